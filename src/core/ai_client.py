@@ -18,6 +18,12 @@ from .secure_key_manager import get_secure_key_manager
 from .multimodal_types import MultimodalMessage, TextContent, ImageContent, FileContent, MediaContent
 from .tool_types import ToolDefinition, ToolCall, ToolCallStatus
 from .tool_manager import ToolManager, get_tool_manager
+from .http_session_pool import get_http_session_pool
+from .sse_stream import SSEDecoder, StreamDeltaExtractor
+from .prompt_layout import get_prompt_cache_stats
+from .concurrency_limiter import (
+    RequestPriority, request_slot, request_slot_blocking, parse_retry_after
+)
 
 logger = logging.getLogger(__name__)
 
@@ -113,7 +119,6 @@ class AIClient:
     
     def __init__(self, config: AIConfig):
         self.config = config
-        self._session = None
         self._setup_logging()
     
     def _setup_logging(self):
@@ -159,6 +164,15 @@ class AIClient:
         
         return headers
     
+    def _get_http_session(self) -> requests.Session:
+        """获取会话池中该服务商、该服务地址的长连接会话"""
+        return get_http_session_pool().get_session(self.config.provider.value, self._get_endpoint_url())
+    
+    @staticmethod
+    def _request_priority(kwargs: Dict[str, Any]) -> RequestPriority:
+        """请求优先级，调用方可通过 priority 参数指定（默认视为交互式请求）"""
+        return RequestPriority(kwargs.get('priority', RequestPriority.INTERACTIVE))
+
     def _get_endpoint_url(self) -> str:
         """获取端点URL"""
         # 用户自定义URL优先级最高
@@ -203,8 +217,8 @@ class AIClient:
         # 处理系统提示词
         if system_prompt:
             if self.config.provider == AIProvider.CLAUDE:
-                # Claude使用system参数而不是system消息
-                pass
+                # Claude使用system参数而不是system消息，由_build_request_data提取
+                messages.append({"role": "system", "content": system_prompt})
             elif is_reasoning_model:
                 # Reasoning models使用developer角色而不是system
                 messages.append({"role": "developer", "content": system_prompt})
@@ -294,7 +308,15 @@ class AIClient:
             
             data["messages"] = user_messages
             if system_msg:
-                data["system"] = system_msg
+                if kwargs.get("cache_system_prompt"):
+                    # 稳定的系统提示词标记为可缓存，后续请求从缓存读取这部分前缀
+                    data["system"] = [{
+                        "type": "text",
+                        "text": system_msg,
+                        "cache_control": {"type": "ephemeral"}
+                    }]
+                else:
+                    data["system"] = system_msg
             data["max_tokens"] = self.config.max_tokens
             data["temperature"] = self.config.temperature
             
@@ -455,7 +477,8 @@ class AIClient:
             elif key not in ["max_tokens", "max_completion_tokens", "temperature", "top_p", "reasoning_effort", 
                            "tools", "tool_choice", "parallel_tool_calls", "timeout", "max_retries", "disable_ssl_verify",
                            "num_ctx", "num_predict", "repeat_penalty", "top_k", "seed", "include_thoughts", 
-                           "includeThoughts", "thinking_budget", "thinkingBudget"]:
+                           "includeThoughts", "thinking_budget", "thinkingBudget", "cache_system_prompt",
+                           "priority"]:
                 # 其他未处理的参数（排除仅用于客户端配置的参数和已处理的特有参数）
                 data[key] = value
         
@@ -499,8 +522,8 @@ class AIClient:
                 safe_data['api_key'] = '***REDACTED***'
             self.logger.debug(f"请求数据: {json.dumps(safe_data, ensure_ascii=False, indent=2)}")
             
-            # 创建会话并设置适当的配置
-            session = requests.Session()
+            # 复用会话池中的长连接会话（重试和连接池已在会话池中配置）
+            session = self._get_http_session()
             
             # 设置代理（如果需要）
             proxies = None
@@ -511,20 +534,6 @@ class AIClient:
                 }
                 self.logger.debug(f"使用代理: {proxies}")
             
-            # 设置请求适配器，增加重试和连接池
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.retry import Retry
-            
-            retry_strategy = Retry(
-                total=3,
-                backoff_factor=1,
-                status_forcelist=[429, 500, 502, 503, 504],
-                allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"]
-            )
-            adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=10)
-            session.mount("http://", adapter)
-            session.mount("https://", adapter)
-            
             # SSL证书验证配置
             verify_ssl = True
             ssl_verify_disabled_warning_shown = False
@@ -542,21 +551,25 @@ class AIClient:
             # 添加额外的超时配置
             timeout_config = (self.config.timeout, self.config.timeout)  # (连接超时, 读取超时)
             
-            response = session.post(
-                url,
-                headers=headers,
-                json=data,
-                timeout=timeout_config,
-                verify=verify_ssl,
-                allow_redirects=True,
-                proxies=proxies
-            )
+            # 在端点的自适应并发窗口内发送请求
+            with request_slot_blocking('chat', url, self._request_priority(kwargs)) as permit:
+                response = session.post(
+                    url,
+                    headers=headers,
+                    json=data,
+                    timeout=timeout_config,
+                    verify=verify_ssl,
+                    allow_redirects=True,
+                    proxies=proxies
+                )
+                permit.set_status(response.status_code, parse_retry_after(response.headers))
             
             elapsed_time = time.time() - start_time
             self.logger.debug(f"请求完成，耗时: {elapsed_time:.2f}秒")
             
             if response.status_code == 200:
                 result = response.json()
+                get_prompt_cache_stats().record(self.config.provider.value, result)
                 content = self._extract_content(result)
                 self.logger.info(f"补全成功: {len(content) if content else 0} 字符")
                 return content
@@ -577,9 +590,6 @@ class AIClient:
             error_msg = f"补全请求失败: {e}"
             self.logger.error(error_msg)
             raise AIClientError(error_msg)
-        finally:
-            if 'session' in locals():
-                session.close()
     
     def complete_multimodal(self, messages: List[MultimodalMessage], system_prompt: Optional[str] = None, **kwargs) -> Optional[str]:
         """多模态补全"""
@@ -596,8 +606,8 @@ class AIClient:
             
             self.logger.debug(f"多模态请求URL: {url}")
             
-            # 创建会话并设置适当的配置
-            session = requests.Session()
+            # 复用会话池中的长连接会话（重试和连接池已在会话池中配置）
+            session = self._get_http_session()
             
             # 设置代理（如果需要）
             proxies = None
@@ -608,20 +618,6 @@ class AIClient:
                 }
                 self.logger.debug(f"使用代理: {proxies}")
             
-            # 设置请求适配器，增加重试和连接池
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.retry import Retry
-            
-            retry_strategy = Retry(
-                total=3,
-                backoff_factor=1,
-                status_forcelist=[429, 500, 502, 503, 504],
-                allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"]
-            )
-            adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=10)
-            session.mount("http://", adapter)
-            session.mount("https://", adapter)
-            
             # SSL证书验证配置
             verify_ssl = True
             if self.config.provider == AIProvider.CUSTOM and hasattr(self.config, 'disable_ssl_verify'):
@@ -634,15 +630,18 @@ class AIClient:
             # 添加额外的超时配置
             timeout_config = (self.config.timeout, self.config.timeout)  # (连接超时, 读取超时)
             
-            response = session.post(
-                url,
-                headers=headers,
-                json=data,
-                timeout=timeout_config,
-                verify=verify_ssl,
-                allow_redirects=True,
-                proxies=proxies
-            )
+            # 在端点的自适应并发窗口内发送请求
+            with request_slot_blocking('chat', url, self._request_priority(kwargs)) as permit:
+                response = session.post(
+                    url,
+                    headers=headers,
+                    json=data,
+                    timeout=timeout_config,
+                    verify=verify_ssl,
+                    allow_redirects=True,
+                    proxies=proxies
+                )
+                permit.set_status(response.status_code, parse_retry_after(response.headers))
             
             elapsed_time = time.time() - start_time
             self.logger.debug(f"多模态请求完成，耗时: {elapsed_time:.2f}秒")
@@ -669,9 +668,6 @@ class AIClient:
             error_msg = f"多模态补全请求失败: {e}"
             self.logger.error(error_msg)
             raise AIClientError(error_msg)
-        finally:
-            if 'session' in locals():
-                session.close()
     
     def _extract_content(self, response_data: Dict[str, Any]) -> Optional[str]:
         """从响应中提取内容"""
@@ -902,38 +898,25 @@ class AIClient:
                 headers = self._get_headers()
                 url = self._get_endpoint_url()
                 
-                session = requests.Session()
-                
-                # 设置重试和超时
-                from requests.adapters import HTTPAdapter
-                from urllib3.util.retry import Retry
-                
-                retry_strategy = Retry(
-                    total=3,
-                    backoff_factor=1,
-                    status_forcelist=[429, 500, 502, 503, 504],
-                    allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"]
-                )
-                adapter = HTTPAdapter(max_retries=retry_strategy)
-                session.mount("http://", adapter)
-                session.mount("https://", adapter)
+                session = self._get_http_session()
                 
                 verify_ssl = True
                 if self.config.provider == AIProvider.CUSTOM and hasattr(self.config, 'disable_ssl_verify'):
                     verify_ssl = not self.config.disable_ssl_verify
                 
-                response = session.post(
-                    url,
-                    headers=headers,
-                    json=data,
-                    timeout=(self.config.timeout, self.config.timeout),
-                    verify=verify_ssl
-                )
+                with request_slot_blocking('chat', url, self._request_priority(kwargs)) as permit:
+                    response = session.post(
+                        url,
+                        headers=headers,
+                        json=data,
+                        timeout=(self.config.timeout, self.config.timeout),
+                        verify=verify_ssl
+                    )
+                    permit.set_status(response.status_code, parse_retry_after(response.headers))
                 
                 if response.status_code != 200:
                     error_msg = f"API请求失败: {response.status_code} - {response.text}"
                     self.logger.error(error_msg)
-                    session.close()
                     raise AIClientError(error_msg)
                 
                 result = response.json()
@@ -978,12 +961,10 @@ class AIClient:
                         conversation_history.append(result_message)
                     
                     # 继续下一轮对话
-                    session.close()
                     continue
                 else:
                     # 没有工具调用，返回最终结果
                     content = self._extract_content(result)
-                    session.close()
                     return content
             
             # 达到最大轮次，返回最后的响应
@@ -1000,56 +981,59 @@ class AIClient:
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._session:
-            self._session.close()
+        # 会话归会话池所有，保持连接供后续请求复用
+        pass
 
 
 class AsyncAIClient(AIClient):
     """异步AI客户端"""
 
-    def __init__(self, config: AIConfig):
-        super().__init__(config)
-        self._session = None
-
     async def __aenter__(self):
-        self._session = aiohttp.ClientSession()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self._session:
-            await self._session.close()
+        # aiohttp会话归会话池所有，随事件循环一起关闭
+        pass
+
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        """获取当前事件循环中该服务商、该服务地址共享的aiohttp会话"""
+        return get_http_session_pool().get_async_session(self.config.provider.value, self._get_endpoint_url())
+
+    def _ssl_option(self) -> Optional[bool]:
+        """aiohttp的ssl参数：仅对明确配置的自定义服务禁用证书验证"""
+        if self.config.provider == AIProvider.CUSTOM and getattr(self.config, 'disable_ssl_verify', False):
+            return False
+        return None
 
     async def complete_async(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Optional[str]:
         """异步补全"""
-        if not self._session:
-            self._session = aiohttp.ClientSession()
+        session = self._get_async_session()
 
         try:
             start_time = time.time()
             self.logger.debug(f"开始异步补全请求: {prompt[:50]}...")
 
             messages = self._build_messages(prompt, system_prompt)
-            data = self._build_request_data(messages, stream=False)
-
-            # 应用额外参数
-            for key, value in kwargs.items():
-                if key in ['max_tokens', 'temperature', 'top_p']:
-                    data[key] = value
+            # 与同步补全相同的请求参数（各服务商的max_tokens、temperature等字段位置不同）
+            data = self._build_request_data(messages, stream=False, **kwargs)
 
             headers = self._get_headers()
             url = self._get_endpoint_url()
 
-            async with self._session.post(
+            async with request_slot('chat', url, self._request_priority(kwargs)) as permit, session.post(
                 url,
                 headers=headers,
                 json=data,
-                timeout=aiohttp.ClientTimeout(total=self.config.timeout)
+                timeout=aiohttp.ClientTimeout(total=self.config.timeout),
+                ssl=self._ssl_option()
             ) as response:
+                permit.set_status(response.status, parse_retry_after(response.headers))
                 elapsed_time = time.time() - start_time
                 self.logger.debug(f"异步请求完成，耗时: {elapsed_time:.2f}秒")
 
                 if response.status == 200:
                     result = await response.json()
+                    get_prompt_cache_stats().record(self.config.provider.value, result)
                     content = self._extract_content(result)
                     self.logger.info(f"异步补全成功: {len(content) if content else 0} 字符")
                     return content
@@ -1070,8 +1054,7 @@ class AsyncAIClient(AIClient):
     
     async def complete_multimodal_async(self, messages: List[MultimodalMessage], system_prompt: Optional[str] = None, **kwargs) -> Optional[str]:
         """异步多模态补全"""
-        if not self._session:
-            self._session = aiohttp.ClientSession()
+        session = self._get_async_session()
 
         try:
             start_time = time.time()
@@ -1088,12 +1071,13 @@ class AsyncAIClient(AIClient):
             headers = self._get_headers()
             url = self._get_endpoint_url()
 
-            async with self._session.post(
+            async with request_slot('chat', url, self._request_priority(kwargs)) as permit, session.post(
                 url,
                 headers=headers,
                 json=data,
                 timeout=aiohttp.ClientTimeout(total=self.config.timeout)
             ) as response:
+                permit.set_status(response.status, parse_retry_after(response.headers))
                 elapsed_time = time.time() - start_time
                 self.logger.debug(f"异步多模态请求完成，耗时: {elapsed_time:.2f}秒")
 
@@ -1119,8 +1103,7 @@ class AsyncAIClient(AIClient):
     
     async def complete_multimodal_stream(self, messages: List[MultimodalMessage], system_prompt: Optional[str] = None, **kwargs) -> AsyncGenerator[str, None]:
         """异步多模态流式补全"""
-        if not self._session:
-            self._session = aiohttp.ClientSession()
+        session = self._get_async_session()
 
         try:
             start_time = time.time()
@@ -1137,12 +1120,13 @@ class AsyncAIClient(AIClient):
             headers = self._get_headers()
             url = self._get_endpoint_url()
 
-            async with self._session.post(
+            async with request_slot('chat', url, self._request_priority(kwargs), stream=True) as permit, session.post(
                 url,
                 headers=headers,
                 json=data,
                 timeout=aiohttp.ClientTimeout(total=self.config.timeout)
             ) as response:
+                permit.set_status(response.status, parse_retry_after(response.headers))
                 if response.status != 200:
                     error_text = await response.text()
                     error_msg = f"多模态流式API请求失败: {response.status} - {error_text}"
@@ -1151,33 +1135,8 @@ class AsyncAIClient(AIClient):
 
                 self.logger.debug("开始接收多模态流式数据")
 
-                async for line in response.content:
-                    if not line:
-                        continue
-
-                    line_str = line.decode('utf-8').strip()
-                    if not line_str:
-                        continue
-
-                    # 处理Server-Sent Events格式
-                    if line_str.startswith('data: '):
-                        data_str = line_str[6:]  # 移除'data: '前缀
-
-                        if data_str == '[DONE]':
-                            self.logger.debug("多模态流式响应完成")
-                            break
-
-                        try:
-                            chunk_data = json.loads(data_str)
-                            content = self._extract_stream_content(chunk_data)
-
-                            if content:
-                                self.logger.debug(f"接收到多模态流式内容: {content}")
-                                yield content
-
-                        except json.JSONDecodeError as e:
-                            self.logger.warning(f"解析多模态流式数据失败: {e}, 数据: {data_str}")
-                            continue
+                async for content in self._iter_stream_deltas(response):
+                    yield content
 
                 elapsed_time = time.time() - start_time
                 self.logger.info(f"多模态流式补全完成，总耗时: {elapsed_time:.2f}秒")
@@ -1196,8 +1155,7 @@ class AsyncAIClient(AIClient):
                                        tool_manager: Optional[ToolManager] = None,
                                        max_tool_rounds: int = 3, **kwargs) -> Optional[str]:
         """异步带工具调用的补全"""
-        if not self._session:
-            self._session = aiohttp.ClientSession()
+        session = self._get_async_session()
         
         if tools is None:
             tools = []
@@ -1220,12 +1178,13 @@ class AsyncAIClient(AIClient):
                 headers = self._get_headers()
                 url = self._get_endpoint_url()
                 
-                async with self._session.post(
+                async with request_slot('chat', url, self._request_priority(kwargs)) as permit, session.post(
                     url,
                     headers=headers,
                     json=data,
                     timeout=aiohttp.ClientTimeout(total=self.config.timeout)
                 ) as response:
+                    permit.set_status(response.status, parse_retry_after(response.headers))
                     if response.status != 200:
                         error_text = await response.text()
                         error_msg = f"异步工具调用API请求失败: {response.status} - {error_text}"
@@ -1234,51 +1193,51 @@ class AsyncAIClient(AIClient):
                     
                     result = await response.json()
                     
-                    # 检查是否有工具调用
-                    if self._has_tool_calls(result):
-                        tool_calls = self._extract_tool_calls(result)
+                # 检查是否有工具调用（工具在归还请求名额后执行）
+                if self._has_tool_calls(result):
+                    tool_calls = self._extract_tool_calls(result)
+                    
+                    # 添加AI的工具调用消息到对话历史
+                    if self.config.provider == AIProvider.CLAUDE:
+                        # Claude格式：添加完整的content块
+                        conversation_history.append({
+                            "role": "assistant",
+                            "content": result.get('content', [])
+                        })
+                    else:
+                        # OpenAI格式：添加带tool_calls的消息
+                        conversation_history.append({
+                            "role": "assistant",
+                            "content": result['choices'][0]['message'].get('content'),
+                            "tool_calls": [tc.to_openai_format() for tc in tool_calls]
+                        })
+                    
+                    # 异步执行工具调用
+                    for tool_call in tool_calls:
+                        self.logger.info(f"异步执行工具: {tool_call.tool_name}")
                         
-                        # 添加AI的工具调用消息到对话历史
-                        if self.config.provider == AIProvider.CLAUDE:
-                            # Claude格式：添加完整的content块
-                            conversation_history.append({
-                                "role": "assistant",
-                                "content": result.get('content', [])
-                            })
+                        # 检查工具是否可用
+                        available_tools = {tool.name: tool for tool in tools}
+                        if tool_call.tool_name not in available_tools:
+                            error_msg = f"请求的工具 {tool_call.tool_name} 不可用"
+                            self.logger.warning(error_msg)
+                            tool_result = {"error": error_msg}
                         else:
-                            # OpenAI格式：添加带tool_calls的消息
-                            conversation_history.append({
-                                "role": "assistant",
-                                "content": result['choices'][0]['message'].get('content'),
-                                "tool_calls": [tc.to_openai_format() for tc in tool_calls]
-                            })
-                        
-                        # 异步执行工具调用
-                        for tool_call in tool_calls:
-                            self.logger.info(f"异步执行工具: {tool_call.tool_name}")
-                            
-                            # 检查工具是否可用
-                            available_tools = {tool.name: tool for tool in tools}
-                            if tool_call.tool_name not in available_tools:
-                                error_msg = f"请求的工具 {tool_call.tool_name} 不可用"
-                                self.logger.warning(error_msg)
-                                tool_result = {"error": error_msg}
-                            else:
-                                # 异步执行工具
-                                execution_result = await tool_manager.execute_tool_call_async(tool_call)
-                                tool_result = execution_result.result if execution_result.success else {"error": execution_result.error}
-                            
-                            # 添加工具执行结果到对话历史
-                            result_message = tool_call.to_result_message(self.config.provider.value)
-                            result_message["content"] = json.dumps(tool_result, ensure_ascii=False)
-                            conversation_history.append(result_message)
+                            # 异步执行工具
+                            execution_result = await tool_manager.execute_tool_call_async(tool_call)
+                            tool_result = execution_result.result if execution_result.success else {"error": execution_result.error}
                         
-                        # 继续下一轮对话
-                        continue
-                    else:
-                        # 没有工具调用，返回最终结果
-                        content = self._extract_content(result)
-                        return content
+                        # 添加工具执行结果到对话历史
+                        result_message = tool_call.to_result_message(self.config.provider.value)
+                        result_message["content"] = json.dumps(tool_result, ensure_ascii=False)
+                        conversation_history.append(result_message)
+                    
+                    # 继续下一轮对话
+                    continue
+                else:
+                    # 没有工具调用，返回最终结果
+                    content = self._extract_content(result)
+                    return content
             
             # 达到最大轮次，返回最后的响应
             self.logger.warning(f"异步工具调用达到最大轮次 {max_tool_rounds}")
@@ -1292,8 +1251,7 @@ class AsyncAIClient(AIClient):
 
     async def complete_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> AsyncGenerator[str, None]:
         """流式补全"""
-        if not self._session:
-            self._session = aiohttp.ClientSession()
+        session = self._get_async_session()
 
         try:
             start_time = time.time()
@@ -1310,12 +1268,13 @@ class AsyncAIClient(AIClient):
             headers = self._get_headers()
             url = self._get_endpoint_url()
 
-            async with self._session.post(
+            async with request_slot('chat', url, self._request_priority(kwargs), stream=True) as permit, session.post(
                 url,
                 headers=headers,
                 json=data,
                 timeout=aiohttp.ClientTimeout(total=self.config.timeout)
             ) as response:
+                permit.set_status(response.status, parse_retry_after(response.headers))
                 if response.status != 200:
                     error_text = await response.text()
                     error_msg = f"流式API请求失败: {response.status} - {error_text}"
@@ -1324,33 +1283,8 @@ class AsyncAIClient(AIClient):
 
                 self.logger.debug("开始接收流式数据")
 
-                async for line in response.content:
-                    if not line:
-                        continue
-
-                    line_str = line.decode('utf-8').strip()
-                    if not line_str:
-                        continue
-
-                    # 处理Server-Sent Events格式
-                    if line_str.startswith('data: '):
-                        data_str = line_str[6:]  # 移除'data: '前缀
-
-                        if data_str == '[DONE]':
-                            self.logger.debug("流式响应完成")
-                            break
-
-                        try:
-                            chunk_data = json.loads(data_str)
-                            content = self._extract_stream_content(chunk_data)
-
-                            if content:
-                                self.logger.debug(f"接收到流式内容: {content}")
-                                yield content
-
-                        except json.JSONDecodeError as e:
-                            self.logger.warning(f"解析流式数据失败: {e}, 数据: {data_str}")
-                            continue
+                async for content in self._iter_stream_deltas(response):
+                    yield content
 
                 elapsed_time = time.time() - start_time
                 self.logger.info(f"流式补全完成，总耗时: {elapsed_time:.2f}秒")
@@ -1364,23 +1298,28 @@ class AsyncAIClient(AIClient):
             self.logger.error(error_msg)
             raise AIClientError(error_msg)
 
-    def _extract_stream_content(self, chunk_data: Dict[str, Any]) -> Optional[str]:
-        """从流式响应块中提取内容"""
-        try:
-            if self.config.provider == AIProvider.CLAUDE:
-                # Claude流式响应格式
-                if chunk_data.get('type') == 'content_block_delta':
-                    delta = chunk_data.get('delta', {})
-                    return delta.get('text', '')
-            else:
-                # OpenAI流式响应格式
-                if 'choices' in chunk_data and len(chunk_data['choices']) > 0:
-                    choice = chunk_data['choices'][0]
-                    delta = choice.get('delta', {})
-                    return delta.get('content', '')
-
-            return None
-
-        except Exception as e:
-            self.logger.warning(f"提取流式内容失败: {e}")
-            return None
+    async def _iter_stream_deltas(self, response: aiohttp.ClientResponse) -> AsyncGenerator[str, None]:
+        """增量解码SSE响应体，逐个产出增量文本"""
+        decoder = SSEDecoder()
+        extractor = StreamDeltaExtractor(self.config.provider.value)
+        chunk_count = 0
+
+        # 按到达的数据块读取，残缺的行和事件留在解码器缓冲区中
+        async for data in response.content.iter_any():
+            for payload in decoder.feed(data):
+                if payload == '[DONE]':
+                    self.logger.debug(f"流式响应完成，共{chunk_count}个增量")
+                    return
+                content = extractor.extract(payload)
+                if content:
+                    chunk_count += 1
+                    yield content
+
+        for payload in decoder.flush():
+            if payload == '[DONE]':
+                break
+            content = extractor.extract(payload)
+            if content:
+                chunk_count += 1
+                yield content
+        self.logger.debug(f"流式响应结束，共{chunk_count}个增量")
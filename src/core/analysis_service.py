@@ -0,0 +1,357 @@
+"""
+文本分析服务
+将分词、NLP语义分析、引用检测等CPU密集型任务放到独立进程池中执行，
+避免在GUI进程中与Qt事件循环争抢GIL
+"""
+
+import logging
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisJobKind(Enum):
+    """分析任务类型"""
+    TEXT_STRUCTURE = "text_structure"            # ChineseSegmenter.analyze_text_structure
+    SEMANTIC = "semantic"                        # NLPAnalyzer.analyze_text
+    ENHANCED_REFERENCES = "enhanced_references"  # EnhancedReferenceDetector.detect_references
+    OPTIMIZED_REFERENCES = "optimized_references"  # OptimizedEntityDetector.detect_references
+    OUTLINE_SEMANTIC = "outline_semantic"        # SemanticOutlineParser.parse
+
+
+# 需要Codex条目快照的任务类型
+_CODEX_JOB_KINDS = {
+    AnalysisJobKind.ENHANCED_REFERENCES,
+    AnalysisJobKind.OPTIMIZED_REFERENCES,
+}
+
+
+@dataclass
+class AnalysisJob:
+    """分析任务（一批文档或段落）"""
+    job_id: str
+    kind: AnalysisJobKind
+    texts: List[str]
+    key: Optional[str] = None   # 同一key的新任务会取消旧任务（如文档ID）
+    future: Optional[Future] = field(default=None, repr=False)
+
+
+# ---------------------------------------------------------------------------
+# 工作进程侧：以下函数在子进程中执行，必须是模块级函数以便pickle
+# ---------------------------------------------------------------------------
+
+class _CodexSnapshot:
+    """工作进程内的只读Codex条目快照，提供检测器所需的CodexManager查询接口"""
+
+    def __init__(self, entries: List['CodexEntry']):
+        self._entries = {entry.id: entry for entry in entries}
+        self._title_to_id = {entry.title: entry.id for entry in entries}
+        self._alias_to_id = {
+            alias.strip(): entry.id
+            for entry in entries
+            for alias in (entry.aliases or [])
+            if alias and alias.strip()
+        }
+
+    def get_all_entries(self) -> List['CodexEntry']:
+        return list(self._entries.values())
+
+    def get_entry(self, entry_id: str) -> Optional['CodexEntry']:
+        return self._entries.get(entry_id)
+
+    def get_entry_by_title(self, title: str) -> Optional['CodexEntry']:
+        entry_id = self._title_to_id.get(title)
+        return self._entries.get(entry_id) if entry_id else None
+
+    def get_entry_by_alias(self, alias: str) -> Optional['CodexEntry']:
+        entry_id = self._alias_to_id.get(alias.strip())
+        return self._entries.get(entry_id) if entry_id else None
+
+
+# 每个工作进程的常驻状态
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker():
+    """工作进程初始化：只加载一次jieba主词典"""
+    logging.getLogger().setLevel(logging.WARNING)
+    from .chinese_segmentation import get_segmenter, JIEBA_AVAILABLE
+    if JIEBA_AVAILABLE:
+        import jieba
+        jieba.initialize()
+    _worker_state['segmenter'] = get_segmenter()
+
+
+def _get_worker_detector(kind: AnalysisJobKind, codex_version: int,
+                         codex_entries: List['CodexEntry']):
+    """获取（或按Codex版本重建）工作进程内的检测器"""
+    cache_key = (kind, codex_version)
+    detector = _worker_state.get('detectors', {}).get(cache_key)
+    if detector is not None:
+        return detector
+
+    snapshot = _CodexSnapshot(codex_entries or [])
+    if kind == AnalysisJobKind.ENHANCED_REFERENCES:
+        from .enhanced_reference_detector import EnhancedReferenceDetector
+        detector = EnhancedReferenceDetector(snapshot)
+    else:
+        from .optimized_entity_detector import OptimizedEntityDetector
+        detector = OptimizedEntityDetector(snapshot)
+
+    # 只保留当前Codex版本的检测器
+    _worker_state['detectors'] = {cache_key: detector}
+    return detector
+
+
+def _run_analysis_batch(kind: AnalysisJobKind, texts: List[str],
+                        codex_version: int = 0,
+                        codex_entries: Optional[List['CodexEntry']] = None) -> List[Any]:
+    """
+    在工作进程中执行一批分析任务
+
+    Returns:
+        与texts一一对应的分析结果列表
+    """
+    if kind == AnalysisJobKind.TEXT_STRUCTURE:
+        from .chinese_segmentation import get_segmenter
+        segmenter = _worker_state.get('segmenter') or get_segmenter()
+        return [segmenter.analyze_text_structure(text) for text in texts]
+
+    if kind == AnalysisJobKind.SEMANTIC:
+        analyzer = _worker_state.get('nlp_analyzer')
+        if analyzer is None:
+            from .nlp_analyzer import NLPAnalyzer
+            analyzer = _worker_state['nlp_analyzer'] = NLPAnalyzer()
+        return [analyzer.analyze_text(text) for text in texts]
+
+    if kind in _CODEX_JOB_KINDS:
+        detector = _get_worker_detector(kind, codex_version, codex_entries)
+        return [detector.detect_references(text) for text in texts]
+
+    if kind == AnalysisJobKind.OUTLINE_SEMANTIC:
+        parser = _worker_state.get('outline_parser')
+        if parser is None:
+            from .outline_parser import SemanticOutlineParser
+            parser = _worker_state['outline_parser'] = SemanticOutlineParser()
+        return [parser.parse(text) for text in texts]
+
+    raise ValueError(f"Unsupported analysis job kind: {kind}")
+
+
+# ---------------------------------------------------------------------------
+# GUI进程侧
+# ---------------------------------------------------------------------------
+
+class AnalysisService(QObject):
+    """
+    后台文本分析服务
+
+    任务以批次提交到进程池，结果通过Qt信号返回GUI线程。
+    同一key的任务只保留最新一次提交，文本再次变化时旧任务会被取消或丢弃。
+    """
+
+    # 信号定义
+    jobFinished = pyqtSignal(str, object)  # (job_id, 结果列表)
+    jobFailed = pyqtSignal(str, str)       # (job_id, 错误信息)
+    jobCancelled = pyqtSignal(str)         # job_id
+
+    # 内部信号：把执行器线程中的完成回调转到GUI线程处理
+    _futureDone = pyqtSignal(str, object)
+
+    def __init__(self, codex_manager=None, max_workers: int = 2,
+                 use_processes: bool = True, parent=None):
+        super().__init__(parent)
+        self._codex_manager = codex_manager
+        self._max_workers = max(1, max_workers)
+        self._use_processes = use_processes
+        self._executor = None
+
+        self._job_counter = itertools.count(1)
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._latest_by_key: Dict[str, str] = {}
+
+        # 统计信息
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+        }
+
+        self._futureDone.connect(self._on_job_done)
+
+        logger.info("AnalysisService initialized")
+
+    def set_codex_manager(self, codex_manager):
+        """设置Codex管理器（引用检测任务需要）"""
+        self._codex_manager = codex_manager
+
+    def _get_executor(self):
+        """惰性创建执行器；进程池不可用时降级为线程池"""
+        if self._executor is not None:
+            return self._executor
+
+        if self._use_processes:
+            try:
+                # 使用spawn避免在已有Qt线程的进程中fork
+                context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=context,
+                    initializer=_init_worker
+                )
+                logger.info(f"分析服务进程池已启动: {self._max_workers} 个工作进程")
+                return self._executor
+            except (OSError, ValueError, NotImplementedError) as e:
+                logger.warning(f"无法启动分析进程池，降级为线程池: {e}")
+                self._use_processes = False
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_workers,
+            thread_name_prefix="analysis",
+            initializer=_init_worker
+        )
+        return self._executor
+
+    def submit(self, kind: AnalysisJobKind, texts: List[str], key: Optional[str] = None) -> str:
+        """
+        提交一批分析任务
+
+        Args:
+            kind: 任务类型
+            texts: 待分析的文档或段落列表
+            key: 任务键，同一键的旧任务会被取消（如文档ID）
+
+        Returns:
+            任务ID
+        """
+        job_id = f"analysis_{next(self._job_counter)}"
+        job = AnalysisJob(job_id=job_id, kind=kind, texts=list(texts), key=key)
+
+        if key is not None:
+            self.cancel(key)
+            self._latest_by_key[key] = job_id
+
+        codex_version = 0
+        codex_entries = None
+        if kind in _CODEX_JOB_KINDS:
+            if not self._codex_manager:
+                raise ValueError(f"{kind.value} 任务需要Codex管理器")
+            codex_version = self._codex_manager.pattern_version
+            codex_entries = self._codex_manager.get_all_entries()
+
+        try:
+            job.future = self._get_executor().submit(
+                _run_analysis_batch, kind, job.texts, codex_version, codex_entries
+            )
+        except BrokenProcessPool as e:
+            logger.warning(f"分析进程池已损坏，重新创建: {e}")
+            self._executor = None
+            job.future = self._get_executor().submit(
+                _run_analysis_batch, kind, job.texts, codex_version, codex_entries
+            )
+
+        self._jobs[job_id] = job
+        self._stats['submitted'] += 1
+        # 回调在执行器的管理线程中触发，经由信号排队投递到GUI线程
+        job.future.add_done_callback(lambda future, jid=job_id: self._futureDone.emit(jid, future))
+
+        logger.debug(f"提交分析任务 {job_id}: {kind.value}, {len(job.texts)} 段文本")
+        return job_id
+
+    def cancel(self, key: str) -> bool:
+        """
+        取消指定键的未完成任务
+
+        已在执行的任务无法中断，其结果将在完成时被丢弃。
+        """
+        job_id = self._latest_by_key.pop(key, None)
+        if not job_id:
+            return False
+
+        job = self._jobs.get(job_id)
+        if job and job.future and not job.future.done():
+            job.future.cancel()
+            return True
+        return False
+
+    def is_stale(self, job_id: str, job: Optional[AnalysisJob] = None) -> bool:
+        """任务结果是否已过期（同一键有更新的任务）"""
+        job = job or self._jobs.get(job_id)
+        if not job or job.key is None:
+            return False
+        return self._latest_by_key.get(job.key) != job_id
+
+    def _on_job_done(self, job_id: str, future: Future):
+        """任务完成回调"""
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return
+
+        if future.cancelled() or self.is_stale(job_id, job):
+            self._stats['cancelled'] += 1
+            self.jobCancelled.emit(job_id)
+            return
+
+        if job.key is not None:
+            self._latest_by_key.pop(job.key, None)
+
+        error = future.exception()
+        if error is not None:
+            self._stats['failed'] += 1
+            logger.error(f"分析任务 {job_id} 失败: {error}")
+            self.jobFailed.emit(job_id, str(error))
+            return
+
+        self._stats['completed'] += 1
+        self.jobFinished.emit(job_id, future.result())
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取服务统计信息"""
+        stats = dict(self._stats)
+        stats.update({
+            'pending': len(self._jobs),
+            'use_processes': self._use_processes,
+            'max_workers': self._max_workers,
+        })
+        return stats
+
+    def shutdown(self, wait: bool = False):
+        """关闭服务，取消所有未开始的任务"""
+        for job in list(self._jobs.values()):
+            if job.future and not job.future.done():
+                job.future.cancel()
+        self._latest_by_key.clear()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        logger.info("AnalysisService shut down")
+
+
+# 全局实例
+_global_analysis_service: Optional[AnalysisService] = None
+
+
+def get_analysis_service() -> AnalysisService:
+    """获取全局分析服务实例"""
+    global _global_analysis_service
+    if _global_analysis_service is None:
+        _global_analysis_service = AnalysisService()
+    return _global_analysis_service
+
+
+def shutdown_analysis_service():
+    """关闭全局分析服务"""
+    global _global_analysis_service
+    if _global_analysis_service is not None:
+        _global_analysis_service.shutdown()
+        _global_analysis_service = None
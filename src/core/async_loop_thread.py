@@ -0,0 +1,118 @@
+"""
+后台asyncio事件循环线程
+所有Qt端的AI请求都以协程形式提交到同一个常驻事件循环，
+避免每次请求都创建线程、事件循环和HTTP会话
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLoopThread:
+    """常驻后台线程中运行的asyncio事件循环"""
+
+    def __init__(self, name: str = "ai-event-loop"):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """事件循环（首次访问时启动线程）"""
+        self.start()
+        return self._loop
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动事件循环线程（已启动时无操作）"""
+        with self._lock:
+            if self.is_running():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+        self._ready.wait()
+        logger.info(f"后台事件循环线程已启动: {self._name}")
+
+    def _run(self):
+        """线程主函数"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._ready.set()
+
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                self._shutdown_loop(loop)
+            finally:
+                loop.close()
+                logger.info(f"后台事件循环线程已退出: {self._name}")
+
+    @staticmethod
+    def _shutdown_loop(loop: asyncio.AbstractEventLoop):
+        """取消未完成的任务并关闭绑定在该循环上的HTTP会话"""
+        pending = [task for task in asyncio.all_tasks(loop) if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
+        from .http_session_pool import get_http_session_pool
+        loop.run_until_complete(get_http_session_pool().close_async_sessions())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        提交协程到事件循环
+
+        Returns:
+            concurrent.futures.Future，可在任意线程中取消或查询
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout: float = 2.0):
+        """停止事件循环并等待线程退出"""
+        with self._lock:
+            thread, loop = self._thread, self._loop
+            self._thread = None
+        if thread is None or loop is None:
+            return
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"后台事件循环线程未在 {timeout} 秒内退出")
+
+
+# 全局AI事件循环
+_global_ai_loop: Optional[AsyncLoopThread] = None
+_global_ai_loop_lock = threading.Lock()
+
+
+def get_ai_event_loop() -> AsyncLoopThread:
+    """获取全局AI事件循环线程"""
+    global _global_ai_loop
+    with _global_ai_loop_lock:
+        if _global_ai_loop is None:
+            _global_ai_loop = AsyncLoopThread()
+        return _global_ai_loop
+
+
+def shutdown_ai_event_loop(timeout: float = 2.0):
+    """停止全局AI事件循环线程"""
+    global _global_ai_loop
+    with _global_ai_loop_lock:
+        loop_thread, _global_ai_loop = _global_ai_loop, None
+    if loop_thread is not None:
+        loop_thread.stop(timeout)
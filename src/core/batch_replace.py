@@ -0,0 +1,205 @@
+"""
+项目级批量替换
+基于项目存储中的文档内容（而不是打开的编辑器）计算所有文档的替换结果，
+生成按行的预览差异；应用时由项目管理器在一个数据库事务中写入所有被修改的文档。
+匹配规则与全局搜索一致（SearchQuery），候选行由全文索引筛选。
+"""
+
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .search_index import SearchQuery, get_search_index
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LineChange:
+    """一行的替换结果"""
+    line_num: int           # 行号（从1开始）
+    before: str
+    after: str
+    count: int              # 行内替换次数
+
+
+@dataclass
+class DocumentReplacement:
+    """一个文档的替换结果"""
+    doc_id: str
+    title: str
+    original: str           # 计算替换时的文档内容，应用前据此检测冲突
+    content: str            # 替换后的内容
+    changes: List[LineChange] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return sum(change.count for change in self.changes)
+
+
+@dataclass
+class ReplacePlan:
+    """一次批量替换的完整计划，按文档顺序排列"""
+    search_text: str
+    replace_text: str
+    options: Dict
+    documents: List[DocumentReplacement] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return sum(doc.count for doc in self.documents)
+
+    def select(self, doc_ids: Iterable[str]) -> 'ReplacePlan':
+        """只保留指定文档的计划（预览中取消勾选的文档不替换）"""
+        selected = set(doc_ids)
+        return ReplacePlan(self.search_text, self.replace_text, self.options,
+                           [doc for doc in self.documents if doc.doc_id in selected])
+
+
+def replace_query(search_text: str, options: Optional[Mapping] = None) -> SearchQuery:
+    """
+    构造用于替换的搜索条件
+
+    替换总是替换整个搜索文本，因此强制使用短语匹配。
+    """
+    options = dict(options or {})
+    options["phrase"] = True
+    return SearchQuery(search_text, options)
+
+
+def replace_line(query: SearchQuery, line: str, replace_text: str) -> Tuple[str, int]:
+    """
+    替换一行中的所有匹配
+
+    正则表达式模式下替换文本支持 \\1、\\g<name> 形式的分组引用；
+    引用无效时抛出 ValueError。
+
+    Returns:
+        (替换后的行, 替换次数)
+    """
+    spans = query.find_spans(line)
+    if not spans:
+        return line, 0
+    if query.regex:
+        wanted = set(spans)
+        replacements = []
+        try:
+            for match in query.patterns[0].finditer(line):
+                if match.span() in wanted:
+                    replacements.append((match.start(), match.end(), match.expand(replace_text)))
+        except (re.error, IndexError) as e:
+            raise ValueError(f"Invalid replacement text: {e}") from e
+    else:
+        replacements = [(start, end, replace_text) for start, end in spans]
+
+    parts, last = [], 0
+    for start, end, text in replacements:
+        parts.append(line[last:start])
+        parts.append(text)
+        last = end
+    parts.append(line[last:])
+    return "".join(parts), len(replacements)
+
+
+def replace_document(query: SearchQuery, doc_id: str, title: str, content: str, replace_text: str,
+                     line_nums: Optional[Iterable[int]] = None) -> Optional[DocumentReplacement]:
+    """
+    计算一个文档的替换结果
+
+    Args:
+        line_nums: 只检查这些行（全文索引筛选出的候选行），为None时检查全部行
+
+    Returns:
+        没有任何替换时返回None
+    """
+    lines = content.split('\n')
+    if line_nums is None:
+        line_nums = range(1, len(lines) + 1)
+    changes = []
+    for line_num in line_nums:
+        if not 0 < line_num <= len(lines):
+            continue
+        before = lines[line_num - 1]
+        after, count = replace_line(query, before, replace_text)
+        if count and after != before:
+            lines[line_num - 1] = after
+            changes.append(LineChange(line_num, before, after, count))
+    if not changes:
+        return None
+    return DocumentReplacement(doc_id, title, content, '\n'.join(lines), changes)
+
+
+def plan_replacements(search_text: str, replace_text: str, options: Optional[Mapping],
+                      order: Iterable[str], contents: Mapping[str, str],
+                      titles: Optional[Mapping[str, str]] = None,
+                      is_cancelled: Optional[Callable[[], bool]] = None) -> Optional[ReplacePlan]:
+    """
+    计算整个项目的替换计划
+
+    全文索引已打开时先将其与 contents 同步，再只在候选行上替换；否则逐行检查全部文档。
+
+    Args:
+        order: 文档顺序（document_order 的结果）
+        contents: 文档ID -> 项目存储中的内容
+        titles: 文档ID -> 标题，用于预览
+        is_cancelled: 返回True时中止计算
+
+    Returns:
+        替换计划；被取消时返回None
+
+    Raises:
+        ValueError: 搜索条件或替换文本无效
+    """
+    query = replace_query(search_text, options)
+    titles = titles or {}
+
+    index = get_search_index()
+    candidates = None
+    if index.is_attached:
+        index.sync(contents)
+        candidates = {doc_id: [line_num for line_num, _ in lines]
+                      for doc_id, lines in index.candidates(query).items()}
+
+    plan = ReplacePlan(search_text, replace_text, dict(options or {}, phrase=True))
+    for doc_id in order:
+        if is_cancelled is not None and is_cancelled():
+            return None
+        content = contents.get(doc_id)
+        if not content:
+            continue
+        line_nums = None
+        if candidates is not None:
+            line_nums = candidates.get(doc_id)
+            if not line_nums:
+                continue
+        replacement = replace_document(query, doc_id, titles.get(doc_id, doc_id), content,
+                                       replace_text, line_nums)
+        if replacement is not None:
+            plan.documents.append(replacement)
+    logger.debug(f"Replace plan for '{search_text}': {plan.count} replacements "
+                 f"in {len(plan.documents)} documents")
+    return plan
+
+
+def apply_plan(project_manager, plan: ReplacePlan) -> Tuple[List[str], List[str]]:
+    """
+    应用替换计划
+
+    计算计划之后内容又发生变化的文档视为冲突，不做替换；
+    其余文档在一个数据库事务中写入，失败时全部不生效（异常向上抛出）。
+
+    Returns:
+        (已替换的文档ID, 因冲突跳过的文档ID)
+    """
+    contents, conflicts = {}, []
+    for doc in plan.documents:
+        if project_manager.get_document_content(doc.doc_id) == doc.original:
+            contents[doc.doc_id] = doc.content
+        else:
+            conflicts.append(doc.doc_id)
+    if conflicts:
+        logger.warning(f"Batch replace skipped {len(conflicts)} documents modified after planning")
+    applied = project_manager.update_documents_content(contents) if contents else []
+    return applied, conflicts
+
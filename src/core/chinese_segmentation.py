@@ -3,8 +3,13 @@
 基于jieba分词库，为Codex系统提供智能文本处理
 """
 
+import io
 import re
+import json
+import hashlib
 import logging
+from collections import OrderedDict
+from pathlib import Path
 from typing import List, Dict, Set, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
@@ -76,15 +81,140 @@ class SegmentedWord:
             return WordType.OTHER
 
 
+# 分词缓存条目: (词, 词性, 段内起始位置, 段内结束位置)
+_CachedToken = Tuple[str, str, int, int]
+
+
+class SegmentationCache:
+    """
+    段落级分词结果LRU缓存
+
+    以 (段落sha1, 分词模式, 词典版本) 为键缓存分词结果，
+    支持按项目持久化到磁盘，未变化的段落无需重新分词。
+    """
+
+    CACHE_FORMAT_VERSION = 1
+
+    def __init__(self, max_entries: int = 4096):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, List[_CachedToken]]" = OrderedDict()
+        self._cache_file: Optional[Path] = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(paragraph: str, mode: str, dict_version: str) -> str:
+        """生成缓存键"""
+        digest = hashlib.sha1(paragraph.encode('utf-8')).hexdigest()
+        return f"{digest}:{mode}:{dict_version}"
+
+    def get(self, key: str) -> Optional[List[_CachedToken]]:
+        """获取缓存的分词结果"""
+        tokens = self._entries.get(key)
+        if tokens is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return tokens
+
+    def put(self, key: str, tokens: List[_CachedToken]):
+        """写入分词结果"""
+        self._entries[key] = tokens
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, float]:
+        """获取缓存统计"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self._max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def attach(self, cache_file: Path):
+        """绑定磁盘缓存文件并加载已有内容"""
+        self._cache_file = Path(cache_file)
+        self._entries.clear()
+        self._dirty = False
+
+        if not self._cache_file.exists():
+            return
+
+        try:
+            with open(self._cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format_version') != self.CACHE_FORMAT_VERSION:
+                logger.info("分词缓存格式版本不匹配，忽略旧缓存")
+                return
+            for key, tokens in data.get('entries', []):
+                self._entries[key] = [tuple(token) for token in tokens]
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            logger.info(f"已加载分词缓存: {len(self._entries)} 个段落")
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"加载分词缓存失败: {e}")
+            self._entries.clear()
+
+    def save(self):
+        """将缓存写回磁盘（仅在有修改时）"""
+        if not self._cache_file or not self._dirty:
+            return
+
+        try:
+            self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+            data = {
+                'format_version': self.CACHE_FORMAT_VERSION,
+                'entries': [[key, tokens] for key, tokens in self._entries.items()]
+            }
+            tmp_file = self._cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            tmp_file.replace(self._cache_file)
+            self._dirty = False
+            logger.debug(f"分词缓存已保存: {self._cache_file}")
+        except OSError as e:
+            logger.warning(f"保存分词缓存失败: {e}")
+
+    def detach(self):
+        """保存并解除磁盘绑定"""
+        self.save()
+        self._cache_file = None
+        self._entries.clear()
+        self._dirty = False
+
+
 class ChineseSegmenter:
     """中文分词器"""
     
-    def __init__(self, enable_custom_dict: bool = True):
+    # 自定义词汇类型对应的jieba词性标签
+    _WORD_TYPE_TAGS = {
+        "character": "nr",
+        "location": "ns",
+        "object": "nz",
+    }
+    
+    def __init__(self, enable_custom_dict: bool = True, cache_size: int = 4096):
         """
         初始化分词器
         
         Args:
             enable_custom_dict: 是否启用自定义词典
+            cache_size: 段落分词缓存的最大条目数
         """
         self._custom_words = set()  # 自定义词汇
         self._character_names = set()  # 角色名
@@ -93,6 +223,11 @@ class ChineseSegmenter:
         
         self._enable_custom_dict = enable_custom_dict
         
+        # 已加载到jieba的词汇及词典版本戳（版本戳参与缓存键，词典变化后旧结果自动失效）
+        self._loaded_words: Dict[str, str] = {}
+        self._dict_version = "base"
+        self._cache = SegmentationCache(max_entries=cache_size)
+        
         if JIEBA_AVAILABLE and enable_custom_dict:
             logger.critical("🎯[JIEBA_DEBUG] 正在初始化jieba自定义词典...")
             self._init_jieba()
@@ -129,6 +264,7 @@ class ChineseSegmenter:
         if not words:
             return
         
+        new_words = {}
         for word in words:
             if word and len(word.strip()) > 0:
                 clean_word = word.strip()
@@ -142,12 +278,89 @@ class ChineseSegmenter:
                 elif word_type == "object":
                     self._object_names.add(clean_word)
                 
-                # 如果jieba可用，添加到jieba词典
-                if JIEBA_AVAILABLE and self._enable_custom_dict:
-                    jieba.add_word(clean_word, freq=2000)
+                new_words[clean_word] = word_type
+        
+        # 如果jieba可用，批量加载到jieba词典
+        self._load_user_dictionary(new_words)
         
         logger.info(f"已添加 {len(words)} 个 {word_type} 类型的自定义词汇")
     
+    @staticmethod
+    def _compute_dict_version(words: Dict[str, str]) -> str:
+        """根据词汇表计算词典版本戳"""
+        if not words:
+            return "base"
+        digest = hashlib.sha1()
+        for word in sorted(words):
+            digest.update(f"{word}\t{words[word]}\n".encode('utf-8'))
+        return digest.hexdigest()[:16]
+    
+    def _load_user_dictionary(self, words: Dict[str, str]):
+        """
+        批量加载用户词典
+        
+        只加载尚未载入jieba的新词，并以jieba用户词典格式一次性导入，
+        随后更新词典版本戳。
+        
+        Args:
+            words: 词汇 -> 词汇类型
+        """
+        pending = {
+            word: word_type for word, word_type in words.items()
+            if self._loaded_words.get(word) != word_type
+        }
+        if not pending:
+            return
+        
+        self._loaded_words.update(pending)
+        self._dict_version = self._compute_dict_version(self._loaded_words)
+        
+        if not (JIEBA_AVAILABLE and self._enable_custom_dict):
+            return
+        
+        lines = []
+        for word, word_type in pending.items():
+            # jieba用户词典以空白分隔字段，含空白的词无法通过词典格式导入
+            if re.search(r'\s', word):
+                jieba.add_word(word, freq=2000)
+                continue
+            tag = self._WORD_TYPE_TAGS.get(word_type)
+            lines.append(f"{word} 2000 {tag}" if tag else f"{word} 2000")
+        
+        if lines:
+            jieba.load_userdict(io.StringIO("\n".join(lines)))
+        
+        logger.debug(f"已批量加载 {len(pending)} 个用户词汇，词典版本: {self._dict_version}")
+    
+    @property
+    def dictionary_version(self) -> str:
+        """当前用户词典版本戳"""
+        return self._dict_version
+    
+    @property
+    def cache(self) -> SegmentationCache:
+        """段落分词缓存"""
+        return self._cache
+    
+    def attach_project_cache(self, project_path: str):
+        """
+        绑定项目级分词缓存
+        
+        Args:
+            project_path: 项目根目录
+        """
+        cache_file = Path(project_path) / "cache" / "segmentation_cache.json"
+        self._cache.save()
+        self._cache.attach(cache_file)
+    
+    def save_cache(self):
+        """保存项目级分词缓存"""
+        self._cache.save()
+    
+    def detach_project_cache(self):
+        """保存并解除项目级分词缓存"""
+        self._cache.detach()
+    
     def segment_text(self, text: str, with_pos: bool = True) -> List[SegmentedWord]:
         """
         对文本进行分词
@@ -162,60 +375,61 @@ class ChineseSegmenter:
         if not text or not text.strip():
             return []
         
-        results = []
+        if not JIEBA_AVAILABLE:
+            logger.critical("❌[JIEBA_DEBUG] jieba不可用，降级到基础分词（按字符），文本长度: %d", len(text))
+            # 降级到基础分词（按字符）
+            return self._basic_segment(text)
         
-        if JIEBA_AVAILABLE and with_pos:
+        if with_pos:
             logger.critical("🎯[JIEBA_DEBUG] 使用jieba进行词性标注分词，文本长度: %d", len(text))
-            # 使用jieba进行词性标注分词
-            words = pseg.cut(text)
-            current_pos = 0
-            
-            for word, pos in words:
-                if word.strip():  # 跳过空白字符
-                    # 在原文中找到词的位置
-                    start_pos = text.find(word, current_pos)
-                    if start_pos != -1:
-                        end_pos = start_pos + len(word)
-                        
-                        segmented_word = SegmentedWord(
-                            word=word,
-                            pos=pos,
-                            start=start_pos,
-                            end=end_pos,
-                            word_type=WordType.OTHER  # 会在__post_init__中设置
-                        )
-                        results.append(segmented_word)
-                        current_pos = end_pos
-        
-        elif JIEBA_AVAILABLE:
+        else:
             logger.critical("🎯[JIEBA_DEBUG] 使用jieba进行简单分词，文本长度: %d", len(text))
-            # 使用jieba进行简单分词
-            words = jieba.cut(text, cut_all=False)
-            current_pos = 0
-            
-            for word in words:
-                if word.strip():
-                    start_pos = text.find(word, current_pos)
-                    if start_pos != -1:
-                        end_pos = start_pos + len(word)
-                        
-                        segmented_word = SegmentedWord(
-                            word=word,
-                            pos="unknown",
-                            start=start_pos,
-                            end=end_pos,
-                            word_type=WordType.OTHER
-                        )
-                        results.append(segmented_word)
-                        current_pos = end_pos
         
-        else:
-            logger.critical("❌[JIEBA_DEBUG] jieba不可用，降级到基础分词（按字符），文本长度: %d", len(text))
-            # 降级到基础分词（按字符）
-            results = self._basic_segment(text)
+        mode = "pos" if with_pos else "plain"
+        results = []
+        offset = 0
+        
+        # 按段落分词并缓存；jieba本身会在换行处切分，因此结果与整体分词一致
+        for paragraph in text.splitlines(keepends=True):
+            if paragraph.strip():
+                key = SegmentationCache.make_key(paragraph, mode, self._dict_version)
+                tokens = self._cache.get(key)
+                if tokens is None:
+                    tokens = self._segment_paragraph(paragraph, with_pos)
+                    self._cache.put(key, tokens)
+                
+                for word, pos, start, end in tokens:
+                    results.append(SegmentedWord(
+                        word=word,
+                        pos=pos,
+                        start=offset + start,
+                        end=offset + end,
+                        word_type=WordType.OTHER  # 会在__post_init__中设置
+                    ))
+            offset += len(paragraph)
         
         return results
     
+    def _segment_paragraph(self, paragraph: str, with_pos: bool) -> List[_CachedToken]:
+        """
+        对单个段落进行jieba分词
+        
+        jieba的输出按顺序完整覆盖原文，词的位置直接由累计词长得出。
+        """
+        if with_pos:
+            pairs = ((pair.word, pair.flag) for pair in pseg.cut(paragraph))
+        else:
+            pairs = ((word, "unknown") for word in jieba.cut(paragraph, cut_all=False))
+        
+        tokens = []
+        current_pos = 0
+        for word, pos in pairs:
+            end_pos = current_pos + len(word)
+            if word.strip():  # 跳过空白字符
+                tokens.append((word, pos, current_pos, end_pos))
+            current_pos = end_pos
+        return tokens
+    
     def _basic_segment(self, text: str) -> List[SegmentedWord]:
         """基础分词（当jieba不可用时的降级方案）"""
         results = []
@@ -281,13 +495,12 @@ class ChineseSegmenter:
                 names.append(name)
         
         if JIEBA_AVAILABLE:
-            # 使用词性标注找人名
-            words = pseg.cut(text)
-            for word, pos in words:
+            # 使用词性标注找人名（复用分词缓存）
+            for seg in self.segment_text(text, with_pos=True):
                 # nr: 人名, nrfg: 人名_姓, nrt: 人名_字
-                if pos in ['nr', 'nrfg', 'nrt'] and len(word) >= 2:
-                    if word not in names:
-                        names.append(word)
+                if seg.pos in ['nr', 'nrfg', 'nrt'] and len(seg.word) >= 2:
+                    if seg.word not in names:
+                        names.append(seg.word)
         
         return names
     
@@ -309,13 +522,12 @@ class ChineseSegmenter:
                 places.append(place)
         
         if JIEBA_AVAILABLE:
-            # 使用词性标注找地名
-            words = pseg.cut(text)
-            for word, pos in words:
+            # 使用词性标注找地名（复用分词缓存）
+            for seg in self.segment_text(text, with_pos=True):
                 # ns: 地名, nt: 机构团体名
-                if pos in ['ns', 'nt'] and len(word) >= 2:
-                    if word not in places:
-                        places.append(word)
+                if seg.pos in ['ns', 'nt'] and len(seg.word) >= 2:
+                    if seg.word not in places:
+                        places.append(seg.word)
         
         return places
     
@@ -365,27 +577,39 @@ class ChineseSegmenter:
         if not codex_entries:
             return
         
+        type_map = {
+            'CHARACTER': ("character", self._character_names),
+            'LOCATION': ("location", self._location_names),
+            'OBJECT': ("object", self._object_names),
+        }
+        words: Dict[str, str] = {}
         characters = []
         locations = []
         objects = []
         
         for entry in codex_entries:
-            words = [entry.title] + (entry.aliases or [])
+            mapped = type_map.get(entry.entry_type.name)
+            if not mapped:
+                continue
+            word_type, name_set = mapped
             
-            if entry.entry_type.name == 'CHARACTER':
-                characters.extend(words)
-            elif entry.entry_type.name == 'LOCATION':
-                locations.extend(words)
-            elif entry.entry_type.name == 'OBJECT':
-                objects.extend(words)
-        
-        # 批量添加词汇
-        if characters:
-            self.add_custom_words(characters, "character")
-        if locations:
-            self.add_custom_words(locations, "location")
-        if objects:
-            self.add_custom_words(objects, "object")
+            for word in [entry.title] + (entry.aliases or []):
+                clean_word = word.strip() if word else ""
+                if not clean_word:
+                    continue
+                self._custom_words.add(clean_word)
+                name_set.add(clean_word)
+                words[clean_word] = word_type
+                
+                if word_type == "character":
+                    characters.append(clean_word)
+                elif word_type == "location":
+                    locations.append(clean_word)
+                else:
+                    objects.append(clean_word)
+        
+        # 一次性批量加载，词表未变化时不会触碰jieba词典
+        self._load_user_dictionary(words)
         
         logger.info(f"已更新自定义词典: {len(characters)} 个角色, {len(locations)} 个地点, {len(objects)} 个物品")
 
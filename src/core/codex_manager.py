@@ -7,6 +7,7 @@ import re
 import uuid
 import logging
 import time
+import itertools
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Set, Tuple
 from enum import Enum
@@ -33,6 +34,9 @@ from .database_manager import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
+# 进程内全局递增的引用模式版本号，保证不同CodexManager实例的版本也不会重复
+_pattern_version_counter = itertools.count(1)
+
 
 class CodexEntryType(Enum):
     """Codex条目类型枚举"""
@@ -788,9 +792,14 @@ class CodexManager(QObject):
                     except re.error as e:
                         logger.warning(f"Failed to compile pattern for {entry.title}: {e}")
         
-        self._pattern_cache_version += 1
+        self._pattern_cache_version = next(_pattern_version_counter)
         logger.debug(f"Rebuilt {len(self._reference_patterns)} reference patterns")
 
+    @property
+    def pattern_version(self) -> int:
+        """引用模式版本号，条目标题/别名变化后递增（进程内全局唯一）"""
+        return self._pattern_cache_version
+
     def detect_references_in_text(self, text: str, document_id: str) -> List[Tuple[str, str, int, int]]:
         """
         在文本中检测Codex引用
@@ -816,11 +825,38 @@ class CodexManager(QObject):
 
     def update_references_for_document(self, document_id: str, text: str):
         """更新文档的引用记录"""
-        # 删除该文档的旧引用
-        self._references = [ref for ref in self._references 
-                           if ref.document_id != document_id]
-        
-        # 检测新引用
+        self.update_references_for_documents({document_id: text})
+
+    def update_references_for_documents(self, texts: Dict[str, str]):
+        """
+        批量更新多个文档的引用记录，只保存一次数据库
+
+        Args:
+            texts: 文档ID -> 文档内容
+        """
+        if not texts:
+            return
+
+        # 删除这些文档的旧引用
+        self._references = [ref for ref in self._references
+                           if ref.document_id not in texts]
+
+        counts = {}
+        for document_id, text in texts.items():
+            counts[document_id] = self._collect_references(document_id, text)
+
+        # 保存到数据库
+        self._save_data()
+
+        # 发送信号
+        if HAS_QT:
+            for document_id, count in counts.items():
+                self.referencesUpdated.emit(document_id, count)
+
+        logger.debug(f"Updated references for {len(texts)} documents: {sum(counts.values())} found")
+
+    def _collect_references(self, document_id: str, text: str) -> int:
+        """检测文档中的引用并加入引用列表，返回引用数"""
         detected_refs = self.detect_references_in_text(text, document_id)
         
         # 添加新引用记录
@@ -843,15 +879,8 @@ class CodexManager(QObject):
             )
             
             self._references.append(reference)
-        
-        # 保存到数据库
-        self._save_data()
-        
-        # 发送信号
-        if HAS_QT:
-            self.referencesUpdated.emit(document_id, len(detected_refs))
-        
-        logger.debug(f"Updated references for document {document_id}: {len(detected_refs)} found")
+
+        return len(detected_refs)
 
     def get_references_for_entry(self, entry_id: str) -> List[CodexReference]:
         """获取特定条目的所有引用"""
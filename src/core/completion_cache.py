@@ -0,0 +1,214 @@
+"""
+补全响应缓存
+按规范化提示词、模型和采样参数的哈希缓存补全结果（内存LRU + 磁盘持久化），
+撤销、重新聚焦或切换模式后在相同上下文再次请求时无需访问API
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCache:
+    """补全响应LRU缓存（带TTL和容量上限）"""
+
+    # 累计多少次写入后自动保存到磁盘
+    SAVE_INTERVAL = 20
+
+    def __init__(self, max_entries: int = 500, ttl_seconds: float = 24 * 3600,
+                 cache_file: Optional[Path] = None):
+        """
+        Args:
+            max_entries: 最大条目数
+            ttl_seconds: 条目有效期（秒）
+            cache_file: 磁盘缓存文件（为空时只使用内存）
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._cache_file = Path(cache_file) if cache_file else None
+        # key -> (补全结果, 写入时间)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._unsaved = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+        if self._cache_file:
+            self.load()
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """规范化提示词：统一换行并去掉行尾和首尾空白"""
+        lines = prompt.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        return '\n'.join(line.rstrip() for line in lines).strip()
+
+    @classmethod
+    def make_key(cls, prompt: str, model: str = "", system_prompt: Optional[str] = None,
+                 **params) -> str:
+        """
+        生成缓存键
+
+        Args:
+            prompt: 提示词
+            model: 模型标识（可包含服务商和端点）
+            system_prompt: 系统提示词
+            **params: 采样参数（max_tokens、temperature等）
+        """
+        payload = json.dumps({
+            'prompt': cls.normalize_prompt(prompt),
+            'system_prompt': cls.normalize_prompt(system_prompt) if system_prompt else None,
+            'model': model,
+            'params': params,
+        }, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """获取缓存的补全结果，未命中或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            completion, created_at = entry
+            if self.ttl_seconds and time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return completion
+
+    def contains(self, key: str) -> bool:
+        """是否有未过期的缓存结果（不计入命中统计，也不改变淘汰顺序）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            return not (self.ttl_seconds and time.time() - entry[1] > self.ttl_seconds)
+
+    def put(self, key: str, completion: str):
+        """写入补全结果"""
+        if not completion or not completion.strip():
+            return
+
+        with self._lock:
+            self._entries[key] = (completion, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            self._unsaved += 1
+            should_save = self._cache_file is not None and self._unsaved >= self.SAVE_INTERVAL
+
+        if should_save:
+            self.save()
+
+    def load(self):
+        """从磁盘加载缓存（跳过已过期条目）"""
+        if not self._cache_file or not self._cache_file.exists():
+            return
+
+        try:
+            with open(self._cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"加载补全缓存失败: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, (completion, created_at) in data.get('entries', {}).items():
+                if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                    continue
+                self._entries[key] = (completion, created_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        logger.info(f"已加载补全缓存: {len(self._entries)} 条")
+
+    def save(self):
+        """保存缓存到磁盘（原子写入）"""
+        if not self._cache_file:
+            return
+
+        with self._lock:
+            data = {'version': 1, 'entries': {key: list(value) for key, value in self._entries.items()}}
+            self._unsaved = 0
+
+        try:
+            self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self._cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            tmp_file.replace(self._cache_file)
+        except OSError as e:
+            logger.warning(f"保存补全缓存失败: {e}")
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._unsaved = 0
+        if self._cache_file and self._cache_file.exists():
+            try:
+                self._cache_file.unlink()
+            except OSError as e:
+                logger.warning(f"删除补全缓存文件失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+# 全局缓存实例
+_global_completion_cache: Optional[CompletionCache] = None
+
+
+def get_completion_cache() -> CompletionCache:
+    """获取全局补全缓存，按配置决定容量、有效期和磁盘位置"""
+    global _global_completion_cache
+    if _global_completion_cache is None:
+        max_entries, ttl_seconds, cache_file = 500, 24 * 3600, None
+        try:
+            from .config import get_config
+            config = get_config()
+            if config:
+                completion_config = config.get_completion_config()
+                max_entries = completion_config.get('response_cache_size', max_entries)
+                ttl_seconds = completion_config.get('response_cache_ttl', ttl_seconds)
+                cache_file = config.config_dir / "cache" / "completion_cache.json"
+        except Exception as e:
+            logger.warning(f"读取补全缓存配置失败，使用默认值: {e}")
+
+        _global_completion_cache = CompletionCache(max_entries, ttl_seconds, cache_file)
+    return _global_completion_cache
+
+
+def shutdown_completion_cache():
+    """保存并释放全局补全缓存"""
+    global _global_completion_cache
+    if _global_completion_cache is not None:
+        _global_completion_cache.save()
+        _global_completion_cache = None
@@ -0,0 +1,222 @@
+"""
+补全预取
+在输入停顿且光标位于句末、段落结尾等可能触发补全的位置时，
+由调用方在GUI线程中收集上下文、生成提示词，再以低优先级在后台事件循环中发起补全请求并写入补全缓存；
+用户随后在相同上下文触发补全时直接命中缓存，或接管仍在进行中的预取请求
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque, OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Callable, List
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .ai_client import AsyncAIClient, AIConfig
+from .async_loop_thread import get_ai_event_loop
+from .completion_cache import CompletionCache, get_completion_cache
+from .concurrency_limiter import RequestPriority
+
+logger = logging.getLogger(__name__)
+
+
+# 视为补全触发点的光标前字符（句末标点、闭合引号）
+SENTENCE_END_CHARS = set("。！？!?…；;：:”」』\"")
+
+# 记录预取耗时的缓存键数量上限（超出时淘汰最久未写入的）
+MAX_PREFETCHED_KEYS = 200
+
+
+@dataclass
+class PrefetchBudget:
+    """预取预算"""
+    max_concurrent: int = 1              # 同时进行的预取请求数
+    max_tokens_per_minute: int = 4000    # 每分钟预取请求可申请的最大token数
+
+
+@dataclass
+class _PendingPrefetch:
+    """进行中的预取请求"""
+    cache_key: str
+    started_at: float
+    future: Any = None
+    waiters: List[Callable[[Optional[str]], None]] = field(default_factory=list)
+
+
+class CompletionPrefetcher(QObject):
+    """补全预取引擎"""
+
+    # 预取完成 (cache_key, 是否成功)
+    prefetchFinished = pyqtSignal(str, bool)
+
+    # 内部信号：把事件循环线程中的结果投递到GUI线程
+    _resultReady = pyqtSignal(str, object)
+
+    def __init__(self, budget: Optional[PrefetchBudget] = None,
+                 cache: Optional[CompletionCache] = None, parent=None):
+        super().__init__(parent)
+        self.budget = budget or PrefetchBudget()
+        self._cache = cache or get_completion_cache()
+        self._loop_thread = get_ai_event_loop()
+
+        self._pending: Dict[str, _PendingPrefetch] = {}
+        # 预取写入缓存的键 -> 预取耗时，用于统计命中节省的延迟（LRU，容量有上限）
+        self._prefetched: "OrderedDict[str, float]" = OrderedDict()
+        # 最近一分钟内申请的token: (时间, token数)
+        self._token_log = deque()
+
+        # 统计信息
+        self._stats = {
+            'issued': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'budget_rejected': 0,
+            'hits': 0,             # 触发时直接命中预取结果
+            'joined': 0,           # 触发时接管进行中的预取
+            'latency_saved': 0.0,  # 估算节省的等待时间（秒）
+        }
+
+        self._resultReady.connect(self._on_result_ready)
+
+    @staticmethod
+    def is_trigger_point(text: str, cursor_pos: int) -> bool:
+        """
+        光标是否位于可能触发补全的位置：行尾，且前面是句末标点或段落分隔
+        """
+        if cursor_pos <= 0 or cursor_pos > len(text):
+            return False
+        # 只在行尾预取，行中间的光标多半是在修改已有内容
+        if cursor_pos < len(text) and text[cursor_pos] != '\n':
+            return False
+
+        before = text[:cursor_pos].rstrip(' \t')
+        if not before:
+            return False
+        if before.endswith('\n'):
+            # 段落结尾后的新行
+            return bool(before.strip())
+        return before[-1] in SENTENCE_END_CHARS
+
+    def _reserve_tokens(self, tokens: int) -> bool:
+        """在每分钟token预算内申请额度"""
+        now = time.monotonic()
+        while self._token_log and now - self._token_log[0][0] > 60:
+            self._token_log.popleft()
+        used = sum(count for _, count in self._token_log)
+        if used + tokens > self.budget.max_tokens_per_minute:
+            return False
+        self._token_log.append((now, tokens))
+        return True
+
+    def prefetch(self, cache_key: str, prompt: str, config: AIConfig,
+                 max_tokens: int, temperature: float, system_prompt: Optional[str] = None) -> bool:
+        """
+        以低优先级发起预取请求
+
+        Returns:
+            是否发起了请求（已缓存、已在进行或超出预算时返回False）
+        """
+        if cache_key in self._pending or cache_key in self._prefetched:
+            return False
+        # 只检查是否已缓存，不计入缓存的命中统计
+        if self._cache.contains(cache_key):
+            return False
+        if not self.has_capacity() or not self._reserve_tokens(max_tokens):
+            self._stats['budget_rejected'] += 1
+            return False
+
+        pending = _PendingPrefetch(cache_key=cache_key, started_at=time.monotonic())
+        self._pending[cache_key] = pending
+        self._stats['issued'] += 1
+
+        async def run():
+            try:
+                # aiohttp请求：取消预取时连接随之关闭
+                client = AsyncAIClient(config)
+                result = await client.complete_async(
+                    prompt, system_prompt,
+                    max_tokens=max_tokens, temperature=temperature,
+                    cache_system_prompt=True,
+                    # 预取是推测性的，排在用户正在等待的补全之后
+                    priority=RequestPriority.NORMAL
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"预取请求失败: {e}")
+                result = None
+            self._resultReady.emit(cache_key, result)
+
+        pending.future = self._loop_thread.submit(run())
+        logger.debug(f"发起补全预取: {cache_key[:12]}, max_tokens={max_tokens}")
+        return True
+
+    def has_capacity(self) -> bool:
+        """是否还能发起预取（调用方可在构建提示词之前检查，避免无用的上下文收集）"""
+        return len(self._pending) < self.budget.max_concurrent
+
+    def _on_result_ready(self, cache_key: str, result: Optional[str]):
+        """预取完成（GUI线程）"""
+        pending = self._pending.pop(cache_key, None)
+        if pending is None:
+            return
+
+        success = bool(result and result.strip())
+        if success:
+            self._stats['completed'] += 1
+            self._cache.put(cache_key, result)
+            self._prefetched[cache_key] = time.monotonic() - pending.started_at
+            self._prefetched.move_to_end(cache_key)
+            while len(self._prefetched) > MAX_PREFETCHED_KEYS:
+                self._prefetched.popitem(last=False)
+        else:
+            self._stats['failed'] += 1
+
+        for waiter in pending.waiters:
+            waiter(result if success else None)
+        self.prefetchFinished.emit(cache_key, success)
+
+    def record_cache_hit(self, cache_key: str) -> bool:
+        """补全请求命中缓存时调用；如果该结果来自预取则计入命中统计"""
+        latency = self._prefetched.pop(cache_key, None)
+        if latency is None:
+            return False
+        self._stats['hits'] += 1
+        self._stats['latency_saved'] += latency
+        return True
+
+    def join_pending(self, cache_key: str, callback: Callable[[Optional[str]], None]) -> bool:
+        """
+        接管进行中的预取请求，完成后以结果（失败时为None）调用callback
+
+        Returns:
+            是否存在可接管的预取请求
+        """
+        pending = self._pending.get(cache_key)
+        if pending is None:
+            return False
+        pending.waiters.append(callback)
+        self._stats['joined'] += 1
+        self._stats['latency_saved'] += time.monotonic() - pending.started_at
+        return True
+
+    def cancel_stale(self, keep_key: Optional[str] = None):
+        """取消没有等待者的预取请求（文本已变化，结果不会再被使用）"""
+        for cache_key, pending in list(self._pending.items()):
+            if cache_key == keep_key or pending.waiters:
+                continue
+            if pending.future is not None:
+                pending.future.cancel()
+            del self._pending[cache_key]
+            self._stats['cancelled'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取预取统计"""
+        stats = dict(self._stats)
+        used = self._stats['hits'] + self._stats['joined']
+        stats['pending'] = len(self._pending)
+        stats['hit_rate'] = used / self._stats['issued'] if self._stats['issued'] else 0.0
+        return stats
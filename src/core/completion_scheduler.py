@@ -0,0 +1,141 @@
+"""
+补全请求调度器
+光标上下文变化时取消进行中的补全请求并立即开始最新的请求，
+统计被取消的请求数量和由此节省的等待时间
+"""
+
+import hashlib
+import logging
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 上下文键使用的光标前文本长度
+CONTEXT_KEY_CHARS = 200
+
+
+@dataclass
+class _InFlightRequest:
+    """进行中的请求"""
+    request_id: int
+    context_key: str
+    started_at: float
+    abortable: bool = True  # 取消时HTTP连接是否随之关闭
+
+
+class CompletionScheduler:
+    """
+    补全请求调度器（取消并替换策略）
+
+    同一时间只保留一个进行中的请求；新请求或上下文变化会取消旧请求。
+    节省时间按最近完成请求的延迟中位数减去被取消请求已耗时估算，
+    只计入取消时连接被关闭的请求；不可中断的请求仍在占用连接，新请求未必更早返回。
+    """
+
+    def __init__(self, latency_history: int = 50):
+        self._in_flight: Optional[_InFlightRequest] = None
+        self._latencies = deque(maxlen=latency_history)
+
+        # 统计信息
+        self._stats = {
+            'started': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'superseded': 0,        # 被新请求取代
+            'context_changed': 0,   # 因光标上下文变化取消
+            'time_saved': 0.0,      # 估算节省的等待时间（秒）
+            'time_discarded': 0.0,  # 被取消请求已花费的时间（秒）
+            'not_aborted': 0,       # 取消后仍在后台执行到结束的请求
+        }
+
+    @staticmethod
+    def make_context_key(text: str, cursor_pos: int) -> str:
+        """根据光标位置和光标前文本生成上下文键"""
+        cursor_pos = max(0, min(cursor_pos, len(text))) if cursor_pos >= 0 else len(text)
+        before = text[max(0, cursor_pos - CONTEXT_KEY_CHARS):cursor_pos]
+        digest = hashlib.sha1(before.encode('utf-8')).hexdigest()[:16]
+        return f"{cursor_pos}:{digest}"
+
+    @property
+    def in_flight_id(self) -> Optional[int]:
+        return self._in_flight.request_id if self._in_flight else None
+
+    @property
+    def in_flight_key(self) -> Optional[str]:
+        return self._in_flight.context_key if self._in_flight else None
+
+    def begin(self, request_id: int, context_key: str = "", abortable: bool = True) -> Optional[int]:
+        """
+        登记新请求；如有进行中的请求则将其记为被取代
+
+        Args:
+            abortable: 取消时HTTP连接是否随之关闭
+
+        Returns:
+            被取代的请求编号（无则为None）
+        """
+        superseded = None
+        if self._in_flight is not None:
+            superseded = self._in_flight.request_id
+            self.cancel(superseded, reason='superseded')
+
+        self._in_flight = _InFlightRequest(request_id, context_key, time.monotonic(), abortable)
+        self._stats['started'] += 1
+        return superseded
+
+    def is_stale(self, context_key: str) -> bool:
+        """进行中的请求是否与给定上下文不一致"""
+        return self._in_flight is not None and self._in_flight.context_key != context_key
+
+    def finish(self, request_id: int, success: bool = True):
+        """登记请求完成"""
+        if self._in_flight is None or self._in_flight.request_id != request_id:
+            return
+
+        elapsed = time.monotonic() - self._in_flight.started_at
+        self._in_flight = None
+        if success:
+            self._latencies.append(elapsed)
+            self._stats['completed'] += 1
+        else:
+            self._stats['failed'] += 1
+
+    def cancel(self, request_id: int, reason: str = 'cancelled') -> bool:
+        """
+        登记请求被取消
+
+        Args:
+            request_id: 请求编号
+            reason: 取消原因 (cancelled/superseded/context_changed)
+        """
+        if self._in_flight is None or self._in_flight.request_id != request_id:
+            return False
+
+        elapsed = time.monotonic() - self._in_flight.started_at
+        abortable = self._in_flight.abortable
+        self._in_flight = None
+
+        self._stats['cancelled'] += 1
+        if reason in ('superseded', 'context_changed'):
+            self._stats[reason] += 1
+        self._stats['time_discarded'] += elapsed
+        if not abortable:
+            self._stats['not_aborted'] += 1
+        elif self._latencies:
+            self._stats['time_saved'] += max(0.0, statistics.median(self._latencies) - elapsed)
+
+        logger.debug(f"补全请求 {request_id} 已取消 ({reason})，已耗时 {elapsed:.2f}秒")
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取调度统计"""
+        metrics = dict(self._stats)
+        metrics['in_flight'] = self._in_flight is not None
+        metrics['median_latency'] = statistics.median(self._latencies) if self._latencies else 0.0
+        return metrics
@@ -0,0 +1,504 @@
+"""
+自适应并发限制
+进程内共享的出站请求限流器：每个端点（接口类型+主机）一个AIMD并发窗口，
+成功时线性增大窗口，遇到429/5xx/超时或响应延迟明显升高时按比例缩小；
+流式请求的延迟是首个数据块的到达时间，非流式请求的延迟包含整个生成过程，两者分别维护延迟基线；
+等待中的请求按优先级获得名额，交互式补全优先于后台索引。
+限流器与事件循环无关，可同时用于常驻事件循环、RAG服务的临时事件循环和同步请求
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from enum import IntEnum
+from contextlib import contextmanager, asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """请求优先级，数值越小越优先"""
+    INTERACTIVE = 0   # 用户正在等待的补全、搜索
+    NORMAL = 1        # 大纲增强等用户触发的后台任务
+    BACKGROUND = 2    # 文档索引等批量任务
+
+
+# 视为服务端过载的状态码
+OVERLOAD_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class LimiterConfig:
+    """单个端点的限流配置"""
+    initial_limit: int = 4
+    min_limit: int = 1
+    max_limit: int = 16
+    decrease_factor: float = 0.5        # 过载时窗口缩小的比例
+    latency_tolerance: float = 3.0      # 响应延迟超过基线的倍数时视为过载
+    background_share: float = 0.75      # 后台请求最多占用的窗口比例，为交互请求留出名额
+    max_requests_per_second: float = 0  # 请求发送速率上限，0表示不限制
+
+
+class _Waiter:
+    """等待名额的请求"""
+
+    __slots__ = ('priority', 'seq', 'loop', 'future', 'event', 'granted')
+
+    def __init__(self, priority: RequestPriority, seq: int, loop=None):
+        self.priority = priority
+        self.seq = seq
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.granted = False
+
+
+class Permit:
+    """已获得的请求名额，请求完成后由限流器根据结果调整窗口"""
+
+    def __init__(self, limiter: 'AdaptiveLimiter', priority: RequestPriority, stream: bool = False):
+        self.limiter = limiter
+        self.priority = priority
+        self.stream = stream
+        self.acquired_at = time.monotonic()
+        self.responded_at: Optional[float] = None
+        self.status: Optional[int] = None
+        self.retry_after: Optional[float] = None
+        self._released = False
+
+    def set_status(self, status: int, retry_after: Optional[float] = None):
+        """记录响应状态码（收到响应头时调用，此刻的耗时作为延迟样本）"""
+        if self.responded_at is None:
+            self.responded_at = time.monotonic()
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def latency(self) -> float:
+        end = self.responded_at if self.responded_at is not None else time.monotonic()
+        return end - self.acquired_at
+
+    def release(self, error: Optional[BaseException] = None):
+        if not self._released:
+            self._released = True
+            self.limiter._release(self, error)
+
+
+class AdaptiveLimiter:
+    """单个端点的AIMD并发限制器"""
+
+    def __init__(self, name: str, config: Optional[LimiterConfig] = None):
+        self.name = name
+        self.config = config or LimiterConfig()
+        self._lock = threading.Lock()
+        self._limit = float(max(self.config.min_limit,
+                                min(self.config.initial_limit, self.config.max_limit)))
+        self._in_flight = 0
+        self._background_in_flight = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = 0
+        self._successes = 0                 # 本轮窗口内的成功数
+        self._last_decrease = 0.0
+        # 延迟基线，按是否流式请求分开（流式请求只计到首个数据块）
+        self._min_latency: Dict[bool, float] = {}
+        self._paused_until = 0.0            # 429的Retry-After
+        self._next_send_at = 0.0            # 速率限制下一次可发送的时间
+        self._stats = {
+            'granted': [0, 0, 0],
+            'waited': 0,
+            'increases': 0,
+            'decreases': 0,
+            'throttled': 0,
+            'errors': 0,
+        }
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    # ---------- 获取名额 ----------
+
+    @asynccontextmanager
+    async def slot(self, priority: RequestPriority = RequestPriority.NORMAL, stream: bool = False):
+        """
+        异步获取名额
+
+        用法：
+            async with limiter.slot(RequestPriority.INTERACTIVE) as permit:
+                async with session.post(...) as response:
+                    permit.set_status(response.status)
+
+        Args:
+            stream: 是否流式请求，其延迟与非流式请求分开比较
+        """
+        permit = await self.acquire(priority, stream)
+        try:
+            yield permit
+        except BaseException as e:
+            permit.release(e)
+            raise
+        else:
+            permit.release()
+
+    @contextmanager
+    def slot_blocking(self, priority: RequestPriority = RequestPriority.NORMAL,
+                      timeout: Optional[float] = None, stream: bool = False):
+        """同步获取名额（用于requests等阻塞调用）"""
+        permit = self.acquire_blocking(priority, timeout, stream)
+        try:
+            yield permit
+        except BaseException as e:
+            permit.release(e)
+            raise
+        else:
+            permit.release()
+
+    async def acquire(self, priority: RequestPriority = RequestPriority.NORMAL,
+                      stream: bool = False) -> Permit:
+        with self._lock:
+            if self._can_grant_now(priority):
+                self._grant(priority)
+                waiter = None
+            else:
+                waiter = self._enqueue(priority, asyncio.get_running_loop())
+
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        waiter = None
+                if waiter is not None:
+                    # 名额已经分配给这个等待者，归还
+                    self._return_slot(priority)
+                raise
+
+        permit = Permit(self, priority, stream)
+        delay = self._reserve_send_time()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                permit._released = True
+                self._return_slot(priority)
+                raise
+            permit.acquired_at = time.monotonic()
+        return permit
+
+    def acquire_blocking(self, priority: RequestPriority = RequestPriority.NORMAL,
+                         timeout: Optional[float] = None, stream: bool = False) -> Permit:
+        with self._lock:
+            if self._can_grant_now(priority):
+                self._grant(priority)
+                waiter = None
+            else:
+                waiter = self._enqueue(priority, None)
+
+        if waiter is not None and not waiter.event.wait(timeout):
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise TimeoutError(f"等待请求名额超时: {self.name}")
+            # 超时的同时获得了名额，继续使用
+
+        permit = Permit(self, priority, stream)
+        delay = self._reserve_send_time()
+        if delay > 0:
+            time.sleep(delay)
+            permit.acquired_at = time.monotonic()
+        return permit
+
+    def _can_grant(self, priority: RequestPriority) -> bool:
+        if self._in_flight >= int(self._limit):
+            return False
+        if priority == RequestPriority.BACKGROUND:
+            background_limit = max(1, int(self._limit * self.config.background_share))
+            return self._background_in_flight < background_limit
+        return True
+
+    def _can_grant_now(self, priority: RequestPriority) -> bool:
+        """有空闲名额且没有同级或更高优先级的请求在排队"""
+        if any(waiter.priority <= priority for waiter in self._waiters):
+            return False
+        return self._can_grant(priority)
+
+    def _grant(self, priority: RequestPriority):
+        self._in_flight += 1
+        if priority == RequestPriority.BACKGROUND:
+            self._background_in_flight += 1
+        self._stats['granted'][priority] += 1
+
+    def _enqueue(self, priority: RequestPriority, loop) -> _Waiter:
+        self._seq += 1
+        waiter = _Waiter(priority, self._seq, loop)
+        self._waiters.append(waiter)
+        self._waiters.sort(key=lambda w: (w.priority, w.seq))
+        self._stats['waited'] += 1
+        return waiter
+
+    def _wake_waiters(self):
+        """按优先级把空出的名额分配给等待者（调用方持有锁）"""
+        for waiter in list(self._waiters):
+            if self._in_flight >= int(self._limit):
+                break
+            if not self._can_grant(waiter.priority):
+                continue
+            self._waiters.remove(waiter)
+            self._grant(waiter.priority)
+            waiter.granted = True
+            if waiter.loop is None:
+                waiter.event.set()
+                continue
+            try:
+                waiter.loop.call_soon_threadsafe(_resolve_future, waiter.future)
+            except RuntimeError:
+                # 等待者所在的事件循环已关闭
+                self._release_counts(waiter.priority)
+
+    def _reserve_send_time(self) -> float:
+        """按Retry-After暂停和速率上限预约发送时间，返回需要等待的秒数"""
+        rate = self.config.max_requests_per_second
+        with self._lock:
+            now = time.monotonic()
+            send_at = max(now, self._paused_until)
+            if rate > 0:
+                send_at = max(send_at, self._next_send_at)
+                self._next_send_at = send_at + 1.0 / rate
+            return send_at - now
+
+    # ---------- 释放与窗口调整 ----------
+
+    def _release_counts(self, priority: RequestPriority):
+        self._in_flight -= 1
+        if priority == RequestPriority.BACKGROUND:
+            self._background_in_flight -= 1
+
+    def _return_slot(self, priority: RequestPriority):
+        """未发出请求就归还名额（不参与窗口调整）"""
+        with self._lock:
+            self._release_counts(priority)
+            self._wake_waiters()
+
+    def _release(self, permit: Permit, error: Optional[BaseException]):
+        with self._lock:
+            self._release_counts(permit.priority)
+            self._adjust(permit, error)
+            self._wake_waiters()
+
+    def _adjust(self, permit: Permit, error: Optional[BaseException]):
+        """根据请求结果调整窗口（调用方持有锁）"""
+        status = permit.status
+        overloaded = False
+
+        if status in OVERLOAD_STATUSES:
+            overloaded = True
+            if status == 429:
+                self._stats['throttled'] += 1
+                if permit.retry_after:
+                    # 从收到响应的时刻开始计算（调用方可能在名额内等待后才释放）
+                    self._paused_until = max(self._paused_until, permit.responded_at + permit.retry_after)
+        elif status is None:
+            if error is None or isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+                # 调用方没有报告状态（或主动取消），不作为窗口调整的依据
+                return
+            self._stats['errors'] += 1
+            # 超时和连接错误（requests与aiohttp的网络异常都是OSError）
+            overloaded = isinstance(error, (asyncio.TimeoutError, OSError))
+        elif status >= 400:
+            # 客户端错误与负载无关
+            return
+        else:
+            latency = permit.latency
+            baseline = self._min_latency.get(permit.stream)
+            if baseline is None or latency < baseline:
+                baseline = latency
+            else:
+                # 基线缓慢上浮，适应服务端性能的长期变化
+                baseline *= 1.01
+            self._min_latency[permit.stream] = baseline
+            overloaded = latency > baseline * self.config.latency_tolerance and latency > 0.05
+
+        if overloaded:
+            # 同一批并发请求只缩小一次窗口
+            if permit.acquired_at >= self._last_decrease:
+                new_limit = max(float(self.config.min_limit), self._limit * self.config.decrease_factor)
+                if int(new_limit) < int(self._limit):
+                    logger.info(f"端点 {self.name} 过载(status={status})，并发窗口 {int(self._limit)} -> {int(new_limit)}")
+                self._limit = new_limit
+                self._last_decrease = time.monotonic()
+                self._successes = 0
+                self._stats['decreases'] += 1
+            return
+
+        self._successes += 1
+        if self._successes >= int(self._limit) and self._limit < self.config.max_limit:
+            self._limit = min(float(self.config.max_limit), float(int(self._limit) + 1))
+            self._successes = 0
+            self._stats['increases'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            granted = self._stats['granted']
+            return {
+                'limit': int(self._limit),
+                'in_flight': self._in_flight,
+                'waiting': len(self._waiters),
+                'granted_interactive': granted[RequestPriority.INTERACTIVE],
+                'granted_normal': granted[RequestPriority.NORMAL],
+                'granted_background': granted[RequestPriority.BACKGROUND],
+                'waited': self._stats['waited'],
+                'increases': self._stats['increases'],
+                'decreases': self._stats['decreases'],
+                'throttled': self._stats['throttled'],
+                'errors': self._stats['errors'],
+                'min_latency_ms': self._latency_ms(False),
+                'min_stream_latency_ms': self._latency_ms(True),
+            }
+
+
+    def _latency_ms(self, stream: bool) -> Optional[float]:
+        baseline = self._min_latency.get(stream)
+        return baseline * 1000 if baseline is not None else None
+
+
+def _resolve_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+def endpoint_key(kind: str, url: str) -> str:
+    """端点标识：接口类型 + 主机，例如 chat:api.openai.com"""
+    host = urlparse(url).netloc or url
+    return f"{kind}:{host}"
+
+
+class ConcurrencyLimiterRegistry:
+    """按端点管理限流器"""
+
+    def __init__(self, default_config: Optional[LimiterConfig] = None,
+                 overrides: Optional[Dict[str, Dict[str, Any]]] = None, enabled: bool = True):
+        self.default_config = default_config or LimiterConfig()
+        self.enabled = enabled
+        # 覆盖配置，键为完整端点标识或接口类型（chat/embeddings/rerank）
+        self._overrides: Dict[str, Dict[str, Any]] = dict(overrides or {})
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, key: str, **settings):
+        """设置端点或接口类型的配置，只影响之后创建的限流器"""
+        with self._lock:
+            self._overrides.setdefault(key, {}).update(settings)
+
+    def get(self, kind: str, url: str) -> Optional[AdaptiveLimiter]:
+        """获取端点的限流器，未启用时返回None"""
+        if not self.enabled:
+            return None
+        key = endpoint_key(kind, url)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                settings = {}
+                settings.update(self._overrides.get(kind, {}))
+                settings.update(self._overrides.get(key, {}))
+                known = LimiterConfig.__dataclass_fields__
+                config = replace(self.default_config, **{k: v for k, v in settings.items() if k in known})
+                limiter = self._limiters[key] = AdaptiveLimiter(key, config)
+                logger.debug(f"创建端点限流器: {key}, 初始并发 {config.initial_limit}")
+            return limiter
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = list(self._limiters.items())
+        return {key: limiter.get_stats() for key, limiter in limiters}
+
+
+# 全局注册表
+_global_registry: Optional[ConcurrencyLimiterRegistry] = None
+_global_registry_lock = threading.Lock()
+
+
+def get_limiter_registry() -> ConcurrencyLimiterRegistry:
+    """获取全局限流器注册表，配置来自 ai.concurrency"""
+    global _global_registry
+    with _global_registry_lock:
+        if _global_registry is None:
+            settings = {}
+            try:
+                from .config import get_config
+                config = get_config()
+                if config:
+                    settings = dict(config.get_section('ai').get('concurrency', {}))
+            except Exception as e:
+                logger.warning(f"读取并发限制配置失败，使用默认值: {e}")
+
+            enabled = settings.pop('enabled', True)
+            overrides = settings.pop('endpoints', {})
+            known = LimiterConfig.__dataclass_fields__
+            default_config = LimiterConfig(**{k: v for k, v in settings.items() if k in known})
+            _global_registry = ConcurrencyLimiterRegistry(default_config, overrides, enabled)
+        return _global_registry
+
+
+def get_endpoint_limiter(kind: str, url: str) -> Optional[AdaptiveLimiter]:
+    """获取端点的全局限流器（未启用时返回None）"""
+    return get_limiter_registry().get(kind, url)
+
+
+def reset_limiter_registry():
+    """丢弃全局注册表（配置变更后重新创建）"""
+    global _global_registry
+    with _global_registry_lock:
+        _global_registry = None
+
+
+class _UnlimitedPermit:
+    """限流未启用时使用的空名额"""
+
+    def set_status(self, status: int, retry_after: Optional[float] = None):
+        pass
+
+
+_UNLIMITED_PERMIT = _UnlimitedPermit()
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """解析Retry-After响应头（秒数形式）"""
+    value = headers.get('Retry-After') if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+@asynccontextmanager
+async def request_slot(kind: str, url: str, priority: RequestPriority = RequestPriority.NORMAL,
+                       stream: bool = False):
+    """在端点的全局限流器下发起异步请求，未启用限流时直接放行"""
+    limiter = get_endpoint_limiter(kind, url)
+    if limiter is None:
+        yield _UNLIMITED_PERMIT
+        return
+    async with limiter.slot(priority, stream) as permit:
+        yield permit
+
+
+@contextmanager
+def request_slot_blocking(kind: str, url: str, priority: RequestPriority = RequestPriority.NORMAL,
+                          timeout: Optional[float] = None, stream: bool = False):
+    """在端点的全局限流器下发起同步请求，未启用限流时直接放行"""
+    limiter = get_endpoint_limiter(kind, url)
+    if limiter is None:
+        yield _UNLIMITED_PERMIT
+        return
+    with limiter.slot_blocking(priority, timeout, stream) as permit:
+        yield permit
@@ -98,6 +98,15 @@ class Config:
                 "top_p": 0.9,
                 "timeout": 30,
                 "max_retries": 3,
+                "tokenizer": "auto",  # auto（有tiktoken时使用）、heuristic、tiktoken:<编码名>
+                # 出站请求的自适应并发限制（按端点）
+                "concurrency": {
+                    "enabled": True,
+                    "initial_limit": 4,
+                    "max_limit": 16,
+                    "max_requests_per_second": 0,  # 0表示不限制
+                    "endpoints": {}  # 按接口类型（chat/embeddings/rerank）或端点覆盖，如 {"embeddings": {"max_limit": 8}}
+                },
                 "completion_delay": 500,  # 毫秒
                 "auto_suggestions": True,
                 "suggestion_types": [
@@ -183,7 +192,14 @@ class Config:
                 "auto_trigger": False,  # 修复：默认关闭自动触发
                 "streaming": True,
                 "temperature": 0.7,
-                "max_length": 200
+                "max_length": 200,
+                "response_cache": True,  # 相同上下文的补全结果直接复用
+                "response_cache_size": 500,
+                "response_cache_ttl": 86400,  # 秒
+                "prefetch": False,  # 输入停顿时在句末/段落结尾预取补全
+                "prefetch_delay": 400,  # ms
+                "prefetch_max_concurrent": 1,
+                "prefetch_tokens_per_minute": 4000
             }
         }
         
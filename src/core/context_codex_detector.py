@@ -0,0 +1,238 @@
+"""
+光标窗口内的Codex检测
+只扫描光标附近的有限窗口，按距离和出现频率为条目排序，
+远处的提及由后台线程预先计算的文档条目摘要补充，使补全延迟不随章节长度增长
+"""
+
+import time
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .reference_cache import ReferenceDetectionCache, get_reference_cache
+
+if TYPE_CHECKING:
+    from .codex_manager import CodexManager
+    from .reference_detector import ReferenceDetector
+
+logger = logging.getLogger(__name__)
+
+
+# 各上下文模式的扫描窗口大小：(光标前字符数, 光标后字符数)
+WINDOW_SIZES: Dict[str, Tuple[int, int]] = {
+    "fast": (1200, 300),
+    "balanced": (3000, 800),
+    "full": (8000, 2000),
+}
+
+
+@dataclass
+class RankedCodexEntry:
+    """按相关性排序的Codex条目"""
+    entry_id: str
+    score: float
+    window_count: int = 0               # 窗口内出现次数
+    nearest_distance: Optional[int] = None  # 与光标的最近距离
+    document_count: int = 0             # 全文档出现次数（来自摘要）
+    matched_text: str = ""              # 离光标最近的匹配文本
+
+    @property
+    def in_window(self) -> bool:
+        return self.window_count > 0
+
+
+class ContextAwareCodexDetector:
+    """光标窗口感知的Codex检测器"""
+
+    def __init__(self, codex_manager: 'CodexManager',
+                 reference_detector: Optional['ReferenceDetector'] = None,
+                 cache: Optional[ReferenceDetectionCache] = None,
+                 summary_refresh_interval: float = 30.0,
+                 proximity_scale: int = 200):
+        """
+        Args:
+            codex_manager: Codex管理器
+            reference_detector: 引用检测器（为空时使用CodexManager的正则检测）
+            cache: 引用检测缓存，默认使用全局缓存
+            summary_refresh_interval: 文档摘要的有效期（秒），过期后在后台刷新
+            proximity_scale: 距离衰减尺度（字符数），距离为此值时权重减半
+        """
+        self.codex_manager = codex_manager
+        self.reference_detector = reference_detector
+        self._cache = cache or get_reference_cache()
+        self.summary_refresh_interval = summary_refresh_interval
+        self.proximity_scale = max(1, proximity_scale)
+
+        # document_id -> (刷新时间, Codex模式版本, 条目出现次数)
+        self._document_summaries: Dict[str, Tuple[float, Optional[int], Counter]] = {}
+        # 等待后台计算摘要的文档：document_id -> 文本（同一文档只保留最新的文本）
+        self._pending_summaries: Dict[str, str] = {}
+        self._summary_lock = threading.Lock()
+        self._summary_thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def get_window(text: str, cursor_pos: int, mode: str = "balanced") -> Tuple[int, int]:
+        """
+        计算扫描窗口，并扩展到段落边界以便复用段落级检测缓存
+
+        Returns:
+            (窗口起点, 窗口终点)
+        """
+        before_size, after_size = WINDOW_SIZES.get(mode, WINDOW_SIZES["balanced"])
+        cursor_pos = max(0, min(cursor_pos, len(text)))
+
+        start = max(0, cursor_pos - before_size)
+        end = min(len(text), cursor_pos + after_size)
+
+        # 扩展到段落边界，但最多再扩展窗口大小的四分之一
+        if start > 0:
+            boundary = text.rfind('\n', max(0, start - before_size // 4), start)
+            if boundary != -1:
+                start = boundary + 1
+        if end < len(text):
+            boundary = text.find('\n', end, end + after_size // 4)
+            if boundary != -1:
+                end = boundary
+
+        return start, end
+
+    def detect(self, text: str, cursor_pos: int, mode: str = "balanced",
+               document_id: str = "", limit: int = 10) -> List[RankedCodexEntry]:
+        """
+        检测光标附近的Codex条目并排序
+
+        窗口内的条目按距离加权的出现次数排序；窗口外只在文档摘要中出现的条目排在其后。
+
+        Args:
+            text: 当前文档全文
+            cursor_pos: 光标位置
+            mode: 上下文模式 (fast/balanced/full)
+            document_id: 文档ID，用于文档摘要
+            limit: 返回条目上限
+
+        Returns:
+            排序后的条目列表
+        """
+        if not text or not text.strip():
+            return []
+
+        start, end = self.get_window(text, cursor_pos, mode)
+        window_text = text[start:end]
+        local_cursor = cursor_pos - start
+
+        ranked: Dict[str, RankedCodexEntry] = {}
+        for entry_id, matched_text, ref_start, ref_end in self._detect(window_text, document_id):
+            if ref_end <= local_cursor:
+                distance = local_cursor - ref_end
+            elif ref_start >= local_cursor:
+                distance = ref_start - local_cursor
+            else:
+                distance = 0
+
+            item = ranked.get(entry_id)
+            if item is None:
+                item = ranked[entry_id] = RankedCodexEntry(entry_id=entry_id, score=0.0)
+            item.window_count += 1
+            item.score += 1.0 / (1.0 + distance / self.proximity_scale)
+            if item.nearest_distance is None or distance < item.nearest_distance:
+                item.nearest_distance = distance
+                item.matched_text = matched_text
+
+        # 窗口之外的长距离提及由文档摘要补充（只读取后台计算好的摘要）
+        if document_id and (start > 0 or end < len(text)):
+            for entry_id, count in self.get_document_summary(document_id, text).items():
+                item = ranked.get(entry_id)
+                if item is None:
+                    ranked[entry_id] = RankedCodexEntry(
+                        entry_id=entry_id, score=0.0, document_count=count
+                    )
+                else:
+                    item.document_count = count
+
+        results = sorted(
+            ranked.values(),
+            key=lambda item: (item.in_window, item.score, item.document_count),
+            reverse=True
+        )
+        return results[:limit]
+
+    def _detect(self, text: str, document_id: str) -> List[Tuple[str, str, int, int]]:
+        """检测引用，统一返回 (entry_id, matched_text, start, end)"""
+        if self.reference_detector:
+            return [
+                (ref.entry_id, ref.matched_text, ref.start_position, ref.end_position)
+                for ref in self._cache.detect(self.reference_detector, text, document_id or None)
+            ]
+        if hasattr(self.codex_manager, 'detect_references_in_text'):
+            return self.codex_manager.detect_references_in_text(text, document_id)
+        return []
+
+    def get_document_summary(self, document_id: str, text: Optional[str] = None) -> Counter:
+        """
+        读取文档级条目出现次数摘要，不在调用线程中检测全文
+
+        摘要缺失、已过期或Codex版本变化时用text安排后台刷新；
+        本次返回已有的摘要，尚未计算或版本已变化时返回空摘要。
+        """
+        version = getattr(self.codex_manager, 'pattern_version', None)
+        with self._summary_lock:
+            cached = self._document_summaries.get(document_id)
+
+        if text is not None and (cached is None or cached[1] != version
+                                 or time.monotonic() - cached[0] >= self.summary_refresh_interval):
+            self.schedule_summary(document_id, text)
+
+        if cached is None or cached[1] != version:
+            return Counter()
+        return cached[2]
+
+    def schedule_summary(self, document_id: str, text: str):
+        """
+        在后台线程中（重新）计算文档摘要
+
+        编辑停顿或保存后调用；同一文档在计算前多次提交时只计算最新的文本。
+        """
+        if not document_id:
+            return
+
+        with self._summary_lock:
+            self._pending_summaries[document_id] = text
+            if self._summary_thread is not None:
+                return
+            self._summary_thread = threading.Thread(
+                target=self._run_summaries, name="CodexSummary", daemon=True
+            )
+            self._summary_thread.start()
+
+    def _run_summaries(self):
+        """后台线程：依次计算等待中的文档摘要，全文检测大多命中段落缓存"""
+        while True:
+            with self._summary_lock:
+                if not self._pending_summaries:
+                    self._summary_thread = None
+                    return
+                document_id = next(iter(self._pending_summaries))
+                text = self._pending_summaries.pop(document_id)
+
+            version = getattr(self.codex_manager, 'pattern_version', None)
+            try:
+                summary = Counter(entry_id for entry_id, _, _, _ in self._detect(text, document_id))
+            except Exception as e:
+                logger.warning(f"计算文档Codex摘要失败: {document_id}, {e}")
+                continue
+
+            with self._summary_lock:
+                self._document_summaries[document_id] = (time.monotonic(), version, summary)
+            logger.debug(f"刷新文档Codex摘要: {document_id}, {len(summary)} 个条目")
+
+    def invalidate_summary(self, document_id: Optional[str] = None):
+        """使文档摘要失效（为空时清空全部）"""
+        with self._summary_lock:
+            if document_id is None:
+                self._document_summaries.clear()
+                self._pending_summaries.clear()
+            else:
+                self._document_summaries.pop(document_id, None)
+                self._pending_summaries.pop(document_id, None)
@@ -9,6 +9,9 @@ from typing import Dict, List, Any, Optional, Set, TYPE_CHECKING
 from dataclasses import dataclass
 from enum import Enum
 
+from .reference_cache import detect_references_cached
+from .tokenizer import TokenBudget, get_token_counter
+
 if TYPE_CHECKING:
     from .codex_manager import CodexManager, CodexEntry
     from .reference_detector import ReferenceDetector
@@ -36,6 +39,8 @@ class ContextSection:
 class SmartContextInjector:
     """智能上下文注入器"""
     
+    TRUNCATION_MARK = "..."  # 截断段落末尾的省略号
+    
     def __init__(self, codex_manager: 'CodexManager', reference_detector: 'ReferenceDetector'):
         self.codex_manager = codex_manager
         self.reference_detector = reference_detector
@@ -44,6 +49,11 @@ class SmartContextInjector:
         self.max_context_tokens = 2000  # 最大上下文token数
         self.min_relevance_score = 0.3  # 最小相关性分数
         self.global_entry_limit = 10    # 全局条目限制
+        self.min_section_tokens = 100   # 截断后段落至少保留的token数
+        
+        # 各段落token数按内容缓存，段落不变时无需重新计数和分配
+        self._token_counter = get_token_counter()
+        self._budget = TokenBudget(self.max_context_tokens, self._token_counter)
         
         logger.info("SmartContextInjector initialized")
 
@@ -121,9 +131,9 @@ class SmartContextInjector:
         if not prompt_context.current_text:
             return []
         
-        # 检测引用
-        references = self.reference_detector.detect_references(
-            prompt_context.current_text, prompt_context.document_id
+        # 检测引用（通过共享缓存，与其他消费者保持一致）
+        references = detect_references_cached(
+            self.reference_detector, prompt_context.current_text, prompt_context.document_id
         )
         
         # 获取唯一条目
@@ -238,51 +248,58 @@ class SmartContextInjector:
         else:
             content = story_so_far
         
+        content = f"故事发展到目前为止：\n{content}"
         return ContextSection(
             title="故事发展",
-            content=f"故事发展到目前为止：\n{content}",
+            content=content,
             priority=7,
             token_estimate=self._estimate_tokens(content)
         )
 
     def _select_context_sections(self, sections: List[ContextSection]) -> List[ContextSection]:
-        """根据优先级和token限制选择上下文段落"""
-        # 按优先级排序
-        sections.sort(key=lambda x: x.priority, reverse=True)
+        """根据优先级和token限制选择上下文段落（按真实token数分配预算）"""
+        budget = self._budget
+        budget.max_tokens = self.max_context_tokens
+        budget.retain_sections({section.title for section in sections})
+        # 截断的段落要追加省略号，最少保留量中预留省略号的token
+        min_tokens = self.min_section_tokens + self._estimate_tokens(self.TRUNCATION_MARK)
+        for section in sections:
+            budget.set_section(section.title, section.content, section.priority,
+                               min_tokens=min_tokens)
         
-        selected = []
-        total_tokens = 0
+        allocation = budget.allocate()
+        allocated_tokens = budget.allocated_tokens()
         
-        for section in sections:
-            if total_tokens + section.token_estimate <= self.max_context_tokens:
+        selected = []
+        for section in sorted(sections, key=lambda x: x.priority, reverse=True):
+            content = allocation.get(section.title)
+            if content is None:
+                continue
+            if content == section.content:
                 selected.append(section)
-                total_tokens += section.token_estimate
             else:
-                # 尝试截断内容
-                remaining_tokens = self.max_context_tokens - total_tokens
-                if remaining_tokens > 100:  # 至少保留100 tokens
-                    truncated_section = self._truncate_section(section, remaining_tokens)
-                    if truncated_section:
-                        selected.append(truncated_section)
-                break
+                truncated = self._truncate_section(section, allocated_tokens[section.title])
+                if truncated is not None:
+                    selected.append(truncated)
         
         return selected
 
     def _truncate_section(self, section: ContextSection, max_tokens: int) -> Optional[ContextSection]:
-        """截断段落内容"""
-        # 简单的截断策略：按字符数比例截断
-        char_ratio = max_tokens / section.token_estimate
-        if char_ratio < 0.3:  # 截断太多时放弃
+        """截断段落内容，使截断后（含省略号）不超过max_tokens；留不下最少内容时返回None（舍弃该段落）"""
+        body_tokens = max_tokens - self._estimate_tokens(self.TRUNCATION_MARK)
+        if body_tokens < max(1, self.min_section_tokens):
             return None
         
-        max_chars = int(len(section.content) * char_ratio)
-        truncated_content = section.content[:max_chars] + "..."
+        body = self._token_counter.truncate(section.content, body_tokens).rstrip()
+        if not body:
+            return None
+        content = body + self.TRUNCATION_MARK
         
         return ContextSection(
             title=section.title,
-            content=truncated_content,
+            content=content,
             priority=section.priority,
-            token_estimate=max_tokens
+            token_estimate=self._estimate_tokens(content)
         )
 
     def _build_enhanced_prompt(self, sections: List[ContextSection], user_prompt: str) -> str:
@@ -306,12 +323,8 @@ class SmartContextInjector:
         return "\n".join(prompt_parts)
 
     def _estimate_tokens(self, text: str) -> int:
-        """估算文本的token数量"""
-        # 简单的估算：中文约1.5字符/token，英文约4字符/token
-        chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
-        other_chars = len(text) - chinese_chars
-        
-        return int(chinese_chars / 1.5 + other_chars / 4)
+        """计算文本的token数量（按段缓存）"""
+        return self._token_counter.count(text)
 
     def _get_type_name(self, entry_type: str) -> str:
         """获取类型的中文名称"""
@@ -242,6 +242,34 @@ class DatabaseManager:
                 logger.error(f"Error saving project data: {e}")
                 raise
 
+    def update_documents_content(self, documents: list):
+        """
+        在一个事务中更新多个文档的内容（增量更新，不重写整个项目）。
+
+        Args:
+            documents (list): 包含 'id', 'content', 'word_count', 'updated_at' 的字典列表
+        """
+        if not documents:
+            return
+
+        with self._lock:
+            try:
+                with self._get_connection() as conn:
+                    cursor = conn.executemany("""
+                        UPDATE documents SET content = :content, word_count = :word_count, updated_at = :updated_at
+                        WHERE id = :id
+                    """, documents)
+                    if cursor.rowcount != len(documents):
+                        # 有文档尚未写入数据库，整个事务回滚
+                        raise sqlite3.IntegrityError(
+                            f"Expected to update {len(documents)} documents, updated {cursor.rowcount}")
+                    conn.commit()
+                    logger.info(f"Updated content of {len(documents)} documents in one transaction")
+
+            except sqlite3.Error as e:
+                logger.error(f"Error updating documents content: {e}")
+                raise
+
     def load_project_data(self) -> Dict[str, Any]:
         """从数据库加载所有项目数据"""
         with self._lock:
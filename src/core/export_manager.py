@@ -3,22 +3,73 @@
 负责将项目导出为各种格式（文本、Word、PDF、HTML等）
 """
 
+import os
+import queue
+import shutil
 import logging
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterable, Iterator, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
 from PyQt6.QtCore import QObject, pyqtSignal, QThread
 
-from .concurrent_io import FileIOWorker, get_concurrent_io
-
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from core.project import ProjectManager, ProjectDocument, DocumentType
 
 logger = logging.getLogger(__name__)
 
+# PDF分段渲染后合并页面需要pypdf，未安装时整本书一次渲染
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# PDF分段：每段至少包含的字符数（只在幕、章开头处分段），以及并行渲染的最大进程数
+PDF_PART_CHARS = 200_000
+PDF_MAX_WORKERS = 4
+
+
+class ExportCancelled(Exception):
+    """导出被取消"""
+    pass
+
+
+def _weasyprint_available() -> bool:
+    try:
+        import weasyprint  # noqa: F401
+        return True
+    except (ImportError, OSError):
+        # 缺少pango等系统库时导入会抛出OSError
+        return False
+
+
+def _render_pdf_part(html: str, output_path: str) -> str:
+    """在工作进程中把一段HTML渲染为PDF文件"""
+    from weasyprint import HTML
+    HTML(string=html).write_pdf(output_path)
+    return output_path
+
+
+@contextmanager
+def _atomic_output(path: Path, encoding: str):
+    """先写入临时文件，成功后替换目标文件；失败或取消时删除临时文件，不留下半个文件"""
+    temp_path = path.with_name(path.name + ".part")
+    try:
+        with open(temp_path, 'w', encoding=encoding) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+
 
 class ExportFormat(Enum):
     """导出格式枚举"""
@@ -52,14 +103,34 @@ class ExportManager(QObject):
     exportProgress = pyqtSignal(int, int)  # 当前进度, 总数
     exportCompleted = pyqtSignal(str)  # 导出完成
     exportError = pyqtSignal(str)  # 导出错误
+    exportCancelled = pyqtSignal(str)  # 导出已取消
     
     def __init__(self, project_manager: 'ProjectManager'):
         super().__init__()
         self._project_manager = project_manager
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """取消正在进行的导出（在处理下一个文档前生效，可从任意线程调用）"""
+        self._cancel_event.set()
+
+    def reset_cancel(self):
+        """
+        清除取消标记
+
+        在创建新的导出任务时调用；导出开始执行时不再清除，
+        任务排队期间发出的取消不会丢失。
+        """
+        self._cancel_event.clear()
+
+    def _check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise ExportCancelled()
         
     def export_project(self, options: ExportOptions) -> bool:
         """导出项目"""
         try:
+            self._check_cancelled()
             self.exportStarted.emit(f"开始导出为 {options.format.value} 格式...")
             
             # 获取当前项目
@@ -82,7 +153,11 @@ class ExportManager(QObject):
             else:
                 self.exportError.emit(f"不支持的导出格式: {options.format.value}")
                 return False
-                
+
+        except ExportCancelled:
+            logger.info(f"导出已取消: {options.output_path}")
+            self.exportCancelled.emit(str(options.output_path))
+            return False
         except Exception as e:
             logger.error(f"导出失败: {e}")
             self.exportError.emit(str(e))
@@ -117,108 +192,114 @@ class ExportManager(QObject):
         collect_recursive(root_docs)
         return documents
     
-    def _export_to_text(self, project: Any, options: ExportOptions) -> bool:
-        """导出为纯文本（非阻塞版本）"""
-        try:
-            documents = self._collect_documents(project)
-            total = len(documents)
-            
-            # 准备内容
-            content_parts = []
-            
-            # 添加标题和作者信息
-            if options.include_metadata:
-                title = options.title or project.name
-                author = options.author or project.author
-                content_parts.append(f"{title}\n")
-                content_parts.append(f"作者：{author}\n")
-                content_parts.append("\n" + "="*50 + "\n\n")
-            
-            # 生成文档内容
+    def _stream_export(self, project: Any, options: ExportOptions,
+                       render_document: Callable[['ProjectDocument', int, int, ExportOptions], Iterable[str]],
+                       header: Iterable[str] = (), footer: Iterable[str] = ()):
+        """
+        逐个文档渲染并写入输出文件，不在内存中拼接整本书
+
+        每个文档写入前检查是否已取消，写入后发出进度。
+        """
+        documents = self._collect_documents(project)
+        total = len(documents)
+        with _atomic_output(Path(options.output_path), options.encoding) as f:
+            f.writelines(header)
             for i, doc in enumerate(documents):
+                self._check_cancelled()
+                f.writelines(render_document(doc, i, total, options))
                 self.exportProgress.emit(i + 1, total)
-                
-                # 添加章节标题
-                if doc.doc_type.value == 'act':
-                    content_parts.append(f"\n第{doc.order + 1}幕 {doc.name}\n")
-                    content_parts.append("="*30 + "\n\n")
-                elif doc.doc_type.value == 'chapter':
-                    content_parts.append(f"\n第{doc.order + 1}章 {doc.name}\n")
-                    content_parts.append("-"*30 + "\n\n")
-                elif doc.doc_type.value == 'scene':
-                    content_parts.append(f"\n场景{doc.order + 1}：{doc.name}\n\n")
-                
-                # 添加内容
-                if doc.content:
-                    content_parts.append(doc.content)
-                    content_parts.append("\n")
-                
-                # 章节分隔
-                if doc.doc_type.value in ['act', 'chapter']:
-                    content_parts.append(options.chapter_break)
-            
-            # 合并所有内容
-            full_content = ''.join(content_parts)
-            
-            # 使用非阻塞写入
-            worker = FileIOWorker('write', options.output_path, 
-                                data=full_content, encoding=options.encoding, 
-                                parent=self)
-            worker.finished.connect(lambda: self.exportCompleted.emit(str(options.output_path)))
-            worker.error.connect(lambda e: self.exportError.emit(f"导出文本失败: {e}"))
-            worker.start()
-            
+            f.writelines(footer)
+
+    def _export_to_text(self, project: Any, options: ExportOptions) -> bool:
+        """导出为纯文本（逐章写入）"""
+        try:
+            self._stream_export(project, options, self._render_text_document,
+                                header=self._text_header(project, options))
+            self.exportCompleted.emit(str(options.output_path))
             return True
-            
+
+        except ExportCancelled:
+            raise
         except Exception as e:
             logger.error(f"导出文本失败: {e}")
             self.exportError.emit(f"导出文本失败: {e}")
             return False
-    
+
+    def _text_header(self, project: Any, options: ExportOptions) -> Iterator[str]:
+        """纯文本的标题和作者信息"""
+        if options.include_metadata:
+            title = options.title or project.name
+            author = options.author or project.author
+            yield f"{title}\n"
+            yield f"作者：{author}\n"
+            yield "\n" + "="*50 + "\n\n"
+
+    def _render_text_document(self, doc: 'ProjectDocument', index: int, total: int,
+                              options: ExportOptions) -> Iterator[str]:
+        """一个文档的纯文本内容"""
+        # 添加章节标题
+        if doc.doc_type.value == 'act':
+            yield f"\n第{doc.order + 1}幕 {doc.name}\n"
+            yield "="*30 + "\n\n"
+        elif doc.doc_type.value == 'chapter':
+            yield f"\n第{doc.order + 1}章 {doc.name}\n"
+            yield "-"*30 + "\n\n"
+        elif doc.doc_type.value == 'scene':
+            yield f"\n场景{doc.order + 1}：{doc.name}\n\n"
+
+        # 添加内容
+        if doc.content:
+            yield doc.content
+            yield "\n"
+
+        # 章节分隔
+        if doc.doc_type.value in ['act', 'chapter']:
+            yield options.chapter_break
+
     def _export_to_markdown(self, project: Any, options: ExportOptions) -> bool:
-        """导出为Markdown格式"""
+        """导出为Markdown格式（逐章写入）"""
         try:
-            documents = self._collect_documents(project)
-            total = len(documents)
-            
-            with open(options.output_path, 'w', encoding=options.encoding) as f:
-                # 写入元数据
-                if options.include_metadata:
-                    title = options.title or project.name
-                    author = options.author or project.author
-                    f.write(f"# {title}\n\n")
-                    f.write(f"**作者**: {author}\n\n")
-                    f.write("---\n\n")
-                
-                # 写入文档内容
-                for i, doc in enumerate(documents):
-                    self.exportProgress.emit(i + 1, total)
-                    
-                    # 写入标题（使用Markdown标题级别）
-                    if doc.doc_type.value == 'act':
-                        f.write(f"\n# 第{doc.order + 1}幕 {doc.name}\n\n")
-                    elif doc.doc_type.value == 'chapter':
-                        f.write(f"\n## 第{doc.order + 1}章 {doc.name}\n\n")
-                    elif doc.doc_type.value == 'scene':
-                        f.write(f"\n### 场景{doc.order + 1}：{doc.name}\n\n")
-                    
-                    # 写入内容
-                    if doc.content:
-                        # 处理特殊标记
-                        content = doc.content
-                        # 保留@标记
-                        content = content.replace('@', '**@') 
-                        content = content.replace('**@', '@')
-                        f.write(content)
-                        f.write("\n\n")
-            
+            self._stream_export(project, options, self._render_markdown_document,
+                                header=self._markdown_header(project, options))
             self.exportCompleted.emit(str(options.output_path))
             return True
-            
+
+        except ExportCancelled:
+            raise
         except Exception as e:
             logger.error(f"导出Markdown失败: {e}")
             self.exportError.emit(f"导出Markdown失败: {e}")
             return False
+
+    def _markdown_header(self, project: Any, options: ExportOptions) -> Iterator[str]:
+        """Markdown的元数据"""
+        if options.include_metadata:
+            title = options.title or project.name
+            author = options.author or project.author
+            yield f"# {title}\n\n"
+            yield f"**作者**: {author}\n\n"
+            yield "---\n\n"
+
+    def _render_markdown_document(self, doc: 'ProjectDocument', index: int, total: int,
+                                  options: ExportOptions) -> Iterator[str]:
+        """一个文档的Markdown内容"""
+        # 写入标题（使用Markdown标题级别）
+        if doc.doc_type.value == 'act':
+            yield f"\n# 第{doc.order + 1}幕 {doc.name}\n\n"
+        elif doc.doc_type.value == 'chapter':
+            yield f"\n## 第{doc.order + 1}章 {doc.name}\n\n"
+        elif doc.doc_type.value == 'scene':
+            yield f"\n### 场景{doc.order + 1}：{doc.name}\n\n"
+
+        # 写入内容
+        if doc.content:
+            # 处理特殊标记
+            content = doc.content
+            # 保留@标记
+            content = content.replace('@', '**@')
+            content = content.replace('**@', '@')
+            yield content
+            yield "\n\n"
     
     def _export_to_docx(self, project: Any, options: ExportOptions) -> bool:
         """导出为Word文档"""
@@ -260,6 +341,7 @@ class ExportManager(QObject):
             
             # 写入文档内容
             for i, document in enumerate(documents):
+                self._check_cancelled()
                 self.exportProgress.emit(i + 1, total)
                 
                 # 添加标题
@@ -289,77 +371,192 @@ class ExportManager(QObject):
             self.exportCompleted.emit(str(options.output_path))
             return True
             
+        except ExportCancelled:
+            raise
         except Exception as e:
             logger.error(f"导出Word文档失败: {e}")
             self.exportError.emit(f"导出Word文档失败: {e}")
             return False
     
     def _export_to_pdf(self, project: Any, options: ExportOptions) -> bool:
-        """导出为PDF（通过HTML转换）"""
+        """
+        导出为PDF（通过HTML转换）
+
+        书稿按幕、章分成若干段，每段在独立的工作进程中渲染为PDF，再依次合并页面，
+        内存占用只与同时渲染的段数有关。未安装pypdf或只有一段时整本一次渲染。
+        """
+        if not _weasyprint_available():
+            self.exportError.emit("需要安装weasyprint库: pip install weasyprint")
+            return False
+
         try:
-            # 先导出为HTML
-            html_path = options.output_path.with_suffix('.html')
-            html_options = ExportOptions(
-                format=ExportFormat.HTML,
-                output_path=html_path,
-                include_metadata=options.include_metadata,
-                title=options.title,
-                author=options.author
-            )
-            
-            if not self._export_to_html(project, html_options):
-                return False
-            
-            # 使用weasyprint转换为PDF
+            documents = self._collect_documents(project)
+            parts = self._split_pdf_parts(documents)
+            temp_dir = Path(tempfile.mkdtemp(prefix="export_pdf_"))
             try:
-                from weasyprint import HTML
-                HTML(filename=str(html_path)).write_pdf(str(options.output_path))
-                
-                # 删除临时HTML文件
-                if html_path.exists():
-                    html_path.unlink()
-                
-                self.exportCompleted.emit(str(options.output_path))
-                return True
-                
-            except ImportError:
-                # 清理临时文件
-                if html_path.exists():
-                    html_path.unlink()
-                self.exportError.emit("需要安装weasyprint库: pip install weasyprint")
-                return False
-            except Exception as weasy_error:
-                # 清理临时文件
-                if html_path.exists():
-                    html_path.unlink()
-                self.exportError.emit(f"PDF转换失败: {weasy_error}")
-                return False
-                
+                if PYPDF_AVAILABLE and len(parts) > 1:
+                    self._render_pdf_parallel(project, options, documents, parts, temp_dir)
+                else:
+                    self._render_pdf_single(project, options, temp_dir)
+            except BaseException:
+                # 被终止的工作进程可能还占用着分段文件，在后台删除，不阻塞取消
+                threading.Thread(target=shutil.rmtree, args=(temp_dir,), kwargs={"ignore_errors": True},
+                                 name="export-pdf-cleanup", daemon=True).start()
+                raise
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+            self.exportCompleted.emit(str(options.output_path))
+            return True
+
+        except ExportCancelled:
+            raise
         except Exception as e:
             logger.error(f"导出PDF失败: {e}")
-            self.exportError.emit(f"导出PDF失败: {e}")
+            self.exportError.emit(f"PDF转换失败: {e}")
             return False
-    
+
+    @staticmethod
+    def _split_pdf_parts(documents: List['ProjectDocument']) -> List[Tuple[int, int]]:
+        """
+        把文档序列分成PDF渲染段
+
+        只在幕、章开头处分段，且每段至少包含 PDF_PART_CHARS 个字符。
+
+        Returns:
+            每段的文档下标范围 [(起始, 结束), ...]
+        """
+        parts = []
+        start, chars = 0, 0
+        for i, doc in enumerate(documents):
+            if i > start and chars >= PDF_PART_CHARS and doc.doc_type.value in ('act', 'chapter'):
+                parts.append((start, i))
+                start, chars = i, 0
+            chars += len(doc.content or "")
+        if documents:
+            parts.append((start, len(documents)))
+        return parts
+
+    def _render_pdf_single(self, project: Any, options: ExportOptions, temp_dir: Path):
+        """整本书写成一个HTML文件后一次渲染"""
+        from weasyprint import HTML
+
+        html_path = temp_dir / "book.html"
+        html_options = ExportOptions(
+            format=ExportFormat.HTML,
+            output_path=html_path,
+            include_metadata=options.include_metadata,
+            title=options.title,
+            author=options.author
+        )
+        self._stream_export(project, html_options, self._render_html_document,
+                            header=self._html_header(project, html_options),
+                            footer=self._html_footer())
+        self._check_cancelled()
+        HTML(filename=str(html_path)).write_pdf(str(options.output_path))
+
+    def _render_pdf_parallel(self, project: Any, options: ExportOptions,
+                             documents: List['ProjectDocument'], parts: List[Tuple[int, int]],
+                             temp_dir: Path):
+        """各段在工作进程中并行渲染，再按顺序合并页面"""
+        total = len(documents)
+        max_workers = min(len(parts), os.cpu_count() or 1, PDF_MAX_WORKERS)
+        part_paths = [temp_dir / f"part_{n:04d}.pdf" for n in range(len(parts))]
+
+        def part_html(n: int) -> str:
+            start, end = parts[n]
+            chunks = list(self._html_header(project, options, include_cover=(n == 0)))
+            for i in range(start, end):
+                chunks.extend(self._render_html_document(documents[i], i, total, options))
+            chunks.extend(self._html_footer())
+            return "".join(chunks)
+
+        pool = multiprocessing.get_context("spawn").Pool(processes=max_workers)
+        finished = queue.Queue()  # (段序号, 异常或None)，由进程池的结果线程写入
+        try:
+            running = set()
+            next_part, done_docs = 0, 0
+            while next_part < len(parts) or running:
+                # 同时在途的段数有上限，未提交的段不生成HTML
+                while next_part < len(parts) and len(running) < max_workers * 2:
+                    self._check_cancelled()
+                    n = next_part
+                    pool.apply_async(_render_pdf_part, (part_html(n), str(part_paths[n])),
+                                     callback=lambda _, n=n: finished.put((n, None)),
+                                     error_callback=lambda error, n=n: finished.put((n, error)))
+                    running.add(n)
+                    next_part += 1
+                try:
+                    n, error = finished.get(timeout=0.2)
+                except queue.Empty:
+                    n, error = None, None
+                self._check_cancelled()
+                if n is None:
+                    continue
+                running.discard(n)
+                if error is not None:
+                    raise error
+                done_docs += parts[n][1] - parts[n][0]
+                self.exportProgress.emit(done_docs, total)
+        except BaseException:
+            # 不等待正在渲染的段，直接终止工作进程
+            pool.terminate()
+            raise
+        pool.close()
+        pool.join()
+
+        self._check_cancelled()
+        output_path = Path(options.output_path)
+        temp_output = output_path.with_name(output_path.name + ".part")
+        try:
+            writer = PdfWriter()
+            for path in part_paths:
+                self._check_cancelled()
+                reader = PdfReader(str(path))
+                writer.append(reader)
+                # 写入器默认持有每个源文档（含整个分段文件的内容），复制完页面后立即释放，
+                # 合并时只多占用一个分段的内存
+                writer.reset_translation(reader)
+                del reader
+                path.unlink()
+            with open(temp_output, 'wb') as f:
+                writer.write(f)
+            writer.close()
+            os.replace(temp_output, output_path)
+        except BaseException:
+            if temp_output.exists():
+                temp_output.unlink()
+            raise
+
     def _export_to_html(self, project: Any, options: ExportOptions) -> bool:
-        """导出为HTML"""
+        """导出为HTML（逐章写入）"""
         try:
-            documents = self._collect_documents(project)
-            total = len(documents)
-            
-            with open(options.output_path, 'w', encoding=options.encoding) as f:
-                # HTML头部
-                f.write("""<!DOCTYPE html>
+            self._stream_export(project, options, self._render_html_document,
+                                header=self._html_header(project, options),
+                                footer=self._html_footer())
+            self.exportCompleted.emit(str(options.output_path))
+            return True
+
+        except ExportCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"导出HTML失败: {e}")
+            self.exportError.emit(f"导出HTML失败: {e}")
+            return False
+
+    def _html_header(self, project: Any, options: ExportOptions,
+                     include_cover: bool = True) -> Iterator[str]:
+        """HTML头部、样式以及标题和作者"""
+        yield """<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-""")
-                
-                title = options.title or project.name
-                f.write(f"    <title>{title}</title>\n")
-                
-                # 添加样式
-                f.write("""    <style>
+"""
+        title = options.title or project.name
+        yield f"    <title>{title}</title>\n"
+
+        # 添加样式
+        yield """    <style>
         body {
             font-family: "Microsoft YaHei", "SimSun", serif;
             line-height: 1.8;
@@ -383,50 +580,41 @@ class ExportManager(QObject):
 </head>
 <body>
     <div class="content">
-""")
-                
-                # 标题和作者
-                if options.include_metadata:
-                    author = options.author or project.author
-                    f.write(f"        <h1>{title}</h1>\n")
-                    f.write(f"        <p class='author'>作者：{author}</p>\n")
-                
-                # 写入内容
-                for i, doc in enumerate(documents):
-                    self.exportProgress.emit(i + 1, total)
-                    
-                    # 写入标题
-                    if doc.doc_type.value == 'act':
-                        f.write(f"        <h1>第{doc.order + 1}幕 {doc.name}</h1>\n")
-                    elif doc.doc_type.value == 'chapter':
-                        f.write(f"        <h2>第{doc.order + 1}章 {doc.name}</h2>\n")
-                    elif doc.doc_type.value == 'scene':
-                        f.write(f"        <h3>场景{doc.order + 1}：{doc.name}</h3>\n")
-                    
-                    # 写入内容
-                    if doc.content:
-                        paragraphs = doc.content.split('\n')
-                        for para in paragraphs:
-                            if para.strip():
-                                # 转义HTML字符
-                                para = para.replace('&', '&amp;')
-                                para = para.replace('<', '&lt;')
-                                para = para.replace('>', '&gt;')
-                                f.write(f"        <p>{para}</p>\n")
-                    
-                    # 章节分隔
-                    if doc.doc_type.value in ['act', 'chapter'] and i < len(documents) - 1:
-                        f.write("        <div class='chapter-break'>* * *</div>\n")
-                
-                # HTML结尾
-                f.write("""    </div>
+"""
+        # 标题和作者
+        if options.include_metadata and include_cover:
+            author = options.author or project.author
+            yield f"        <h1>{title}</h1>\n"
+            yield f"        <p class='author'>作者：{author}</p>\n"
+
+    @staticmethod
+    def _html_footer() -> Iterator[str]:
+        """HTML结尾"""
+        yield """    </div>
 </body>
-</html>""")
-            
-            self.exportCompleted.emit(str(options.output_path))
-            return True
-            
-        except Exception as e:
-            logger.error(f"导出HTML失败: {e}")
-            self.exportError.emit(f"导出HTML失败: {e}")
-            return False
\ No newline at end of file
+</html>"""
+
+    def _render_html_document(self, doc: 'ProjectDocument', index: int, total: int,
+                              options: ExportOptions) -> Iterator[str]:
+        """一个文档的HTML内容"""
+        # 写入标题
+        if doc.doc_type.value == 'act':
+            yield f"        <h1>第{doc.order + 1}幕 {doc.name}</h1>\n"
+        elif doc.doc_type.value == 'chapter':
+            yield f"        <h2>第{doc.order + 1}章 {doc.name}</h2>\n"
+        elif doc.doc_type.value == 'scene':
+            yield f"        <h3>场景{doc.order + 1}：{doc.name}</h3>\n"
+
+        # 写入内容
+        if doc.content:
+            for para in doc.content.split('\n'):
+                if para.strip():
+                    # 转义HTML字符
+                    para = para.replace('&', '&amp;')
+                    para = para.replace('<', '&lt;')
+                    para = para.replace('>', '&gt;')
+                    yield f"        <p>{para}</p>\n"
+
+        # 章节分隔
+        if doc.doc_type.value in ['act', 'chapter'] and index < total - 1:
+            yield "        <div class='chapter-break'>* * *</div>\n"
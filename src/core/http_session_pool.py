@@ -0,0 +1,227 @@
+"""
+HTTP会话池
+为同步AIClient（requests）和AsyncAIClient（aiohttp）提供长期存活的会话，
+按服务商和服务地址（scheme://host:port）分别建立会话、限制连接数并保持keep-alive，
+避免每次补全都重新进行TCP/TLS握手
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+# 各服务商的连接数上限（每个主机）
+PROVIDER_CONNECTION_LIMITS: Dict[str, int] = {
+    "openai": 8,
+    "claude": 8,
+    "gemini": 8,
+    "ollama": 4,    # 本地模型并发能力有限
+    "custom": 6,
+}
+DEFAULT_CONNECTION_LIMIT = 6
+
+# 空闲连接保持时间（秒）
+KEEPALIVE_TIMEOUT = 60.0
+
+
+def endpoint_origin(url: Optional[str]) -> str:
+    """
+    取URL的 scheme://host:port 部分（省略端口时补上默认端口）
+
+    同一服务商的不同服务地址使用各自的会话和连接数上限。
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    scheme = (parts.scheme or "http").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is None:
+        port = 443 if scheme == "https" else 80
+    return f"{scheme}://{(parts.hostname or '').lower()}:{port}"
+
+
+class HTTPSessionPool:
+    """
+    HTTP会话池
+
+    同步会话按 (服务商, 服务地址) 共享，可跨线程使用；
+    aiohttp会话绑定事件循环，按 (事件循环, 服务商, 服务地址) 共享。
+    """
+
+    def __init__(self, keepalive_timeout: float = KEEPALIVE_TIMEOUT):
+        self.keepalive_timeout = keepalive_timeout
+        self._sessions: Dict[Tuple[str, str], requests.Session] = {}
+        self._async_sessions: Dict[Tuple[int, str, str],
+                                   Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self._stats = {
+            'sessions_created': 0,
+            'async_sessions_created': 0,
+            'session_requests': 0,
+            'async_session_requests': 0,
+        }
+
+    @staticmethod
+    def get_connection_limit(provider: str) -> int:
+        """获取服务商的连接数上限"""
+        return PROVIDER_CONNECTION_LIMITS.get(provider, DEFAULT_CONNECTION_LIMIT)
+
+    def get_session(self, provider: str, url: Optional[str] = None) -> requests.Session:
+        """
+        获取服务商在该服务地址上的同步会话（不存在时创建）
+
+        Args:
+            provider: 服务商标识（AIProvider.value）
+            url: 请求地址，按其 scheme://host:port 区分会话
+        """
+        key = (provider, endpoint_origin(url))
+        with self._lock:
+            self._stats['session_requests'] += 1
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = self._create_session(*key)
+                self._stats['sessions_created'] += 1
+            return session
+
+    def _create_session(self, provider: str, origin: str) -> requests.Session:
+        """创建带重试和连接池的同步会话"""
+        limit = self.get_connection_limit(provider)
+        session = requests.Session()
+
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"]
+        )
+        # 超过上限的并发请求阻塞等待空闲连接，而不是临时新建连接
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=limit,
+                              pool_maxsize=limit, pool_block=True)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        logger.debug(f"创建HTTP会话: {provider} {origin}, 连接上限 {limit}")
+        return session
+
+    def get_async_session(self, provider: str, url: Optional[str] = None) -> aiohttp.ClientSession:
+        """
+        获取当前事件循环中服务商在该服务地址上的aiohttp会话（不存在时创建）
+
+        必须在事件循环内调用。
+        """
+        loop = asyncio.get_running_loop()
+        origin = endpoint_origin(url)
+        key = (id(loop), provider, origin)
+
+        with self._lock:
+            self._stats['async_session_requests'] += 1
+            self._prune_closed_loops()
+
+            cached = self._async_sessions.get(key)
+            if cached and cached[0] is loop and not cached[1].closed:
+                return cached[1]
+
+            limit = self.get_connection_limit(provider)
+            connector = aiohttp.TCPConnector(
+                limit=limit,
+                limit_per_host=limit,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._async_sessions[key] = (loop, session)
+            self._stats['async_sessions_created'] += 1
+
+        logger.debug(f"创建aiohttp会话: {provider} {origin}, 连接上限 {limit}")
+        return session
+
+    def _prune_closed_loops(self):
+        """丢弃已关闭事件循环上的会话（调用方持有锁）"""
+        for key, (loop, _) in list(self._async_sessions.items()):
+            if loop.is_closed():
+                del self._async_sessions[key]
+
+    async def close_async_sessions(self):
+        """关闭当前事件循环上的所有aiohttp会话"""
+        loop = asyncio.get_running_loop()
+        sessions = []
+        with self._lock:
+            for key, (session_loop, session) in list(self._async_sessions.items()):
+                if session_loop is loop:
+                    del self._async_sessions[key]
+                    sessions.append(session)
+
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+
+    def close(self):
+        """关闭所有会话（应用退出时调用）"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            async_sessions = list(self._async_sessions.values())
+            self._sessions.clear()
+            self._async_sessions.clear()
+
+        for session in sessions:
+            session.close()
+
+        # aiohttp会话只能在所属事件循环中关闭
+        for loop, session in async_sessions:
+            if session.closed or loop.is_closed():
+                continue
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+            else:
+                try:
+                    loop.run_until_complete(session.close())
+                except RuntimeError as e:
+                    logger.debug(f"无法关闭aiohttp会话: {e}")
+
+        logger.info("HTTP会话池已关闭")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取会话池统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'sessions': len(self._sessions),
+                'async_sessions': len(self._async_sessions),
+            })
+            return stats
+
+
+# 全局会话池
+_global_session_pool: Optional[HTTPSessionPool] = None
+_global_pool_lock = threading.Lock()
+
+
+def get_http_session_pool() -> HTTPSessionPool:
+    """获取全局HTTP会话池"""
+    global _global_session_pool
+    with _global_pool_lock:
+        if _global_session_pool is None:
+            _global_session_pool = HTTPSessionPool()
+        return _global_session_pool
+
+
+def shutdown_http_session_pool():
+    """关闭全局HTTP会话池"""
+    global _global_session_pool
+    with _global_pool_lock:
+        pool, _global_session_pool = _global_session_pool, None
+    if pool is not None:
+        pool.close()
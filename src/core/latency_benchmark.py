@@ -0,0 +1,298 @@
+"""
+延迟基准测试
+基于本地模拟服务测量补全链路（首token延迟、总延迟、生成速度）和
+RAG索引链路（每个文档的索引耗时、吞吐量），输出p50/p99，
+用于离线发现性能回归
+
+命令行用法（在src目录下）：
+    python -m core.latency_benchmark --requests 50 --concurrency 4 --ttft-ms 150
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional, Sequence
+
+from .ai_client import AIConfig, AIProvider, AsyncAIClient
+from .async_loop_thread import get_ai_event_loop
+from .mock_llm_server import MockLLMServer, MockServerProfile
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """线性插值计算百分位数（pct取0~100）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+@dataclass
+class LatencySummary:
+    """一组延迟样本的统计（毫秒）"""
+    count: int = 0
+    p50: float = 0.0
+    p99: float = 0.0
+    mean: float = 0.0
+    max: float = 0.0
+
+    @classmethod
+    def from_samples(cls, samples: Sequence[float]) -> 'LatencySummary':
+        if not samples:
+            return cls()
+        return cls(
+            count=len(samples),
+            p50=percentile(samples, 50),
+            p99=percentile(samples, 99),
+            mean=sum(samples) / len(samples),
+            max=max(samples),
+        )
+
+
+@dataclass
+class BenchmarkReport:
+    """单项基准测试结果"""
+    name: str
+    requests: int = 0
+    errors: int = 0
+    wall_time: float = 0.0                     # 总耗时（秒）
+    latency: LatencySummary = field(default_factory=LatencySummary)
+    ttft: Optional[LatencySummary] = None      # 仅流式补全
+    throughput: float = 0.0                    # 成功请求数/秒
+    units_per_second: float = 0.0              # 补全为token/秒，索引为文本块/秒
+    unit: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def format(self) -> str:
+        lines = [f"[{self.name}] 请求 {self.requests}，失败 {self.errors}，耗时 {self.wall_time:.2f}s"]
+        if self.ttft is not None:
+            lines.append(f"  首token延迟  p50 {self.ttft.p50:8.1f}ms  p99 {self.ttft.p99:8.1f}ms")
+        lines.append(f"  总延迟      p50 {self.latency.p50:8.1f}ms  p99 {self.latency.p99:8.1f}ms")
+        throughput = f"  吞吐量      {self.throughput:.2f} 请求/s"
+        if self.unit:
+            throughput += f"，{self.units_per_second:.1f} {self.unit}/s"
+        lines.append(throughput)
+        return "\n".join(lines)
+
+
+def _run_async(coro, timeout: Optional[float] = None):
+    """在常驻事件循环线程中执行协程（与界面发起请求的方式一致）"""
+    return get_ai_event_loop().submit(coro).result(timeout)
+
+
+def benchmark_completion(config: AIConfig, prompts: Sequence[str], concurrency: int = 4,
+                         stream: bool = True, system_prompt: Optional[str] = None,
+                         max_tokens: int = 64) -> BenchmarkReport:
+    """
+    测量补全链路延迟
+
+    Args:
+        config: 指向被测服务的AI配置
+        prompts: 依次发送的提示词
+        concurrency: 同时进行的请求数
+        stream: 使用流式接口（可测首token延迟）或非流式接口
+    """
+    ttft_samples: List[float] = []
+    latency_samples: List[float] = []
+    token_count = 0
+    errors = 0
+
+    async def one_request(client: AsyncAIClient, prompt: str):
+        nonlocal token_count, errors
+        start = time.perf_counter()
+        try:
+            if stream:
+                first = None
+                async for chunk in client.complete_stream(prompt, system_prompt, max_tokens=max_tokens):
+                    if first is None:
+                        first = time.perf_counter()
+                    token_count += 1
+                if first is None:
+                    raise RuntimeError("流式响应没有内容")
+                ttft_samples.append((first - start) * 1000)
+            else:
+                content = await client.complete_async(prompt, system_prompt, max_tokens=max_tokens,
+                                                      cache_system_prompt=True)
+                if not content:
+                    raise RuntimeError("响应没有内容")
+                token_count += 1
+            latency_samples.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            errors += 1
+            logger.debug(f"基准请求失败: {e}")
+
+    async def run_all():
+        client = AsyncAIClient(config)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def limited(prompt):
+            async with semaphore:
+                await one_request(client, prompt)
+
+        await asyncio.gather(*(limited(prompt) for prompt in prompts))
+
+    started = time.perf_counter()
+    _run_async(run_all())
+    wall_time = time.perf_counter() - started
+
+    succeeded = len(latency_samples)
+    return BenchmarkReport(
+        name="completion-stream" if stream else "completion",
+        requests=len(prompts),
+        errors=errors,
+        wall_time=wall_time,
+        latency=LatencySummary.from_samples(latency_samples),
+        ttft=LatencySummary.from_samples(ttft_samples) if stream else None,
+        throughput=succeeded / wall_time if wall_time else 0.0,
+        units_per_second=token_count / wall_time if wall_time and stream else 0.0,
+        unit="增量" if stream else "",
+    )
+
+
+def benchmark_indexing(rag_config: Dict[str, Any], documents: Dict[str, str],
+                       concurrency: int = 1, db_path: Optional[str] = None) -> BenchmarkReport:
+    """
+    测量RAG索引链路（分块、嵌入、写入向量库）的延迟
+
+    Args:
+        rag_config: RAGService配置，base_url指向被测服务
+        documents: 文档ID -> 内容
+        concurrency: 同时索引的文档数
+        db_path: 向量库路径，默认使用临时文件
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from .rag_service import RAGService
+    from .sqlite_vector_store import SQLiteVectorStore
+
+    temp_dir = None
+    if db_path is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(temp_dir.name, "benchmark_vectors.db")
+
+    service = RAGService(rag_config)
+    service.set_vector_store(SQLiteVectorStore(db_path))
+
+    latency_samples: List[float] = []
+    chunk_count = 0
+    errors = 0
+    lock = threading.Lock()
+
+    def index_one(item):
+        nonlocal chunk_count, errors
+        document_id, content = item
+        start = time.perf_counter()
+        ok = service.index_document(document_id, content)
+        elapsed = (time.perf_counter() - start) * 1000
+        chunks = len(service.chunk_text(content, document_id)) if ok else 0
+        with lock:
+            if ok:
+                latency_samples.append(elapsed)
+                chunk_count += chunks
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            list(executor.map(index_one, documents.items()))
+    finally:
+        wall_time = time.perf_counter() - started
+        service.close()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    return BenchmarkReport(
+        name="rag-indexing",
+        requests=len(documents),
+        errors=errors,
+        wall_time=wall_time,
+        latency=LatencySummary.from_samples(latency_samples),
+        throughput=len(latency_samples) / wall_time if wall_time else 0.0,
+        units_per_second=chunk_count / wall_time if wall_time else 0.0,
+        unit="块",
+    )
+
+
+def _sample_prompts(count: int) -> List[str]:
+    base = "林远推开客栈的门，屋里很暗，只有一盏油灯。"
+    return [f"{base}（第{i + 1}段）请续写接下来的情节。" for i in range(count)]
+
+
+def _sample_documents(count: int, length: int = 1200) -> Dict[str, str]:
+    sentence = "山风吹过竹林，林远在石阶上停下脚步，远处传来钟声。"
+    return {f"bench_doc_{i}": (f"第{i + 1}章\n" + sentence * (length // len(sentence) + 1))[:length]
+            for i in range(count)}
+
+
+def run_benchmarks(profile: Optional[MockServerProfile] = None, requests: int = 20,
+                   concurrency: int = 4, documents: int = 5) -> List[BenchmarkReport]:
+    """启动模拟服务并依次运行补全（流式、非流式）和索引基准测试"""
+    with MockLLMServer(profile) as server:
+        # OpenAI兼容接口，本地服务不需要API密钥
+        config = AIConfig(provider=AIProvider.OLLAMA, model="mock-model",
+                          endpoint_url=server.base_url, timeout=60)
+        system_prompt = "你是一位小说写作助手，请根据上下文续写。"
+        prompts = _sample_prompts(requests)
+        reports = [
+            benchmark_completion(config, prompts, concurrency, stream=True, system_prompt=system_prompt),
+            benchmark_completion(config, prompts, concurrency, stream=False, system_prompt=system_prompt),
+        ]
+        if documents:
+            rag_config = {
+                'base_url': server.api_base_url,
+                'api_key': 'mock-key',
+                'provider': 'mock',
+                'network': {'max_retries': 1},
+            }
+            reports.append(benchmark_indexing(rag_config, _sample_documents(documents)))
+        logger.info(f"模拟服务统计: {server.get_stats()['requests']}")
+    return reports
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="补全与RAG索引链路的离线延迟基准测试")
+    parser.add_argument('--requests', type=int, default=20, help="补全请求数")
+    parser.add_argument('--concurrency', type=int, default=4, help="补全并发数")
+    parser.add_argument('--documents', type=int, default=5, help="索引文档数（0表示跳过）")
+    parser.add_argument('--ttft-ms', type=float, default=200.0, help="模拟首token延迟")
+    parser.add_argument('--tokens-per-second', type=float, default=50.0, help="模拟生成速度")
+    parser.add_argument('--embedding-ms', type=float, default=30.0, help="模拟嵌入接口延迟")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="注入服务器错误的概率")
+    parser.add_argument('--seed', type=int, default=None, help="随机种子")
+    parser.add_argument('--json', action='store_true', help="以JSON输出结果")
+    args = parser.parse_args(argv)
+
+    profile = MockServerProfile(
+        ttft_ms=args.ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        embedding_latency_ms=args.embedding_ms,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    reports = run_benchmarks(profile, args.requests, args.concurrency, args.documents)
+
+    if args.json:
+        print(json.dumps([report.to_dict() for report in reports], ensure_ascii=False, indent=2))
+    else:
+        for report in reports:
+            print(report.format())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
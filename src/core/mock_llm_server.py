@@ -0,0 +1,388 @@
+"""
+本地模拟LLM与嵌入服务
+实现AIClient和RAGService调用的OpenAI兼容接口（chat/completions流式与非流式、
+embeddings、rerank、health），可配置首token延迟、生成速度、接口延迟和故障注入，
+用于离线测量补全与索引链路的端到端延迟
+"""
+
+import json
+import math
+import time
+import random
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional
+
+from .tokenizer import HeuristicTokenizer
+
+logger = logging.getLogger(__name__)
+
+
+# 生成内容使用的文本素材，按token切片后循环输出
+_RESPONSE_CORPUS = (
+    "夜色渐深，山道上只剩下零星的灯火。林远握紧手中的长剑，"
+    "回头望了一眼身后的客栈，心中隐隐有些不安。风从林间穿过，"
+    "带来远处溪水的声音，他深吸一口气，继续向山顶走去。"
+)
+
+
+@dataclass
+class MockServerProfile:
+    """模拟服务的性能与故障配置"""
+    ttft_ms: float = 200.0              # 补全首token延迟
+    tokens_per_second: float = 50.0     # 流式生成速度
+    response_tokens: int = 40           # 每次补全生成的token数（受请求的max_tokens限制）
+    chars_per_token: int = 2            # 每个token对应的字符数
+    embedding_latency_ms: float = 30.0  # 每次嵌入请求的基础延迟
+    embedding_latency_per_input_ms: float = 2.0  # 每条输入额外增加的延迟
+    rerank_latency_ms: float = 50.0     # 重排序请求延迟
+    embedding_dim: int = 1024           # 嵌入向量维度
+    jitter: float = 0.0                 # 延迟随机抖动比例（0.1表示±10%）
+    failure_rate: float = 0.0           # 返回服务器错误的概率
+    failure_status: int = 500           # 注入故障的状态码
+    rate_limit_rate: float = 0.0        # 返回429的概率
+    retry_after: int = 1                # 429响应的Retry-After秒数
+    prefix_cache: bool = True           # 模拟服务端前缀缓存（相同系统提示词计为缓存token）
+    seed: Optional[int] = None          # 随机种子，固定后故障注入可复现
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """请求处理器，行为由所属的MockLLMServer决定"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "MockLLM/1.0"
+
+    @property
+    def mock(self) -> 'MockLLMServer':
+        return self.server.mock
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path in ('/health', '/v1/health'):
+            self._send_json(200, {'status': 'ok'})
+        elif path in ('/v1/models', '/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'mock-model', 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': {'message': f'未知路径: {self.path}'}})
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {'error': {'message': '请求体不是有效的JSON'}})
+            return
+
+        if path.endswith('/chat/completions'):
+            endpoint = 'chat'
+        elif path.endswith('/embeddings'):
+            endpoint = 'embeddings'
+        elif path.endswith('/rerank'):
+            endpoint = 'rerank'
+        else:
+            self._send_json(404, {'error': {'message': f'未知路径: {self.path}'}})
+            return
+
+        self.mock._record_request(endpoint)
+        try:
+            if self._inject_failure(endpoint):
+                return
+            if endpoint == 'chat':
+                self._handle_chat(request)
+            elif endpoint == 'embeddings':
+                self._handle_embeddings(request)
+            else:
+                self._handle_rerank(request)
+        finally:
+            self.mock._record_done()
+
+    def _inject_failure(self, endpoint: str) -> bool:
+        """按配置的概率返回429或服务器错误"""
+        profile = self.mock.profile
+        roll = self.mock._random()
+        if roll < profile.rate_limit_rate:
+            self.mock._record_failure(endpoint, 429)
+            self._send_json(429, {'error': {'message': 'rate limited (injected)'}},
+                            headers={'Retry-After': str(profile.retry_after)})
+            return True
+        if roll < profile.rate_limit_rate + profile.failure_rate:
+            self.mock._record_failure(endpoint, profile.failure_status)
+            self._send_json(profile.failure_status, {'error': {'message': 'server error (injected)'}})
+            return True
+        return False
+
+    def _handle_chat(self, request: Dict[str, Any]):
+        profile = self.mock.profile
+        max_tokens = request.get('max_tokens') or profile.response_tokens
+        pieces = self.mock.generate_pieces(min(profile.response_tokens, max_tokens))
+        usage = self.mock.build_usage(request.get('messages', []), len(pieces))
+        model = request.get('model', 'mock-model')
+
+        self.mock._sleep(profile.ttft_ms)
+        interval = 1.0 / profile.tokens_per_second if profile.tokens_per_second > 0 else 0.0
+
+        if not request.get('stream'):
+            # 非流式：等待完整生成时间后一次返回
+            if len(pieces) > 1:
+                time.sleep(interval * (len(pieces) - 1))
+            self._send_json(200, {
+                'id': f'chatcmpl-mock-{self.mock._next_id()}',
+                'object': 'chat.completion',
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': ''.join(pieces)},
+                    'finish_reason': 'stop' if len(pieces) < max_tokens else 'length',
+                }],
+                'usage': usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        completion_id = f'chatcmpl-mock-{self.mock._next_id()}'
+        try:
+            for index, piece in enumerate(pieces):
+                if index:
+                    time.sleep(interval)
+                self._write_event({
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}],
+                })
+            self._write_event({
+                'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+            self._write_chunk(b'data: [DONE]\n\n')
+            self._write_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端取消了流式请求
+            self.mock._record_failure('chat', 499)
+            self.close_connection = True
+
+    def _handle_embeddings(self, request: Dict[str, Any]):
+        profile = self.mock.profile
+        inputs = request.get('input', [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        self.mock._sleep(profile.embedding_latency_ms + profile.embedding_latency_per_input_ms * len(inputs))
+        tokenizer = self.mock.tokenizer
+        self._send_json(200, {
+            'object': 'list',
+            'model': request.get('model', 'mock-embedding'),
+            'data': [
+                {'object': 'embedding', 'index': i, 'embedding': self.mock.embed(text)}
+                for i, text in enumerate(inputs)
+            ],
+            'usage': {'prompt_tokens': sum(tokenizer.count(text) for text in inputs),
+                      'total_tokens': sum(tokenizer.count(text) for text in inputs)},
+        })
+
+    def _handle_rerank(self, request: Dict[str, Any]):
+        query = request.get('query', '')
+        documents = [doc if isinstance(doc, str) else doc.get('text', '')
+                     for doc in request.get('documents', [])]
+        top_n = request.get('top_n') or len(documents)
+
+        self.mock._sleep(self.mock.profile.rerank_latency_ms)
+        scored = sorted(((i, self.mock.relevance(query, doc)) for i, doc in enumerate(documents)),
+                        key=lambda item: -item[1])[:top_n]
+        self._send_json(200, {
+            'id': f'rerank-mock-{self.mock._next_id()}',
+            'results': [{'index': i, 'relevance_score': score} for i, score in scored],
+        })
+
+    def _write_event(self, payload: Dict[str, Any]):
+        self._write_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+    def _write_chunk(self, data: bytes):
+        """按chunked编码写出一个数据块（空数据块表示结束）"""
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        logger.debug("mock server: " + format % args)
+
+
+class MockLLMServer:
+    """
+    本地模拟服务
+
+    用法：
+        with MockLLMServer(MockServerProfile(ttft_ms=100)) as server:
+            config = AIConfig(provider=AIProvider.OPENAI, model="mock", endpoint_url=server.base_url)
+            rag = RAGService({'base_url': server.api_base_url, 'api_key': 'mock'})
+    """
+
+    def __init__(self, profile: Optional[MockServerProfile] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.profile = profile or MockServerProfile()
+        self.tokenizer = HeuristicTokenizer()
+        self._host = host
+        self._port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.profile.seed)
+        self._request_id = 0
+        self._seen_prefixes = set()
+        self._stats = {'requests': {}, 'failures': {}}
+        self._in_flight = 0
+        self._max_in_flight = 0
+
+    @property
+    def base_url(self) -> str:
+        """服务根地址（用作AIConfig.endpoint_url）"""
+        host, port = self._server.server_address[:2] if self._server else (self._host, self._port)
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base_url(self) -> str:
+        """带 /v1 的接口地址（用作RAGService的base_url）"""
+        return f"{self.base_url}/v1"
+
+    def start(self) -> 'MockLLMServer':
+        if self._server is not None:
+            return self
+        self._server = ThreadingHTTPServer((self._host, self._port), _MockHandler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="mock-llm-server", daemon=True)
+        self._thread.start()
+        logger.info(f"模拟LLM服务已启动: {self.base_url}")
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=2.0)
+        self._server = None
+        self._thread = None
+        logger.info("模拟LLM服务已停止")
+
+    def __enter__(self) -> 'MockLLMServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def generate_pieces(self, count: int) -> List[str]:
+        """生成count个token的增量文本"""
+        size = max(1, self.profile.chars_per_token)
+        pieces = []
+        offset = 0
+        for _ in range(max(0, count)):
+            piece = (_RESPONSE_CORPUS * 2)[offset:offset + size]
+            pieces.append(piece)
+            offset = (offset + size) % len(_RESPONSE_CORPUS)
+        return pieces
+
+    def build_usage(self, messages: List[Dict[str, Any]], completion_tokens: int) -> Dict[str, Any]:
+        """按OpenAI格式构造用量，模拟前缀缓存：出现过的系统提示词计为缓存token"""
+        prompt_tokens = 0
+        cached_tokens = 0
+        for message in messages:
+            content = message.get('content', '')
+            if not isinstance(content, str):
+                content = json.dumps(content, ensure_ascii=False)
+            tokens = self.tokenizer.count(content)
+            prompt_tokens += tokens
+            if self.profile.prefix_cache and message.get('role') == 'system':
+                key = hashlib.sha1(content.encode('utf-8')).hexdigest()
+                with self._lock:
+                    if key in self._seen_prefixes:
+                        cached_tokens += tokens
+                    else:
+                        self._seen_prefixes.add(key)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'prompt_tokens_details': {'cached_tokens': cached_tokens},
+        }
+
+    def embed(self, text: str) -> List[float]:
+        """根据文本哈希生成确定的单位向量（相同文本得到相同向量）"""
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big')
+        rng = random.Random(seed)
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.profile.embedding_dim)]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    @staticmethod
+    def relevance(query: str, document: str) -> float:
+        """按字符重合度给出0~1的相关性分数"""
+        query_chars = set(query)
+        if not query_chars or not document:
+            return 0.0
+        return round(len(query_chars & set(document)) / len(query_chars), 4)
+
+    def _sleep(self, milliseconds: float):
+        jitter = self.profile.jitter
+        if jitter > 0:
+            milliseconds *= 1.0 + self._random(-jitter, jitter)
+        if milliseconds > 0:
+            time.sleep(milliseconds / 1000.0)
+
+    def _random(self, low: float = 0.0, high: float = 1.0) -> float:
+        with self._lock:
+            return self._rng.uniform(low, high)
+
+    def _next_id(self) -> int:
+        with self._lock:
+            self._request_id += 1
+            return self._request_id
+
+    def _record_request(self, endpoint: str):
+        with self._lock:
+            requests = self._stats['requests']
+            requests[endpoint] = requests.get(endpoint, 0) + 1
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+    def _record_done(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _record_failure(self, endpoint: str, status: int):
+        with self._lock:
+            failures = self._stats['failures']
+            key = f"{endpoint}:{status}"
+            failures[key] = failures.get(key, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各接口的请求数、注入的故障数和观察到的最大并发"""
+        with self._lock:
+            return {
+                'requests': dict(self._stats['requests']),
+                'failures': dict(self._stats['failures']),
+                'max_in_flight': self._max_in_flight,
+                'profile': asdict(self.profile),
+            }
@@ -5,6 +5,7 @@
 
 import re
 import logging
+from bisect import bisect_left
 from typing import List, Dict, Set, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
@@ -24,6 +25,75 @@ class EntityConfidence(Enum):
     VERY_LOW = "very_low"  # 极低置信度 (0.0-0.4)
 
 
+# 否定语境模式的标准形式: "否定词.{0,N}"
+_NEGATIVE_PATTERN_SHAPE = re.compile(r'^(?P<cue>[^.\\()|\[\]{}*+?^$]+)\.\{0,(?P<gap>\d+)\}$')
+
+
+class _FilterIndex:
+    """
+    单段文本的过滤索引
+    
+    对整段文本只运行一次否定词/转折词自动机，记录所有出现位置，
+    之后每个候选匹配通过二分查找按位置判断所处语境。
+    """
+    
+    def __init__(self, text: str, cue_regex: Optional[re.Pattern], cue_gaps: Dict[str, int],
+                 transition_regex: re.Pattern):
+        self.text = text
+        
+        # 否定词出现位置（按起始位置排序）
+        self.cue_starts: List[int] = []
+        self.cue_ends: List[int] = []
+        self.cue_max_gaps: List[int] = []
+        if cue_regex is not None:
+            # 使用前瞻匹配以找到所有（可能重叠的）否定词
+            for match in cue_regex.finditer(text):
+                cue = match.group(1)
+                self.cue_starts.append(match.start())
+                self.cue_ends.append(match.start() + len(cue))
+                self.cue_max_gaps.append(cue_gaps[cue])
+        
+        # 转折词出现位置
+        self.transition_starts: List[int] = []
+        self.transition_ends: List[int] = []
+        for match in transition_regex.finditer(text):
+            word = match.group(1)
+            self.transition_starts.append(match.start())
+            self.transition_ends.append(match.start() + len(word))
+        
+        # 换行位置（否定模式中的"."不匹配换行）
+        self.newlines: List[int] = [i for i, ch in enumerate(text) if ch == '\n']
+    
+    def has_transition_within(self, start: int, end: int) -> bool:
+        """[start, end) 区间内是否完整包含转折词"""
+        i = bisect_left(self.transition_starts, start)
+        while i < len(self.transition_starts) and self.transition_starts[i] < end:
+            if self.transition_ends[i] <= end:
+                return True
+            i += 1
+        return False
+    
+    def has_negative_cue_before(self, context_start: int, match_start: int, matched_text: str) -> bool:
+        """
+        上下文窗口 [context_start, match_end) 内是否存在"否定词 + 不超过N个非换行字符 + 匹配文本"
+        
+        与逐个模式拼接 re.search 的结果一致：窗口内同名的更早出现同样计入。
+        """
+        match_end = match_start + len(matched_text)
+        i = bisect_left(self.cue_starts, context_start)
+        while i < len(self.cue_starts) and self.cue_starts[i] < match_start:
+            cue_end = self.cue_ends[i]
+            # 间隔中不能包含换行
+            j = bisect_left(self.newlines, cue_end)
+            next_newline = self.newlines[j] if j < len(self.newlines) else len(self.text)
+            last_pos = min(cue_end + self.cue_max_gaps[i], next_newline, match_end - len(matched_text))
+            for pos in range(cue_end, last_pos + 1):
+                if self.text.startswith(matched_text, pos):
+                    return True
+            i += 1
+        return False
+
+
 @dataclass
 class OptimizedDetectedReference(DetectedReference):
     """优化的检测引用，包含置信度等级和过滤原因"""
@@ -100,9 +170,14 @@ class OptimizedEntityDetector(ReferenceDetector):
             EntityConfidence.VERY_LOW: 0.0
         }
         
+        # 转折词（出现时说明为肯定语境）
+        self.transition_words = ['而是', '但是', '不过', '然而', '可是']
+        
         # 最低接受置信度
         self.min_confidence_threshold = 0.6
         
+        self._compile_filters()
+        
         logger.info("OptimizedEntityDetector initialized with enhanced filtering")
     
     def detect_references(self, text: str, document_id: str = None) -> List[DetectedReference]:
@@ -122,10 +197,11 @@ class OptimizedEntityDetector(ReferenceDetector):
         # 1. 基础检测
         raw_references = self._detect_raw_references(text)
         
-        # 2. 应用过滤器
+        # 2. 应用过滤器（整段文本只建立一次过滤索引）
+        filter_index = self._build_filter_index(text)
         filtered_references = []
         for ref in raw_references:
-            optimized_ref = self._apply_filters_and_scoring(ref, text)
+            optimized_ref = self._apply_filters_and_scoring(ref, text, filter_index)
             if optimized_ref and optimized_ref.confidence >= self.min_confidence_threshold:
                 filtered_references.append(optimized_ref)
         
@@ -195,13 +271,56 @@ class OptimizedEntityDetector(ReferenceDetector):
         
         return references
     
-    def _apply_filters_and_scoring(self, ref: DetectedReference, full_text: str) -> Optional[OptimizedDetectedReference]:
+    def _compile_filters(self):
+        """
+        预编译过滤模式
+        
+        时间/数量表达式合并为单个交替模式；否定语境模式拆分为否定词和允许间隔，
+        合并为一个可在整段文本上运行一次的自动机。修改模式列表后需重新调用。
+        """
+        self._time_expression_regex = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in self.time_expression_patterns)
+        ) if self.time_expression_patterns else None
+        self._quantity_regex = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in self.quantity_patterns)
+        ) if self.quantity_patterns else None
+        
+        self._negative_cue_gaps: Dict[str, int] = {}
+        self._irregular_negative_patterns: List[str] = []
+        for pattern in self.negative_context_patterns:
+            shape = _NEGATIVE_PATTERN_SHAPE.match(pattern)
+            if shape:
+                cue = shape.group('cue')
+                gap = int(shape.group('gap'))
+                self._negative_cue_gaps[cue] = max(gap, self._negative_cue_gaps.get(cue, 0))
+            else:
+                self._irregular_negative_patterns.append(pattern)
+        
+        # 长词优先，保证前瞻分组捕获完整的否定词
+        cues = sorted(self._negative_cue_gaps, key=len, reverse=True)
+        self._negative_cue_regex = re.compile(
+            '(?=(' + '|'.join(re.escape(cue) for cue in cues) + '))'
+        ) if cues else None
+        
+        words = sorted(self.transition_words, key=len, reverse=True)
+        self._transition_regex = re.compile(
+            '(?=(' + '|'.join(re.escape(word) for word in words) + '))'
+        ) if words else re.compile(r'(?!)()')
+    
+    def _build_filter_index(self, text: str) -> _FilterIndex:
+        """为一段文本建立过滤索引"""
+        return _FilterIndex(text, self._negative_cue_regex, self._negative_cue_gaps,
+                            self._transition_regex)
+    
+    def _apply_filters_and_scoring(self, ref: DetectedReference, full_text: str,
+                                   filter_index: Optional[_FilterIndex] = None) -> Optional[OptimizedDetectedReference]:
         """
         应用过滤器和置信度评分
         
         Args:
             ref: 原始检测引用
             full_text: 完整文本
+            filter_index: 预先建立的过滤索引（可选）
             
         Returns:
             优化后的引用或None（如果被过滤）
@@ -228,7 +347,7 @@ class OptimizedEntityDetector(ReferenceDetector):
             return None
         
         # 过滤器4: 否定语境过滤
-        if self._is_in_negative_context(full_text, ref.start_position, matched_text):
+        if self._is_in_negative_context(full_text, ref.start_position, matched_text, filter_index):
             filter_reasons.append("否定语境")
             logger.debug(f"Filtered negative context: {matched_text}")
             return None
@@ -254,54 +373,47 @@ class OptimizedEntityDetector(ReferenceDetector):
     
     def _is_time_expression(self, text: str) -> bool:
         """检测是否为时间表达式"""
-        for pattern in self.time_expression_patterns:
-            if re.fullmatch(pattern, text):
-                return True
-        return False
+        return bool(self._time_expression_regex and self._time_expression_regex.fullmatch(text))
     
     def _is_quantity_expression(self, text: str) -> bool:
         """检测是否为数量表达式"""
-        for pattern in self.quantity_patterns:
-            if re.fullmatch(pattern, text):
-                return True
-        return False
+        return bool(self._quantity_regex and self._quantity_regex.fullmatch(text))
     
-    def _is_in_negative_context(self, text: str, start_pos: int, matched_text: str) -> bool:
+    def _is_in_negative_context(self, text: str, start_pos: int, matched_text: str,
+                                filter_index: Optional[_FilterIndex] = None) -> bool:
         """检测是否在否定语境中"""
+        if filter_index is None or filter_index.text is not text:
+            filter_index = self._build_filter_index(text)
+        
+        end_pos = start_pos + len(matched_text)
+        
         # 检查前面20个字符的上下文
         context_start = max(0, start_pos - 20)
-        context_before = text[context_start:start_pos]
         
         # 检查后面10个字符的上下文，用于识别转折
-        context_end = min(len(text), start_pos + len(matched_text) + 10)
-        context_after = text[start_pos + len(matched_text):context_end]
-        
-        # 检查是否有转折词，如"而是"、"但是"等
-        transition_words = ['而是', '但是', '不过', '然而', '可是']
-        has_transition_before = any(word in context_before for word in transition_words)
+        context_end = min(len(text), end_pos + 10)
         
         # 如果前面有转折词，说明这是肯定语境
-        if has_transition_before:
+        if filter_index.has_transition_within(context_start, start_pos):
             return False
         
         # 检查直接的否定模式
-        for pattern in self.negative_context_patterns:
-            # 构建完整的否定模式
-            full_pattern = pattern + re.escape(matched_text)
-            if re.search(full_pattern, context_before + matched_text):
-                # 进一步检查是否有转折，如"不是张三，而是李四"
-                full_context = context_before + matched_text + context_after
-                if any(word in full_context for word in transition_words):
-                    # 如果转折词在匹配文本之后，说明这个实体是被否定的
-                    transition_after_match = any(word in context_after for word in transition_words)
-                    if transition_after_match:
-                        return True
-                    else:
-                        return False
-                else:
-                    return True
+        negated = filter_index.has_negative_cue_before(context_start, start_pos, matched_text)
+        if not negated and self._irregular_negative_patterns:
+            context_before = text[context_start:start_pos]
+            negated = any(
+                re.search(pattern + re.escape(matched_text), context_before + matched_text)
+                for pattern in self._irregular_negative_patterns
+            )
         
-        return False
+        if not negated:
+            return False
+        
+        # 进一步检查是否有转折，如"不是张三，而是李四"
+        if filter_index.has_transition_within(context_start, context_end):
+            # 如果转折词在匹配文本之后，说明这个实体是被否定的
+            return filter_index.has_transition_within(end_pos, context_end)
+        return True
     
     def _calculate_optimized_confidence(self, ref: DetectedReference, full_text: str) -> float:
         """
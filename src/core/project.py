@@ -17,6 +17,8 @@ from enum import Enum
 from .database_manager import DatabaseManager
 from .config import Config
 from .shared import Shared
+from .chinese_segmentation import get_segmenter
+from .search_index import get_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -167,6 +169,8 @@ class ProjectManager:
             # 概念系统已移除
 
             if self.save_project():
+                get_segmenter().attach_project_cache(str(project_path))
+                get_search_index().attach(str(project_path))
                 self._shared.current_project_path = str(project_path)
                 _add_to_recent_projects(str(project_path), self._config)
                 
@@ -204,6 +208,10 @@ class ProjectManager:
 
             self._current_project = self._dict_to_project(data['metadata'], data.get('documents', []))
 
+            # 加载项目级分词缓存和全文搜索索引（索引在首次搜索时与文档内容同步）
+            get_segmenter().attach_project_cache(str(project_path))
+            get_search_index().attach(str(project_path))
+
             self._shared.current_project_path = str(project_path)
             _add_to_recent_projects(str(project_path), self._config)
             
@@ -256,6 +264,8 @@ class ProjectManager:
         finally:
             if self._db_manager:
                 self._db_manager.close()
+            get_segmenter().detach_project_cache()
+            get_search_index().detach()
             self._current_project = None
             self._project_path = None
             self._db_manager = None
@@ -310,6 +320,7 @@ class ProjectManager:
                 del self._current_project.documents[id_to_remove]
         
         logger.info(f"Removed document {doc_id} and its children.")
+        get_search_index().remove_documents(docs_to_remove)
         
         # 删除RAG索引（如果启用）
         try:
@@ -354,6 +365,8 @@ class ProjectManager:
             if save:
                 try:
                     self.save_project()
+                    if 'content' in kwargs:
+                        get_search_index().update_document(doc_id, doc.content)
                     # 发出文档保存信号以触发自动索引
                     if 'content' in kwargs and self._shared:
                         self._shared.documentSaved.emit(doc_id, doc.content)
@@ -368,6 +381,54 @@ class ProjectManager:
             logger.info(f"Document updated: {doc.name}")
         return doc
 
+    def update_documents_content(self, contents: Dict[str, str]) -> List[str]:
+        """
+        批量更新多个文档的内容（项目级替换等）
+
+        所有文档在一个数据库事务中写入，失败时恢复内存中的内容并重新抛出异常；
+        成功后只为被修改的文档更新搜索索引，并发出一次 documentsSaved 信号。
+
+        Returns:
+            内容实际发生变化的文档ID
+        """
+        if not self._current_project or not self._db_manager:
+            return []
+
+        documents = self._current_project.documents
+        changed = [doc_id for doc_id, content in contents.items()
+                   if doc_id in documents and documents[doc_id].content != content]
+        if not changed:
+            return []
+
+        original_data = {doc_id: (documents[doc_id].content, documents[doc_id].word_count,
+                                  documents[doc_id].updated_at) for doc_id in changed}
+        now = datetime.now()
+        rows = []
+        for doc_id in changed:
+            doc = documents[doc_id]
+            doc.content = contents[doc_id]
+            doc.word_count = len(doc.content.split()) if doc.content else 0
+            doc.updated_at = now
+            rows.append({'id': doc_id, 'content': doc.content, 'word_count': doc.word_count,
+                         'updated_at': now.isoformat()})
+
+        try:
+            self._db_manager.update_documents_content(rows)
+        except Exception as e:
+            logger.error(f"Batch update failed. Rolling back memory state for {len(changed)} documents.")
+            for doc_id, (content, word_count, updated_at) in original_data.items():
+                doc = documents[doc_id]
+                doc.content, doc.word_count, doc.updated_at = content, word_count, updated_at
+            raise e
+
+        index = get_search_index()
+        for doc_id in changed:
+            index.update_document(doc_id, documents[doc_id].content)
+        if self._shared:
+            self._shared.documentsSaved.emit(changed)
+        logger.info(f"Batch updated content of {len(changed)} documents")
+        return changed
+
     def get_document(self, doc_id: str) -> Optional[ProjectDocument]:
         if self._current_project:
             return self._current_project.documents.get(doc_id)
@@ -9,6 +9,8 @@ from typing import Dict, Any, List, Optional, Callable, TYPE_CHECKING
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
+from .reference_cache import detect_references_cached
+
 if TYPE_CHECKING:
     from core.codex_manager import CodexManager
     from core.reference_detector import ReferenceDetector
@@ -72,9 +74,9 @@ class CodexDetectedFunction(CodexFunction):
         if not context.current_text:
             return ""
         
-        # 检测当前文本中的引用
-        references = self.reference_detector.detect_references(
-            context.current_text, context.document_id
+        # 检测当前文本中的引用（通过共享缓存）
+        references = detect_references_cached(
+            self.reference_detector, context.current_text, context.document_id
         )
         
         if not references:
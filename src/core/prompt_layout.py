@@ -0,0 +1,168 @@
+"""
+提示词分段布局与前缀缓存统计
+提示词按"稳定段 + 易变段"的顺序组装：系统说明、风格要求等不随光标变化的内容在前，
+光标附近文本、场景分析等每次都变的内容在后，使服务端的前缀缓存能够命中；
+同时记录各服务商返回的缓存token数
+"""
+
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PromptLayout:
+    """分段提示词：稳定段在前，易变段在后"""
+    stable: List[Tuple[str, str]] = field(default_factory=list)
+    volatile: List[Tuple[str, str]] = field(default_factory=list)
+    separator: str = "\n\n"
+
+    def add_stable(self, name: str, text: str) -> 'PromptLayout':
+        """追加稳定段（相同配置下每次请求都相同）"""
+        if text and text.strip():
+            self.stable.append((name, text.strip('\n')))
+        return self
+
+    def add_volatile(self, name: str, text: str) -> 'PromptLayout':
+        """追加易变段（随光标位置和文本变化）"""
+        if text and text.strip():
+            self.volatile.append((name, text.strip('\n')))
+        return self
+
+    @property
+    def stable_text(self) -> str:
+        return self.separator.join(text for _, text in self.stable)
+
+    @property
+    def volatile_text(self) -> str:
+        return self.separator.join(text for _, text in self.volatile)
+
+    @property
+    def prefix_key(self) -> str:
+        """稳定前缀的哈希，相同前缀的请求可以共享服务端缓存"""
+        return hashlib.sha1(self.stable_text.encode('utf-8')).hexdigest()[:16]
+
+    def to_prompt(self) -> str:
+        """合并为单个提示词（稳定段仍在最前）"""
+        return self.separator.join(part for part in (self.stable_text, self.volatile_text) if part)
+
+    def map_segments(self, func) -> 'PromptLayout':
+        """对每一段应用 func(name, text) -> text，返回新布局"""
+        layout = PromptLayout(separator=self.separator)
+        for name, text in self.stable:
+            layout.add_stable(name, func(name, text))
+        for name, text in self.volatile:
+            layout.add_volatile(name, func(name, text))
+        return layout
+
+
+def extract_cache_usage(provider: str, response_data: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    """
+    从响应中提取提示词token数和缓存命中token数
+
+    Args:
+        provider: 服务商标识（AIProvider的值）
+        response_data: 响应JSON
+
+    Returns:
+        {'prompt_tokens', 'cached_tokens', 'cache_write_tokens'}，响应中没有用量信息时返回None
+    """
+    if not isinstance(response_data, dict):
+        return None
+
+    if provider == 'gemini' or 'usageMetadata' in response_data:
+        usage = response_data.get('usageMetadata')
+        if not usage:
+            return None
+        return {
+            'prompt_tokens': usage.get('promptTokenCount', 0),
+            'cached_tokens': usage.get('cachedContentTokenCount', 0),
+            'cache_write_tokens': 0,
+        }
+
+    usage = response_data.get('usage')
+    if not usage:
+        # Ollama原生接口
+        if 'prompt_eval_count' in response_data:
+            return {'prompt_tokens': response_data.get('prompt_eval_count', 0),
+                    'cached_tokens': 0, 'cache_write_tokens': 0}
+        return None
+
+    if 'input_tokens' in usage:
+        # Claude：input_tokens不包含缓存读写的部分
+        cached = usage.get('cache_read_input_tokens', 0) or 0
+        written = usage.get('cache_creation_input_tokens', 0) or 0
+        return {
+            'prompt_tokens': (usage.get('input_tokens', 0) or 0) + cached + written,
+            'cached_tokens': cached,
+            'cache_write_tokens': written,
+        }
+
+    # OpenAI兼容格式
+    details = usage.get('prompt_tokens_details') or {}
+    return {
+        'prompt_tokens': usage.get('prompt_tokens', 0) or 0,
+        'cached_tokens': details.get('cached_tokens', 0) or 0,
+        'cache_write_tokens': 0,
+    }
+
+
+class PromptCacheStats:
+    """按服务商统计前缀缓存命中情况"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def record(self, provider: str, response_data: Dict[str, Any]) -> Optional[Dict[str, int]]:
+        """记录一次响应的用量"""
+        usage = extract_cache_usage(provider, response_data)
+        if usage is None:
+            return None
+
+        with self._lock:
+            stats = self._stats.setdefault(provider, {
+                'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0,
+                'cache_write_tokens': 0, 'cache_hit_requests': 0
+            })
+            stats['requests'] += 1
+            stats['prompt_tokens'] += usage['prompt_tokens']
+            stats['cached_tokens'] += usage['cached_tokens']
+            stats['cache_write_tokens'] += usage['cache_write_tokens']
+            if usage['cached_tokens']:
+                stats['cache_hit_requests'] += 1
+
+        if usage['cached_tokens']:
+            logger.debug(f"{provider} 前缀缓存命中: {usage['cached_tokens']}/{usage['prompt_tokens']} tokens")
+        return usage
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取各服务商的统计（含缓存token占比）"""
+        with self._lock:
+            result = {}
+            for provider, stats in self._stats.items():
+                item = dict(stats)
+                item['cached_ratio'] = (stats['cached_tokens'] / stats['prompt_tokens']
+                                        if stats['prompt_tokens'] else 0.0)
+                result[provider] = item
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# 全局统计实例
+_global_prompt_cache_stats: Optional[PromptCacheStats] = None
+
+
+def get_prompt_cache_stats() -> PromptCacheStats:
+    """获取全局前缀缓存统计"""
+    global _global_prompt_cache_stats
+    if _global_prompt_cache_stats is None:
+        _global_prompt_cache_stats = PromptCacheStats()
+    return _global_prompt_cache_stats
@@ -27,6 +27,10 @@ except ImportError:
 # 导入智能缓存
 # 缓存系统已移除
 
+from .concurrency_limiter import (
+    RequestPriority, request_slot, parse_retry_after, endpoint_key, get_limiter_registry
+)
+
 logger = logging.getLogger(__name__)
 
 # 延迟记录警告，确保logger已初始化
@@ -98,6 +102,12 @@ class RAGService:
         
         # 向量存储引用
         self._vector_store = None
+
+        # 嵌入接口的并发上限来自 network.max_concurrent（与其他模块共享同一个端点限流器）
+        max_concurrent = config.get('network', {}).get('max_concurrent')
+        if max_concurrent:
+            get_limiter_registry().configure(endpoint_key('embeddings', self.base_url),
+                                             max_limit=max_concurrent)
         
     def _get_secure_api_key(self, config: Dict[str, Any]) -> str:
         """从安全存储获取API密钥"""
@@ -265,7 +275,8 @@ class RAGService:
         
         return chunks
     
-    async def create_embedding_async(self, text: str, max_retries: int = None) -> Optional[List[float]]:
+    async def create_embedding_async(self, text: str, max_retries: int = None,
+                                     priority: RequestPriority = RequestPriority.NORMAL) -> Optional[List[float]]:
         """异步创建文本嵌入向量（带缓存、重试机制和降级策略）"""
         if max_retries is None:
             max_retries = self._max_retries
@@ -300,13 +311,15 @@ class RAGService:
             try:
                 timeout = aiohttp.ClientTimeout(total=30 + attempt * 10)  # 递增超时时间
                 
-                async with aiohttp.ClientSession() as session:
+                async with aiohttp.ClientSession() as session, \
+                        request_slot('embeddings', self.base_url, priority) as permit:
                     async with session.post(
                         f"{self.base_url}/embeddings",
                         headers=headers,
                         json=data,
                         timeout=timeout
                     ) as response:
+                        permit.set_status(response.status, parse_retry_after(response.headers))
                         if response.status == 200:
                             result = await response.json()
                             embedding = result['data'][0]['embedding']
@@ -373,7 +386,7 @@ class RAGService:
             try:
                 # 使用asyncio.wait_for来强制超时
                 future = asyncio.wait_for(
-                    self.create_embedding_async(text),
+                    self.create_embedding_async(text, priority=RequestPriority.INTERACTIVE),
                     timeout=timeout
                 )
                 return loop.run_until_complete(future)
@@ -391,9 +404,11 @@ class RAGService:
             except:
                 pass
     
-    async def create_embeddings_batch_async(self, texts: List[str]) -> List[Optional[List[float]]]:
-        """批量创建嵌入向量"""
-        tasks = [self.create_embedding_async(text) for text in texts]
+    async def create_embeddings_batch_async(self, texts: List[str],
+                                            priority: RequestPriority = RequestPriority.BACKGROUND
+                                            ) -> List[Optional[List[float]]]:
+        """批量创建嵌入向量（并发数由端点限流器控制，默认作为后台请求）"""
+        tasks = [self.create_embedding_async(text, priority=priority) for text in texts]
         return await asyncio.gather(*tasks)
     
     def create_embeddings_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
@@ -485,13 +500,15 @@ class RAGService:
             try:
                 timeout = aiohttp.ClientTimeout(total=30 + attempt * 10)  # 递增超时时间
                 
-                async with aiohttp.ClientSession() as session:
+                async with aiohttp.ClientSession() as session, \
+                        request_slot('rerank', self.base_url, RequestPriority.INTERACTIVE) as permit:
                     async with session.post(
                         f"{self.base_url}/rerank",
                         headers=headers,
                         json=data,
                         timeout=timeout
                     ) as response:
+                        permit.set_status(response.status, parse_retry_after(response.headers))
                         if response.status == 200:
                             result = await response.json()
                             # 返回 (索引, 分数) 对的列表
@@ -558,7 +575,7 @@ class RAGService:
                           min_similarity: float = 0.3) -> List[SearchResult]:  # 降低相似度阈值
         """异步搜索相关文本块"""
         # 获取查询向量
-        query_embedding = await self.create_embedding_async(query)
+        query_embedding = await self.create_embedding_async(query, priority=RequestPriority.INTERACTIVE)
         if not query_embedding:
             return []
         
@@ -0,0 +1,161 @@
+"""
+引用检测结果缓存
+按段落缓存引用检测结果，键为 (检测器类型, 段落sha1, Codex模式版本)，
+补全上下文构建、提示词函数、上下文注入和编辑器高亮共享同一份结果
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .reference_detector import ReferenceDetector, DetectedReference
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceDetectionCache:
+    """
+    段落级引用检测缓存
+
+    整篇文本的检测结果由各段落的缓存结果拼接而成，
+    只有新增或修改过的段落才会真正运行检测器。
+    """
+
+    def __init__(self, max_paragraphs: int = 4096):
+        self._max_paragraphs = max_paragraphs
+        # 段落缓存: key -> 以段落起点为原点的引用列表
+        self._paragraphs: "OrderedDict[Tuple[str, str, int], List[DetectedReference]]" = OrderedDict()
+        # 最近一次整篇结果，同一补全周期内的重复请求直接复用
+        self._last_document: Optional[Tuple[Tuple[str, str, int], List['DetectedReference']]] = None
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.document_hits = 0
+
+    @staticmethod
+    def _get_pattern_version(detector: 'ReferenceDetector') -> Optional[int]:
+        """获取检测器所用Codex的模式版本，无法获取时返回None（不缓存）"""
+        version = getattr(getattr(detector, 'codex_manager', None), 'pattern_version', None)
+        return version if isinstance(version, int) else None
+
+    def detect(self, detector: 'ReferenceDetector', text: str,
+               document_id: str = None) -> List['DetectedReference']:
+        """
+        使用缓存检测文本中的引用
+
+        Args:
+            detector: 引用检测器
+            text: 待检测的文本
+            document_id: 文档ID（可选）
+
+        Returns:
+            检测到的引用列表（位置相对于整篇文本）
+        """
+        if not text or not text.strip():
+            return []
+
+        version = self._get_pattern_version(detector)
+        if version is None:
+            return detector.detect_references(text, document_id)
+
+        detector_key = type(detector).__name__
+        document_key = (detector_key, self._hash(text), version)
+
+        with self._lock:
+            if self._last_document and self._last_document[0] == document_key:
+                self.document_hits += 1
+                return [replace(ref) for ref in self._last_document[1]]
+
+        references = []
+        offset = 0
+        for paragraph in text.splitlines(keepends=True):
+            # 不含换行符的段落作为缓存键，末段追加换行后仍能命中
+            line = paragraph.rstrip('\r\n')
+            if line.strip():
+                for ref in self._detect_paragraph(detector, detector_key, line, version, document_id):
+                    references.append(replace(
+                        ref,
+                        start_position=ref.start_position + offset,
+                        end_position=ref.end_position + offset
+                    ))
+            offset += len(paragraph)
+
+        # 上下文依赖整篇文本，拼接后统一提取
+        for ref in references:
+            ref.context_before, ref.context_after = detector._extract_context(
+                text, ref.start_position, ref.end_position
+            )
+
+        with self._lock:
+            self._last_document = (document_key, [replace(ref) for ref in references])
+
+        return references
+
+    def _detect_paragraph(self, detector: 'ReferenceDetector', detector_key: str,
+                          paragraph: str, version: int,
+                          document_id: str = None) -> List['DetectedReference']:
+        """检测单个段落（带缓存）"""
+        key = (detector_key, self._hash(paragraph), version)
+
+        with self._lock:
+            cached = self._paragraphs.get(key)
+            if cached is not None:
+                self._paragraphs.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        references = detector.detect_references(paragraph, document_id)
+
+        with self._lock:
+            self.misses += 1
+            self._paragraphs[key] = references
+            while len(self._paragraphs) > self._max_paragraphs:
+                self._paragraphs.popitem(last=False)
+
+        return references
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._paragraphs.clear()
+            self._last_document = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'paragraphs': len(self._paragraphs),
+                'max_paragraphs': self._max_paragraphs,
+                'hits': self.hits,
+                'misses': self.misses,
+                'document_hits': self.document_hits,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+# 全局缓存实例
+_global_reference_cache: Optional[ReferenceDetectionCache] = None
+
+
+def get_reference_cache() -> ReferenceDetectionCache:
+    """获取全局引用检测缓存"""
+    global _global_reference_cache
+    if _global_reference_cache is None:
+        _global_reference_cache = ReferenceDetectionCache()
+    return _global_reference_cache
+
+
+def detect_references_cached(detector: 'ReferenceDetector', text: str,
+                             document_id: str = None) -> List['DetectedReference']:
+    """便利函数：通过全局缓存检测引用"""
+    return get_reference_cache().detect(detector, text, document_id)
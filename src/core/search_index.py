@@ -0,0 +1,463 @@
+"""
+项目全文搜索索引
+基于SQLite FTS5 trigram分词器的按行全文索引，保存在项目的cache目录中。
+trigram对中文等不分词文字同样按3字n-gram建立索引；文档保存时只更新该文档的行。
+搜索时先用索引筛出候选行（正则表达式提取必需的字面量后同样走索引），
+再按大小写、全字、短语等选项在候选行上精确匹配，结果按文档顺序分批返回。
+"""
+
+import re
+import hashlib
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+try:
+    import re._parser as sre_parse     # Python 3.11+
+except ImportError:                     # pragma: no cover
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+
+def _check_fts5_trigram() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text, tokenize='trigram')")
+        finally:
+            conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+# FTS5 trigram分词器需要 SQLite 3.34+
+FTS5_TRIGRAM_AVAILABLE = _check_fts5_trigram()
+if not FTS5_TRIGRAM_AVAILABLE:
+    logger.warning("SQLite不支持FTS5 trigram分词器，全局搜索将逐行扫描文档")
+
+CJK_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\uac00-\ud7af]')
+
+# 一个文档的行在索引中的rowid范围为 [doc_key << LINE_BITS, (doc_key + 1) << LINE_BITS)
+LINE_BITS = 32
+SCHEMA_VERSION = 2
+
+
+@dataclass
+class SearchHit:
+    """一条搜索结果"""
+    doc_id: str
+    line_num: int                       # 行号（从1开始，与 content.split('\n') 一致）
+    line: str                           # 整行内容
+    spans: List[Tuple[int, int]]        # 行内匹配位置
+
+
+class SearchQuery:
+    """
+    编译后的搜索条件
+
+    选项（与查找对话框一致）:
+        case_sensitive: 区分大小写
+        whole_word: 全字匹配；含中文的词按分词边界判断（使用Codex用户词典）
+        regex: 正则表达式（优先于全字匹配）
+        phrase: 短语匹配，默认开启；关闭时空白分隔的词及中文分词得到的词须全部出现在同一行
+    """
+
+    def __init__(self, text: str, options: Optional[Mapping] = None):
+        options = options or {}
+        if not text:
+            raise ValueError("Search text is empty")
+        self.text = text
+        self.case_sensitive = bool(options.get("case_sensitive", False))
+        self.whole_word = bool(options.get("whole_word", False))
+        self.regex = bool(options.get("regex", False))
+        self.phrase = bool(options.get("phrase", True))
+        flags = 0 if self.case_sensitive else re.IGNORECASE
+        self.ignore_case = not self.case_sensitive
+
+        if self.regex:
+            try:
+                self.patterns = [re.compile(text, flags)]
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}") from e
+            # 正则表达式中可能用 (?i) 单独开启忽略大小写
+            self.ignore_case = bool(self.patterns[0].flags & re.IGNORECASE)
+            self.terms = _required_literals(text, flags)
+            self._segment_terms = []
+            return
+
+        terms = [text] if self.phrase else self._split_terms(text)
+        self.terms = terms
+        self.patterns = []
+        self._segment_terms = []
+        for term in terms:
+            if self.whole_word and CJK_PATTERN.search(term):
+                # 中文没有单词边界，按分词结果判断
+                self.patterns.append(re.compile(re.escape(term), flags))
+                self._segment_terms.append(True)
+            else:
+                pattern = re.escape(term)
+                if self.whole_word:
+                    pattern = r'\b' + pattern + r'\b'
+                self.patterns.append(re.compile(pattern, flags))
+                self._segment_terms.append(False)
+
+    @staticmethod
+    def _split_terms(text: str) -> List[str]:
+        """按空白拆分，含中文的部分再按分词结果拆分"""
+        terms = []
+        for chunk in text.split():
+            if CJK_PATTERN.search(chunk):
+                from core.chinese_segmentation import get_segmenter
+                terms.extend(word.word for word in get_segmenter().segment_text(chunk, with_pos=False)
+                             if word.word.strip())
+            else:
+                terms.append(chunk)
+        # 去重并保持顺序
+        return list(dict.fromkeys(terms)) or [text]
+
+    def find_spans(self, line: str) -> List[Tuple[int, int]]:
+        """返回行内所有匹配位置；非短语模式下任一词缺失时返回空列表"""
+        spans = []
+        boundaries = None
+        for i, pattern in enumerate(self.patterns):
+            term_spans = [match.span() for match in pattern.finditer(line) if match.end() > match.start()]
+            if self._segment_terms and self._segment_terms[i] and term_spans:
+                if boundaries is None:
+                    boundaries = _token_boundaries(line)
+                term_spans = [span for span in term_spans
+                              if span[0] in boundaries and span[1] in boundaries]
+            if not term_spans:
+                return []
+            spans.extend(term_spans)
+        if len(self.patterns) > 1:
+            spans.sort()
+        return spans
+
+    def matches(self, line: str) -> bool:
+        return bool(self.find_spans(line))
+
+
+def _token_boundaries(line: str) -> set:
+    """分词边界位置（词的起止位置及行首行尾）"""
+    from core.chinese_segmentation import get_segmenter
+    boundaries = {0, len(line)}
+    for word in get_segmenter().segment_text(line, with_pos=False):
+        boundaries.add(word.start)
+        boundaries.add(word.end)
+    return boundaries
+
+
+def _required_literals(pattern: str, flags: int = 0) -> List[str]:
+    """
+    提取正则表达式任何匹配都必须包含的字面量
+
+    只分析顶层的连续字面量以及至少重复一次的分组，遇到分支、字符集等无法确定的结构即断开；
+    提取失败时返回空列表（退化为扫描全部行）。
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return []
+    literals = _collect_literals(parsed)
+    return [literal for literal in literals if literal.strip()]
+
+
+def _collect_literals(parsed) -> List[str]:
+    literals: List[str] = []
+    current: List[str] = []
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+            continue
+        if op is sre_parse.AT:
+            # 锚点不消耗字符，不打断字面量
+            continue
+        if current:
+            literals.append("".join(current))
+            current = []
+        if op is sre_parse.SUBPATTERN:
+            literals.extend(_collect_literals(av[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            literals.extend(_collect_literals(av[2]))
+    if current:
+        literals.append("".join(current))
+    return literals
+
+
+def document_order(documents: Mapping) -> List[str]:
+    """
+    按项目文档树的先序遍历（同级按 order 排序）返回文档ID
+
+    Args:
+        documents: 文档ID到 ProjectDocument 的映射
+    """
+    children: Dict[Optional[str], List] = {}
+    for doc in documents.values():
+        parent_id = doc.parent_id if doc.parent_id in documents else None
+        children.setdefault(parent_id, []).append(doc)
+    order: List[str] = []
+    stack = sorted(children.get(None, []), key=lambda d: d.order)[::-1]
+    while stack:
+        doc = stack.pop()
+        order.append(doc.id)
+        stack.extend(sorted(children.get(doc.id, []), key=lambda d: d.order)[::-1])
+    return order
+
+
+def scan_documents(query: SearchQuery, order: Iterable[str], contents: Mapping[str, str],
+                   batch_size: int = 200) -> Iterator[List[SearchHit]]:
+    """不使用索引，逐行扫描文档内容（索引不可用时的降级方案）"""
+    batch: List[SearchHit] = []
+    for doc_id in order:
+        content = contents.get(doc_id)
+        if not content:
+            continue
+        for line_num, line in enumerate(content.split('\n'), 1):
+            spans = query.find_spans(line)
+            if spans:
+                batch.append(SearchHit(doc_id, line_num, line, spans))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def content_hash(content: str) -> str:
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+class ProjectSearchIndex:
+    """
+    项目全文索引
+
+    表结构:
+        documents(doc_id, doc_key, content_hash, line_count): 已索引文档及内容摘要
+        lines(text): FTS5 trigram表，rowid 由文档键和行号组成；
+            空行不入索引（不可能有非空匹配），只含空白的行仍要索引
+
+    连接在多个线程间共享（保存文档在界面线程，搜索在工作线程），所有访问都持有同一把锁。
+    """
+
+    def __init__(self):
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_path: Optional[Path] = None
+        self._lock = threading.RLock()
+        # 文档ID -> (上次索引的内容字符串, 摘要)；内容仍是同一个字符串对象时无需重新计算摘要
+        self._digests: Dict[str, Tuple[str, str]] = {}
+
+    @property
+    def is_attached(self) -> bool:
+        return self._conn is not None
+
+    def attach(self, project_path: str):
+        """打开（或创建）项目的索引文件"""
+        if not FTS5_TRIGRAM_AVAILABLE:
+            return
+        db_path = Path(project_path) / "cache" / "search_index.db"
+        with self._lock:
+            self.detach()
+            try:
+                db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(db_path), check_same_thread=False)
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    conn.executescript("""
+                        DROP TABLE IF EXISTS documents;
+                        DROP TABLE IF EXISTS lines;
+                    """)
+                conn.executescript(f"""
+                    CREATE TABLE IF NOT EXISTS documents (
+                        doc_id TEXT PRIMARY KEY,
+                        doc_key INTEGER NOT NULL UNIQUE,
+                        content_hash TEXT NOT NULL,
+                        line_count INTEGER NOT NULL
+                    );
+                    CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(text, tokenize='trigram');
+                    PRAGMA user_version = {SCHEMA_VERSION};
+                """)
+                self._conn = conn
+                self._db_path = db_path
+                logger.info(f"搜索索引已打开: {db_path}")
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open search index {db_path}: {e}")
+                self._conn = None
+
+    def detach(self):
+        """关闭索引文件"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._db_path = None
+            self._digests.clear()
+
+    def indexed_hashes(self) -> Dict[str, str]:
+        """已索引文档的内容摘要"""
+        with self._lock:
+            if self._conn is None:
+                return {}
+            return dict(self._conn.execute("SELECT doc_id, content_hash FROM documents"))
+
+    def sync(self, contents: Mapping[str, str]) -> int:
+        """
+        使索引与给定的文档内容一致（新增、变化的文档重新索引，不存在的文档删除）
+
+        Returns:
+            重新索引或删除的文档数
+        """
+        with self._lock:
+            if self._conn is None:
+                return 0
+            indexed = self.indexed_hashes()
+            changed = 0
+            with self._conn:
+                for doc_id in indexed.keys() - contents.keys():
+                    self._delete_document(doc_id)
+                    changed += 1
+                for doc_id, content in contents.items():
+                    digest = self._digest(doc_id, content or "")
+                    if indexed.get(doc_id) != digest:
+                        self._index_document(doc_id, content or "", digest)
+                        changed += 1
+            if changed:
+                logger.info(f"搜索索引已同步: {changed} 个文档更新")
+            return changed
+
+    def update_document(self, doc_id: str, content: str) -> bool:
+        """文档保存后更新其索引，内容未变化时返回False"""
+        with self._lock:
+            if self._conn is None:
+                return False
+            digest = self._digest(doc_id, content or "")
+            try:
+                row = self._conn.execute("SELECT content_hash FROM documents WHERE doc_id = ?",
+                                         (doc_id,)).fetchone()
+                if row is not None and row[0] == digest:
+                    return False
+                with self._conn:
+                    self._index_document(doc_id, content or "", digest)
+                return True
+            except sqlite3.Error as e:
+                # 索引失败不影响文档保存，下次搜索前的同步会重新索引
+                logger.error(f"Failed to update search index for document {doc_id}: {e}")
+                return False
+
+    def remove_documents(self, doc_ids: Iterable[str]):
+        """删除文档的索引"""
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                with self._conn:
+                    for doc_id in doc_ids:
+                        self._delete_document(doc_id)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to remove documents from search index: {e}")
+
+    def candidates(self, query: SearchQuery) -> Dict[str, List[Tuple[int, str]]]:
+        """
+        用trigram索引筛选候选行
+
+        Returns:
+            文档ID -> [(行号, 行内容), ...]（按行号升序）
+        """
+        match_terms, like_terms = [], []
+        for term in query.terms:
+            if len(term) >= 3:
+                match_terms.append('"' + term.replace('"', '""') + '"')
+            elif not query.ignore_case or term.lower() == term.upper() or term.isascii():
+                # 不足3个字符的词无法使用trigram，用LIKE在SQLite内扫描（LIKE只对ASCII不区分大小写）
+                like_terms.append(term)
+
+        sql = "SELECT d.doc_id, lines.rowid, lines.text FROM lines JOIN documents AS d " \
+              "ON lines.rowid >> ? = d.doc_key"
+        conditions, params = [], [LINE_BITS]
+        if match_terms:
+            conditions.append("lines MATCH ?")
+            params.append(" AND ".join(match_terms))
+        for term in like_terms:
+            conditions.append("lines.text LIKE ? ESCAPE '\\'")
+            params.append('%' + re.sub(r'([\\%_])', r'\\\1', term) + '%')
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        mask = (1 << LINE_BITS) - 1
+        result: Dict[str, List[Tuple[int, str]]] = {}
+        with self._lock:
+            if self._conn is None:
+                return result
+            rows = self._conn.execute(sql, params).fetchall()
+        for doc_id, rowid, text in rows:
+            result.setdefault(doc_id, []).append(((rowid & mask) + 1, text))
+        for lines in result.values():
+            lines.sort(key=lambda item: item[0])
+        return result
+
+    def search(self, query: SearchQuery, order: Iterable[str],
+               batch_size: int = 200) -> Iterator[List[SearchHit]]:
+        """按文档顺序分批返回精确匹配的结果"""
+        candidates = self.candidates(query)
+        batch: List[SearchHit] = []
+        for doc_id in order:
+            for line_num, line in candidates.get(doc_id, ()):
+                spans = query.find_spans(line)
+                if spans:
+                    batch.append(SearchHit(doc_id, line_num, line, spans))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
+
+    def _digest(self, doc_id: str, content: str) -> str:
+        known = self._digests.get(doc_id)
+        if known is not None and known[0] is content:
+            return known[1]
+        digest = content_hash(content)
+        self._digests[doc_id] = (content, digest)
+        return digest
+
+    def _doc_key(self, doc_id: str) -> int:
+        row = self._conn.execute("SELECT doc_key FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is not None:
+            return row[0]
+        row = self._conn.execute("SELECT COALESCE(MAX(doc_key), 0) + 1 FROM documents").fetchone()
+        return row[0]
+
+    def _delete_rows(self, doc_key: int):
+        self._conn.execute("DELETE FROM lines WHERE rowid >= ? AND rowid < ?",
+                           (doc_key << LINE_BITS, (doc_key + 1) << LINE_BITS))
+
+    def _delete_document(self, doc_id: str):
+        self._digests.pop(doc_id, None)
+        row = self._conn.execute("SELECT doc_key FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is not None:
+            self._delete_rows(row[0])
+            self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def _index_document(self, doc_id: str, content: str, digest: str):
+        doc_key = self._doc_key(doc_id)
+        self._delete_rows(doc_key)
+        lines = content.split('\n')
+        base = doc_key << LINE_BITS
+        self._conn.executemany("INSERT INTO lines(rowid, text) VALUES (?, ?)",
+                               ((base + i, line) for i, line in enumerate(lines) if line))
+        self._conn.execute("INSERT OR REPLACE INTO documents(doc_id, doc_key, content_hash, line_count) "
+                           "VALUES (?, ?, ?, ?)", (doc_id, doc_key, digest, len(lines)))
+
+
+# 全局实例
+_global_search_index: Optional[ProjectSearchIndex] = None
+
+
+def get_search_index() -> ProjectSearchIndex:
+    """获取全局搜索索引实例"""
+    global _global_search_index
+    if _global_search_index is None:
+        _global_search_index = ProjectSearchIndex()
+    return _global_search_index
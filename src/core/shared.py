@@ -21,6 +21,7 @@ class Shared(QObject):
     projectChanged = pyqtSignal(str)  # 项目变化信号
     documentChanged = pyqtSignal(str)  # 文档变化信号
     documentSaved = pyqtSignal(str, str)  # 文档保存信号 (document_id, content)
+    documentsSaved = pyqtSignal(list)  # 批量保存信号 (document_ids)，如项目级替换
     themeChanged = pyqtSignal(str)  # 主题变化信号
     configChanged = pyqtSignal(str, str)  # 配置变化信号
     
@@ -17,6 +17,8 @@ import hashlib
 
 # 导入模板处理器
 from .template_processor import TemplateProcessor
+from .prompt_layout import PromptLayout
+from .tokenizer import TokenBudget, get_token_counter
 
 logger = logging.getLogger(__name__)
 
@@ -55,10 +57,11 @@ class SimplePromptContext:
     rag_context: str = ""                       # RAG检索上下文
     auto_variables: Dict[str, str] = field(default_factory=dict)  # 自动变量
     detected_entities: List[str] = field(default_factory=list)    # 检测到的实体
+    codex_entries: List[Dict[str, Any]] = field(default_factory=list)  # Codex条目（含is_global标记）
     
     # 用户配置
     word_count: int = 300                       # 续写字数
-    context_size: int = 500                     # 上下文长度
+    context_size: int = 500                     # 上下文长度（字符，兼容旧接口；写作上下文按模式的token预算分配）
     custom_prompt: str = ""                     # 自定义提示词补充
 
 
@@ -178,10 +181,23 @@ class TaggedPromptSystem:
 class AutoContextInjector:
     """自动上下文注入器 - 智能检测并注入相关上下文"""
     
+    # 各模式下写作上下文（光标前后文本和RAG检索结果）的token预算
+    CONTEXT_TOKEN_BUDGETS = {
+        PromptMode.FAST: 500,
+        PromptMode.BALANCED: 900,
+        PromptMode.FULL: 1500
+    }
+    # 按token截取前先按字符取窗口（汉字约1.2个token/字，英文约4字符/token）
+    WINDOW_CHARS_PER_TOKEN = 3
+    
     def __init__(self, shared=None):
         self.shared = shared
         self.rag_service = None
         
+        # 各部分token数按内容缓存，未变化的部分无需重新计数
+        self._token_counter = get_token_counter()
+        self._budget = TokenBudget(0, self._token_counter)
+        
         # 尝试获取RAG服务
         if shared and hasattr(shared, 'rag_service'):
             self.rag_service = shared.rag_service
@@ -195,10 +211,12 @@ class AutoContextInjector:
         # 1. 基础变量替换
         context_vars = self._build_basic_variables(context)
         
-        # 2. RAG上下文检索 (如果可用)
+        # 2. RAG上下文检索 (如果可用)，与光标前后文本共用token预算
         rag_context = self._get_rag_context(context.text, context.cursor_position)
         if rag_context:
-            context_vars["rag_context"] = rag_context
+            allocated = self.allocate_context(context, rag_context)
+            context_vars["current_text"] = allocated["current_text"]
+            context_vars["rag_context"] = allocated["rag_context"]
         
         # 3. 实体检测和上下文扩展
         entities = self._detect_entities(context.text, context.cursor_position)
@@ -215,11 +233,40 @@ class AutoContextInjector:
         
         return enhanced_prompt
     
+    def allocate_context(self, context: SimplePromptContext, rag_context: str = "") -> Dict[str, str]:
+        """
+        按token预算分配写作上下文
+        
+        光标后文（不超过预算的1/6）和RAG检索结果（不超过1/3）先分配，
+        光标前文保留结尾、用满剩余预算。
+        
+        Returns:
+            {"current_text": 光标前后文本, "rag_context": RAG检索结果}
+        """
+        max_tokens = self.CONTEXT_TOKEN_BUDGETS.get(
+            context.prompt_mode, self.CONTEXT_TOKEN_BUDGETS[PromptMode.BALANCED]
+        )
+        window = max_tokens * self.WINDOW_CHARS_PER_TOKEN
+        text, cursor_pos = context.text, context.cursor_position
+        before_text = text[max(0, cursor_pos - window):cursor_pos]
+        after_text = self._token_counter.truncate(text[cursor_pos:cursor_pos + window // 6], max_tokens // 6)
+        rag_context = self._token_counter.truncate(rag_context, max_tokens // 3)
+        
+        budget = self._budget
+        budget.max_tokens = max_tokens
+        budget.set_section("after", after_text, priority=3)
+        budget.set_section("rag", rag_context, priority=2)
+        budget.set_section("before", before_text, priority=1, keep_tail=True)
+        allocation = budget.allocate()
+        
+        return {
+            "current_text": (allocation.get("before", "") + allocation.get("after", "")).strip(),
+            "rag_context": allocation.get("rag", "")
+        }
+    
     def _build_basic_variables(self, context: SimplePromptContext) -> Dict[str, str]:
         """构建基础上下文变量"""
-        current_text = self._get_context_text(
-            context.text, context.cursor_position, context.context_size
-        )
+        current_text = self.allocate_context(context)["current_text"]
         
         return {
             "current_text": current_text,
@@ -343,6 +390,25 @@ class AutoContextInjector:
         return enhanced_prompt
 
 
+def format_codex_entries(entries: List[Dict[str, Any]], heading: str) -> str:
+    """
+    格式化Codex条目；按id排序，保证相同条目集合生成相同文本
+
+    Returns:
+        格式化文本，没有条目时返回空字符串
+    """
+    if not entries:
+        return ""
+    lines = [heading]
+    for entry in sorted(entries, key=lambda e: str(e.get('id', ''))):
+        line = f"- [{entry.get('type', '')}] {entry.get('title', '')}"
+        description = (entry.get('description') or '').strip()
+        if description:
+            line += f"：{description}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
 class SinglePromptManager(QObject):
     """统一的提示词管理器 - 替代所有复杂系统"""
     
@@ -363,7 +429,9 @@ class SinglePromptManager(QObject):
         
         # 缓存系统已移除，保证多次触发正常工作
         
-        # 基础模板
+        # 基础模板：稳定的系统说明在前，随光标变化的写作上下文在后
+        self.system_template = self._load_system_template()
+        self.context_template = self._load_context_template()
         self.base_template = self._load_base_template()
         
         # 验证模板
@@ -373,34 +441,45 @@ class SinglePromptManager(QObject):
     
     def generate_prompt(self, context: SimplePromptContext) -> str:
         """生成最终提示词 - 核心方法"""
+        return self.generate_prompt_layout(context).to_prompt()
+    
+    def generate_prompt_layout(self, context: SimplePromptContext) -> PromptLayout:
+        """
+        生成分段提示词
         
-        # 1. 缓存系统已移除，直接生成提示词
-        
-        # 2. 构建基础提示词
-        prompt = self.base_template
-        
-        # 3. 应用标签修饰 - 生成风格指导
+        稳定段（系统说明、风格要求、附加要求）在相同标签和模式下保持不变，
+        放在最前面以便服务端前缀缓存命中；写作上下文等易变内容放在后面。
+        """
+        # 1. 应用标签修饰 - 生成风格指导
         style_guidance = []
         if context.selected_tags:
             style_guidance = self._generate_style_guidance(context.selected_tags)
             logger.debug(f"已应用标签: {context.selected_tags}")
         
-        # 4. 构建模板上下文数据
+        # 2. 构建模板上下文数据
         template_context = self._build_template_context(context, style_guidance)
         
-        # 5. 使用TemplateProcessor处理模板
-        prompt = self.template_processor.process_template(prompt, template_context)
-        
-        # 6. 添加自定义补充
+        # 3. 使用TemplateProcessor分别处理稳定段和易变段
+        layout = PromptLayout()
+        layout.add_stable('system', self.template_processor.process_template(self.system_template, template_context))
+        if context.prompt_mode == PromptMode.FULL:
+            layout.add_stable('detail_guidance', self._load_detail_guidance())
         if context.custom_prompt:
-            prompt += f"\n\n**附加要求**：\n{context.custom_prompt}"
-        
-        # 7. 根据模式调整提示词长度和详细度
-        prompt = self._adjust_for_mode(prompt, context.prompt_mode)
-        
-        # 8. 缓存系统已移除
-        
-        # 9. 发出信号
+            layout.add_stable('custom', f"**附加要求**：\n{context.custom_prompt}")
+        # 全局Codex条目（世界规则、角色档案）每次请求都相同，放在稳定段
+        global_entries = [entry for entry in context.codex_entries if entry.get('is_global')]
+        layout.add_stable('codex_global', format_codex_entries(global_entries, "**世界设定与角色档案**："))
+        layout.add_volatile('context', self.template_processor.process_template(self.context_template, template_context))
+        # 光标附近检测到的条目随光标变化，放在易变段
+        detected_entries = [entry for entry in context.codex_entries if not entry.get('is_global')]
+        layout.add_volatile('codex_detected', format_codex_entries(detected_entries, "**相关设定**："))
+        
+        # 4. 根据模式调整提示词长度和详细度
+        if context.prompt_mode == PromptMode.FAST:
+            layout = layout.map_segments(lambda name, text: self._adjust_for_mode(text, PromptMode.FAST))
+        
+        # 5. 发出信号
+        prompt = layout.to_prompt()
         self.promptGenerated.emit(prompt)
         self.contextUpdated.emit({
             'tags': context.selected_tags,
@@ -408,8 +487,8 @@ class SinglePromptManager(QObject):
             'mode': context.prompt_mode.value
         })
         
-        logger.info(f"提示词生成完成，长度: {len(prompt)} 字符")
-        return prompt
+        logger.info(f"提示词生成完成，长度: {len(prompt)} 字符（稳定前缀 {len(layout.stable_text)} 字符）")
+        return layout
     
     def generate_simple_prompt(self, text: str, cursor_pos: int = 0, 
                              tags: List[str] = None, mode: str = "balanced") -> str:
@@ -425,15 +504,27 @@ class SinglePromptManager(QObject):
         return self.generate_prompt(context)
     
     def _load_base_template(self) -> str:
-        """加载基础提示词模板"""
+        """加载基础提示词模板（稳定段 + 易变段）"""
+        return f"{self._load_system_template()}\n\n{self._load_context_template()}"
+    
+    def _load_system_template(self) -> str:
+        """加载系统说明模板（不随光标位置变化）"""
         return """你是一个专业的小说写作助手，专门帮助作家创作高质量的小说内容。
 
-**当前写作上下文**：
-{current_text}
-
 **写作要求**：
 {style_guidance}
 
+请基于下面提供的写作上下文，为用户提供自然流畅、符合风格的续写内容。续写应该：
+1. 与前文保持连贯性和一致性
+2. 符合选定的写作风格和类型
+3. 推进情节发展或深化角色刻画
+4. 语言流畅自然，符合小说写作规范"""
+    
+    def _load_context_template(self) -> str:
+        """加载写作上下文模板（每次请求都会变化）"""
+        return """**当前写作上下文**：
+{current_text}
+
 **续写指导**：
 - 续写长度：{word_count}
 - 补全类型：{completion_type}
@@ -446,13 +537,16 @@ class SinglePromptManager(QObject):
 **检测到的角色/地点**：{detected_entities}
 
 **光标位置上下文**：
-{cursor_context}
-
-请基于以上信息，为用户提供自然流畅、符合风格的续写内容。续写应该：
-1. 与前文保持连贯性和一致性
-2. 符合选定的写作风格和类型
-3. 推进情节发展或深化角色刻画
-4. 语言流畅自然，符合小说写作规范"""
+{cursor_context}"""
+    
+    def _load_detail_guidance(self) -> str:
+        """完整模式的详细创作指导"""
+        return """**详细创作指导**：
+- 注重细节描写和心理刻画
+- 保持人物性格的一致性和发展
+- 营造适当的氛围和情境
+- 运用适当的修辞手法和表达技巧
+- 确保情节逻辑性和可信度"""
     
     def _adjust_for_mode(self, prompt: str, mode: PromptMode) -> str:
         """根据模式调整提示词"""
@@ -461,20 +555,12 @@ class SinglePromptManager(QObject):
             lines = prompt.split('\n')
             essential_lines = [line for line in lines 
                              if any(keyword in line for keyword in 
-                                  ['当前写作上下文', '续写指导', '请基于以上信息'])]
+                                  ['当前写作上下文', '续写指导', '请基于'])]
             return '\n'.join(essential_lines)
         
         elif mode == PromptMode.FULL:
             # 完整模式：添加更多细节指导
-            additional_guidance = """
-
-**详细创作指导**：
-- 注重细节描写和心理刻画
-- 保持人物性格的一致性和发展
-- 营造适当的氛围和情境
-- 运用适当的修辞手法和表达技巧
-- 确保情节逻辑性和可信度"""
-            return prompt + additional_guidance
+            return f"{prompt}\n\n{self._load_detail_guidance()}"
         
         else:
             # 平衡模式：保持原样
@@ -542,24 +628,20 @@ class SinglePromptManager(QObject):
                                style_guidance: List[str]) -> Dict[str, Any]:
         """构建模板上下文数据"""
         
-        # 1. 基础变量
-        current_text = self._get_context_text(
-            context.text, context.cursor_position, context.context_size
-        )
+        # 1. 光标前后文本和RAG上下文按token预算分配
+        rag_context = self._get_rag_context(context.text, context.cursor_position)
+        allocated = self.context_injector.allocate_context(context, rag_context)
         
         template_context = {
-            "current_text": current_text,
+            "current_text": allocated["current_text"],
             "word_count": context.word_count,
             "completion_type": context.completion_type.value,
             "cursor_context": self._get_cursor_context(context.text, context.cursor_position),
-            "style_guidance": style_guidance
+            "style_guidance": style_guidance,
+            "rag_context": allocated["rag_context"]
         }
         
-        # 2. RAG上下文检索 (如果可用)
-        rag_context = self._get_rag_context(context.text, context.cursor_position)
-        template_context["rag_context"] = rag_context
-        
-        # 3. 实体检测
+        # 2. 实体检测
         entities = self._detect_entities(context.text, context.cursor_position)
         if entities:
             template_context["detected_entities"] = entities
@@ -567,7 +649,7 @@ class SinglePromptManager(QObject):
         else:
             template_context["detected_entities"] = []
         
-        # 4. 智能上下文分析
+        # 3. 智能上下文分析
         context_analysis = self._analyze_context(context.text, context.cursor_position)
         template_context.update(context_analysis)
         
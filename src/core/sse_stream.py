@@ -0,0 +1,185 @@
+"""
+流式响应处理
+增量SSE解码（跨读取的残缺帧留在缓冲区，完整行只解码一次）、
+按服务商提取增量文本，以及按时间间隔合并数据块后再投递到界面
+"""
+
+import json
+import time
+import asyncio
+import logging
+from typing import List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SSEDecoder:
+    """
+    增量Server-Sent Events解码器
+
+    feed() 接收任意切分的原始字节，返回其中已完整的事件data；
+    未结束的行和事件保留到下一次调用，不会重复扫描已处理的字节。
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data_lines: List[str] = []
+
+    def feed(self, data: bytes) -> List[str]:
+        """输入一段字节，返回已完整的事件data列表"""
+        buffer = self._buffer
+        buffer += data
+        events = []
+        start = 0
+
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+
+            line_end = end
+            if line_end > start and buffer[line_end - 1] == 0x0D:
+                line_end -= 1
+
+            if line_end == start:
+                # 空行：事件结束
+                if self._data_lines:
+                    events.append('\n'.join(self._data_lines))
+                    self._data_lines = []
+            elif buffer.startswith(b'data:', start, line_end):
+                value_start = start + 5
+                if value_start < line_end and buffer[value_start] == 0x20:
+                    value_start += 1
+                self._data_lines.append(buffer[value_start:line_end].decode('utf-8', errors='replace'))
+            # event/id/retry字段和注释行不影响补全内容，直接跳过
+
+            start = end + 1
+
+        if start:
+            del buffer[:start]
+        return events
+
+    def flush(self) -> List[str]:
+        """流结束：返回缺少结尾空行的最后一个事件"""
+        if self._buffer:
+            self.feed(b'\n')
+        events = []
+        if self._data_lines:
+            events.append('\n'.join(self._data_lines))
+            self._data_lines = []
+        return events
+
+
+class StreamDeltaExtractor:
+    """按服务商从流式事件中提取增量文本"""
+
+    # 不包含该标记的事件没有文本增量（心跳、角色、结束原因等），跳过JSON解析
+    _MARKERS = {
+        'claude': '"content_block_delta"',
+    }
+    _DEFAULT_MARKER = '"content"'
+
+    def __init__(self, provider: str):
+        """
+        Args:
+            provider: 服务商标识（AIProvider的值，如 openai/claude/gemini）
+        """
+        self.provider = provider
+        self._marker = self._MARKERS.get(provider, self._DEFAULT_MARKER)
+        self.skipped = 0
+        self.parsed = 0
+
+    def extract(self, payload: str) -> Optional[str]:
+        """从一个事件的data中提取增量文本"""
+        if self._marker not in payload:
+            self.skipped += 1
+            return None
+
+        try:
+            chunk = json.loads(payload)
+        except ValueError:
+            # 部分服务端不以空行分隔事件，多行data被合并到同一事件
+            if '\n' in payload:
+                pieces = [self.extract(line) for line in payload.split('\n')]
+                return ''.join(piece for piece in pieces if piece) or None
+            logger.warning(f"解析流式数据失败: {payload[:200]}")
+            return None
+
+        self.parsed += 1
+        return self._extract_delta(chunk)
+
+    def _extract_delta(self, chunk) -> Optional[str]:
+        if not isinstance(chunk, dict):
+            return None
+
+        if self.provider == 'claude':
+            if chunk.get('type') == 'content_block_delta':
+                return chunk.get('delta', {}).get('text')
+            return None
+
+        if self.provider == 'gemini' and 'candidates' in chunk:
+            candidates = chunk.get('candidates') or []
+            if not candidates:
+                return None
+            parts = candidates[0].get('content', {}).get('parts', [])
+            return ''.join(part.get('text', '') for part in parts if not part.get('thought')) or None
+
+        # OpenAI兼容格式
+        choices = chunk.get('choices')
+        if choices:
+            return choices[0].get('delta', {}).get('content')
+        return None
+
+
+class ChunkCoalescer:
+    """
+    流式数据块合并器
+
+    第一个数据块立即投递，之后累积的文本最多每 interval_ms 投递一次，
+    避免每个token都触发一次界面重排。需在事件循环线程中使用。
+    """
+
+    def __init__(self, emit: Callable[[str], None], interval_ms: float = 50,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._emit = emit
+        self._interval = max(0.0, interval_ms) / 1000.0
+        self._loop = loop
+        self._pending: List[str] = []
+        self._last_emit = None
+        self._flush_handle = None
+        self.emitted = 0
+
+    def push(self, text: str):
+        """加入一个数据块"""
+        if not text:
+            return
+        self._pending.append(text)
+
+        now = time.monotonic()
+        if self._last_emit is None or now - self._last_emit >= self._interval:
+            self.flush()
+        elif self._flush_handle is None and self._loop is not None:
+            # 流暂停时也要在间隔到期后投递已累积的文本
+            delay = self._interval - (now - self._last_emit)
+            self._flush_handle = self._loop.call_later(delay, self.flush)
+
+    def flush(self):
+        """立即投递累积的文本"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        text = ''.join(self._pending)
+        self._pending = []
+        self._last_emit = time.monotonic()
+        self.emitted += 1
+        self._emit(text)
+
+    def discard(self):
+        """丢弃未投递的文本（请求被取消）"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending = []
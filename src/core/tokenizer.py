@@ -0,0 +1,384 @@
+"""
+分词与token预算
+可替换的分词器层：安装了tiktoken时在后台线程加载BPE编码（首次使用可能需要下载编码文件），
+加载完成前及加载失败时使用按cl100k预分词规则校准的估算器；
+按文本段缓存token数，并在提示词各部分之间按优先级增量分配token预算
+"""
+
+import re
+import math
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Tokenizer:
+    """分词器接口"""
+
+    name = "base"
+
+    def count(self, text: str) -> int:
+        """计算文本的token数"""
+        raise NotImplementedError
+
+    def truncate(self, text: str, max_tokens: int, keep_tail: bool = False) -> str:
+        """
+        截断文本使其不超过 max_tokens 个token
+
+        Args:
+            keep_tail: 为True时保留结尾部分（用于光标前文）
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+
+        # 二分查找满足预算的最长前缀/后缀
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            piece = text[-mid:] if keep_tail else text[:mid]
+            if self.count(piece) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        return text[-low:] if keep_tail and low else text[:low]
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    估算分词器
+
+    按cl100k的预分词规则切分（英文单词、最多3位数字、空白、标点），
+    再按各类片段的平均token数估算；汉字按常用字约1.2个token计。
+    """
+
+    name = "heuristic"
+
+    CJK_TOKENS_PER_CHAR = 1.2
+
+    _PIECE_PATTERN = re.compile(
+        r"(?P<cjk>[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)"
+        r"|(?P<word>[A-Za-z]+)"
+        r"|(?P<number>\d{1,3})"
+        r"|(?P<space>\s+)"
+        r"|(?P<other>.)",
+        re.DOTALL
+    )
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+
+        cjk_chars = 0
+        tokens = 0
+        for match in self._PIECE_PATTERN.finditer(text):
+            kind = match.lastgroup
+            if kind == 'cjk':
+                cjk_chars += match.end() - match.start()
+            elif kind == 'word':
+                # 常见英文单词为1个token，长单词按约5个字母1个token
+                tokens += math.ceil((match.end() - match.start()) / 5)
+            elif kind == 'space':
+                # 单个空格通常并入后一个单词
+                tokens += 0 if match.group() == ' ' else 1
+            else:
+                tokens += 1
+        return tokens + math.ceil(cjk_chars * self.CJK_TOKENS_PER_CHAR)
+
+
+class TiktokenTokenizer(Tokenizer):
+    """基于tiktoken的BPE分词器（精确计数）"""
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        import tiktoken  # 可选依赖，由调用方处理ImportError
+
+        self._encoding = tiktoken.get_encoding(encoding_name)
+        self.name = f"tiktoken:{encoding_name}"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int, keep_tail: bool = False) -> str:
+        if max_tokens <= 0:
+            return ""
+        tokens = self._encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+
+        tokens = tokens[-max_tokens:] if keep_tail else tokens[:max_tokens]
+        # 边界可能切开多字节字符，去掉不完整的替换字符
+        return self._encoding.decode(tokens).strip('�')
+
+
+class CachedTokenCounter:
+    """按文本段缓存token数的计数器（LRU）"""
+
+    def __init__(self, tokenizer: Tokenizer, max_entries: int = 4096):
+        self.tokenizer = tokenizer
+        self.max_entries = max(1, max_entries)
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def name(self) -> str:
+        return self.tokenizer.name
+
+    def set_tokenizer(self, tokenizer: Tokenizer):
+        """替换分词器并清空缓存（如后台加载的tiktoken编码就绪后）"""
+        with self._lock:
+            self.tokenizer = tokenizer
+            self._counts.clear()
+
+    def count(self, text: str) -> int:
+        """计算文本的token数（带缓存）"""
+        if not text:
+            return 0
+
+        with self._lock:
+            cached = self._counts.get(text)
+            if cached is not None:
+                self._counts.move_to_end(text)
+                self.hits += 1
+                return cached
+
+        tokenizer = self.tokenizer
+        result = tokenizer.count(text)
+        with self._lock:
+            self.misses += 1
+            if tokenizer is not self.tokenizer:
+                # 计数期间分词器已被替换，不缓存旧分词器的结果
+                return result
+            self._counts[text] = result
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return result
+
+    def truncate(self, text: str, max_tokens: int, keep_tail: bool = False) -> str:
+        """截断文本使其不超过 max_tokens 个token"""
+        if self.count(text) <= max_tokens:
+            return text
+        return self.tokenizer.truncate(text, max_tokens, keep_tail)
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'tokenizer': self.tokenizer.name,
+                'entries': len(self._counts),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+@dataclass
+class _BudgetSection:
+    """预算中的一个提示词部分"""
+    name: str
+    text: str
+    priority: int
+    min_tokens: int
+    keep_tail: bool
+    tokens: int
+    order: int
+
+
+class TokenBudget:
+    """
+    提示词各部分的token预算分配
+
+    按优先级从高到低放入各部分，放不下时截断到剩余预算（剩余不足 min_tokens 时舍弃）。
+    只有内容变化的部分需要重新计数，分配结果在部分未变化时直接复用。
+    """
+
+    def __init__(self, max_tokens: int, counter: Optional[CachedTokenCounter] = None):
+        self._max_tokens = max_tokens
+        self.counter = counter or get_token_counter()
+        self._sections: Dict[str, _BudgetSection] = {}
+        self._order = 0
+        self._allocation: Optional[Dict[str, str]] = None
+        self._allocated_tokens: Dict[str, int] = {}
+
+    @property
+    def max_tokens(self) -> int:
+        return self._max_tokens
+
+    @max_tokens.setter
+    def max_tokens(self, value: int):
+        if value != self._max_tokens:
+            self._max_tokens = value
+            self._allocation = None
+
+    def set_section(self, name: str, text: str, priority: int = 0,
+                    min_tokens: int = 0, keep_tail: bool = False):
+        """
+        设置一个部分的内容
+
+        Args:
+            name: 部分名称
+            text: 内容
+            priority: 优先级，数字越大越先分配
+            min_tokens: 截断后至少保留的token数，不足时舍弃整个部分
+            keep_tail: 截断时保留结尾（如光标前文）
+        """
+        section = self._sections.get(name)
+        if (section is not None and section.text == text and section.priority == priority
+                and section.min_tokens == min_tokens and section.keep_tail == keep_tail):
+            return
+
+        order = section.order if section is not None else self._next_order()
+        tokens = section.tokens if section is not None and section.text == text else self.counter.count(text)
+        self._sections[name] = _BudgetSection(name, text, priority, min_tokens, keep_tail, tokens, order)
+        self._allocation = None
+
+    def remove_section(self, name: str):
+        if self._sections.pop(name, None) is not None:
+            self._allocation = None
+
+    def retain_sections(self, names) -> None:
+        """只保留给定名称的部分"""
+        for name in [name for name in self._sections if name not in names]:
+            self.remove_section(name)
+
+    def _next_order(self) -> int:
+        self._order += 1
+        return self._order
+
+    def allocate(self) -> Dict[str, str]:
+        """按优先级分配预算，返回 名称 -> 放入提示词的内容（已舍弃的部分不出现）"""
+        if self._allocation is not None:
+            return dict(self._allocation)
+
+        allocation = {}
+        allocated_tokens = {}
+        remaining = self._max_tokens
+        for section in sorted(self._sections.values(), key=lambda s: (-s.priority, s.order)):
+            if not section.text:
+                continue
+            if section.tokens <= remaining:
+                allocation[section.name] = section.text
+                allocated_tokens[section.name] = section.tokens
+                remaining -= section.tokens
+            elif remaining >= max(1, section.min_tokens):
+                truncated = self.counter.truncate(section.text, remaining, section.keep_tail)
+                if truncated:
+                    tokens = self.counter.count(truncated)
+                    allocation[section.name] = truncated
+                    allocated_tokens[section.name] = tokens
+                    remaining -= tokens
+
+        self._allocation = allocation
+        self._allocated_tokens = allocated_tokens
+        return dict(allocation)
+
+    def allocated_tokens(self) -> Dict[str, int]:
+        """各部分实际分配的token数"""
+        self.allocate()
+        return dict(self._allocated_tokens)
+
+    @property
+    def used_tokens(self) -> int:
+        return sum(self.allocated_tokens().values())
+
+    def section_names(self) -> List[str]:
+        return list(self._sections)
+
+
+# 估算分词器替代tiktoken的警告只记录一次
+_fallback_warned = False
+
+
+def _warn_fallback(reason: str):
+    global _fallback_warned
+    if not _fallback_warned:
+        _fallback_warned = True
+        logger.warning(f"{reason}，token数使用估算分词器（可通过TIKTOKEN_CACHE_DIR指定本地编码文件目录）")
+
+
+def _tiktoken_encoding_name(name: str) -> Optional[str]:
+    """分词器配置对应的tiktoken编码名，heuristic返回None"""
+    if name == "heuristic":
+        return None
+    return name.split(':', 1)[1] if name.startswith("tiktoken:") else "cl100k_base"
+
+
+def create_tokenizer(name: str = "auto") -> Tokenizer:
+    """
+    创建分词器（同步加载tiktoken编码，可能需要下载，不要在GUI线程中调用）
+
+    Args:
+        name: auto（优先tiktoken）、heuristic，或 tiktoken:<编码名>
+    """
+    encoding_name = _tiktoken_encoding_name(name)
+    if encoding_name is None:
+        return HeuristicTokenizer()
+
+    try:
+        return TiktokenTokenizer(encoding_name)
+    except ImportError:
+        _warn_fallback("tiktoken未安装")
+    except Exception as e:
+        # 离线且本地没有编码文件
+        _warn_fallback(f"加载tiktoken编码 {encoding_name} 失败: {e}")
+    return HeuristicTokenizer()
+
+
+def _load_tokenizer_in_background(counter: CachedTokenCounter, encoding_name: str):
+    """在后台线程中加载tiktoken编码，成功后替换计数器的分词器"""
+    def load():
+        tokenizer = create_tokenizer(f"tiktoken:{encoding_name}")
+        if isinstance(tokenizer, TiktokenTokenizer):
+            counter.set_tokenizer(tokenizer)
+            logger.info(f"token计数器: {tokenizer.name}")
+
+    threading.Thread(target=load, name="TokenizerLoader", daemon=True).start()
+
+
+# 全局计数器实例
+_global_token_counter: Optional[CachedTokenCounter] = None
+
+
+def get_token_counter() -> CachedTokenCounter:
+    """
+    获取全局token计数器，分词器由配置 ai.tokenizer 决定（默认auto）
+
+    tiktoken编码在后台线程中加载，加载完成前使用估算分词器，不阻塞调用线程。
+    """
+    global _global_token_counter
+    if _global_token_counter is None:
+        name = "auto"
+        try:
+            from .config import get_config
+            config = get_config()
+            if config:
+                name = config.get_section('ai').get('tokenizer', name)
+        except Exception as e:
+            logger.warning(f"读取分词器配置失败，使用默认值: {e}")
+
+        _global_token_counter = CachedTokenCounter(HeuristicTokenizer())
+        encoding_name = _tiktoken_encoding_name(name)
+        if encoding_name is not None:
+            _load_tokenizer_in_background(_global_token_counter, encoding_name)
+        else:
+            logger.info(f"token计数器: {_global_token_counter.name}")
+    return _global_token_counter
+
+
+def set_tokenizer(tokenizer: Tokenizer) -> CachedTokenCounter:
+    """替换全局分词器（例如接入特定模型的分词器）"""
+    global _global_token_counter
+    _global_token_counter = CachedTokenCounter(tokenizer)
+    return _global_token_counter
@@ -23,10 +23,16 @@ logger = logging.getLogger(__name__)
 # 尝试导入必要组件
 try:
     from core.ai_qt_client import QtAIClient
+    from core.completion_scheduler import CompletionScheduler
+    from core.completion_cache import get_completion_cache
+    from core.completion_prefetcher import CompletionPrefetcher, PrefetchBudget
+    from core.prompt_layout import PromptLayout, get_prompt_cache_stats
+    from core.concurrency_limiter import get_limiter_registry
+    from core.tokenizer import TokenBudget, get_token_counter
     from core.config import Config
     from core.simple_prompt_service import (
         SinglePromptManager, SimplePromptContext, 
-        PromptMode, CompletionType, create_simple_prompt_context
+        PromptMode, CompletionType, create_simple_prompt_context, format_codex_entries
     )
     from core.prompt_functions import PromptFunctionRegistry, PromptContext
     AI_AVAILABLE = True
@@ -38,12 +44,23 @@ except ImportError as e:
 class IntelligentContextBuilder:
     """智能上下文构建器 - 多维度上下文收集和处理"""
     
+    # 各模式下光标前文的token预算，光标后文为其一半
+    TEXT_CONTEXT_TOKENS = {
+        "fast": 360,
+        "balanced": 600,
+        "full": 960
+    }
+    # 按token截取前先按字符取窗口（汉字约1.2个token/字，英文约4字符/token）
+    WINDOW_CHARS_PER_TOKEN = 3
+    
     def __init__(self, shared=None):
         self.shared = shared
         self.codex_manager = None
         self.rag_service = None
         self.reference_detector = None
+        self._window_detector = None
         self._intelligent_context_collector = None
+        self._text_budget = TokenBudget(0, get_token_counter())
         
         # 从shared获取组件
         if shared:
@@ -83,7 +100,7 @@ class IntelligentContextBuilder:
         
         context_data = {
             "text_context": self._extract_text_context(text, cursor_pos, mode),
-            "codex_context": self._collect_codex_data(text, cursor_pos, document_id),
+            "codex_context": self._collect_codex_data(text, cursor_pos, document_id, mode),
             "rag_context": self._search_rag_relevant(text, cursor_pos, mode),
             "user_preferences": self._get_user_style_preferences(),
             "document_metadata": document_metadata,
@@ -94,19 +111,21 @@ class IntelligentContextBuilder:
         return context_data
     
     def _extract_text_context(self, text: str, cursor_pos: int, mode: str) -> Dict[str, str]:
-        """提取文本上下文"""
-        # 根据模式调整上下文窗口大小
-        context_sizes = {
-            "fast": 300,
-            "balanced": 500,
-            "full": 800
-        }
-        context_size = context_sizes.get(mode, 500)
-        
-        # 获取光标前后文本
-        before_start = max(0, cursor_pos - context_size)
-        before_text = text[before_start:cursor_pos]
-        after_text = text[cursor_pos:cursor_pos + context_size // 2]
+        """提取文本上下文（按token预算截取光标前后文本）"""
+        before_tokens = self.TEXT_CONTEXT_TOKENS.get(mode, self.TEXT_CONTEXT_TOKENS["balanced"])
+        after_tokens = before_tokens // 2
+        window = before_tokens * self.WINDOW_CHARS_PER_TOKEN
+        
+        # 光标后文先按自己的预算截取，光标前文保留结尾、用满其余预算
+        budget = self._text_budget
+        budget.max_tokens = before_tokens + after_tokens
+        budget.set_section("after", budget.counter.truncate(
+            text[cursor_pos:cursor_pos + window // 2], after_tokens), priority=2)
+        budget.set_section("before", text[max(0, cursor_pos - window):cursor_pos],
+                           priority=1, keep_tail=True)
+        allocation = budget.allocate()
+        before_text = allocation.get("before", "")
+        after_text = allocation.get("after", "")
         
         # 智能截断到句子边界
         before_text = self._truncate_to_sentence(before_text, reverse=True)
@@ -119,8 +138,34 @@ class IntelligentContextBuilder:
             "cursor_line": self._get_current_line(text, cursor_pos)
         }
     
-    def _collect_codex_data(self, text: str, cursor_pos: int, document_id: str = "") -> List[Dict[str, Any]]:
-        """收集Codex系统数据"""
+    def _get_window_detector(self):
+        """获取光标窗口检测器，检测器或Codex管理器变化时重建"""
+        from core.context_codex_detector import ContextAwareCodexDetector
+        
+        reference_detector = self.reference_detector or getattr(self.shared, 'reference_detector', None)
+        detector = self._window_detector
+        if (detector is None or detector.codex_manager is not self.codex_manager
+                or detector.reference_detector is not reference_detector):
+            detector = self._window_detector = ContextAwareCodexDetector(
+                self.codex_manager, reference_detector
+            )
+        return detector
+    
+    @staticmethod
+    def _summary_document_id(document_id: str) -> str:
+        """文档摘要使用的文档ID（没有文档ID时使用默认ID）"""
+        return document_id if document_id else "default_document"
+    
+    def refresh_document_summary(self, text: str):
+        """在后台刷新当前文档的Codex条目摘要（编辑停顿后调用，补全时只读取缓存的摘要）"""
+        if not self.codex_manager or not text.strip():
+            return
+        document_id = self._get_document_metadata().get("document_id", "")
+        self._get_window_detector().schedule_summary(self._summary_document_id(document_id), text)
+    
+    def _collect_codex_data(self, text: str, cursor_pos: int, document_id: str = "",
+                            mode: str = "balanced") -> List[Dict[str, Any]]:
+        """收集Codex系统数据（只扫描光标附近的窗口）"""
         if not self.codex_manager:
             return []
         
@@ -140,30 +185,29 @@ class IntelligentContextBuilder:
                         "is_global": True
                     })
             
-            # 检测当前文本中提到的条目 - 修复：添加document_id参数
-            if hasattr(self.codex_manager, 'detect_references_in_text'):
-                try:
-                    # 修复：使用正确的方法签名，传递text和document_id
-                    # 如果document_id为空，使用默认值
-                    effective_document_id = document_id if document_id else "default_document"
-                    references = self.codex_manager.detect_references_in_text(text, effective_document_id)
-                    
-                    for ref in references[:10]:  # 最多10个引用
-                        if hasattr(ref, 'entry_id'):
-                            entry = self.codex_manager.get_entry(ref.entry_id)
-                            if entry and not any(e['id'] == entry.id for e in detected_entries):
-                                detected_entries.append({
-                                    "id": entry.id,
-                                    "title": entry.title,
-                                    "type": entry.entry_type.value,
-                                    "description": entry.description[:200],
-                                    "is_global": False,
-                                    "reference_text": getattr(ref, 'reference_text', '')
-                                })
-                except Exception as e:
-                    # 记录错误但不中断流程
-                    logger.warning(f"Codex引用检测失败: {e}")
-                    # 继续处理，不影响其他功能
+            # 检测光标附近窗口中提到的条目，按距离和频率排序
+            try:
+                effective_document_id = self._summary_document_id(document_id)
+                window_detector = self._get_window_detector()
+                ranked_entries = window_detector.detect(
+                    text, cursor_pos, mode, effective_document_id, limit=10  # 最多10个引用
+                )
+                
+                for ranked in ranked_entries:
+                    entry = self.codex_manager.get_entry(ranked.entry_id)
+                    if entry and not any(e['id'] == entry.id for e in detected_entries):
+                        detected_entries.append({
+                            "id": entry.id,
+                            "title": entry.title,
+                            "type": entry.entry_type.value,
+                            "description": entry.description[:200],
+                            "is_global": False,
+                            "reference_text": ranked.matched_text or entry.title
+                        })
+            except Exception as e:
+                # 记录错误但不中断流程
+                logger.warning(f"Codex引用检测失败: {e}")
+                # 继续处理，不影响其他功能
             
             logger.debug(f"Codex数据收集完成: {len(detected_entries)}个条目, 文档ID: {document_id}")
             return detected_entries
@@ -448,24 +492,35 @@ class DynamicPromptGenerator:
         Returns:
             完整的AI提示词
         """
+        return self.generate_prompt_layout(context_data, user_tags, completion_type, mode).to_prompt()
+    
+    def generate_prompt_layout(self, context_data: Dict[str, Any], user_tags: List[str] = None,
+                               completion_type: str = "text", mode: str = "balanced") -> 'PromptLayout':
+        """
+        生成分段提示词：稳定段作为系统提示词发送，易变段作为用户消息
+        
+        Returns:
+            PromptLayout
+        """
         if not self.prompt_manager:
             # 降级到简单提示词生成
-            return self._generate_simple_prompt(context_data, user_tags, completion_type, mode)
+            return self._generate_simple_prompt_layout(context_data, user_tags, completion_type, mode)
         
         try:
             # 创建简化提示词上下文
             prompt_context = self._build_prompt_context(context_data, user_tags, completion_type, mode)
             
             # 使用SinglePromptManager生成提示词
-            final_prompt = self.prompt_manager.generate_prompt(prompt_context)
+            layout = self.prompt_manager.generate_prompt_layout(prompt_context)
             
-            logger.debug(f"动态提示词生成完成: {len(final_prompt)}字符, 标签: {user_tags}")
-            return final_prompt
+            logger.debug(f"动态提示词生成完成: 稳定段{len(layout.stable_text)}字符, "
+                         f"易变段{len(layout.volatile_text)}字符, 标签: {user_tags}")
+            return layout
             
         except Exception as e:
             logger.error(f"动态提示词生成失败: {e}")
             # 降级处理
-            return self._generate_simple_prompt(context_data, user_tags, completion_type, mode)
+            return self._generate_simple_prompt_layout(context_data, user_tags, completion_type, mode)
     
     def _build_prompt_context(self, context_data: Dict[str, Any], user_tags: List[str],
                             completion_type: str, mode: str) -> SimplePromptContext:
@@ -491,10 +546,12 @@ class DynamicPromptGenerator:
             prompt_mode=PromptMode(mode) if mode in [pm.value for pm in PromptMode] else PromptMode.BALANCED
         )
         
+        # Codex条目：全局条目进入稳定段，光标附近检测到的条目进入易变段
+        prompt_context.codex_entries = list(context_data.get("codex_context", []))
+        
         # 设置用户偏好
         user_prefs = context_data.get("user_preferences", {})
         prompt_context.word_count = user_prefs.get("preferred_word_count", 300)
-        prompt_context.context_size = 500 if mode == "balanced" else (300 if mode == "fast" else 800)
         
         return prompt_context
     
@@ -502,11 +559,7 @@ class DynamicPromptGenerator:
         """使用上下文数据增强文本"""
         enhanced_text = base_text
         
-        # 添加Codex条目信息作为隐式上下文
-        codex_context = context_data.get("codex_context", [])
-        if codex_context:
-            # 不直接添加到文本中，而是通过变量注入
-            pass
+        # Codex条目通过 SimplePromptContext.codex_entries 注入，不添加到文本中
         
         # RAG上下文已经在AutoContextInjector中处理
         
@@ -515,36 +568,48 @@ class DynamicPromptGenerator:
     def _generate_simple_prompt(self, context_data: Dict[str, Any], user_tags: List[str],
                               completion_type: str, mode: str) -> str:
         """简单的降级提示词生成"""
+        return self._generate_simple_prompt_layout(context_data, user_tags, completion_type, mode).to_prompt()
+    
+    def _generate_simple_prompt_layout(self, context_data: Dict[str, Any], user_tags: List[str],
+                                     completion_type: str, mode: str) -> 'PromptLayout':
+        """简单的降级提示词生成（分段）"""
         text_context = context_data.get("text_context", {})
         before_text = text_context.get("before", "")
         
-        # 构建基础提示词
-        prompt = f"""请根据以下小说文本续写内容：
-
-【上文】
-{before_text[-300:] if len(before_text) > 300 else before_text}
+        # 续写要求只取决于类型、模式和标签，放在稳定段
+        requirements = f"""请根据用户提供的小说上文续写内容。
 
 【续写要求】
 - 续写类型：{completion_type}
 - 续写模式：{mode}
 - 保持文风一致
-- 情节自然发展
-"""
+- 情节自然发展"""
         
         # 添加风格标签指导
         if user_tags:
-            prompt += f"\n- 写作风格：{', '.join(user_tags)}"
+            requirements += f"\n- 写作风格：{', '.join(user_tags)}"
         
-        # 添加Codex信息
         codex_context = context_data.get("codex_context", [])
-        if codex_context:
-            character_names = [entry['title'] for entry in codex_context if entry['type'] == 'CHARACTER']
-            if character_names:
-                prompt += f"\n- 主要角色：{', '.join(character_names[:3])}"
+        
+        layout = PromptLayout()
+        layout.add_stable('system', requirements)
+        # 全局Codex条目不随光标变化，放在稳定段
+        layout.add_stable('codex_global', format_codex_entries(
+            [entry for entry in codex_context if entry.get('is_global')], "【世界设定与角色档案】"))
+        
+        prompt = f"""【上文】
+{before_text[-300:] if len(before_text) > 300 else before_text}"""
+        
+        # 添加光标附近检测到的角色
+        character_names = [entry['title'] for entry in codex_context
+                           if not entry.get('is_global') and entry['type'] == 'CHARACTER']
+        if character_names:
+            prompt += f"\n\n【主要角色】{', '.join(character_names[:3])}"
         
         prompt += "\n\n【续写内容】"
+        layout.add_volatile('context', prompt)
         
-        return prompt
+        return layout
 
 
 class EnhancedAIManager(QObject):
@@ -608,6 +673,17 @@ class EnhancedAIManager(QObject):
         self._completion_timer.setSingleShot(True)
         self._completion_timer.timeout.connect(self._trigger_completion)
         
+        # 输入停顿时的补全预取（默认关闭）
+        self._prefetcher = None
+        self._prefetch_timer = QTimer()
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.timeout.connect(self._trigger_prefetch)
+        
+        # 编辑停顿后在后台刷新文档Codex摘要
+        self._summary_timer = QTimer()
+        self._summary_timer.setSingleShot(True)
+        self._summary_timer.timeout.connect(self._refresh_document_summary)
+        
         logger.info("EnhancedAIManager初始化完成")
     
     def _init_ai_client(self):
@@ -751,33 +827,41 @@ class EnhancedAIManager(QObject):
             logger.warning("AI补全不可用")
             return False
         
-        # 缓存系统已移除，直接进行AI请求
-        
         try:
-            # 1. 智能上下文收集
-            context_mode = self._get_context_mode()
-            context_data = self.context_builder.collect_context(context, cursor_position, context_mode)
-            
-            # 2. 动态提示词生成
-            prompt = self.prompt_generator.generate_prompt(
-                context_data, user_tags, completion_type, context_mode
+            prompt, request_context, max_tokens, temperature = self._build_completion_request(
+                context, cursor_position, user_tags, completion_type
             )
             
-            # 3. 发送AI请求
-            request_context = {
-                'context': context,
-                'cursor_position': cursor_position,
-                'prompt': prompt,
-                'user_tags': user_tags or [],
-                'completion_type': completion_type,
-                'context_data': context_data
-            }
+            system_prompt = request_context['system_prompt']
+            
+            # 相同提示词和采样参数的结果直接从缓存返回，无需API往返
+            cache_key = self._get_completion_cache_key(prompt, max_tokens, temperature, system_prompt)
+            if cache_key:
+                cached = get_completion_cache().get(cache_key)
+                if cached is not None:
+                    request_context['cache_hit'] = True
+                    if self._prefetcher:
+                        self._prefetcher.record_cache_hit(cache_key)
+                    # 延迟到下一轮事件循环，保持与网络响应相同的信号时序
+                    QTimer.singleShot(0, lambda: self._on_completion_ready(cached, request_context))
+                    logger.info(f"增强AI补全命中缓存 - 类型: {completion_type}")
+                    return True
+                request_context['cache_key'] = cache_key
+                
+                # 相同上下文的预取请求仍在进行，直接接管其结果
+                if self._prefetcher and self._prefetcher.join_pending(
+                        cache_key, lambda result: self._on_prefetch_joined(
+                            result, prompt, request_context, max_tokens, temperature)):
+                    logger.info(f"增强AI补全接管预取请求 - 类型: {completion_type}")
+                    return True
             
             self._ai_client.complete_async(
                 prompt=prompt,
                 context=request_context,
-                max_tokens=self._get_max_tokens(context_mode),
-                temperature=self._get_temperature()
+                system_prompt=system_prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                cache_system_prompt=True
             )
             
             logger.info(f"增强AI补全请求已发送 - 类型: {completion_type}, 标签: {user_tags}")
@@ -788,6 +872,118 @@ class EnhancedAIManager(QObject):
             self.completionError.emit(f"补全请求失败: {str(e)}")
             return False
     
+    def _build_completion_request(self, context: str, cursor_position: int,
+                                  user_tags: List[str], completion_type: str):
+        """
+        收集上下文并生成提示词
+        
+        Returns:
+            (提示词, 请求上下文, max_tokens, temperature)；
+            稳定的系统提示词放在请求上下文的 system_prompt 中
+        """
+        # 1. 智能上下文收集
+        context_mode = self._get_context_mode()
+        context_data = self.context_builder.collect_context(context, cursor_position, context_mode)
+        
+        # 2. 动态提示词生成：稳定段作为系统提示词，便于服务端前缀缓存
+        layout = self.prompt_generator.generate_prompt_layout(
+            context_data, user_tags, completion_type, context_mode
+        )
+        prompt = layout.volatile_text
+        
+        max_tokens = self._get_max_tokens(context_mode)
+        temperature = self._get_temperature()
+        
+        request_context = {
+            'context': context,
+            'cursor_position': cursor_position,
+            'context_key': CompletionScheduler.make_context_key(context, cursor_position),
+            'prompt': prompt,
+            'system_prompt': layout.stable_text or None,
+            'prompt_prefix_key': layout.prefix_key,
+            'user_tags': user_tags or [],
+            'completion_type': completion_type,
+            'context_data': context_data
+        }
+        return prompt, request_context, max_tokens, temperature
+    
+    def _on_prefetch_joined(self, result: Optional[str], prompt: str, request_context: dict,
+                            max_tokens: int, temperature: float):
+        """被接管的预取请求完成"""
+        # 等待期间光标上下文已变化，结果作废
+        if self._current_editor:
+            current_key = CompletionScheduler.make_context_key(
+                self._current_editor.toPlainText(), self._current_editor.textCursor().position()
+            )
+            if current_key != request_context.get('context_key'):
+                return
+        
+        if result is None:
+            # 预取失败，按普通请求重新发送
+            self._ai_client.complete_async(
+                prompt=prompt,
+                context=request_context,
+                system_prompt=request_context.get('system_prompt'),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                cache_system_prompt=True
+            )
+            return
+        
+        self._on_completion_ready(result, request_context)
+    
+    # 补全预取
+    def _get_prefetcher(self) -> Optional['CompletionPrefetcher']:
+        """获取预取引擎（配置未开启时返回None）"""
+        if not self._completion_config.get('prefetch', False):
+            return None
+        if self._prefetcher is None:
+            budget = PrefetchBudget(
+                max_concurrent=self._completion_config.get('prefetch_max_concurrent', 1),
+                max_tokens_per_minute=self._completion_config.get('prefetch_tokens_per_minute', 4000)
+            )
+            self._prefetcher = CompletionPrefetcher(budget, parent=self)
+        return self._prefetcher
+    
+    def _schedule_prefetch(self):
+        """文本变化：作废旧的预取并重新等待输入停顿"""
+        self._prefetch_timer.stop()
+        if self._prefetcher:
+            self._prefetcher.cancel_stale()
+        
+        if (self._completion_enabled and self._ai_client and self._current_editor
+                and self._get_prefetcher()):
+            self._prefetch_timer.start(self._completion_config.get('prefetch_delay', 400))
+    
+    def _trigger_prefetch(self):
+        """输入停顿且光标位于可能的触发点时预取补全"""
+        prefetcher = self._get_prefetcher()
+        if not prefetcher or not self._current_editor or not self._ai_client:
+            return
+        # 低优先级：有正式请求进行时不预取
+        if self._ai_client.is_busy():
+            return
+        
+        if not prefetcher.has_capacity():
+            return
+        
+        text = self._current_editor.toPlainText()
+        cursor_pos = self._current_editor.textCursor().position()
+        if not CompletionPrefetcher.is_trigger_point(text, cursor_pos):
+            return
+        
+        # 上下文检测器和文档摘要不是线程安全的，提示词在GUI线程（输入停顿后）构建，
+        # 只有网络请求在后台事件循环中进行；与编辑器触发的补全使用相同的参数，保证缓存键一致
+        prompt, request_context, max_tokens, temperature = self._build_completion_request(
+            text, cursor_pos, [], "text"
+        )
+        system_prompt = request_context['system_prompt']
+        cache_key = self._get_completion_cache_key(prompt, max_tokens, temperature, system_prompt)
+        if not cache_key:
+            return
+        prefetcher.prefetch(cache_key, prompt, self._ai_client.config, max_tokens, temperature,
+                            system_prompt=system_prompt)
+    
     def request_completion_with_tags(self, context: str, cursor_position: int,
                                    tags: List[str], completion_type: str = "text") -> bool:
         """
@@ -853,6 +1049,21 @@ class EnhancedAIManager(QObject):
         
         return result
     
+    def _get_completion_cache_key(self, prompt: str, max_tokens: int, temperature: float,
+                                  system_prompt: Optional[str] = None) -> Optional[str]:
+        """生成补全缓存键，缓存被禁用时返回None"""
+        if not self._completion_config.get('response_cache', True):
+            return None
+        
+        ai_config = self._ai_client.config
+        model = f"{ai_config.provider.value}:{ai_config.model}@{ai_config.endpoint_url or ''}"
+        return get_completion_cache().make_key(
+            prompt, model, system_prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=getattr(ai_config, 'top_p', None)
+        )
+    
     def _get_temperature(self) -> float:
         """获取AI生成的温度参数"""
         # 从配置获取，默认0.7
@@ -862,13 +1073,16 @@ class EnhancedAIManager(QObject):
         except:
             return 0.7
     
-    # 缓存系统已完全移除
-    
     # 信号处理 - 增强版本
     @pyqtSlot(str, dict)
     def _on_completion_ready(self, response: str, context: dict):
         """处理补全完成 - 增强版本"""
         try:
+            # 写入补全缓存（缓存命中的结果不带cache_key）
+            cache_key = context.get('cache_key')
+            if cache_key:
+                get_completion_cache().put(cache_key, response)
+            
             # 清理和格式化响应
             completion = response.strip()
             
@@ -884,8 +1098,6 @@ class EnhancedAIManager(QObject):
             user_tags = context.get('user_tags', [])
             completion_type = context.get('completion_type', 'text')
             
-            # 缓存系统已移除，直接处理结果
-            
             # 发送信号
             self.completionReady.emit(completion, original_context)
             
@@ -962,7 +1174,8 @@ class EnhancedAIManager(QObject):
             'completion_enabled': self._completion_enabled,
             'auto_trigger_enabled': self._auto_trigger_enabled,
             'trigger_delay': self._trigger_delay,
-            'cache_enabled': False,  # 缓存已禁用
+            'cache_enabled': self._completion_config.get('response_cache', True),
+            'scheduler': self._ai_client.get_scheduler_metrics() if self._ai_client else {},
             'enhanced_features': {
                 'codex_integration': bool(self._codex_manager),
                 'rag_available': bool(self.context_builder.rag_service),
@@ -1011,6 +1224,11 @@ class EnhancedAIManager(QObject):
                 getattr(self, '_scheduled_completion_type', 'text')
             )
     
+    def _refresh_document_summary(self):
+        """编辑停顿：在后台重新计算当前文档的Codex摘要"""
+        if self._current_editor:
+            self.context_builder.refresh_document_summary(self._current_editor.toPlainText())
+    
     # 编辑器管理
     def set_editor(self, editor):
         """设置当前编辑器"""
@@ -1021,6 +1239,7 @@ class EnhancedAIManager(QObject):
                 self._current_editor.cursorPositionChanged.disconnect(self._on_cursor_changed)
                 if hasattr(self._current_editor, '_smart_completion'):
                     self._current_editor._smart_completion.aiCompletionRequested.disconnect(self._on_ai_completion_requested)
+                    self._current_editor._smart_completion.aiCompletionCancelled.disconnect(self._on_ai_completion_cancelled)
             except:
                 pass
 
@@ -1034,12 +1253,18 @@ class EnhancedAIManager(QObject):
             # 连接智能补全管理器的AI补全请求信号
             if hasattr(editor, '_smart_completion'):
                 editor._smart_completion.aiCompletionRequested.connect(self._on_ai_completion_requested)
+                editor._smart_completion.aiCompletionCancelled.connect(self._on_ai_completion_cancelled)
                 logger.debug("Connected enhanced smart completion AI request signal")
 
+            # 新打开的文档立即在后台计算Codex摘要
+            self._summary_timer.start(0)
             logger.debug("Editor set for EnhancedAIManager")
     
     def _on_text_changed(self):
         """处理文本变化"""
+        self._schedule_prefetch()
+        self._summary_timer.start(self._completion_config.get('summary_refresh_delay', 2000))
+        
         # 修复：只有在自动AI模式下才允许自动触发
         if (not self._auto_trigger_enabled or 
             not self._current_editor or 
@@ -1062,12 +1287,26 @@ class EnhancedAIManager(QObject):
     
     def _on_ai_completion_requested(self, text: str, context: dict):
         """处理AI补全请求 - 增强版本"""
-        cursor_pos = context.get('cursor_position', -1)
+        cursor_pos = context.get('cursor_position', context.get('position', -1))
         tags = context.get('user_tags', [])
         completion_type = context.get('completion_type', 'text')
         
         self.request_completion(text, cursor_pos, tags, completion_type)
     
+    def _on_ai_completion_cancelled(self, reason: str):
+        """光标上下文变化，取消与当前光标上下文不一致的进行中AI请求"""
+        if not self._ai_client:
+            return
+        if self._current_editor is None:
+            self._ai_client.cancel_request(reason)
+            return
+        context_key = CompletionScheduler.make_context_key(self._current_editor.toPlainText(),
+                                                           self._current_editor.textCursor().position())
+        if self._ai_client.cancel_if_stale(context_key):
+            completion = getattr(self._current_editor, '_smart_completion', None)
+            if completion is not None:
+                completion.on_ai_request_cancelled(reason)
+    
     # 为了保持完全兼容性，添加SimpleAIManager的所有公共方法
     def get_ai_status(self):
         """获取AI状态（兼容性方法）"""
@@ -1337,6 +1576,10 @@ class EnhancedAIManager(QObject):
             # 停止定时器
             if hasattr(self, '_completion_timer'):
                 self._completion_timer.stop()
+            self._prefetch_timer.stop()
+            self._summary_timer.stop()
+            if self._prefetcher:
+                self._prefetcher.cancel_stale()
             
             # 清理AI客户端
             if self._ai_client:
@@ -1412,7 +1655,11 @@ class EnhancedAIManager(QObject):
     def get_completion_stats(self) -> Dict[str, Any]:
         """获取补全统计信息"""
         return {
-            'cache_enabled': False,  # 缓存已禁用
+            'cache_enabled': self._completion_config.get('response_cache', True),
+            'response_cache': get_completion_cache().get_stats(),
+            'prefetch': self._prefetcher.get_stats() if self._prefetcher else None,
+            'prompt_cache': get_prompt_cache_stats().get_stats(),
+            'concurrency': get_limiter_registry().get_stats(),
             'completion_enabled': self._completion_enabled,
             'auto_trigger_enabled': self._auto_trigger_enabled,
             'punctuation_assist_enabled': getattr(self, '_punctuation_assist_enabled', True),
@@ -15,6 +15,7 @@ logger = logging.getLogger(__name__)
 # 尝试导入AI客户端
 try:
     from core.ai_qt_client import QtAIClient
+    from core.completion_scheduler import CompletionScheduler
     from core.config import Config
     AI_CLIENT_AVAILABLE = True
 except ImportError as e:
@@ -136,6 +137,7 @@ class SimpleAIManager(QObject):
             request_context = {
                 'context': context,
                 'cursor_position': cursor_position,
+                'context_key': CompletionScheduler.make_context_key(context, cursor_position),
                 'prompt': prompt
             }
             
@@ -363,6 +365,7 @@ class SimpleAIManager(QObject):
                 # 断开智能补全管理器的信号
                 if hasattr(self._current_editor, '_smart_completion'):
                     self._current_editor._smart_completion.aiCompletionRequested.disconnect(self._on_ai_completion_requested)
+                    self._current_editor._smart_completion.aiCompletionCancelled.disconnect(self._on_ai_completion_cancelled)
             except:
                 pass
 
@@ -376,6 +379,7 @@ class SimpleAIManager(QObject):
             # 连接智能补全管理器的AI补全请求信号
             if hasattr(editor, '_smart_completion'):
                 editor._smart_completion.aiCompletionRequested.connect(self._on_ai_completion_requested)
+                editor._smart_completion.aiCompletionCancelled.connect(self._on_ai_completion_cancelled)
                 logger.debug("Connected smart completion AI request signal")
 
             logger.debug("Editor set for SimpleAIManager")
@@ -401,7 +405,7 @@ class SimpleAIManager(QObject):
     
     def _on_ai_completion_requested(self, text: str, context: dict):
         """处理AI补全请求 - 修复参数传递问题"""
-        cursor_pos = context.get('cursor_position', -1)
+        cursor_pos = context.get('cursor_position', context.get('position', -1))
         trigger_type = context.get('trigger_type', 'auto')
         mode = context.get('mode', 'auto')
         
@@ -416,6 +420,20 @@ class SimpleAIManager(QObject):
             # 其他情况：使用上下文调用
             self.request_completion(text, cursor_pos)
     
+    def _on_ai_completion_cancelled(self, reason: str):
+        """光标上下文变化，取消与当前光标上下文不一致的进行中AI请求"""
+        if not self._ai_client:
+            return
+        if not getattr(self, '_current_editor', None):
+            self._ai_client.cancel_request(reason)
+            return
+        context_key = CompletionScheduler.make_context_key(self._current_editor.toPlainText(),
+                                                           self._current_editor.textCursor().position())
+        if self._ai_client.cancel_if_stale(context_key):
+            completion = getattr(self._current_editor, '_smart_completion', None)
+            if completion is not None:
+                completion.on_ai_request_cancelled(reason)
+    
     # 兼容性方法 - 为了支持原有接口
     def set_context_mode(self, mode: str):
         """设置上下文模式（兼容性方法）"""
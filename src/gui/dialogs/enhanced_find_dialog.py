@@ -4,7 +4,7 @@
 """
 
 import logging
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Set
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
     QLineEdit, QPushButton, QCheckBox, QTabWidget, QWidget, QGroupBox,
@@ -14,15 +14,26 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, pyqtSignal, QRegularExpression, QThread, pyqtSlot, QTimer
 from PyQt6.QtGui import QTextCursor, QTextDocument, QFont
 
+from core.search_index import SearchQuery, document_order, get_search_index, scan_documents
+from core.batch_replace import plan_replacements, apply_plan, replace_query, replace_document
+
 logger = logging.getLogger(__name__)
 
 
 class GlobalSearchWorker(QThread):
-    """全局搜索工作线程"""
+    """
+    全局搜索工作线程
+
+    先把项目全文索引与当前文档内容同步（只重新索引内容有变化的文档），
+    再用索引筛选候选行并精确匹配，结果按文档顺序分批发出；索引不可用时逐行扫描。
+    """
     
-    searchResult = pyqtSignal(str, str, int, str)  # 文档ID, 文档标题, 行号, 匹配行内容
+    searchBatch = pyqtSignal(list)  # [(文档ID, 文档标题, 行号, 匹配行内容), ...]
+    searchError = pyqtSignal(str)
     searchFinished = pyqtSignal()
     
+    BATCH_SIZE = 200
+    
     def __init__(self, project_manager, search_text: str, options: dict):
         super().__init__()
         self.project_manager = project_manager
@@ -31,76 +42,85 @@ class GlobalSearchWorker(QThread):
     
     def run(self):
         """执行全局搜索"""
-        print(f"🔍 全局搜索线程开始运行")
+        try:
+            project = self.project_manager.get_current_project() if self.project_manager else None
+            if not project:
+                logger.debug("Global search skipped: no current project")
+                return
 
-        if not self.project_manager:
-            print("❌ 项目管理器为空，搜索结束")
+            query = SearchQuery(self.search_text, self.options)
+            documents = dict(project.documents)
+            contents = {doc_id: document.content for doc_id, document in documents.items()}
+            order = document_order(documents)
+
+            index = get_search_index()
+            if index.is_attached:
+                index.sync(contents)
+                batches = index.search(query, order, self.BATCH_SIZE)
+            else:
+                batches = scan_documents(query, order, contents, self.BATCH_SIZE)
+
+            total = 0
+            for batch in batches:
+                if self.isInterruptionRequested():
+                    break
+                self.searchBatch.emit([(hit.doc_id, documents[hit.doc_id].name, hit.line_num, hit.line.strip())
+                                       for hit in batch])
+                total += len(batch)
+            logger.debug(f"Global search for '{self.search_text}' found {total} lines")
+
+        except ValueError as e:
+            self.searchError.emit(str(e))
+        except Exception as e:
+            logger.error(f"Global search error: {e}")
+            self.searchError.emit(str(e))
+        finally:
             self.searchFinished.emit()
-            return
 
-        try:
-            # 获取所有文档
-            print("📚 获取所有文档...")
 
-            # 检查项目管理器是否有当前项目
-            if not hasattr(self.project_manager, '_current_project') or not self.project_manager._current_project:
-                print("❌ 没有当前项目")
+class BatchReplaceWorker(QThread):
+    """
+    项目级替换工作线程
+
+    根据项目存储中的文档内容计算替换计划（不修改任何文档），完成后发出计划供预览。
+    """
+
+    planReady = pyqtSignal(object)  # ReplacePlan
+    planError = pyqtSignal(str)
+
+    def __init__(self, project_manager, search_text: str, replace_text: str, options: dict,
+                 excluded=()):
+        super().__init__()
+        self.project_manager = project_manager
+        self.search_text = search_text
+        self.replace_text = replace_text
+        self.options = options
+        self.excluded = set(excluded)
+
+    def run(self):
+        """计算替换计划"""
+        try:
+            project = self.project_manager.get_current_project() if self.project_manager else None
+            if not project:
+                self.planError.emit("没有打开的项目")
                 return
 
-            documents = self.project_manager._current_project.documents
-            print(f"📚 找到 {len(documents)} 个文档")
+            documents = dict(project.documents)
+            contents = {doc_id: document.content for doc_id, document in documents.items()}
+            titles = {doc_id: document.name for doc_id, document in documents.items()}
+            # 排除的文档仍参与索引同步，只是不做替换
+            order = [doc_id for doc_id in document_order(documents) if doc_id not in self.excluded]
 
-            for doc_id, document in documents.items():
-                print(f"🔍 搜索文档: {doc_id} - {document.name}")
-                content = document.content
-                if content:
-                    print(f"📄 文档内容长度: {len(content)}")
-                    self._search_in_content(doc_id, document.name, content)
-                else:
-                    print(f"❌ 文档内容为空: {doc_id}")
+            plan = plan_replacements(self.search_text, self.replace_text, self.options, order,
+                                     contents, titles, is_cancelled=self.isInterruptionRequested)
+            if plan is not None:
+                self.planReady.emit(plan)
 
+        except ValueError as e:
+            self.planError.emit(str(e))
         except Exception as e:
-            print(f"❌ 全局搜索异常: {e}")
-            logger.error(f"Global search error: {e}")
-        finally:
-            print("🏁 全局搜索完成")
-            self.searchFinished.emit()
-    
-    def _search_in_content(self, doc_id: str, doc_title: str, content: str):
-        """在内容中搜索"""
-        lines = content.split('\n')
-        print(f"🔍 在文档 {doc_title} 中搜索，共 {len(lines)} 行")
-
-        for line_num, line in enumerate(lines, 1):
-            if self._line_matches(line):
-                print(f"✅ 找到匹配项: {doc_title} 第{line_num}行 - {line.strip()}")
-                self.searchResult.emit(doc_id, doc_title, line_num, line.strip())
-            else:
-                print(f"❌ 第{line_num}行不匹配: {repr(line[:50])}")
-    
-    def _line_matches(self, line: str) -> bool:
-        """检查行是否匹配搜索条件"""
-        search_text = self.search_text
-        
-        if not self.options.get("case_sensitive", False):
-            line = line.lower()
-            search_text = search_text.lower()
-        
-        if self.options.get("regex", False):
-            try:
-                regex = QRegularExpression(self.search_text)
-                if not self.options.get("case_sensitive", False):
-                    regex.setPatternOptions(QRegularExpression.PatternOption.CaseInsensitiveOption)
-                return regex.match(line).hasMatch()
-            except:
-                return False
-        elif self.options.get("whole_word", False):
-            import re
-            pattern = r'\b' + re.escape(search_text) + r'\b'
-            flags = 0 if self.options.get("case_sensitive", False) else re.IGNORECASE
-            return bool(re.search(pattern, line, flags))
-        else:
-            return search_text in line
+            logger.error(f"Batch replace planning error: {e}")
+            self.planError.emit(str(e))
 
 
 class EnhancedFindDialog(QDialog):
@@ -108,12 +128,18 @@ class EnhancedFindDialog(QDialog):
     
     documentRequested = pyqtSignal(str)  # 请求打开文档
     
-    def __init__(self, parent=None, text_editor=None, project_manager=None):
+    def __init__(self, parent=None, text_editor=None, project_manager=None, editor_panel=None):
         super().__init__(parent)
         
         self._text_editor = text_editor
         self._project_manager = project_manager
+        self._editor_panel = editor_panel
         self._search_worker = None
+        self._replace_worker = None
+        # 被新任务取代但仍在运行的工作线程，保留引用直到线程结束
+        self._retired_workers: Set[QThread] = set()
+        self._replace_skipped: List[str] = []
+        self._search_error: Optional[str] = None
         
         self._init_ui()
         self._setup_connections()
@@ -183,6 +209,10 @@ class EnhancedFindDialog(QDialog):
         self._regex_check = QCheckBox("正则表达式")
         options_layout.addWidget(self._regex_check)
         
+        self._phrase_check = QCheckBox("短语匹配（取消后各词出现在同一行即可）")
+        self._phrase_check.setChecked(True)
+        options_layout.addWidget(self._phrase_check)
+        
         layout.addWidget(options_group)
         
         # 搜索范围 - 使用单选按钮组
@@ -289,7 +319,7 @@ class EnhancedFindDialog(QDialog):
         self._find_next_btn.setEnabled(not is_global or self._text_editor is not None)
         self._find_prev_btn.setEnabled(not is_global or self._text_editor is not None)
         self._replace_btn.setEnabled(not is_global or self._text_editor is not None)
-        self._replace_all_btn.setEnabled(not is_global or self._text_editor is not None)
+        self._replace_all_btn.setEnabled(not is_global or self._project_manager is not None)
     
     def _get_search_options(self) -> dict:
         """获取搜索选项"""
@@ -297,6 +327,7 @@ class EnhancedFindDialog(QDialog):
             "case_sensitive": self._case_sensitive_check.isChecked(),
             "whole_word": self._whole_word_check.isChecked(),
             "regex": self._regex_check.isChecked(),
+            "phrase": self._phrase_check.isChecked(),
         }
     
     def _find_next(self):
@@ -452,50 +483,181 @@ class EnhancedFindDialog(QDialog):
         pass
     
     def _replace_all(self):
-        """全部替换"""
-        # 实现全部替换逻辑
-        pass
+        """全部替换：当前文档在编辑器中替换，整个项目则计算替换计划并预览"""
+        search_text = self._search_edit.text()
+        if not search_text:
+            return
+        if self._global_search_radio.isChecked():
+            self._start_project_replace(search_text)
+        else:
+            self._replace_all_in_current_document(search_text)
+
+    def _replace_all_in_current_document(self, search_text: str):
+        """在当前编辑器中全部替换，作为一次可撤销的编辑"""
+        if not self._text_editor:
+            return
+        try:
+            query = replace_query(search_text, self._get_search_options())
+            replacement = replace_document(query, "", "", self._text_editor.toPlainText(),
+                                           self._replace_edit.text())
+        except ValueError as e:
+            self._show_message(f"替换失败: {e}")
+            return
+        if replacement is None:
+            self._show_message("未找到匹配项")
+            return
+
+        document = self._text_editor.document()
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        # 只改写发生变化的行，保留其余文本块的格式和光标
+        for change in reversed(replacement.changes):
+            block = document.findBlockByNumber(change.line_num - 1)
+            cursor.setPosition(block.position())
+            cursor.setPosition(block.position() + block.length() - 1, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(change.after)
+        cursor.endEditBlock()
+        self._show_message(f"已替换 {replacement.count} 处")
+
+    def _start_project_replace(self, search_text: str):
+        """在后台计算整个项目的替换计划"""
+        if not self._project_manager or not self._project_manager.get_current_project():
+            return
+        self._retire_worker(self._replace_worker)
+
+        # 编辑器中有未保存修改的文档不参与替换，避免覆盖用户的修改
+        excluded = []
+        if self._editor_panel is not None:
+            for doc_id, text in self._editor_panel.get_open_document_contents().items():
+                document = self._project_manager.get_document(doc_id)
+                if document is not None and document.content != text:
+                    excluded.append(doc_id)
+        self._replace_skipped = [self._project_manager.get_document(doc_id).name for doc_id in excluded]
+
+        self._results_label.setText("正在计算替换...")
+        self._replace_all_btn.setEnabled(False)
+        self._replace_worker = BatchReplaceWorker(self._project_manager, search_text, self._replace_edit.text(),
+                                                  self._get_search_options(), excluded)
+        self._replace_worker.planReady.connect(self._on_replace_plan_ready)
+        self._replace_worker.planError.connect(self._on_replace_plan_error)
+        self._replace_worker.finished.connect(self._on_replace_worker_finished)
+        self._replace_worker.start()
+
+    @pyqtSlot(object)
+    def _on_replace_plan_ready(self, plan):
+        """显示替换预览，确认后在一个事务中应用"""
+        if self.sender() is not self._replace_worker:
+            return
+        self._results_label.setText("搜索结果")
+        if not plan.documents:
+            self._show_message("未找到匹配项")
+            return
+
+        from .replace_preview_dialog import ReplacePreviewDialog
+        preview = ReplacePreviewDialog(plan, self._replace_skipped, self)
+        if preview.exec() != QDialog.DialogCode.Accepted:
+            return
+        selected = preview.selected_plan()
+
+        from PyQt6.QtWidgets import QMessageBox
+        try:
+            applied, conflicts = apply_plan(self._project_manager, selected)
+        except Exception as e:
+            logger.error(f"Batch replace failed: {e}")
+            QMessageBox.critical(self, "替换失败", f"替换未能保存，所有文档均未修改：\n{e}")
+            return
+
+        applied_ids = set(applied)
+        count = sum(doc.count for doc in selected.documents if doc.doc_id in applied_ids)
+        message = f"已在 {len(applied)} 个文档中替换 {count} 处"
+        if conflicts:
+            message += f"\n{len(conflicts)} 个文档在预览后被修改，已跳过"
+        self._results_tree.clear()
+        self._results_label.setText(message.split("\n")[0])
+        self._show_message(message)
+
+    @pyqtSlot(str)
+    def _on_replace_plan_error(self, message: str):
+        if self.sender() is self._replace_worker:
+            self._results_label.setText(f"替换失败: {message}")
+
+    @pyqtSlot()
+    def _on_replace_worker_finished(self):
+        if self.sender() is self._replace_worker:
+            self._on_scope_changed()
     
+    def _retire_worker(self, worker: Optional[QThread]):
+        """
+        停止被取代的工作线程
+
+        工作线程没有父对象，丢掉最后一个引用会销毁仍在运行的QThread；
+        这里保留引用，线程结束后再删除。
+        """
+        if worker is None or not worker.isRunning():
+            return
+        worker.requestInterruption()
+        self._retired_workers.add(worker)
+        worker.finished.connect(lambda: self._release_worker(worker))
+        if worker.isFinished():
+            # 连接信号前线程已经结束
+            self._release_worker(worker)
+
+    def _release_worker(self, worker: QThread):
+        self._retired_workers.discard(worker)
+        worker.deleteLater()
+
     def _start_global_search(self):
         """开始全局搜索"""
         search_text = self._search_edit.text()
-        print(f"🌍 开始全局搜索: '{search_text}'")
-
-        if not search_text:
-            print("❌ 搜索文本为空")
+        if not search_text or not self._project_manager:
             return
 
-        if not self._project_manager:
-            print("❌ 项目管理器为空")
-            return
+        # 停止仍在进行的上一次搜索，其后续结果在槽函数中忽略
+        self._retire_worker(self._search_worker)
 
         # 清空结果
         self._results_tree.clear()
         self._results_label.setText("搜索中...")
-        print("🔄 清空搜索结果，开始搜索...")
+        self._search_error = None
 
         # 启动搜索线程
         options = self._get_search_options()
-        print(f"🔧 全局搜索选项: {options}")
+        logger.debug(f"Global search: '{search_text}', options: {options}")
 
         self._search_worker = GlobalSearchWorker(self._project_manager, search_text, options)
-        self._search_worker.searchResult.connect(self._add_search_result)
+        self._search_worker.searchBatch.connect(self._add_search_results)
+        self._search_worker.searchError.connect(self._on_search_error)
         self._search_worker.searchFinished.connect(self._on_search_finished)
         self._search_worker.start()
-        print("🚀 全局搜索线程已启动")
     
-    @pyqtSlot(str, str, int, str)
-    def _add_search_result(self, doc_id: str, doc_title: str, line_num: int, line_content: str):
-        """添加搜索结果"""
-        item = QTreeWidgetItem([doc_title, str(line_num), line_content])
-        item.setData(0, Qt.ItemDataRole.UserRole, doc_id)
-        item.setData(1, Qt.ItemDataRole.UserRole, line_num)  # 存储行号
-        self._results_tree.addTopLevelItem(item)
-        print(f"➕ 添加搜索结果: {doc_title} 第{line_num}行")
+    @pyqtSlot(list)
+    def _add_search_results(self, results: list):
+        """批量添加搜索结果"""
+        if self.sender() is not self._search_worker:
+            return
+        items = []
+        for doc_id, doc_title, line_num, line_content in results:
+            item = QTreeWidgetItem([doc_title, str(line_num), line_content])
+            item.setData(0, Qt.ItemDataRole.UserRole, doc_id)
+            item.setData(1, Qt.ItemDataRole.UserRole, line_num)  # 存储行号
+            items.append(item)
+        self._results_tree.addTopLevelItems(items)
+        self._results_label.setText(f"搜索中... ({self._results_tree.topLevelItemCount()} 项)")
+    
+    @pyqtSlot(str)
+    def _on_search_error(self, message: str):
+        """搜索条件无效等错误"""
+        if self.sender() is self._search_worker:
+            self._search_error = message
+            self._results_label.setText(f"搜索失败: {message}")
     
     @pyqtSlot()
     def _on_search_finished(self):
         """搜索完成"""
+        if self.sender() is not self._search_worker:
+            return
+        if self._search_error:
+            return
         count = self._results_tree.topLevelItemCount()
         self._results_label.setText(f"搜索结果 ({count} 项)")
     
@@ -32,6 +32,8 @@ class ExportWorker(QThread):
         self.export_manager = export_manager
         self.options = options
         self.success = False
+        # 创建任务时清除上一次的取消标记，任务启动前的取消仍然有效
+        self.export_manager.reset_cancel()
         
     def run(self):
         """执行导出"""
@@ -139,6 +141,7 @@ class ExportDialog(QDialog):
         self._export_manager.exportProgress.connect(self._on_export_progress)
         self._export_manager.exportCompleted.connect(self._on_export_completed)
         self._export_manager.exportError.connect(self._on_export_error)
+        self._export_manager.exportCancelled.connect(self._on_export_cancelled)
     
     def _update_format_options(self):
         """更新格式相关选项"""
@@ -287,6 +290,20 @@ class ExportDialog(QDialog):
         logger.error(f"导出失败: {error}")
         QMessageBox.critical(self, "导出失败", error)
     
+    @pyqtSlot(str)
+    def _on_export_cancelled(self, output_path: str):
+        """导出已取消"""
+        self._status_label.setText("导出已取消")
+        logger.info(f"导出已取消: {output_path}")
+
+    def reject(self):
+        """导出进行中时取消导出，否则关闭对话框"""
+        if self._export_worker is not None and self._export_worker.isRunning():
+            self._export_manager.cancel()
+            self._status_label.setText("正在取消导出...")
+            return
+        super().reject()
+
     def _on_worker_finished(self):
         """工作线程完成"""
         self._set_ui_enabled(True)
@@ -14,6 +14,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, pyqtSignal, QRegularExpression
 from PyQt6.QtGui import QFont, QTextCursor, QTextDocument, QTextCharFormat, QColor
 
+from gui.editor.search_highlighter import IncrementalSearchHighlighter
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,7 +35,7 @@ class FindReplaceDialog(QDialog):
         # 搜索高亮
         self._highlight_format = QTextCharFormat()
         self._highlight_format.setBackground(QColor(255, 255, 0, 100))  # 黄色半透明背景
-        self._current_highlights = []
+        self._highlighter = IncrementalSearchHighlighter(text_editor, self._highlight_format, self)
 
         # 搜索历史
         self._search_history = []
@@ -187,6 +189,13 @@ class FindReplaceDialog(QDialog):
         # 选项变化
         self._forward_check.toggled.connect(self._on_direction_changed)
         self._backward_check.toggled.connect(self._on_direction_changed)
+
+        # 输入查找文本或修改匹配选项时增量高亮
+        self._find_edit.textChanged.connect(self._on_search_text_changed)
+        self._replace_find_edit.textChanged.connect(self._on_search_text_changed)
+        self._case_sensitive_check.toggled.connect(self._on_search_text_changed)
+        self._whole_word_check.toggled.connect(self._on_search_text_changed)
+        self._regex_check.toggled.connect(self._on_search_text_changed)
     
     def _on_tab_changed(self, index: int):
         """标签页切换处理"""
@@ -197,6 +206,11 @@ class FindReplaceDialog(QDialog):
             self._replace_btn.setEnabled(True)
             self._replace_all_btn.setEnabled(True)
     
+    def _on_search_text_changed(self, *args):
+        """查找文本或选项变化时更新高亮（不移动光标）"""
+        if self._text_editor and self.isVisible():
+            self._highlight_all_matches(self._get_search_text(), self._get_search_options())
+
     def _on_direction_changed(self, checked: bool):
         """搜索方向变化处理"""
         sender = self.sender()
@@ -567,71 +581,17 @@ class FindReplaceDialog(QDialog):
         QMessageBox.information(self, "替换", f"已替换 {count} 处。")
 
     def _highlight_all_matches(self, search_text: str, options: dict):
-        """高亮显示所有匹配项"""
+        """高亮显示所有匹配项（可见区域立即高亮，其余在空闲时增量扫描）"""
         if not self._text_editor or not search_text:
+            self._clear_highlights()
             return
-
-        # 清除之前的高亮
-        self._clear_highlights()
-
-        try:
-            # 验证正则表达式
-            if options.get("regex", False):
-                regex = QRegularExpression(search_text)
-                if not regex.isValid():
-                    return
-        except:
-            return
-
-        # 构建搜索标志
-        flags = QTextDocument.FindFlag(0)
-        if options.get("case_sensitive", False):
-            flags |= QTextDocument.FindFlag.FindCaseSensitively
-        if options.get("whole_word", False):
-            flags |= QTextDocument.FindFlag.FindWholeWords
-
-        # 搜索所有匹配项
-        cursor = QTextCursor(self._text_editor.document())
-        cursor.movePosition(QTextCursor.MoveOperation.Start)
-
-        while True:
-            if options.get("regex", False):
-                regex = QRegularExpression(search_text)
-                if not options.get("case_sensitive", False):
-                    regex.setPatternOptions(QRegularExpression.PatternOption.CaseInsensitiveOption)
-                found_cursor = self._text_editor.document().find(regex, cursor, flags)
-            else:
-                found_cursor = self._text_editor.document().find(search_text, cursor, flags)
-
-            if found_cursor.isNull():
-                break
-
-            # 添加高亮
-            self._add_highlight(found_cursor)
-            cursor = found_cursor
-
-    def _add_highlight(self, cursor: QTextCursor):
-        """添加高亮"""
-        # 创建额外选择来高亮文本
-        extra_selection = QTextEdit.ExtraSelection()
-        extra_selection.cursor = cursor
-        extra_selection.format = self._highlight_format
-
-        self._current_highlights.append(extra_selection)
-
-        # 应用高亮
-        self._apply_highlights()
-
-    def _apply_highlights(self):
-        """应用所有高亮"""
-        if self._text_editor:
-            self._text_editor.setExtraSelections(self._current_highlights)
+        # 只有匹配相关的选项影响高亮，方向等选项变化时可以沿用已有结果
+        match_options = {key: options.get(key, False) for key in ("case_sensitive", "whole_word", "regex")}
+        self._highlighter.set_query(search_text, match_options)
 
     def _clear_highlights(self):
         """清除所有高亮"""
-        self._current_highlights.clear()
-        if self._text_editor:
-            self._text_editor.setExtraSelections([])
+        self._highlighter.clear()
 
     def closeEvent(self, event):
         """对话框关闭时清除高亮"""
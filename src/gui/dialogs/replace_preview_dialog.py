@@ -0,0 +1,129 @@
+"""
+项目级替换预览对话框
+按文档列出每一处被修改的行（原文/替换后），可取消勾选不需要替换的文档
+"""
+
+import html
+import logging
+from typing import List
+
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTreeWidget, QTreeWidgetItem, QTextBrowser, QSplitter
+)
+from PyQt6.QtCore import Qt
+
+from core.batch_replace import ReplacePlan, LineChange
+
+logger = logging.getLogger(__name__)
+
+# 预览中每行最多显示的字符数，避免超长段落撑开列表
+PREVIEW_WIDTH = 120
+
+
+def _excerpt(text: str) -> str:
+    text = text.strip()
+    return text if len(text) <= PREVIEW_WIDTH else text[:PREVIEW_WIDTH] + "…"
+
+
+class ReplacePreviewDialog(QDialog):
+    """替换预览对话框"""
+
+    def __init__(self, plan: ReplacePlan, skipped_titles: List[str] = None, parent=None):
+        super().__init__(parent)
+        self._plan = plan
+        self._doc_items = {}
+
+        self.setWindowTitle("替换预览")
+        self.resize(900, 600)
+        self._init_ui(skipped_titles or [])
+
+    def _init_ui(self, skipped_titles: List[str]):
+        """初始化UI"""
+        layout = QVBoxLayout(self)
+
+        summary = (f"将在 {len(self._plan.documents)} 个文档中替换 {self._plan.count} 处："
+                   f"“{self._plan.search_text}” → “{self._plan.replace_text}”")
+        layout.addWidget(QLabel(summary))
+        if skipped_titles:
+            skipped = QLabel("以下文档在编辑器中有未保存的修改，已跳过：" + "、".join(skipped_titles))
+            skipped.setWordWrap(True)
+            layout.addWidget(skipped)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+
+        self._tree = QTreeWidget()
+        self._tree.setHeaderLabels(["文档 / 行号", "原文", "替换后"])
+        self._tree.setColumnWidth(0, 160)
+        self._tree.setColumnWidth(1, 340)
+        for doc in self._plan.documents:
+            doc_item = QTreeWidgetItem([f"{doc.title} ({doc.count})", "", ""])
+            doc_item.setFlags(doc_item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            doc_item.setCheckState(0, Qt.CheckState.Checked)
+            doc_item.setData(0, Qt.ItemDataRole.UserRole, doc.doc_id)
+            for change in doc.changes:
+                line_item = QTreeWidgetItem([str(change.line_num), _excerpt(change.before),
+                                             _excerpt(change.after)])
+                line_item.setData(0, Qt.ItemDataRole.UserRole, change)
+                doc_item.addChild(line_item)
+            self._doc_items[doc.doc_id] = doc_item
+        self._tree.addTopLevelItems(list(self._doc_items.values()))
+        if len(self._doc_items) == 1:
+            self._tree.expandAll()
+        self._tree.currentItemChanged.connect(self._on_current_item_changed)
+        self._tree.itemChanged.connect(self._update_apply_button)
+        splitter.addWidget(self._tree)
+
+        # 选中行的完整差异
+        self._diff_view = QTextBrowser()
+        splitter.addWidget(self._diff_view)
+        splitter.setSizes([420, 140])
+        layout.addWidget(splitter)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self._apply_btn = QPushButton("全部替换")
+        self._apply_btn.setDefault(True)
+        self._apply_btn.clicked.connect(self.accept)
+        button_layout.addWidget(self._apply_btn)
+        cancel_btn = QPushButton("取消")
+        cancel_btn.clicked.connect(self.reject)
+        button_layout.addWidget(cancel_btn)
+        layout.addLayout(button_layout)
+
+    def _on_current_item_changed(self, current: QTreeWidgetItem, previous: QTreeWidgetItem):
+        """显示选中行的差异，替换位置高亮"""
+        change = current.data(0, Qt.ItemDataRole.UserRole) if current else None
+        if not isinstance(change, LineChange):
+            self._diff_view.clear()
+            return
+        before, after = change.before, change.after
+        # 去掉公共前后缀，剩下的部分即为被修改的区域
+        prefix = 0
+        while prefix < min(len(before), len(after)) and before[prefix] == after[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < min(len(before), len(after)) - prefix
+               and before[-1 - suffix] == after[-1 - suffix]):
+            suffix += 1
+
+        def render(text: str, color: str) -> str:
+            end = len(text) - suffix
+            return (html.escape(text[:prefix])
+                    + f'<span style="background-color: {color};">{html.escape(text[prefix:end])}</span>'
+                    + html.escape(text[end:]))
+
+        self._diff_view.setHtml(f"<p><b>−</b> {render(before, '#f5c2c7')}</p>"
+                                f"<p><b>+</b> {render(after, '#badbcc')}</p>")
+
+    def _update_apply_button(self, *args):
+        self._apply_btn.setEnabled(bool(self.selected_document_ids()))
+
+    def selected_document_ids(self) -> List[str]:
+        """勾选的文档ID"""
+        return [doc_id for doc_id, item in self._doc_items.items()
+                if item.checkState(0) == Qt.CheckState.Checked]
+
+    def selected_plan(self) -> ReplacePlan:
+        """只包含勾选文档的替换计划"""
+        return self._plan.select(self.selected_document_ids())
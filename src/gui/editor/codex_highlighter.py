@@ -13,6 +13,8 @@ from PyQt6.QtGui import (
 )
 from PyQt6.QtWidgets import QTextEdit
 
+from core.reference_cache import detect_references_cached
+
 logger = logging.getLogger(__name__)
 
 
@@ -133,8 +135,8 @@ class CodexHighlighter(QObject):
         self._last_text = current_text
         
         try:
-            # 检测引用
-            references = self._reference_detector.detect_references(current_text)
+            # 检测引用（未修改的段落直接复用缓存结果）
+            references = detect_references_cached(self._reference_detector, current_text)
             self._last_references = references
             
             # 清除现有高亮
@@ -542,3 +542,23 @@ class EditorPanel(QWidget):
         """设置文档内容"""
         if document_id in self._document_tabs:
             self._document_tabs[document_id].set_document_content(content, document_id)
+
+    def get_open_document_contents(self) -> Dict[str, str]:
+        """获取所有已打开文档在编辑器中的内容（可能包含未保存的修改）"""
+        return {document_id: editor.get_document_content()
+                for document_id, editor in self._document_tabs.items()
+                if document_id != "default_doc"}
+
+    def reload_documents(self, contents: Dict[str, str]):
+        """用外部修改后的内容（如项目级替换）刷新已打开的编辑器，尽量保持光标位置"""
+        for document_id, content in contents.items():
+            editor = self._document_tabs.get(document_id)
+            if editor is None or editor.get_document_content() == content:
+                continue
+            position = editor.textCursor().position()
+            editor.set_document_content(content, document_id)
+            cursor = editor.textCursor()
+            cursor.setPosition(min(position, len(content)))
+            editor.setTextCursor(cursor)
+            if document_id == self._current_document_id:
+                self._word_count_label.setText(f"字数: {self._calculate_word_count(content)}")
@@ -0,0 +1,266 @@
+"""
+增量搜索高亮
+在查找框输入时高亮编辑器中的所有匹配：搜索条件只编译一次，先同步扫描可见的文本块，
+其余文本块在空闲时分片扫描，每片限定耗时，不阻塞输入。
+查询在上一次的基础上延长（如继续输入字符）时，只需复查上一次有匹配的文本块。
+额外选区只为视口附近的匹配创建，滚动时更新，匹配再多也不会拖慢重绘。
+搜索条件使用与查找对话框相同的 QRegularExpression（PCRE2），高亮与查找下一个的结果一致。
+"""
+
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QTimer, QRegularExpression, pyqtSignal
+from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor
+from PyQt6.QtWidgets import QTextEdit
+
+logger = logging.getLogger(__name__)
+
+
+def compile_search_pattern(text: str, options: dict) -> Optional[QRegularExpression]:
+    """
+    按查找选项编译搜索条件
+
+    与 QTextDocument.find 的选项语义一致：不区分大小写时使用 CaseInsensitiveOption；
+    全字匹配要求匹配前后不是字母或数字（FindWholeWords 的判断方式）。
+
+    Returns:
+        编译后的正则表达式；搜索文本为空或正则表达式无效时返回None
+    """
+    if not text:
+        return None
+    pattern = text if options.get("regex", False) else QRegularExpression.escape(text)
+    if options.get("whole_word", False):
+        pattern = r'(?<![\p{L}\p{N}])(?:' + pattern + r')(?![\p{L}\p{N}])'
+    regex = QRegularExpression(pattern)
+    if not options.get("case_sensitive", False):
+        regex.setPatternOptions(QRegularExpression.PatternOption.CaseInsensitiveOption)
+    if not regex.isValid():
+        return None
+    return regex
+
+
+class IncrementalSearchHighlighter(QObject):
+    """
+    编辑器搜索结果的增量高亮器
+
+    匹配结果按文本块号保存（块内位置以UTF-16代码单元计，与Qt一致）；
+    文档内容变化后重新扫描。
+    """
+
+    # 扫描进度 (已找到的匹配数, 是否已扫描完整个文档)
+    matchesUpdated = pyqtSignal(int, bool)
+
+    SLICE_SECONDS = 0.008       # 每个空闲分片的最长耗时
+    APPLY_INTERVAL = 0.1        # 后台扫描期间刷新高亮的最短间隔
+
+    def __init__(self, editor, highlight_format: Optional[QTextCharFormat] = None, parent=None):
+        super().__init__(parent)
+        if highlight_format is None:
+            highlight_format = QTextCharFormat()
+            highlight_format.setBackground(QColor(255, 255, 0, 100))
+        self._format = highlight_format
+
+        self._editor = None
+        self._text = ""
+        self._options: dict = {}
+        self._pattern: Optional[QRegularExpression] = None
+        self._matches: Dict[int, List[Tuple[int, int]]] = {}    # 块号 -> [(起始, 结束), ...]
+        self._scanned: set = set()
+        self._pending: List[int] = []
+        self._window: Optional[Tuple[int, int]] = None          # 已设置额外选区的块号范围
+        self._window_dirty = False
+        self._last_apply = 0.0
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._scan_slice)
+
+        self.set_editor(editor)
+
+    # ---- 公共接口 ----
+
+    @property
+    def match_count(self) -> int:
+        return sum(len(spans) for spans in self._matches.values())
+
+    @property
+    def is_finished(self) -> bool:
+        return self._pattern is not None and not self._pending
+
+    def matches(self) -> List[Tuple[int, int]]:
+        """已找到的匹配（文档内的起止位置，按位置排序）"""
+        if self._editor is None:
+            return []
+        document = self._editor.document()
+        result = []
+        for block_number in sorted(self._matches):
+            position = document.findBlockByNumber(block_number).position()
+            result.extend((position + start, position + end) for start, end in self._matches[block_number])
+        return result
+
+    def set_editor(self, editor):
+        """切换高亮的编辑器"""
+        if self._editor is not None:
+            self.clear()
+            try:
+                self._editor.document().contentsChanged.disconnect(self._on_contents_changed)
+                self._editor.verticalScrollBar().valueChanged.disconnect(self._on_scrolled)
+            except (TypeError, RuntimeError):
+                pass
+        self._editor = editor
+        if editor is not None:
+            editor.document().contentsChanged.connect(self._on_contents_changed)
+            editor.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+
+    def set_query(self, text: str, options: Optional[dict] = None):
+        """
+        设置搜索条件并开始高亮
+
+        新条件是上一次条件的延长（选项相同、非正则、非全字、包含上一次的文本）时，
+        上一次没有匹配的文本块不可能匹配，只复查有匹配的和尚未扫描的文本块。
+        """
+        options = dict(options or {})
+        pattern = compile_search_pattern(text, options)
+        if pattern is None or self._editor is None:
+            self.clear()
+            return
+
+        block_count = self._editor.document().blockCount()
+        if self._is_refinement(text, options):
+            pending = set(self._matches)
+            if len(self._scanned) < block_count:
+                pending.update(number for number in range(block_count) if number not in self._scanned)
+            self._scanned.difference_update(self._matches)
+        else:
+            pending = set(range(block_count))
+            self._scanned = set()
+        self._matches = {}
+        self._window_dirty = True
+        self._text, self._options, self._pattern = text, options, pattern
+        self._start_scan(pending)
+
+    def clear(self):
+        """清除高亮并停止扫描"""
+        self._timer.stop()
+        had_highlights = self._window is not None
+        self._text, self._options, self._pattern = "", {}, None
+        self._matches = {}
+        self._scanned, self._pending = set(), []
+        self._window = None
+        if had_highlights and self._editor is not None:
+            self._editor.setExtraSelections([])
+
+    # ---- 扫描 ----
+
+    def _is_refinement(self, text: str, options: dict) -> bool:
+        if not self._text or options != self._options:
+            return False
+        if options.get("regex", False) or options.get("whole_word", False):
+            return False
+        if options.get("case_sensitive", False):
+            return self._text in text
+        return self._text.lower() in text.lower()
+
+    def _visible_range(self) -> Tuple[int, int]:
+        """当前视口中的文本块号范围"""
+        rect = self._editor.viewport().rect()
+        first = self._editor.cursorForPosition(rect.topLeft()).blockNumber()
+        last = self._editor.cursorForPosition(rect.bottomRight()).blockNumber()
+        return first, max(first, last)
+
+    def _start_scan(self, pending: set):
+        # 可见的文本块立即扫描，其余按文档顺序在空闲时扫描
+        first, last = self._visible_range()
+        document = self._editor.document()
+        for number in range(first, last + 1):
+            if number in pending:
+                pending.discard(number)
+                self._scan_block(document, number)
+        self._pending = sorted(pending, reverse=True)
+        self._apply()
+        if self._pending:
+            self._timer.start()
+        else:
+            self._timer.stop()
+            self.matchesUpdated.emit(self.match_count, True)
+
+    def _scan_block(self, document, number: int):
+        block = document.findBlockByNumber(number)
+        self._scanned.add(number)
+        if not block.isValid():
+            return
+        spans = []
+        # 匹配位置以UTF-16代码单元计，与文本块内的光标位置一致
+        iterator = self._pattern.globalMatch(block.text())
+        while iterator.hasNext():
+            match = iterator.next()
+            if match.capturedLength() > 0:
+                spans.append((match.capturedStart(), match.capturedEnd()))
+        if not spans:
+            return
+        self._matches[number] = spans
+        if self._window is not None and self._window[0] <= number <= self._window[1]:
+            self._window_dirty = True
+
+    def _scan_slice(self):
+        """空闲时扫描一片文本块，耗时不超过 SLICE_SECONDS"""
+        if self._pattern is None or self._editor is None:
+            self._timer.stop()
+            return
+        document = self._editor.document()
+        deadline = time.perf_counter() + self.SLICE_SECONDS
+        while self._pending and time.perf_counter() < deadline:
+            self._scan_block(document, self._pending.pop())
+
+        finished = not self._pending
+        if finished:
+            self._timer.stop()
+        if finished or time.perf_counter() - self._last_apply >= self.APPLY_INTERVAL:
+            self._apply()
+            self.matchesUpdated.emit(self.match_count, finished)
+
+    # ---- 高亮 ----
+
+    def _apply(self):
+        """为视口及其上下各一屏范围内的匹配设置额外选区"""
+        self._last_apply = time.perf_counter()
+        first, last = self._visible_range()
+        page = last - first + 1
+        window = (max(0, first - page), last + page)
+        if window == self._window and not self._window_dirty:
+            return
+        self._window, self._window_dirty = window, False
+
+        document = self._editor.document()
+        selections = []
+        for number in range(window[0], window[1] + 1):
+            spans = self._matches.get(number)
+            if not spans:
+                continue
+            position = document.findBlockByNumber(number).position()
+            for start, end in spans:
+                selection = QTextEdit.ExtraSelection()
+                cursor = QTextCursor(document)
+                cursor.setPosition(position + start)
+                cursor.setPosition(position + end, QTextCursor.MoveMode.KeepAnchor)
+                selection.cursor = cursor
+                selection.format = self._format
+                selections.append(selection)
+        self._editor.setExtraSelections(selections)
+
+    def _on_scrolled(self, value: int):
+        if self._pattern is not None:
+            first, last = self._visible_range()
+            # 视口仍在已设置选区的范围内时无需更新
+            if self._window is None or not (self._window[0] <= first and last <= self._window[1]):
+                self._apply()
+
+    def _on_contents_changed(self):
+        """文档内容变化后块号和位置可能失效，重新扫描"""
+        if self._pattern is None:
+            return
+        text, options = self._text, self._options
+        self._text = ""     # 不作为延长查询处理
+        self.set_query(text, options)
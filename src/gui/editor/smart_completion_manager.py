@@ -26,6 +26,7 @@ class SmartCompletionManager(QObject):
     
     # 信号定义
     aiCompletionRequested = pyqtSignal(str, dict)  # AI补全请求
+    aiCompletionCancelled = pyqtSignal(str)  # 取消进行中的AI补全请求 (原因)
     
     def __init__(self, text_editor, completion_engine: CompletionEngine):
         super().__init__()
@@ -107,6 +108,7 @@ class SmartCompletionManager(QObject):
 
         # 文本编辑器信号
         self._text_editor.textChanged.connect(self._on_text_changed)
+        self._text_editor.cursorPositionChanged.connect(self._on_cursor_position_changed)
         
     def set_completion_mode(self, mode: str):
         """设置补全模式
@@ -231,15 +233,16 @@ class SmartCompletionManager(QObject):
             logger.debug(f"防止重复触发: position={position}")
             return
 
-        # 🔧 修复：增强重复检查 - 检查时间间隔
-        import time
+        # 🔧 修复：增强重复检查 - 同一位置的快速重复触发视为重复按键；
+        # 光标上下文已变化的新请求立即发出，由AI客户端取消并替换进行中的旧请求
         current_time = time.time()
-        if hasattr(self, '_last_trigger_time'):
+        if hasattr(self, '_last_trigger_time') and self._last_trigger_pos == position:
             time_diff = current_time - self._last_trigger_time
             if time_diff < 0.3:  # 300ms内重复触发
                 logger.debug(f"⚠️ 触发间隔过短({time_diff:.3f}s)，跳过重复触发")
                 return
         self._last_trigger_time = current_time
+        self._last_trigger_pos = position
 
         # 🔧 修复：确保清理任何残留的Ghost Text状态
         if self._ghost_completion and self._ghost_completion.has_active_ghost_text():
@@ -631,6 +634,35 @@ class SmartCompletionManager(QObject):
         if self._completion_mode == 'auto_ai':
             self.trigger_completion('auto')
             
+    def _is_ai_request_in_flight(self) -> bool:
+        """是否有已发出但尚未返回的AI补全请求"""
+        return (hasattr(self, '_ai_timeout_timer') and self._ai_timeout_timer.isActive()
+                and not getattr(self, '_ai_request_completed', False))
+
+    def _cancel_stale_ai_request(self, reason: str = 'context_changed'):
+        """
+        光标上下文变化后请求取消进行中的AI请求，避免等待一个不会被看到的补全
+
+        AI管理器只在请求与当前光标上下文不一致时取消，并通过 on_ai_request_cancelled 通知；
+        上下文又回到请求位置时请求继续有效，补全状态保持不变。
+        """
+        if not self._is_ai_request_in_flight():
+            return
+        logger.debug(f"🛑 光标上下文已变化，请求取消进行中的AI补全 ({reason})")
+        self.aiCompletionCancelled.emit(reason)
+
+    def on_ai_request_cancelled(self, reason: str = 'context_changed'):
+        """AI管理器确实取消了进行中的请求"""
+        if not self._is_ai_request_in_flight():
+            return
+        logger.debug(f"🛑 进行中的AI补全请求已取消 ({reason})")
+        self._reset_completion_state(success=False, reason=reason)
+
+    def _on_cursor_position_changed(self):
+        """光标移动处理：离开请求位置时取消进行中的AI请求"""
+        if self._is_ai_request_in_flight() and self._text_editor.textCursor().position() != self._last_completion_pos:
+            self._cancel_stale_ai_request()
+
     def _on_text_changed(self):
         """文本变化处理"""
         if self._completion_mode == 'disabled':
@@ -641,6 +673,9 @@ class SmartCompletionManager(QObject):
             logger.debug("🚫 检测到活跃的Ghost Text，跳过textChanged处理以防止循环")
             return
 
+        # 用户继续输入：立即取消已过期的AI请求，而不是等它返回
+        self._cancel_stale_ai_request()
+
         # 🔧 修复：检查是否正在进行AI补全，防止重复触发
         if self._is_completing:
             logger.debug("🚫 正在进行补全，跳过textChanged处理")
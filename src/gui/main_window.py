@@ -91,6 +91,9 @@ class MainWindow(QMainWindow):
             if self._codex_manager:
                 self._shared.codex_manager = self._codex_manager
                 logger.info("Codex管理器已注册到共享对象")
+                
+                from core.analysis_service import get_analysis_service
+                get_analysis_service().set_codex_manager(self._codex_manager)
             if self._reference_detector:
                 self._shared.reference_detector = self._reference_detector
                 logger.info("引用检测器已注册到共享对象")
@@ -114,6 +117,12 @@ class MainWindow(QMainWindow):
         self._statistics_update_timer.timeout.connect(self._update_statistics_delayed)
         self._pending_text = ""
 
+        # 批量保存（项目级替换）后合并执行一次RAG索引和Codex引用更新
+        self._batch_index_timer = QTimer()
+        self._batch_index_timer.setSingleShot(True)
+        self._batch_index_timer.timeout.connect(self._index_batch_saved_documents)
+        self._pending_batch_documents: set = set()
+
         self._init_ui()
         self._init_layout()
         
@@ -378,6 +387,8 @@ class MainWindow(QMainWindow):
         # 连接共享对象的文档保存信号到自动索引
         if self._shared and hasattr(self._shared, 'documentSaved'):
             self._shared.documentSaved.connect(self._on_document_saved_auto_index)
+        if self._shared and hasattr(self._shared, 'documentsSaved'):
+            self._shared.documentsSaved.connect(self._on_documents_batch_saved)
 
         if hasattr(self._editor_panel, 'documentSaved'):
             self._editor_panel.documentSaved.connect(self._on_document_saved)
@@ -735,6 +746,57 @@ class MainWindow(QMainWindow):
             logger.error(f"Failed to schedule auto indexing: {e}")
             # 不影响其他操作，只记录错误
 
+    @pyqtSlot(list)
+    def _on_documents_batch_saved(self, document_ids: list):
+        """批量保存后刷新已打开的编辑器，并合并安排一次索引更新"""
+        contents = {doc_id: self._project_manager.get_document_content(doc_id) for doc_id in document_ids}
+        if self._editor_panel:
+            self._editor_panel.reload_documents(contents)
+        self._pending_batch_documents.update(document_ids)
+        # 延迟2秒，期间的多次批量保存合并处理
+        self._batch_index_timer.start(2000)
+
+    def _index_batch_saved_documents(self):
+        """为批量保存的文档更新Codex引用，并在一个后台任务中更新RAG索引"""
+        contents = {}
+        for doc_id in self._pending_batch_documents:
+            document = self._project_manager.get_document(doc_id)
+            if document is not None:
+                contents[doc_id] = document.content
+        self._pending_batch_documents.clear()
+        if not contents:
+            return
+
+        if self._codex_manager and hasattr(self._codex_manager, 'update_references_for_documents'):
+            try:
+                self._codex_manager.update_references_for_documents(contents)
+            except Exception as e:
+                logger.error(f"Failed to update codex references after batch save: {e}")
+
+        if not (self._ai_manager and hasattr(self._ai_manager, 'index_document')):
+            return
+        from PyQt6.QtCore import QThreadPool, QRunnable
+
+        class BatchIndexWorker(QRunnable):
+            def __init__(self, ai_manager, contents):
+                super().__init__()
+                self.ai_manager = ai_manager
+                self.contents = contents
+
+            def run(self):
+                for document_id, content in self.contents.items():
+                    try:
+                        if hasattr(self.ai_manager, 'index_document_sync'):
+                            self.ai_manager.index_document_sync(document_id, content)
+                        else:
+                            self.ai_manager.index_document(document_id, content)
+                    except Exception as e:
+                        logger.error(f"Failed to index document {document_id} in background: {e}")
+                logger.info(f"Batch indexed {len(self.contents)} documents for RAG")
+
+        QThreadPool.globalInstance().start(BatchIndexWorker(self._ai_manager, contents))
+        logger.debug(f"Batch indexing started for {len(contents)} documents")
+
     @pyqtSlot(str)
     def _on_document_selected(self, document_id: str):
         logger.info(f"Document selected: {document_id}")
@@ -1268,7 +1330,8 @@ class MainWindow(QMainWindow):
             self._find_replace_dialog = EnhancedFindDialog(
                 self, 
                 current_text_editor, 
-                self._project_manager
+                self._project_manager,
+                self._editor_panel
             )
             # 连接文档跳转信号
             self._find_replace_dialog.documentRequested.connect(self._on_document_requested)
@@ -1357,6 +1420,24 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 logger.error(f"清理AI管理器时出错: {e}")
         
+        # 关闭后台分析进程池
+        try:
+            from core.analysis_service import shutdown_analysis_service
+            shutdown_analysis_service()
+        except Exception as e:
+            logger.warning(f"关闭分析服务时出错: {e}")
+        
+        # 停止AI请求事件循环线程，并关闭HTTP长连接会话
+        try:
+            from core.async_loop_thread import shutdown_ai_event_loop
+            from core.http_session_pool import shutdown_http_session_pool
+            from core.completion_cache import shutdown_completion_cache
+            shutdown_ai_event_loop()
+            shutdown_http_session_pool()
+            shutdown_completion_cache()
+        except Exception as e:
+            logger.warning(f"关闭HTTP会话池时出错: {e}")
+        
         # 清理其他资源
         try:
             # 确保所有面板都正确关闭
@@ -6,15 +6,27 @@
 import math
 import time
 import logging
+import threading
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import List, Dict, Tuple, Optional, Protocol, Callable
 from enum import Enum
 
-from PyQt6.QtCore import QPointF, QRectF, QTimer, pyqtSignal, QObject
-from PyQt6.QtGui import QColor, QPainter, QPen, QBrush, QFont
+from PyQt6.QtCore import Qt, QPointF, QRectF, QTimer, pyqtSignal, QObject
+from PyQt6.QtGui import QColor, QPainter, QPen, QBrush, QFont, QPainterPath, QStaticText, QTransform
 from PyQt6.QtWidgets import QWidget
 
+from .graph_spatial_index import GraphSpatialIndex
+
+# 可选依赖：NumPy可用时使用向量化的力计算（斥力为Barnes–Hut近似）
+try:
+    import numpy as np
+    from .graph_forces import layout_step, pack_edges
+    from .graph_simulation import PhysicsSimulationWorker
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +57,16 @@ class GraphConfig:
     max_fps: int = 60
     simulation_threshold: float = 0.1
     max_nodes_for_realtime: int = 100
+    barnes_hut_theta: float = 0.8       # Barnes–Hut精度参数，越小越精确（0为精确计算）
+    barnes_hut_min_nodes: int = 200     # 节点数达到该值时使用四叉树近似，否则两两计算
+    max_simulation_iterations: int = 3000  # 后台模拟的迭代上限，达到后视为稳定
+    spatial_cell_size: float = 100.0    # 空间索引网格边长（世界坐标）
+    lod_enabled: bool = True
+    lod_overview_scale: float = 0.35    # 每单位像素数低于该值时聚合为簇
+    lod_detail_scale: float = 0.8       # 每单位像素数达到该值时绘制箭头和标签
+    lod_cluster_pixels: float = 24.0    # 聚合簇在屏幕上的边长（像素）
+    lod_overview_max_edges: int = 1000  # 聚合视图最多绘制的簇间连线数
+    label_cache_size: int = 5000        # QStaticText标签缓存上限
     
     # UI参数
     enable_animations: bool = True
@@ -158,9 +180,11 @@ class LayoutEngine(ABC):
 class ForceDirectedEngine(LayoutEngine):
     """力导向布局引擎 - 优化版本"""
     
+    MAX_VELOCITY = 10.0  # 限制最大速度防止震荡
+
     def __init__(self, config: GraphConfig):
         super().__init__(config)
-        self.quadtree = None  # 未来可以添加四叉树优化
+        self.use_vectorized = NUMPY_AVAILABLE
     
     def initialize_positions(self, nodes: Dict[str, GraphNode]):
         """随机初始化节点位置"""
@@ -178,6 +202,8 @@ class ForceDirectedEngine(LayoutEngine):
     def calculate_forces(self, nodes: Dict[str, GraphNode], edges: List[GraphEdge]) -> bool:
         """优化的力计算"""
         self.iteration_count += 1
+        if self.use_vectorized and nodes:
+            return self._calculate_forces_vectorized(nodes, edges)
         
         # 重置力
         for node in nodes.values():
@@ -198,7 +224,7 @@ class ForceDirectedEngine(LayoutEngine):
         for node in nodes.values():
             if not node.fixed:
                 # 限制最大速度防止震荡
-                max_velocity = 10.0
+                max_velocity = self.MAX_VELOCITY
                 velocity = math.sqrt(node.vx ** 2 + node.vy ** 2)
                 if velocity > max_velocity:
                     node.vx = (node.vx / velocity) * max_velocity
@@ -211,6 +237,25 @@ class ForceDirectedEngine(LayoutEngine):
         avg_energy = total_energy / len(nodes) if nodes else 0
         return avg_energy < self.config.simulation_threshold
     
+    def _calculate_forces_vectorized(self, nodes: Dict[str, GraphNode], edges: List[GraphEdge]) -> bool:
+        """NumPy版本的力计算，与逐对计算的结果一致（斥力在节点较多时为近似值）"""
+        node_list = list(nodes.values())
+        count = len(node_list)
+        x = np.fromiter((node.x for node in node_list), dtype=np.float64, count=count)
+        y = np.fromiter((node.y for node in node_list), dtype=np.float64, count=count)
+        movable = ~np.fromiter((node.fixed for node in node_list), dtype=bool, count=count)
+        source, target, weight = pack_edges({node_id: i for i, node_id in enumerate(nodes)}, edges)
+
+        vx, vy, avg_energy = layout_step(x, y, movable, source, target, weight,
+                                         self.config, self.MAX_VELOCITY)
+
+        for i in np.flatnonzero(movable).tolist():
+            node = node_list[i]
+            node.x, node.y = float(x[i]), float(y[i])
+            node.vx, node.vy = float(vx[i]), float(vy[i])
+
+        return avg_energy < self.config.simulation_threshold
+
     def _calculate_repulsive_forces(self, nodes: Dict[str, GraphNode]):
         """计算节点间斥力"""
         node_list = list(nodes.values())
@@ -294,11 +339,17 @@ class CircularLayoutEngine(LayoutEngine):
 
 
 class GraphPhysicsEngine(QObject):
-    """图形物理引擎 - 统一管理布局算法"""
+    """
+    图形物理引擎 - 统一管理布局算法
+
+    NumPy可用时力导向布局在工作线程中迭代，GUI线程通过 sync_nodes 在绘制前读取最新快照；
+    否则回退到GUI线程上的定时器驱动。
+    """
     
     # 信号定义
     layoutChanged = pyqtSignal()
     stabilityChanged = pyqtSignal(bool)  # 稳定性变化
+    _workerFrame = pyqtSignal()  # 工作线程发出，排队送达GUI线程
     
     def __init__(self, config: GraphConfig):
         super().__init__()
@@ -311,6 +362,11 @@ class GraphPhysicsEngine(QObject):
         self.is_stable = False
         self.timer = QTimer()
         self.timer.timeout.connect(self._update_step)
+        self.use_worker_thread = NUMPY_AVAILABLE
+        self.worker = None
+        self._applied_version = -1
+        self._frame_pending = threading.Event()
+        self._workerFrame.connect(self._on_worker_frame)
         
     def set_algorithm(self, algorithm: LayoutAlgorithm):
         """设置布局算法"""
@@ -323,6 +379,7 @@ class GraphPhysicsEngine(QObject):
         if not nodes:
             return
         
+        self.stop_simulation()
         self.nodes = nodes
         self.edges = edges
         
@@ -330,17 +387,95 @@ class GraphPhysicsEngine(QObject):
         engine = self.engines[self.current_algorithm]
         engine.initialize_positions(nodes)
         
-        # 启动定时器
-        interval = 1000 // self.config.max_fps
-        self.timer.start(interval)
-        
         self.is_stable = False
         self.stabilityChanged.emit(False)
+        
+        if self.use_worker_thread and self.current_algorithm == LayoutAlgorithm.FORCE_DIRECTED:
+            self._start_worker(engine)
+        else:
+            # 启动定时器
+            interval = 1000 // self.config.max_fps
+            self.timer.start(interval)
         logger.info(f"Physics simulation started with {len(nodes)} nodes")
     
+    def _start_worker(self, engine: ForceDirectedEngine):
+        """把节点打包为数组并在工作线程中模拟"""
+        node_list = list(self.nodes.values())
+        count = len(node_list)
+        self.worker = PhysicsSimulationWorker(
+            self.config, list(self.nodes),
+            np.fromiter((node.x for node in node_list), dtype=np.float64, count=count),
+            np.fromiter((node.y for node in node_list), dtype=np.float64, count=count),
+            np.fromiter((node.fixed for node in node_list), dtype=bool, count=count),
+            self.edges, engine.MAX_VELOCITY,
+            on_frame=self._notify_frame, on_stable=self._notify_frame)
+        self._applied_version = -1
+        self._frame_pending.clear()
+        self.worker.start()
+    
     def stop_simulation(self):
         """停止模拟"""
         self.timer.stop()
+        if self.worker:
+            self.worker.stop()
+            self.sync_nodes()
+            self.worker = None
+    
+    def is_running(self) -> bool:
+        """模拟是否正在进行"""
+        if self.worker and self.worker.is_running():
+            return True
+        return self.timer.isActive()
+    
+    def pin_node(self, node_id: str, x: float, y: float):
+        """拖拽时把节点位置同步给模拟"""
+        if self.worker:
+            self.worker.pin(node_id, x, y)
+    
+    def release_node(self, node_id: str):
+        """拖拽结束，解除节点固定"""
+        if self.worker:
+            self.worker.release(node_id)
+    
+    def sync_nodes(self, nodes: Optional[Dict[str, GraphNode]] = None) -> bool:
+        """
+        把工作线程的最新快照复制到节点对象（在GUI线程中、绘制前调用）
+
+        GUI侧固定的节点（正在拖拽）保留自身位置。
+
+        Returns:
+            是否有新的位置被应用
+        """
+        if not self.worker:
+            return False
+        version, positions = self.worker.snapshot.read(self._applied_version)
+        if positions is None:
+            return False
+        self._applied_version = version
+        
+        nodes = nodes if nodes is not None else self.nodes
+        for node_id, (x, y) in zip(self.worker.node_ids, positions.tolist()):
+            node = nodes.get(node_id)
+            if node is not None and not node.fixed:
+                node.x, node.y = x, y
+        return True
+    
+    def _notify_frame(self):
+        """工作线程回调：GUI线程还没处理上一帧时不再排队新的通知"""
+        if not self._frame_pending.is_set():
+            self._frame_pending.set()
+            self._workerFrame.emit()
+    
+    def _on_worker_frame(self):
+        """GUI线程：转发布局变化和稳定性变化"""
+        self._frame_pending.clear()
+        worker = self.worker
+        if worker is None:
+            return
+        if worker.is_stable != self.is_stable:
+            self.is_stable = worker.is_stable
+            self.stabilityChanged.emit(self.is_stable)
+        self.layoutChanged.emit()
         
     def _update_step(self):
         """执行一步物理更新"""
@@ -366,22 +501,43 @@ class GraphPhysicsEngine(QObject):
     def get_engine_info(self) -> Dict:
         """获取引擎信息"""
         engine = self.engines[self.current_algorithm]
-        return {
+        info = {
             'algorithm': self.current_algorithm.value,
             'iteration_count': engine.iteration_count,
             'is_stable': self.is_stable,
             'node_count': len(self.nodes) if hasattr(self, 'nodes') else 0,
-            'edge_count': len(self.edges) if hasattr(self, 'edges') else 0
+            'edge_count': len(self.edges) if hasattr(self, 'edges') else 0,
+            'threaded': self.worker is not None
         }
+        if self.worker:
+            info['iteration_count'] = self.worker.stats.iteration_count
+            info['tick_ms'] = self.worker.stats.last_tick_ms
+        return info
+
+
+class LODTier(Enum):
+    """渲染细节层级"""
+    OVERVIEW = "overview"   # 聚合为簇，不绘制标签和箭头
+    SIMPLIFIED = "simplified"  # 完整节点，边不带箭头，不绘制标签
+    DETAIL = "detail"       # 完整节点、箭头和标签
 
 
 class RenderingEngine:
-    """专门的渲染引擎"""
+    """
+    专门的渲染引擎
+
+    按缩放比例（每个世界坐标单位对应的像素数）选择细节层级：缩小时把屏幕上相邻的节点聚合为簇，
+    所有边合并为一个QPainterPath一次绘制，放大时才绘制箭头和缓存的QStaticText标签。
+    """
     
     def __init__(self, config: GraphConfig):
         self.config = config
         self.render_cache = {}
         self.last_viewport = None
+        self.last_lod: Optional[LODTier] = None
+        self.spatial_index: Optional[GraphSpatialIndex] = None  # 设置后视口剔除只检查候选
+        self._label_cache: Dict[str, QStaticText] = {}
+        self._label_font = QFont("Arial", 10)
         
     def render(self, painter: QPainter, viewport: QRectF, 
                nodes: Dict[str, GraphNode], edges: List[GraphEdge]):
@@ -389,20 +545,53 @@ class RenderingEngine:
         if self.config.anti_aliasing:
             painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         
-        # 渲染顺序：边 -> 节点 -> 标签
-        self._render_edges(painter, viewport, nodes, edges)
-        self._render_nodes(painter, viewport, nodes)
+        self.last_viewport = viewport
+        self.last_lod = lod = self.select_lod(painter)
+        visible_nodes = self._visible_nodes(viewport, nodes)
+        
+        if lod == LODTier.OVERVIEW:
+            self._render_clusters(painter, viewport, nodes, edges, visible_nodes)
+            return
         
-        if self.config.show_labels:
-            self._render_labels(painter, viewport, nodes)
+        # 渲染顺序：边 -> 节点 -> 标签
+        self._render_edges(painter, viewport, nodes, edges, arrows=lod == LODTier.DETAIL)
+        self._render_nodes(painter, viewport, visible_nodes)
+        
+        if self.config.show_labels and lod == LODTier.DETAIL:
+            self._render_labels(painter, viewport, visible_nodes)
+    
+    def select_lod(self, painter: QPainter) -> LODTier:
+        """按画笔当前变换的缩放比例选择细节层级"""
+        if not self.config.lod_enabled:
+            return LODTier.DETAIL
+        transform = painter.combinedTransform()
+        scale = math.hypot(transform.m11(), transform.m12())
+        if scale < self.config.lod_overview_scale:
+            return LODTier.OVERVIEW
+        if scale < self.config.lod_detail_scale:
+            return LODTier.SIMPLIFIED
+        return LODTier.DETAIL
+    
+    def _visible_nodes(self, viewport: QRectF, nodes: Dict[str, GraphNode]) -> List[GraphNode]:
+        """视口内的节点"""
+        if self.spatial_index is not None:
+            bounds = (viewport.left(), viewport.top(), viewport.right(), viewport.bottom())
+            return self.spatial_index.nodes_in_rect(bounds, nodes)
+        return [node for node in nodes.values() if self._is_node_visible(viewport, node)]
+    
+    def _candidate_edges(self, viewport: QRectF, edges: List[GraphEdge]) -> List[GraphEdge]:
+        """可能在视口内的边"""
+        if self.spatial_index is not None:
+            bounds = (viewport.left(), viewport.top(), viewport.right(), viewport.bottom())
+            return [edges[i] for i in self.spatial_index.edges_in_rect(bounds) if i < len(edges)]
+        return edges
     
     def _render_edges(self, painter: QPainter, viewport: QRectF,
-                     nodes: Dict[str, GraphNode], edges: List[GraphEdge]):
-        """渲染边"""
-        pen = QPen(self.config.edge_color, 2)
-        painter.setPen(pen)
+                     nodes: Dict[str, GraphNode], edges: List[GraphEdge], arrows: bool = True):
+        """渲染边（合并为一条路径绘制）"""
+        path = QPainterPath()
         
-        for edge in edges:
+        for edge in self._candidate_edges(viewport, edges):
             source = nodes.get(edge.source)
             target = nodes.get(edge.target)
             
@@ -413,59 +602,127 @@ class RenderingEngine:
             if not self._is_edge_visible(viewport, source, target):
                 continue
             
-            # 绘制边
-            painter.drawLine(source.x, source.y, target.x, target.y)
+            path.moveTo(source.x, source.y)
+            path.lineTo(target.x, target.y)
             
             # 如果是有向边，绘制箭头
-            if not edge.bidirectional:
-                self._draw_arrow(painter, source, target)
+            if arrows and not edge.bidirectional:
+                self._add_arrow(path, source, target)
+        
+        painter.setPen(QPen(self.config.edge_color, 2))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawPath(path)
+    
+    def _node_color(self, node: GraphNode) -> QColor:
+        """节点颜色"""
+        color = self.config.node_colors.get(node.node_type, 
+                                           self.config.node_colors['OTHER'])
+        if node.selected:
+            color = color.lighter(120)
+        elif node.highlighted:
+            color = color.darker(120)
+        return color
     
     def _render_nodes(self, painter: QPainter, viewport: QRectF,
-                     nodes: Dict[str, GraphNode]):
-        """渲染节点"""
-        for node in nodes.values():
-            if not self._is_node_visible(viewport, node):
-                continue
-            
-            # 选择颜色
-            color = self.config.node_colors.get(node.node_type, 
-                                               self.config.node_colors['OTHER'])
-            
-            if node.selected:
-                color = color.lighter(120)
-            elif node.highlighted:
-                color = color.darker(120)
+                     nodes: List[GraphNode]):
+        """渲染节点（已做视口剔除）"""
+        current_color = None
+        for node in nodes:
+            # 颜色相同的节点连续绘制时不重复设置画刷
+            color = self._node_color(node)
+            if color != current_color:
+                painter.setBrush(QBrush(color))
+                painter.setPen(QPen(color.darker(130), 2))
+                current_color = color
             
-            # 绘制节点
-            brush = QBrush(color)
-            painter.setBrush(brush)
-            painter.setPen(QPen(color.darker(130), 2))
-            
-            painter.drawEllipse(
-                node.x - node.size/2, node.y - node.size/2,
-                node.size, node.size
-            )
+            painter.drawEllipse(QPointF(node.x, node.y), node.size / 2, node.size / 2)
     
     def _render_labels(self, painter: QPainter, viewport: QRectF,
-                      nodes: Dict[str, GraphNode]):
-        """渲染标签"""
-        font = QFont("Arial", 10)
-        painter.setFont(font)
+                      nodes: List[GraphNode]):
+        """渲染标签（已做视口剔除，文本排版结果缓存在QStaticText中）"""
+        painter.setFont(self._label_font)
         painter.setPen(QPen(self.config.text_color))
         
-        for node in nodes.values():
-            if not self._is_node_visible(viewport, node):
+        for node in nodes:
+            if not node.label:
                 continue
-            
-            # 绘制标签
-            label_rect = QRectF(
-                node.x - 50, node.y + node.size/2 + 5,
-                100, 20
-            )
-            painter.drawText(label_rect, 0x84, node.label)  # AlignCenter | AlignVCenter
-    
-    def _draw_arrow(self, painter: QPainter, source: GraphNode, target: GraphNode):
-        """绘制箭头"""
+            static_text = self._static_label(node.label)
+            size = static_text.size()
+            painter.drawStaticText(QPointF(node.x - size.width() / 2, node.y + node.size / 2 + 5),
+                                   static_text)
+    
+    def _static_label(self, label: str) -> QStaticText:
+        """取缓存的标签文本"""
+        static_text = self._label_cache.get(label)
+        if static_text is None:
+            if len(self._label_cache) >= self.config.label_cache_size:
+                self._label_cache.clear()
+            static_text = QStaticText(label)
+            static_text.setPerformanceHint(QStaticText.PerformanceHint.AggressiveCaching)
+            static_text.prepare(QTransform(), self._label_font)
+            self._label_cache[label] = static_text
+        return static_text
+    
+    def _render_clusters(self, painter: QPainter, viewport: QRectF, nodes: Dict[str, GraphNode],
+                         edges: List[GraphEdge], visible_nodes: List[GraphNode]):
+        """缩小时把屏幕上相邻的节点聚合为簇，簇之间的边合并绘制"""
+        transform = painter.combinedTransform()
+        scale = math.hypot(transform.m11(), transform.m12()) or 1.0
+        cell = self.config.lod_cluster_pixels / scale
+        
+        clusters: Dict[Tuple[int, int], List] = {}
+        membership: Dict[str, Tuple[int, int]] = {}
+        for node in visible_nodes:
+            key = (math.floor(node.x / cell), math.floor(node.y / cell))
+            membership[node.id] = key
+            cluster = clusters.get(key)
+            if cluster is None:
+                clusters[key] = cluster = [0.0, 0.0, 0, {}, False]
+            cluster[0] += node.x
+            cluster[1] += node.y
+            cluster[2] += 1
+            cluster[3][node.node_type] = cluster[3].get(node.node_type, 0) + 1
+            cluster[4] = cluster[4] or node.selected
+        
+        centers = {key: (c[0] / c[2], c[1] / c[2]) for key, c in clusters.items()}
+        
+        # 簇之间的边按条数合并，只绘制连接最多的若干条
+        links: Dict[Tuple, int] = {}
+        for edge in self._candidate_edges(viewport, edges):
+            source_key = membership.get(edge.source)
+            target_key = membership.get(edge.target)
+            if source_key is None or target_key is None or source_key == target_key:
+                continue
+            pair = (source_key, target_key) if source_key < target_key else (target_key, source_key)
+            links[pair] = links.get(pair, 0) + 1
+        
+        strongest = sorted(links, key=links.get, reverse=True)[:self.config.lod_overview_max_edges]
+        path = QPainterPath()
+        for source_key, target_key in strongest:
+            path.moveTo(*centers[source_key])
+            path.lineTo(*centers[target_key])
+        
+        # 一像素宽的cosmetic画笔描边不受缩放影响，比按世界坐标宽度描边快得多
+        edge_pen = QPen(self.config.edge_color, 1)
+        edge_pen.setCosmetic(True)
+        painter.setPen(edge_pen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawPath(path)
+        
+        # 簇按成员最多的类型着色，面积与成员数成正比
+        min_radius = self.config.node_size_range[0] / 2
+        for key, (_, _, count, types, selected) in clusters.items():
+            node_type = max(types, key=types.get)
+            color = self.config.node_colors.get(node_type, self.config.node_colors['OTHER'])
+            if selected:
+                color = color.lighter(120)
+            radius = max(min_radius, min(cell / 2, min_radius * math.sqrt(count)))
+            painter.setBrush(QBrush(color))
+            painter.setPen(QPen(color.darker(130), 1 / scale))
+            painter.drawEllipse(QPointF(*centers[key]), radius, radius)
+    
+    def _add_arrow(self, path: QPainterPath, source: GraphNode, target: GraphNode):
+        """把箭头加入边的路径"""
         # 计算箭头位置
         dx = target.x - source.x
         dy = target.y - source.y
@@ -497,9 +754,11 @@ class RenderingEngine:
         tip2_x = arrow_start_x - arrow_size * (ux * cos_angle + uy * sin_angle)
         tip2_y = arrow_start_y - arrow_size * (uy * cos_angle - ux * sin_angle)
         
-        # 绘制箭头
-        painter.drawLine(arrow_start_x, arrow_start_y, tip1_x, tip1_y)
-        painter.drawLine(arrow_start_x, arrow_start_y, tip2_x, tip2_y)
+        # 两翼作为独立线段加入路径（带折线连接的子路径在抗锯齿描边时慢得多）
+        path.moveTo(arrow_start_x, arrow_start_y)
+        path.lineTo(tip1_x, tip1_y)
+        path.moveTo(arrow_start_x, arrow_start_y)
+        path.lineTo(tip2_x, tip2_y)
     
     def _is_node_visible(self, viewport: QRectF, node: GraphNode) -> bool:
         """检查节点是否在视口内"""
@@ -535,9 +794,18 @@ class InteractionManager(QObject):
         self.drag_node = None
         self.last_mouse_pos = None
         self.selected_nodes = set()
+        self.spatial_index: Optional[GraphSpatialIndex] = None  # 设置后命中测试只检查附近节点
+        self.rubber_band_origin: Optional[QPointF] = None
+        self.rubber_band_rect: Optional[QRectF] = None
         
-    def handle_mouse_press(self, pos: QPointF, nodes: Dict[str, GraphNode]) -> bool:
-        """处理鼠标按下事件"""
+    def handle_mouse_press(self, pos: QPointF, nodes: Dict[str, GraphNode],
+                           rubber_band: bool = False) -> bool:
+        """
+        处理鼠标按下事件
+
+        Args:
+            rubber_band: 在空白处按下时开始框选而不是平移
+        """
         # 查找点击的节点
         clicked_node = self._find_node_at_position(pos, nodes)
         
@@ -554,6 +822,11 @@ class InteractionManager(QObject):
             
             self.nodeSelected.emit(clicked_node.id)
             return True
+        elif rubber_band:
+            # 开始框选
+            self.rubber_band_origin = pos
+            self.rubber_band_rect = QRectF(pos, pos)
+            return False
         else:
             # 开始平移
             self.is_panning = True
@@ -567,6 +840,12 @@ class InteractionManager(QObject):
             # 拖拽节点
             self.drag_node.x = pos.x()
             self.drag_node.y = pos.y()
+            if self.spatial_index is not None:
+                self.spatial_index.update_node(self.drag_node)
+            self.viewChanged.emit()
+            
+        elif self.rubber_band_origin is not None:
+            self.rubber_band_rect = QRectF(self.rubber_band_origin, pos).normalized()
             self.viewChanged.emit()
             
         elif self.is_panning and self.last_mouse_pos:
@@ -583,6 +862,13 @@ class InteractionManager(QObject):
             self.drag_node.fixed = False
             self.drag_node = None
         
+        if self.rubber_band_origin is not None:
+            rect = QRectF(self.rubber_band_origin, pos).normalized()
+            self.rubber_band_origin = None
+            self.rubber_band_rect = None
+            self.select_nodes_in_rect(rect, nodes)
+            self.viewChanged.emit()
+        
         self.is_dragging = False
         self.is_panning = False
         self.last_mouse_pos = None
@@ -598,6 +884,19 @@ class InteractionManager(QObject):
         node.selected = True
         self.selected_nodes.add(node.id)
     
+    def select_nodes_in_rect(self, rect: QRectF, nodes: Dict[str, GraphNode]) -> List[str]:
+        """选择中心落在矩形内的节点，返回选中的节点ID"""
+        self.clear_selection(nodes)
+        bounds = (rect.left(), rect.top(), rect.right(), rect.bottom())
+        if self.spatial_index is not None:
+            selected = self.spatial_index.nodes_in_rect(bounds, nodes, margin=False)
+        else:
+            selected = [node for node in nodes.values()
+                        if rect.left() <= node.x <= rect.right() and rect.top() <= node.y <= rect.bottom()]
+        for node in selected:
+            self.select_node(node)
+        return [node.id for node in selected]
+    
     def clear_selection(self, nodes: Dict[str, GraphNode]):
         """清除选择"""
         for node_id in self.selected_nodes:
@@ -607,6 +906,10 @@ class InteractionManager(QObject):
     
     def _find_node_at_position(self, pos: QPointF, nodes: Dict[str, GraphNode]) -> Optional[GraphNode]:
         """查找指定位置的节点"""
+        if self.spatial_index is not None:
+            hits = self.spatial_index.nodes_at(pos.x(), pos.y(), nodes)
+            return hits[0] if hits else None
+        
         for node in nodes.values():
             distance = math.sqrt((node.x - pos.x())**2 + (node.y - pos.y())**2)
             if distance <= node.size / 2:
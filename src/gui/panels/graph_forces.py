@@ -0,0 +1,223 @@
+"""
+关系图力导向布局的向量化力计算
+斥力使用Barnes–Hut四叉树近似（O(n log n)），节点较少时直接两两计算；
+弹簧引力与中心引力按边/节点数组一次算完。需要NumPy。
+"""
+
+import numpy as np
+
+# 四叉树最大深度，坐标按 2^MAX_DEPTH 网格量化
+MAX_DEPTH = 20
+
+
+class BarnesHutTree:
+    """
+    按层构建的四叉树
+
+    每层把仍与其他点同格的点按网格坐标分组，单点格子（或达到最大深度的格子）为叶子；
+    同一父格的子格在数组中连续存放，便于批量展开。
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, max_depth: int = MAX_DEPTH):
+        n = len(x)
+        min_x, min_y = float(x.min()), float(y.min())
+        extent = max(float(x.max()) - min_x, float(y.max()) - min_y) or 1.0
+        extent *= 1.0 + 1e-9
+        grid = 1 << max_depth
+        ix = np.minimum(((x - min_x) / extent * grid).astype(np.int64), grid - 1)
+        iy = np.minimum(((y - min_y) / extent * grid).astype(np.int64), grid - 1)
+
+        com_x, com_y, mass, side, leaf, parent = [], [], [], [], [], []
+        offset = 0
+        active = np.arange(n)
+        active_parent = np.full(n, -1, dtype=np.int64)   # 每个活动点在上一层所属的格子
+
+        for level in range(max_depth + 1):
+            shift = max_depth - level
+            keys = ((ix[active] >> shift) << 32) | (iy[active] >> shift)
+            unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+            inverse = inverse.reshape(-1)
+            cell_count = len(unique_keys)
+
+            # 同一父格的子格连续存放
+            cell_parent = np.empty(cell_count, dtype=np.int64)
+            cell_parent[inverse] = active_parent
+            order = np.argsort(cell_parent, kind='stable')
+            rank = np.empty(cell_count, dtype=np.int64)
+            rank[order] = np.arange(cell_count)
+            inverse = rank[inverse]
+            counts = counts[order]
+            cell_parent = cell_parent[order]
+
+            sum_x = np.bincount(inverse, weights=x[active], minlength=cell_count)
+            sum_y = np.bincount(inverse, weights=y[active], minlength=cell_count)
+            is_leaf = (counts == 1) | (level == max_depth)
+
+            com_x.append(sum_x / counts)
+            com_y.append(sum_y / counts)
+            mass.append(counts.astype(np.float64))
+            side.append(np.full(cell_count, extent / (1 << level)))
+            leaf.append(is_leaf)
+            parent.append(cell_parent)
+
+            # 继续细分非叶子格中的点
+            keep = ~is_leaf[inverse]
+            active = active[keep]
+            active_parent = inverse[keep] + offset
+            offset += cell_count
+            if active.size == 0:
+                break
+
+        self.com_x = np.concatenate(com_x)
+        self.com_y = np.concatenate(com_y)
+        self.mass = np.concatenate(mass)
+        self.side = np.concatenate(side)
+        self.leaf = np.concatenate(leaf)
+
+        parents = np.concatenate(parent)[1:]   # 根节点没有父格
+        total = len(self.mass)
+        child_count = np.bincount(parents, minlength=total)
+        self.child_count = child_count
+        self.child_start = np.zeros(total, dtype=np.int64)
+        if len(parents):
+            # 子格按层和父格顺序存放，父格的第一个子格位置即其在parents中的首次出现位置+1
+            first = np.searchsorted(parents, np.arange(total))
+            self.child_start = first + 1
+
+    @property
+    def cell_count(self) -> int:
+        return len(self.mass)
+
+
+def barnes_hut_repulsion(x: np.ndarray, y: np.ndarray, charge: float,
+                         theta: float = 0.8) -> tuple:
+    """
+    Barnes–Hut近似的两两库仑力
+
+    节点i受到的力为 Σ charge * m / r² 沿 (p_i - p_j) 方向；
+    格子边长与到质心距离之比小于theta时把整个格子视为一个质点（theta=0时为精确计算）。
+
+    Returns:
+        (fx, fy) 每个节点受到的力
+    """
+    n = len(x)
+    fx = np.zeros(n)
+    fy = np.zeros(n)
+    if n < 2:
+        return fx, fy
+
+    tree = BarnesHutTree(x, y)
+    theta_sq = theta * theta
+
+    points = np.arange(n)
+    cells = np.zeros(n, dtype=np.int64)
+    while points.size:
+        dx = x[points] - tree.com_x[cells]
+        dy = y[points] - tree.com_y[cells]
+        dist_sq = dx * dx + dy * dy
+        side = tree.side[cells]
+        accept = tree.leaf[cells] | (side * side < theta_sq * dist_sq)
+
+        # 接受的格子作为质点施力（距离为0的是自身所在的叶子）
+        apply = accept & (dist_sq > 0)
+        if apply.any():
+            d_sq = dist_sq[apply]
+            magnitude = charge * tree.mass[cells[apply]] / (d_sq * np.sqrt(d_sq))
+            fx += np.bincount(points[apply], weights=magnitude * dx[apply], minlength=n)
+            fy += np.bincount(points[apply], weights=magnitude * dy[apply], minlength=n)
+
+        # 其余展开到子格
+        expand = ~accept
+        points, cells = points[expand], cells[expand]
+        if not points.size:
+            break
+        counts = tree.child_count[cells]
+        total = int(counts.sum())
+        starts = np.repeat(tree.child_start[cells], counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        points = np.repeat(points, counts)
+        cells = starts + offsets
+
+    return fx, fy
+
+
+def direct_repulsion(x: np.ndarray, y: np.ndarray, charge: float) -> tuple:
+    """精确的两两库仑力（O(n²)，用于节点较少时）"""
+    dx = x[:, None] - x[None, :]
+    dy = y[:, None] - y[None, :]
+    dist_sq = dx * dx + dy * dy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.where(dist_sq > 0, charge / (dist_sq * np.sqrt(dist_sq)), 0.0)
+    return (magnitude * dx).sum(axis=1), (magnitude * dy).sum(axis=1)
+
+
+def spring_forces(x: np.ndarray, y: np.ndarray, source: np.ndarray, target: np.ndarray,
+                  weight: np.ndarray, strength: float, link_distance: float) -> tuple:
+    """边的弹簧力（胡克定律），source受力指向target，target受反向力"""
+    n = len(x)
+    if not len(source):
+        return np.zeros(n), np.zeros(n)
+
+    dx = x[target] - x[source]
+    dy = y[target] - y[source]
+    distance = np.sqrt(dx * dx + dy * dy)
+    valid = distance > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(valid, strength * (distance - link_distance) * weight / distance, 0.0)
+    ex, ey = scale * dx, scale * dy
+    fx = np.bincount(source, weights=ex, minlength=n) - np.bincount(target, weights=ex, minlength=n)
+    fy = np.bincount(source, weights=ey, minlength=n) - np.bincount(target, weights=ey, minlength=n)
+    return fx, fy
+
+
+def pack_edges(index: dict, edges) -> tuple:
+    """
+    把边列表打包为 (source, target, weight) 数组
+
+    Args:
+        index: 节点ID到数组下标的映射，端点不在其中的边被忽略
+    """
+    links = [(index[edge.source], index[edge.target], edge.weight) for edge in edges
+             if edge.source in index and edge.target in index]
+    if not links:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    source, target, weight = zip(*links)
+    return (np.array(source, dtype=np.int64), np.array(target, dtype=np.int64),
+            np.array(weight, dtype=np.float64))
+
+
+def layout_step(x: np.ndarray, y: np.ndarray, movable: np.ndarray,
+                source: np.ndarray, target: np.ndarray, weight: np.ndarray,
+                config, max_velocity: float) -> tuple:
+    """
+    力导向布局的一次迭代，原地更新可移动节点的 x、y
+
+    每次迭代速度从零开始累加（斥力、弹簧力、中心引力），限制最大速度后移动节点并施加阻尼。
+
+    Args:
+        config: GraphConfig（读取力参数和Barnes–Hut参数）
+
+    Returns:
+        (vx, vy, 可移动节点的平均动能)
+    """
+    count = len(x)
+    if count >= config.barnes_hut_min_nodes:
+        fx, fy = barnes_hut_repulsion(x, y, config.charge_strength, config.barnes_hut_theta)
+    else:
+        fx, fy = direct_repulsion(x, y, config.charge_strength)
+
+    sx, sy = spring_forces(x, y, source, target, weight, config.force_strength, config.link_distance)
+    fx += sx - x * config.center_force
+    fy += sy - y * config.center_force
+
+    speed = np.sqrt(fx * fx + fy * fy)
+    scale = np.where(speed > max_velocity, max_velocity / np.maximum(speed, 1e-12), 1.0)
+    vx = np.where(movable, fx * scale, 0.0)
+    vy = np.where(movable, fy * scale, 0.0)
+    x += vx
+    y += vy
+    vx *= config.damping
+    vy *= config.damping
+
+    energy = float((0.5 * (vx * vx + vy * vy)).sum())
+    return vx, vy, energy / count if count else 0.0
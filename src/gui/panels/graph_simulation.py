@@ -0,0 +1,209 @@
+"""
+关系图后台物理模拟
+在工作线程中对打包的位置/速度数组迭代力导向布局，结果写入双缓冲快照；
+GUI线程只在绘制前把最新快照复制到节点对象上，界面帧耗时与图规模无关。需要NumPy。
+"""
+
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .graph_forces import layout_step, pack_edges
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SimulationStats:
+    """模拟统计"""
+    iteration_count: int = 0
+    last_tick_ms: float = 0.0
+    average_energy: float = 0.0
+
+
+class LayoutSnapshot:
+    """
+    布局快照双缓冲
+
+    工作线程写后台缓冲区，写完后在锁内交换；读取方在锁内复制前台缓冲区，
+    因此读写互不阻塞对方的计算，也不会读到写了一半的数据。
+    """
+
+    def __init__(self, count: int):
+        self._buffers = [np.zeros((count, 2)), np.zeros((count, 2))]
+        self._front = 0
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def publish(self, x: np.ndarray, y: np.ndarray) -> int:
+        """把一帧位置写入后台缓冲区并交换，返回新版本号"""
+        back = self._buffers[1 - self._front]
+        back[:, 0] = x
+        back[:, 1] = y
+        with self._lock:
+            self._front = 1 - self._front
+            self.version += 1
+            return self.version
+
+    def read(self, since: int = -1):
+        """
+        读取最新快照
+
+        Returns:
+            (版本号, 位置数组副本)；版本号未超过since时位置为None
+        """
+        with self._lock:
+            if self.version <= since:
+                return self.version, None
+            return self.version, self._buffers[self._front].copy()
+
+
+class PhysicsSimulationWorker:
+    """
+    力导向布局工作线程
+
+    节点顺序在创建时固定；拖拽等交互通过 pin/release 以命令形式交给工作线程，
+    在下一次迭代开始时生效。布局稳定（或达到迭代上限）后线程自动结束，再次拖拽时恢复。
+    """
+
+    def __init__(self, config, node_ids: List[str], x: np.ndarray, y: np.ndarray,
+                 fixed: np.ndarray, edges, max_velocity: float,
+                 on_frame: Optional[Callable[[], None]] = None,
+                 on_stable: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            config: GraphConfig，力参数在每次迭代时重新读取
+            on_frame: 发布新快照后在工作线程中调用
+            on_stable: 达到稳定状态、线程退出前在工作线程中调用
+        """
+        self.config = config
+        self.node_ids = list(node_ids)
+        self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.x = np.array(x, dtype=np.float64)
+        self.y = np.array(y, dtype=np.float64)
+        self.fixed = np.array(fixed, dtype=bool)
+        self.source, self.target, self.weight = pack_edges(self.index, edges)
+        self.max_velocity = max_velocity
+        self.on_frame = on_frame
+        self.on_stable = on_stable
+
+        self.snapshot = LayoutSnapshot(len(self.node_ids))
+        self.snapshot.publish(self.x, self.y)
+        self.stats = SimulationStats()
+        self.is_stable = False
+
+        self._settle_iterations = 0
+        self._pins: Dict[int, Optional[tuple]] = {}
+        self._pin_lock = threading.Lock()
+        self._active = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动工作线程"""
+        with self._pin_lock:
+            if self._active:
+                return
+            self._active = True
+            self._stop_event.clear()
+            self.is_stable = False
+            thread = threading.Thread(target=self._run, name="GraphPhysics", daemon=True)
+            self._thread = thread
+        thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """停止工作线程并等待退出"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def thread_id(self) -> Optional[int]:
+        return self._thread.ident if self._thread else None
+
+    def pin(self, node_id: str, x: float, y: float):
+        """把节点固定到指定位置（拖拽中）"""
+        self._queue_pin(node_id, (x, y))
+
+    def release(self, node_id: str):
+        """解除节点固定"""
+        self._queue_pin(node_id, None)
+
+    def _queue_pin(self, node_id: str, position: Optional[tuple]):
+        i = self.index.get(node_id)
+        if i is None:
+            return
+        with self._pin_lock:
+            self._pins[i] = position
+            # 拖动会打破稳定状态（手动停止后不再自动恢复）
+            restart = not self._active and not self._stop_event.is_set()
+        if restart:
+            self.start()
+
+    def _apply_pins(self) -> bool:
+        with self._pin_lock:
+            pins, self._pins = self._pins, {}
+        for i, position in pins.items():
+            if position is None:
+                self.fixed[i] = False
+            else:
+                self.fixed[i] = True
+                self.x[i], self.y[i] = position
+        return bool(pins)
+
+    def step(self) -> bool:
+        """执行一次迭代并发布快照，返回是否稳定"""
+        start = time.perf_counter()
+        pinned = self._apply_pins()
+        _, _, energy = layout_step(self.x, self.y, ~self.fixed, self.source, self.target,
+                                   self.weight, self.config, self.max_velocity)
+        self.snapshot.publish(self.x, self.y)
+
+        self.stats.iteration_count += 1
+        self.stats.last_tick_ms = (time.perf_counter() - start) * 1000
+        self.stats.average_energy = energy
+        if pinned:
+            # 本次迭代有节点被移动时不视为稳定，重新计算迭代上限
+            self._settle_iterations = 0
+            return False
+        self._settle_iterations += 1
+        return (energy < self.config.simulation_threshold
+                or self._settle_iterations >= self.config.max_simulation_iterations)
+
+    def _run(self):
+        interval = 1.0 / max(1, self.config.max_fps)
+        try:
+            while not self._stop_event.is_set():
+                tick_start = time.perf_counter()
+                stable = self.step()
+                if self.on_frame:
+                    self.on_frame()
+                if stable:
+                    with self._pin_lock:
+                        if self._pins:
+                            continue
+                        self._active = False
+                    self.is_stable = True
+                    logger.info(f"Physics simulation reached stability after "
+                                f"{self.stats.iteration_count} iterations")
+                    if self.on_stable:
+                        self.on_stable()
+                    break
+                # 迭代速度不超过帧率，保持与定时器驱动时相同的动画节奏
+                remaining = interval - (time.perf_counter() - tick_start)
+                if remaining > 0:
+                    self._stop_event.wait(remaining)
+        except Exception as e:
+            logger.error(f"Physics simulation error: {e}")
+        finally:
+            with self._pin_lock:
+                if self._thread is threading.current_thread():
+                    self._active = False
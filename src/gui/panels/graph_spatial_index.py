@@ -0,0 +1,243 @@
+"""
+关系图空间索引
+均匀网格索引节点位置和边的包围盒，供命中测试、框选和视口剔除使用；
+布局移动时只有跨越网格边界的节点（及其相连的边）需要重新分桶。
+"""
+
+import math
+import logging
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Bounds = Tuple[float, float, float, float]      # (min_x, min_y, max_x, max_y)
+CellRange = Tuple[int, int, int, int]           # (min_cx, min_cy, max_cx, max_cy)
+
+
+class SpatialGrid:
+    """
+    均匀网格
+
+    每个条目按包围盒登记到覆盖的所有格子；覆盖格子过多的条目（如很长的边）
+    单独存放，每次查询都作为候选返回。
+    """
+
+    # 单个条目最多登记的格子数
+    MAX_CELLS_PER_ITEM = 64
+
+    def __init__(self, cell_size: float = 100.0):
+        if cell_size <= 0:
+            raise ValueError("Cell size must be positive")
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._ranges: Dict[Hashable, Optional[CellRange]] = {}   # None 表示超大条目
+        self._oversized: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._ranges
+
+    def clear(self):
+        self._cells.clear()
+        self._ranges.clear()
+        self._oversized.clear()
+
+    def _cell_range(self, bounds: Bounds) -> CellRange:
+        size = self.cell_size
+        return (math.floor(bounds[0] / size), math.floor(bounds[1] / size),
+                math.floor(bounds[2] / size), math.floor(bounds[3] / size))
+
+    def insert(self, key: Hashable, bounds: Bounds) -> bool:
+        """
+        登记或更新条目
+
+        Returns:
+            条目所在的格子是否发生变化
+        """
+        cell_range = self._cell_range(bounds)
+        cell_count = (cell_range[2] - cell_range[0] + 1) * (cell_range[3] - cell_range[1] + 1)
+        if cell_count > self.MAX_CELLS_PER_ITEM:
+            cell_range = None
+
+        if key in self._ranges:
+            if self._ranges[key] == cell_range:
+                return False
+            self.remove(key)
+
+        self._ranges[key] = cell_range
+        if cell_range is None:
+            self._oversized.add(key)
+        else:
+            for cell in self._iter_cells(cell_range):
+                self._cells.setdefault(cell, set()).add(key)
+        return True
+
+    def remove(self, key: Hashable):
+        """移除条目"""
+        if key not in self._ranges:
+            return
+        cell_range = self._ranges.pop(key)
+        if cell_range is None:
+            self._oversized.discard(key)
+            return
+        for cell in self._iter_cells(cell_range):
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._cells[cell]
+
+    def query(self, bounds: Bounds) -> Set[Hashable]:
+        """返回包围盒可能与给定区域相交的条目（候选集，调用方需再精确判断）"""
+        cell_range = self._cell_range(bounds)
+        cell_count = (cell_range[2] - cell_range[0] + 1) * (cell_range[3] - cell_range[1] + 1)
+
+        # 区域覆盖的格子比已占用的格子还多时，直接遍历已占用的格子
+        if cell_count > len(self._cells):
+            result = set(self._oversized)
+            min_cx, min_cy, max_cx, max_cy = cell_range
+            for (cx, cy), bucket in self._cells.items():
+                if min_cx <= cx <= max_cx and min_cy <= cy <= max_cy:
+                    result.update(bucket)
+            return result
+
+        result = set(self._oversized)
+        for cell in self._iter_cells(cell_range):
+            bucket = self._cells.get(cell)
+            if bucket:
+                result.update(bucket)
+        return result
+
+    def query_point(self, x: float, y: float) -> Set[Hashable]:
+        """返回包围盒可能包含该点的条目"""
+        return self.query((x, y, x, y))
+
+    @staticmethod
+    def _iter_cells(cell_range: CellRange) -> Iterable[Tuple[int, int]]:
+        min_cx, min_cy, max_cx, max_cy = cell_range
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                yield (cx, cy)
+
+
+class GraphSpatialIndex:
+    """
+    关系图的节点/边空间索引
+
+    节点包围盒向外扩展一个节点尺寸（与视口剔除的边距一致），边包围盒由两个端点中心确定；
+    边用其在边列表中的下标作为键。refresh 只重新分桶所在格子发生变化的节点及其相连的边。
+    """
+
+    def __init__(self, cell_size: float = 100.0):
+        self.node_grid = SpatialGrid(cell_size)
+        self.edge_grid = SpatialGrid(cell_size)
+        self._positions: Dict[str, Tuple[float, float, float]] = {}
+        self._order: Dict[str, int] = {}
+        self._adjacency: Dict[str, List[int]] = {}
+        self._edges: List[Tuple[str, str]] = []
+
+    def rebuild(self, nodes: Dict, edges: List):
+        """按新的图数据重建索引"""
+        self.node_grid.clear()
+        self.edge_grid.clear()
+        self._positions.clear()
+        self._order = {node_id: i for i, node_id in enumerate(nodes)}
+        self._adjacency = {node_id: [] for node_id in nodes}
+        self._edges = [(edge.source, edge.target) for edge in edges]
+
+        for node in nodes.values():
+            self._insert_node(node)
+        for i, (source, target) in enumerate(self._edges):
+            if source in nodes and target in nodes:
+                self._adjacency[source].append(i)
+                if target != source:
+                    self._adjacency[target].append(i)
+                self._insert_edge(i)
+
+    def refresh(self, nodes: Dict) -> int:
+        """
+        按节点的当前位置增量更新索引
+
+        Returns:
+            重新分桶的节点数
+        """
+        moved = 0
+        dirty_edges = set()
+        for node_id, node in nodes.items():
+            previous = self._positions.get(node_id)
+            if previous is not None and previous == (node.x, node.y, node.size):
+                continue
+            if node_id not in self._adjacency:
+                self._adjacency[node_id] = []
+                self._order[node_id] = len(self._order)
+            if self._insert_node(node):
+                moved += 1
+                dirty_edges.update(self._adjacency[node_id])
+        for i in dirty_edges:
+            self._insert_edge(i)
+        return moved
+
+    def update_node(self, node):
+        """单个节点移动（如拖拽）后更新索引"""
+        if node.id not in self._positions:
+            return
+        if self._insert_node(node):
+            for i in self._adjacency.get(node.id, ()):
+                self._insert_edge(i)
+
+    def nodes_at(self, x: float, y: float, nodes: Dict) -> List:
+        """返回覆盖该点的节点（按与点的距离排序）"""
+        hits = []
+        for node_id in self.node_grid.query_point(x, y):
+            node = nodes.get(node_id)
+            if node is None:
+                continue
+            distance_sq = (node.x - x) ** 2 + (node.y - y) ** 2
+            if distance_sq <= (node.size / 2) ** 2:
+                hits.append((distance_sq, node))
+        hits.sort(key=lambda item: item[0])
+        return [node for _, node in hits]
+
+    def nodes_in_rect(self, bounds: Bounds, nodes: Dict, margin: bool = True) -> List:
+        """
+        返回在区域内的节点（保持节点的原有顺序）
+
+        Args:
+            margin: 为True时按节点尺寸放宽边界（视口剔除），否则要求节点中心在区域内（框选）
+        """
+        min_x, min_y, max_x, max_y = bounds
+        result = []
+        for node_id in self.node_grid.query(bounds):
+            node = nodes.get(node_id)
+            if node is None:
+                continue
+            pad = node.size if margin else 0.0
+            if min_x - pad <= node.x <= max_x + pad and min_y - pad <= node.y <= max_y + pad:
+                result.append(node)
+        result.sort(key=lambda node: self._order.get(node.id, 0))
+        return result
+
+    def edges_in_rect(self, bounds: Bounds) -> List[int]:
+        """返回包围盒可能与区域相交的边下标（升序，保持绘制顺序）"""
+        return sorted(self.edge_grid.query(bounds))
+
+    def _insert_node(self, node) -> bool:
+        """登记节点，返回节点或其相连边的所在格子是否可能变化"""
+        previous = self._positions.get(node.id)
+        self._positions[node.id] = (node.x, node.y, node.size)
+        pad = node.size
+        regridded = self.node_grid.insert(node.id, (node.x - pad, node.y - pad,
+                                                    node.x + pad, node.y + pad))
+        # 边包围盒由节点中心确定，中心跨格时相连的边也要更新
+        size = self.edge_grid.cell_size
+        return regridded or previous is None or (
+            math.floor(previous[0] / size) != math.floor(node.x / size) or
+            math.floor(previous[1] / size) != math.floor(node.y / size))
+
+    def _insert_edge(self, i: int):
+        source, target = self._edges[i]
+        sx, sy, _ = self._positions[source]
+        tx, ty, _ = self._positions[target]
+        self.edge_grid.insert(i, (min(sx, tx), min(sy, ty), max(sx, tx), max(sy, ty)))
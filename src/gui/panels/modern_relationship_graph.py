@@ -20,6 +20,7 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QToolBar, QPushB
 from gui.panels.graph_engine import (GraphConfig, GraphNode, GraphEdge, GraphPhysicsEngine, 
                           RenderingEngine, InteractionManager, LayoutAlgorithm,
                           GraphEngineFactory)
+from gui.panels.graph_spatial_index import GraphSpatialIndex
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +50,12 @@ class ModernGraphCanvas(QWidget):
         self.rendering_engine = GraphEngineFactory.create_rendering_engine(config)
         self.interaction_manager = GraphEngineFactory.create_interaction_manager(config)
         
+        # 空间索引：命中测试、框选和视口剔除共用
+        self.spatial_index = GraphSpatialIndex(config.spatial_cell_size)
+        self.rendering_engine.spatial_index = self.spatial_index
+        self.interaction_manager.spatial_index = self.spatial_index
+        self._spatial_index_dirty = False
+        
         # 数据
         self.nodes: Dict[str, GraphNode] = {}
         self.edges: List[GraphEdge] = []
@@ -96,7 +103,7 @@ class ModernGraphCanvas(QWidget):
     def _connect_signals(self):
         """连接信号"""
         # 物理引擎信号
-        self.physics_engine.layoutChanged.connect(self._schedule_render)
+        self.physics_engine.layoutChanged.connect(self._on_layout_changed)
         self.physics_engine.stabilityChanged.connect(self._on_stability_changed)
         
         # 交互管理器信号
@@ -155,6 +162,8 @@ class ModernGraphCanvas(QWidget):
             
             # 启动物理模拟
             self.physics_engine.start_simulation(self.nodes, self.edges)
+            self.spatial_index.rebuild(self.nodes, self.edges)
+            self._spatial_index_dirty = False
             
             # 适应视图
             self.fit_to_content()
@@ -225,6 +234,7 @@ class ModernGraphCanvas(QWidget):
         """适应内容"""
         if not self.nodes:
             return
+        self._sync_layout()
         
         # 计算边界
         min_x = min(node.x for node in self.nodes.values())
@@ -255,7 +265,7 @@ class ModernGraphCanvas(QWidget):
     
     def toggle_simulation(self):
         """切换模拟状态"""
-        if self.physics_engine.timer.isActive():
+        if self.physics_engine.is_running():
             self.physics_engine.stop_simulation()
         else:
             self.physics_engine.start_simulation(self.nodes, self.edges)
@@ -296,6 +306,7 @@ class ModernGraphCanvas(QWidget):
             old_viewport = self.viewport
             
             # 计算导出视口
+            self._sync_layout()
             if self.nodes:
                 # 适应所有内容
                 min_x = min(node.x for node in self.nodes.values())
@@ -345,9 +356,17 @@ class ModernGraphCanvas(QWidget):
             if self.show_grid:
                 self._draw_grid(painter)
             
-            # 渲染图形
+            # 渲染图形（先取物理模拟的最新快照）
+            self._sync_layout()
             self.rendering_engine.render(painter, self.viewport, self.nodes, self.edges)
             
+            # 框选矩形
+            rubber_band = self.interaction_manager.rubber_band_rect
+            if rubber_band is not None:
+                painter.setPen(QPen(self.config.edge_color.darker(150), 1, Qt.PenStyle.DashLine))
+                painter.setBrush(QBrush(QColor(52, 152, 219, 40)))
+                painter.drawRect(rubber_band)
+            
             # 绘制统计信息
             if self.show_stats:
                 self._draw_stats(painter)
@@ -361,7 +380,11 @@ class ModernGraphCanvas(QWidget):
         """鼠标按下事件"""
         if event.button() == Qt.MouseButton.LeftButton:
             pos = self._screen_to_world(event.position())
-            self.interaction_manager.handle_mouse_press(pos, self.nodes)
+            self._sync_layout()
+            rubber_band = bool(event.modifiers() & Qt.KeyboardModifier.ShiftModifier)
+            if self.interaction_manager.handle_mouse_press(pos, self.nodes, rubber_band):
+                node = self.interaction_manager.drag_node
+                self.physics_engine.pin_node(node.id, node.x, node.y)
         elif event.button() == Qt.MouseButton.RightButton:
             self._show_context_menu(event.position())
     
@@ -369,16 +392,23 @@ class ModernGraphCanvas(QWidget):
         """鼠标移动事件"""
         pos = self._screen_to_world(event.position())
         self.interaction_manager.handle_mouse_move(pos, self.nodes)
+        node = self.interaction_manager.drag_node
+        if self.interaction_manager.is_dragging and node:
+            self.physics_engine.pin_node(node.id, node.x, node.y)
     
     def mouseReleaseEvent(self, event):
         """鼠标释放事件"""
         pos = self._screen_to_world(event.position())
+        node = self.interaction_manager.drag_node
         self.interaction_manager.handle_mouse_release(pos, self.nodes)
+        if node:
+            self.physics_engine.release_node(node.id)
     
     def mouseDoubleClickEvent(self, event):
         """鼠标双击事件"""
         if event.button() == Qt.MouseButton.LeftButton:
             pos = self._screen_to_world(event.position())
+            self._sync_layout()
             self.interaction_manager.handle_double_click(pos, self.nodes)
     
     def wheelEvent(self, event):
@@ -395,6 +425,11 @@ class ModernGraphCanvas(QWidget):
         # 这里可以添加额外的键盘处理
         super().keyPressEvent(event)
     
+    def closeEvent(self, event):
+        """关闭时停止后台物理模拟"""
+        self.physics_engine.stop_simulation()
+        super().closeEvent(event)
+    
     # 辅助方法
     def _screen_to_world(self, screen_pos) -> QPointF:
         """屏幕坐标转世界坐标"""
@@ -435,6 +470,17 @@ class ModernGraphCanvas(QWidget):
             
             self.viewportChanged.emit(self.viewport)
     
+    def _sync_layout(self):
+        """取物理模拟的最新位置，并在布局变化后增量更新空间索引"""
+        if self.physics_engine.sync_nodes(self.nodes) or self._spatial_index_dirty:
+            self.spatial_index.refresh(self.nodes)
+            self._spatial_index_dirty = False
+    
+    def _on_layout_changed(self):
+        """布局变化：标记空间索引待更新并安排重绘"""
+        self._spatial_index_dirty = True
+        self._schedule_render()
+    
     def _schedule_render(self):
         """延迟渲染"""
         if not self.render_timer.isActive():
@@ -442,6 +488,8 @@ class ModernGraphCanvas(QWidget):
     
     def _on_stability_changed(self, is_stable: bool):
         """稳定性变化处理"""
+        # 重新开始模拟时位置会被重新初始化
+        self._spatial_index_dirty = True
         if is_stable:
             self.layoutStabilized.emit()
     
@@ -490,6 +538,8 @@ class ModernGraphCanvas(QWidget):
             f"状态: {'稳定' if engine_info['is_stable'] else '运行中'}",
             f"缩放: {self.zoom_factor:.2f}x",
         ]
+        if self.rendering_engine.last_lod is not None:
+            stats_text.append(f"细节: {self.rendering_engine.last_lod.value}")
         
         # 绘制统计信息
         y = 20
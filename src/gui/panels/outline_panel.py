@@ -1216,49 +1216,98 @@ class OutlinePanel(QWidget):
     def _process_outline_sync(self, outline_text: str, use_ai: bool = False):
         """同步处理大纲（标准格式或AI分析完成后的处理）"""
         try:
+            # 语义解析属于CPU密集型NLP分析，交给后台分析服务
+            if use_ai:
+                self._parse_outline_in_background(outline_text, use_ai=True)
+                return
+            
             # 使用大纲解析器解析
             from core.outline_parser import OutlineParserFactory, OutlineParseLevel
-            
-            # 根据是否使用AI选择解析器
-            if use_ai:
-                parser = OutlineParserFactory.create_parser(OutlineParseLevel.SEMANTIC)
-            else:
-                parser = OutlineParserFactory.create_parser(OutlineParseLevel.BASIC)
+            parser = OutlineParserFactory.create_parser(OutlineParseLevel.BASIC)
             
             # 解析大纲
             outline_nodes = parser.parse(outline_text)
-            
-            if not outline_nodes:
-                if use_ai:
-                    QMessageBox.warning(self, "警告", "AI分析后仍无法解析大纲内容，请检查AI输出格式")
-                else:
-                    QMessageBox.warning(self, "警告", "无法解析大纲内容，请检查格式\n\n提示：您可以尝试启用AI智能分析来处理任意格式的文本")
-                return
-            
-            # 转换为项目文档
-            created_count = self._create_documents_from_outline(outline_nodes)
-            
-            if created_count > 0:
-                # 刷新大纲视图
-                QTimer.singleShot(100, self._force_refresh_outline)
-                
-                mode_text = "AI智能分析" if use_ai else "标准格式解析"
-                QMessageBox.information(
-                    self, 
-                    "导入成功", 
-                    f"大纲导入成功！\n"
-                    f"• 处理模式: {mode_text}\n"
-                    f"• 创建文档: {created_count} 个\n"
-                    f"• 大纲视图已更新"
-                )
-                logger.info(f"大纲导入成功 ({mode_text})，创建了 {created_count} 个文档")
-            else:
-                QMessageBox.warning(self, "警告", "没有创建任何文档，导入失败")
+            self._finish_outline_import(outline_nodes, use_ai=False)
             
         except Exception as e:
             logger.error(f"同步处理大纲时发生错误: {e}")
             QMessageBox.critical(self, "错误", f"处理大纲失败: {str(e)}")
     
+    def _parse_outline_in_background(self, outline_text: str, use_ai: bool = True):
+        """在后台分析服务中进行语义级大纲解析"""
+        from core.analysis_service import get_analysis_service, AnalysisJobKind
+        
+        service = get_analysis_service()
+        if not getattr(self, '_analysis_service_connected', False):
+            service.jobFinished.connect(self._on_outline_parse_finished)
+            service.jobFailed.connect(self._on_outline_parse_failed)
+            self._analysis_service_connected = True
+        
+        job_id = service.submit(AnalysisJobKind.OUTLINE_SEMANTIC, [outline_text], key="outline_import")
+        self._pending_outline_parse = (job_id, outline_text, use_ai)
+        logger.info(f"语义大纲解析已提交到后台: {job_id}")
+    
+    @pyqtSlot(str, object)
+    def _on_outline_parse_finished(self, job_id: str, results: object):
+        """后台语义大纲解析完成"""
+        pending = getattr(self, '_pending_outline_parse', None)
+        if not pending or pending[0] != job_id:
+            return
+        self._pending_outline_parse = None
+        
+        try:
+            outline_nodes = results[0] if results else []
+            self._finish_outline_import(outline_nodes, use_ai=pending[2])
+        except Exception as e:
+            logger.error(f"处理大纲解析结果时发生错误: {e}")
+            QMessageBox.critical(self, "错误", f"处理大纲失败: {str(e)}")
+    
+    @pyqtSlot(str, str)
+    def _on_outline_parse_failed(self, job_id: str, error_msg: str):
+        """后台语义大纲解析失败，降级为前台解析"""
+        pending = getattr(self, '_pending_outline_parse', None)
+        if not pending or pending[0] != job_id:
+            return
+        self._pending_outline_parse = None
+        
+        logger.warning(f"后台语义大纲解析失败，改为前台解析: {error_msg}")
+        try:
+            from core.outline_parser import OutlineParserFactory, OutlineParseLevel
+            parser = OutlineParserFactory.create_parser(OutlineParseLevel.SEMANTIC)
+            self._finish_outline_import(parser.parse(pending[1]), use_ai=pending[2])
+        except Exception as e:
+            logger.error(f"处理大纲时发生错误: {e}")
+            QMessageBox.critical(self, "错误", f"处理大纲失败: {str(e)}")
+    
+    def _finish_outline_import(self, outline_nodes: List, use_ai: bool):
+        """将解析好的大纲节点转换为项目文档"""
+        if not outline_nodes:
+            if use_ai:
+                QMessageBox.warning(self, "警告", "AI分析后仍无法解析大纲内容，请检查AI输出格式")
+            else:
+                QMessageBox.warning(self, "警告", "无法解析大纲内容，请检查格式\n\n提示：您可以尝试启用AI智能分析来处理任意格式的文本")
+            return
+        
+        # 转换为项目文档
+        created_count = self._create_documents_from_outline(outline_nodes)
+        
+        if created_count > 0:
+            # 刷新大纲视图
+            QTimer.singleShot(100, self._force_refresh_outline)
+            
+            mode_text = "AI智能分析" if use_ai else "标准格式解析"
+            QMessageBox.information(
+                self, 
+                "导入成功", 
+                f"大纲导入成功！\n"
+                f"• 处理模式: {mode_text}\n"
+                f"• 创建文档: {created_count} 个\n"
+                f"• 大纲视图已更新"
+            )
+            logger.info(f"大纲导入成功 ({mode_text})，创建了 {created_count} 个文档")
+        else:
+            QMessageBox.warning(self, "警告", "没有创建任何文档，导入失败")
+    
     def _ai_analyze_text(self, text: str) -> Optional[str]:
         """使用AI分析文本并转换为大纲格式（异步版本，避免界面卡死）"""
         try:
@@ -1452,38 +1501,8 @@ class OutlinePanel(QWidget):
             # 使用AI分析结果作为大纲文本
             outline_text = ai_result if ai_result else original_text
             
-            # 使用大纲解析器解析
-            from core.outline_parser import OutlineParserFactory, OutlineParseLevel
-            
-            # 使用语义级解析器（因为已经过AI处理）
-            parser = OutlineParserFactory.create_parser(OutlineParseLevel.SEMANTIC)
-            
-            # 解析大纲
-            outline_nodes = parser.parse(outline_text)
-            
-            if not outline_nodes:
-                QMessageBox.warning(self, "警告", "AI分析后仍无法解析大纲内容，请检查AI输出格式")
-                return
-            
-            # 转换为项目文档
-            created_count = self._create_documents_from_outline(outline_nodes)
-            
-            if created_count > 0:
-                # 刷新大纲视图
-                QTimer.singleShot(100, self._force_refresh_outline)
-                
-                mode_text = "AI智能分析"
-                QMessageBox.information(
-                    self, 
-                    "导入成功", 
-                    f"大纲导入成功！\n"
-                    f"• 处理模式: {mode_text}\n"
-                    f"• 创建文档: {created_count} 个\n"
-                    f"• 大纲视图已更新"
-                )
-                logger.info(f"大纲导入成功 ({mode_text})，创建了 {created_count} 个文档")
-            else:
-                QMessageBox.warning(self, "警告", "没有创建任何文档，导入失败")
+            # 使用语义级解析器（因为已经过AI处理），在后台分析服务中执行
+            self._parse_outline_in_background(outline_text, use_ai=True)
             
         except Exception as e:
             logger.error(f"处理AI分析结果时发生错误: {e}")
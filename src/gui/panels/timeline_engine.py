@@ -3,6 +3,7 @@
 提供高质量的时间线数据处理和可视化功能
 """
 
+import copy
 import logging
 import math
 from datetime import datetime, timedelta
@@ -11,10 +12,13 @@ from typing import List, Dict, Optional, Tuple, Set, Any, Union
 from enum import Enum, auto
 from abc import ABC, abstractmethod
 
-from PyQt6.QtCore import QObject, pyqtSignal, QRect, QRectF, QPointF, QDateTime, QDate
-from PyQt6.QtGui import QColor, QPainter, QPen, QBrush, QFont, QFontMetrics, QLinearGradient
+from PyQt6.QtCore import Qt, QObject, pyqtSignal, QRect, QRectF, QPointF, QDateTime, QDate
+from PyQt6.QtGui import QColor, QPainter, QPen, QBrush, QFont, QFontMetrics, QLinearGradient, QPixmap
 from PyQt6.QtWidgets import QWidget
 
+from .timeline_index import EventIntervalIndex, count_cooccurrences, to_seconds
+from .timeline_tiles import TrackTileCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -120,6 +124,22 @@ class TimelineTrack:
     color: QColor = field(default_factory=lambda: QColor("#3498DB"))
     visible: bool = True
     height: int = 40
+    _index: Optional[EventIntervalIndex] = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def index(self) -> EventIntervalIndex:
+        """
+        事件索引（按需构建）
+
+        构建后 events 就是索引内部按时间排序的列表；直接向 events 追加事件时下次访问会重建索引，
+        修改已有事件请使用 add_event / remove_event。
+        """
+        index = self._index
+        if index is None or index.events is not self.events or len(index) != len(self.events):
+            index = EventIntervalIndex(self.events)
+            self._index = index
+            self.events = index.events
+        return index
     
     @property
     def event_count(self) -> int:
@@ -133,17 +153,35 @@ class TimelineTrack:
             now = datetime.now()
             return now, now
         
-        dates = [event.timestamp for event in self.events]
-        return min(dates), max(dates)
+        index = self.index
+        return index.first_timestamp(), index.last_timestamp()
     
     def get_events_in_range(self, start: datetime, end: datetime) -> List[TimelineEvent]:
-        """获取指定时间范围内的事件"""
-        return [event for event in self.events 
-                if start <= event.timestamp <= end]
+        """获取指定时间范围内的事件（二分查找）"""
+        return self.index.in_range(start, end)
+    
+    def get_events_overlapping(self, start: datetime, end: datetime) -> List[TimelineEvent]:
+        """获取持续区间与指定时间范围相交的事件"""
+        return self.index.overlapping(start, end)
+    
+    def add_event(self, event: TimelineEvent):
+        """添加或替换事件，保持时间顺序"""
+        self.index.add(event)
+    
+    def remove_event(self, event_id: str) -> Optional[TimelineEvent]:
+        """移除事件"""
+        return self.index.remove(event_id)
 
 
 class TimelineAnalyzer:
-    """时间线分析器"""
+    """
+    时间线分析器
+
+    轨道间相关性基于各轨道索引中已排序的时间数组做双指针扫描，
+    结果按轨道索引版本缓存：某个条目的进展变化后只重新计算与该轨道相关的轨道对。
+    """
+    
+    CORRELATION_WINDOW = timedelta(days=7)
     
     def __init__(self):
         self.cache = {}
@@ -244,38 +282,58 @@ class TimelineAnalyzer:
     
     def _calculate_correlation_matrix(self, tracks: List[TimelineTrack]) -> Dict[str, Dict[str, float]]:
         """计算轨道间相关性矩阵"""
-        # 简化实现：基于事件时间的相关性
-        matrix = {}
+        # 基于事件时间的相关性，矩阵对称，每对轨道只计算一次
+        matrix = {track.codex_id: {} for track in tracks}
         
         for i, track_a in enumerate(tracks):
-            matrix[track_a.codex_id] = {}
-            for j, track_b in enumerate(tracks):
-                if i == j:
-                    correlation = 1.0
-                else:
-                    correlation = self._calculate_temporal_correlation(track_a.events, track_b.events)
+            matrix[track_a.codex_id][track_a.codex_id] = 1.0
+            for track_b in tracks[i + 1:]:
+                correlation = self._track_correlation(track_a, track_b)
                 matrix[track_a.codex_id][track_b.codex_id] = correlation
+                matrix[track_b.codex_id][track_a.codex_id] = correlation
         
         return matrix
     
+    def _track_correlation(self, track_a: TimelineTrack, track_b: TimelineTrack) -> float:
+        """两个轨道的相关性（按索引版本缓存）"""
+        index_a, index_b = track_a.index, track_b.index
+        key = ('correlation', track_a.codex_id, track_b.codex_id)
+        versions = (id(index_a), index_a.version, id(index_b), index_b.version)
+        cached = self.cache.get(key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+        
+        correlation = self._normalized_cooccurrence(index_a.timestamps, index_b.timestamps)
+        self.cache[key] = (versions, correlation)
+        return correlation
+    
     def _calculate_temporal_correlation(self, events_a: List[TimelineEvent], 
                                       events_b: List[TimelineEvent]) -> float:
         """计算两个事件序列的时间相关性"""
         if not events_a or not events_b:
             return 0.0
         
-        # 简化算法：计算时间窗口内的共现
-        correlation_count = 0
-        window = timedelta(days=7)  # 7天窗口
-        
-        for event_a in events_a:
-            for event_b in events_b:
-                if abs((event_a.timestamp - event_b.timestamp).total_seconds()) <= window.total_seconds():
-                    correlation_count += 1
+        times_a = sorted(to_seconds(event.timestamp) for event in events_a)
+        times_b = sorted(to_seconds(event.timestamp) for event in events_b)
+        return self._normalized_cooccurrence(times_a, times_b)
+    
+    def _normalized_cooccurrence(self, times_a: List[float], times_b: List[float]) -> float:
+        """7天窗口内的共现事件对数，按较短序列的长度归一化"""
+        max_possible = min(len(times_a), len(times_b))
+        if max_possible == 0:
+            return 0.0
         
-        # 归一化
-        max_possible = min(len(events_a), len(events_b))
-        return correlation_count / max_possible if max_possible > 0 else 0.0
+        correlation_count = count_cooccurrences(times_a, times_b,
+                                                self.CORRELATION_WINDOW.total_seconds())
+        return correlation_count / max_possible
+    
+    def invalidate(self, codex_id: Optional[str] = None):
+        """清除缓存（指定条目时只清除与其相关的结果）"""
+        if codex_id is None:
+            self.cache.clear()
+            return
+        for key in [key for key in self.cache if codex_id in key[1:]]:
+            del self.cache[key]
     
     def _find_synchronization_points(self, tracks: List[TimelineTrack]) -> List[Dict[str, Any]]:
         """找到同步点（多个轨道同时有事件的时间点）"""
@@ -319,7 +377,12 @@ class TimelineAnalyzer:
 
 
 class TimelineRenderer:
-    """时间线渲染器"""
+    """
+    时间线渲染器
+
+    轨道行按时间比例栅格化为瓦片缓存（见 TrackTileCache），平移和重绘时直接贴图；
+    绘制瓦片时通过轨道索引只取落在瓦片范围内的事件。
+    """
     
     def __init__(self):
         self.font = QFont("Arial", 10)
@@ -343,6 +406,11 @@ class TimelineRenderer:
             'timeline_margin': 50,
             'label_spacing': 20
         }
+        
+        # 轨道瓦片缓存
+        self.use_tile_cache = True
+        self.tile_cache = TrackTileCache()
+        self.tiles_rendered = 0
     
     def render_timeline(self, painter: QPainter, rect: QRect, 
                        tracks: List[TimelineTrack], view_range: Tuple[datetime, datetime],
@@ -367,17 +435,42 @@ class TimelineRenderer:
         # 绘制时间轴
         self._render_time_axis(painter, timeline_rect, view_range, time_scale)
         
-        # 绘制轨道
+        # 绘制轨道（超出画布底部的轨道不绘制）
         y_offset = timeline_rect.y() + 40  # 为时间轴留空间
         for track in tracks:
+            if y_offset > rect.bottom():
+                break
             if track.visible:
                 track_rect = QRect(
                     timeline_rect.x(), y_offset,
                     timeline_rect.width(), track.height
                 )
-                self._render_track(painter, track_rect, track, view_range)
+                if self.use_tile_cache:
+                    self._render_track_tiles(painter, track_rect, track, view_range)
+                else:
+                    self._render_track(painter, track_rect, track, view_range)
                 y_offset += track.height + self.dimensions['track_spacing']
     
+    def invalidate_events(self, codex_id: str, timestamps: List[datetime],
+                          version: Optional[int] = None) -> int:
+        """
+        事件增删或移动后失效覆盖这些时间点的瓦片
+
+        Args:
+            timestamps: 变化事件的旧时间和新时间
+            version: 变化后的轨道索引版本
+
+        Returns:
+            丢弃的瓦片数
+        """
+        return self.tile_cache.invalidate_times(
+            codex_id, [to_seconds(timestamp) for timestamp in timestamps],
+            self._event_padding(), version)
+    
+    def invalidate(self, codex_id: Optional[str] = None):
+        """丢弃指定轨道（未指定时为全部轨道）的瓦片"""
+        self.tile_cache.invalidate(codex_id)
+    
     def _render_time_axis(self, painter: QPainter, rect: QRect, 
                          view_range: Tuple[datetime, datetime], time_scale: TimeScale):
         """渲染时间轴"""
@@ -401,7 +494,7 @@ class TimelineRenderer:
         
         painter.setPen(QPen(self.colors['text']))
         for pos, timestamp, is_major in tick_positions:
-            x = rect.x() + pos
+            x = rect.x() + round(pos)
             
             if is_major:
                 # 主刻度
@@ -421,7 +514,7 @@ class TimelineRenderer:
     
     def _render_track(self, painter: QPainter, rect: QRect, track: TimelineTrack, 
                      view_range: Tuple[datetime, datetime]):
-        """渲染单个轨道"""
+        """渲染单个轨道（不使用瓦片缓存）"""
         start_time, end_time = view_range
         duration = (end_time - start_time).total_seconds()
         
@@ -433,16 +526,90 @@ class TimelineRenderer:
         painter.fillRect(rect, track_bg)
         
         # 绘制轨道标签
-        painter.setPen(QPen(self.colors['text']))
-        label_rect = QRect(5, rect.y(), self.dimensions['timeline_margin'] - 10, rect.height())
-        painter.drawText(label_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, 
-                        track.codex_title)
+        self._render_track_label(painter, rect, track)
         
         # 绘制事件
         events_in_range = track.get_events_in_range(start_time, end_time)
         for event in events_in_range:
             self._render_event(painter, rect, event, start_time, duration)
     
+    def _render_track_tiles(self, painter: QPainter, rect: QRect, track: TimelineTrack,
+                            view_range: Tuple[datetime, datetime]):
+        """用缓存的瓦片渲染单个轨道"""
+        start_time, end_time = view_range
+        duration = (end_time - start_time).total_seconds()
+        
+        if duration <= 0 or rect.width() <= 0:
+            return
+        
+        cache = self.tile_cache
+        scale = cache.scale_key(duration / rect.width())
+        show_icons = rect.width() > 200
+        dpr = painter.device().devicePixelRatioF() if painter.device() else 1.0
+        cache.sync_track(track.codex_id, track.index.version,
+                         (track.color.rgba(), track.height, show_icons, dpr))
+        
+        # 视图起点在绝对像素坐标中的位置，瓦片按此对齐后整像素拼接
+        origin = round(to_seconds(start_time) / scale)
+        painter.save()
+        painter.setClipRect(rect)
+        for tile_index in cache.tile_range(origin, origin + rect.width()):
+            key = (track.codex_id, scale, tile_index)
+            pixmap = cache.get(key)
+            if pixmap is None:
+                pixmap = self._render_tile(track, scale, tile_index, dpr, show_icons)
+                cache.put(key, pixmap)
+            painter.drawPixmap(rect.x() + tile_index * cache.tile_width - origin, rect.y(), pixmap)
+        painter.restore()
+        
+        self._render_track_label(painter, rect, track)
+    
+    def _render_tile(self, track: TimelineTrack, scale: float, tile_index: int,
+                     dpr: float, show_icons: bool) -> QPixmap:
+        """栅格化一块轨道瓦片"""
+        width = self.tile_cache.tile_width
+        pixmap = QPixmap(math.ceil(width * dpr), math.ceil(track.height * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(track.color.lighter(180))
+        
+        # 取出中心落在瓦片及两侧延伸范围内的事件，跨越瓦片边界的事件在相邻瓦片中各画一部分
+        first_pixel = tile_index * width
+        pad = self._event_padding()
+        index = track.index
+        low, high = index.span((first_pixel - pad) * scale, (first_pixel + width + pad) * scale)
+        
+        # 同一像素位置上外观相同的事件只画最上面的一个
+        markers: Dict[Tuple, Tuple[int, TimelineEvent]] = {}
+        timestamps, events = index.timestamps, index.events
+        for i in range(low, high):
+            event = events[i]
+            x = round(timestamps[i] / scale) - first_pixel
+            marker = (x, event.color.rgba(), event.importance > 3, event.icon if show_icons else "")
+            markers.pop(marker, None)
+            markers[marker] = (x, event)
+        
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.font)
+        y = track.height / 2
+        for x, event in markers.values():
+            self._draw_event_marker(painter, x, y, event, show_icons)
+        painter.end()
+        
+        self.tiles_rendered += 1
+        return pixmap
+    
+    def _render_track_label(self, painter: QPainter, rect: QRect, track: TimelineTrack):
+        """绘制轨道标签"""
+        painter.setPen(QPen(self.colors['text']))
+        label_rect = QRect(5, rect.y(), self.dimensions['timeline_margin'] - 10, rect.height())
+        painter.drawText(label_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, 
+                        track.codex_title)
+    
+    def _event_padding(self) -> int:
+        """事件图形（重要程度圆圈和图标）向两侧延伸的像素数"""
+        return self.dimensions['event_radius'] + 6
+    
     def _render_event(self, painter: QPainter, track_rect: QRect, event: TimelineEvent,
                      start_time: datetime, duration: float):
         """渲染单个事件"""
@@ -452,6 +619,12 @@ class TimelineRenderer:
         x = track_rect.x() + x_ratio * track_rect.width()
         y = track_rect.center().y()
         
+        # 只在足够宽时显示图标
+        self._draw_event_marker(painter, x, y, event, track_rect.width() > 200)
+    
+    def _draw_event_marker(self, painter: QPainter, x: float, y: float,
+                           event: TimelineEvent, show_icon: bool):
+        """在指定位置绘制事件点、重要程度圆圈和图标"""
         # 绘制事件点
         radius = self.dimensions['event_radius']
         painter.setBrush(QBrush(event.color))
@@ -465,9 +638,9 @@ class TimelineRenderer:
             painter.setBrush(QBrush())  # 透明填充
             painter.drawEllipse(QPointF(x, y), radius + 3, radius + 3)
         
-        # 绘制图标（如果空间足够）
-        if track_rect.width() > 200:  # 只在足够宽时显示图标
-            icon_rect = QRect(x - 8, y - 20, 16, 16)
+        # 绘制图标
+        if show_icon:
+            icon_rect = QRectF(x - 8, y - 20, 16, 16)
             painter.setPen(QPen(self.colors['text']))
             painter.drawText(icon_rect, Qt.AlignmentFlag.AlignCenter, event.icon)
     
@@ -562,6 +735,9 @@ class TimelineEngine(QObject):
         self.view_range: Optional[Tuple[datetime, datetime]] = None
         self.selected_event_id: Optional[str] = None
         
+        # 各条目上次加载时的进展数据副本，用于增量更新时比较
+        self._progression_snapshots: Dict[str, List[Dict]] = {}
+        
         logger.info("Timeline engine initialized")
     
     def load_progression_data(self):
@@ -571,6 +747,9 @@ class TimelineEngine(QObject):
         
         try:
             self.tracks.clear()
+            self._progression_snapshots.clear()
+            self.analyzer.invalidate()
+            self.renderer.invalidate()
             
             # 获取所有有进展的条目
             entries = self.codex_manager.get_all_entries()
@@ -593,6 +772,7 @@ class TimelineEngine(QObject):
                     track.events.sort(key=lambda e: e.timestamp)
                     
                     self.tracks[entry.id] = track
+                    self._progression_snapshots[entry.id] = copy.deepcopy(entry.progression)
             
             # 自动计算视图范围
             self._auto_calculate_view_range()
@@ -603,6 +783,70 @@ class TimelineEngine(QObject):
         except Exception as e:
             logger.error(f"Failed to load progression data: {e}")
     
+    def update_entry(self, codex_id: str) -> bool:
+        """
+        增量更新单个条目的进展事件
+
+        只重新创建与上次加载相比发生变化的进展事件，其他轨道和分析缓存保持不变。
+
+        Returns:
+            时间线是否发生变化
+        """
+        if not self.codex_manager:
+            return False
+        
+        entry = self.codex_manager.get_entry(codex_id)
+        if entry is None or not entry.progression:
+            self._progression_snapshots.pop(codex_id, None)
+            if self.tracks.pop(codex_id, None) is None:
+                return False
+            self.analyzer.invalidate(codex_id)
+            self.renderer.invalidate(codex_id)
+            self._auto_calculate_view_range()
+            self.dataChanged.emit()
+            return True
+        
+        track = self.tracks.get(codex_id)
+        if track is None:
+            track = TimelineTrack(
+                codex_id=entry.id,
+                codex_title=entry.title,
+                codex_type=entry.entry_type.value,
+                color=self._get_track_color(entry.entry_type.value)
+            )
+            self.tracks[codex_id] = track
+        track.codex_title = entry.title
+        
+        previous = self._progression_snapshots.get(codex_id, [])
+        index = track.index
+        changed = 0
+        changed_times = []  # 变化事件的旧时间和新时间，用于失效渲染瓦片
+        for i, prog_data in enumerate(entry.progression):
+            event_id = f"{codex_id}_prog_{i}"
+            if i < len(previous) and previous[i] == prog_data and event_id in index:
+                continue
+            old_event = index.get(event_id)
+            if old_event is not None:
+                changed_times.append(old_event.timestamp)
+            event = self._create_event_from_progression(codex_id, prog_data, i)
+            track.add_event(event)
+            changed_times.append(event.timestamp)
+            changed += 1
+        for i in range(len(entry.progression), len(previous)):
+            removed = track.remove_event(f"{codex_id}_prog_{i}")
+            if removed is not None:
+                changed_times.append(removed.timestamp)
+                changed += 1
+        self._progression_snapshots[codex_id] = copy.deepcopy(entry.progression)
+        
+        if changed:
+            self.renderer.invalidate_events(codex_id, changed_times, index.version)
+            self.analyzer.invalidate(codex_id)
+            self._auto_calculate_view_range()
+            self.dataChanged.emit()
+            logger.debug(f"Timeline track {codex_id} updated incrementally: {changed} events changed")
+        return changed > 0
+    
     def _create_event_from_progression(self, codex_id: str, prog_data: Dict, index: int) -> TimelineEvent:
         """从进展数据创建事件"""
         # 解析时间戳
@@ -688,14 +932,12 @@ class TimelineEngine(QObject):
         if not self.tracks:
             return
         
-        all_events = []
-        for track in self.tracks.values():
-            all_events.extend(track.events)
+        # 各轨道索引中事件已按时间排序，只需比较首尾
+        ranges = [track.date_range for track in self.tracks.values() if track.events]
         
-        if all_events:
-            timestamps = [event.timestamp for event in all_events]
-            start_time = min(timestamps)
-            end_time = max(timestamps)
+        if ranges:
+            start_time = min(start for start, _ in ranges)
+            end_time = max(end for _, end in ranges)
             
             # 添加一些边距
             margin = (end_time - start_time).total_seconds() * 0.1
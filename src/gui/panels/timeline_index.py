@@ -0,0 +1,181 @@
+"""
+时间线事件索引
+按时间排序的事件数组 + 区间树（按起点排序、以结束时间最大值增广的隐式线段树），
+支持二分范围查询、区间重叠查询和单个事件的增量增删；
+另提供基于双指针扫描的窗口共现计数，供时间线分析使用。
+"""
+
+import bisect
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(timestamp: datetime) -> float:
+    """把时间转换为秒数（无时区的时间按1970-01-01起算，避免受本地时区影响）"""
+    if timestamp.tzinfo is not None:
+        return timestamp.timestamp()
+    return (timestamp - EPOCH).total_seconds()
+
+
+class EventIntervalIndex:
+    """
+    单个轨道的事件索引
+
+    事件视为区间 [timestamp, timestamp + duration]，按 (起点, ID) 排序存放；
+    events 列表与内部数组顺序一致，可直接作为轨道的事件列表使用。
+    增删事件时二分定位插入位置，区间树在下一次重叠查询时按需重建。
+    """
+
+    def __init__(self, events: Iterable = ()):
+        self._keys: List[Tuple[float, str]] = []
+        self._starts: List[float] = []
+        self._ends: List[float] = []
+        self._events: List = []
+        self._key_by_id: Dict[str, Tuple[float, str]] = {}
+        self._tree: Optional[List[float]] = None
+        self._tree_size = 0
+        self.version = 0
+
+        items = sorted(((to_seconds(event.timestamp), event.id), event) for event in events)
+        for key, event in items:
+            self._keys.append(key)
+            self._starts.append(key[0])
+            self._ends.append(key[0] + event.duration.total_seconds())
+            self._events.append(event)
+            self._key_by_id[event.id] = key
+
+    def __len__(self) -> int:
+        # 按已索引的键计数：外部直接向 events 追加时与 len(events) 不一致，可据此判断索引过期
+        return len(self._keys)
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._key_by_id
+
+    @property
+    def events(self) -> List:
+        """按时间排序的事件列表（只读，修改请使用 add/remove）"""
+        return self._events
+
+    @property
+    def timestamps(self) -> List[float]:
+        """按时间排序的起点秒数（只读）"""
+        return self._starts
+
+    def add(self, event):
+        """插入事件（ID已存在时替换）"""
+        if event.id in self._key_by_id:
+            self.remove(event.id)
+        key = (to_seconds(event.timestamp), event.id)
+        position = bisect.bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._starts.insert(position, key[0])
+        self._ends.insert(position, key[0] + event.duration.total_seconds())
+        self._events.insert(position, event)
+        self._key_by_id[event.id] = key
+        self._tree = None
+        self.version += 1
+
+    def remove(self, event_id: str):
+        """移除事件，返回被移除的事件（不存在时返回None）"""
+        key = self._key_by_id.pop(event_id, None)
+        if key is None:
+            return None
+        position = bisect.bisect_left(self._keys, key)
+        del self._keys[position]
+        del self._starts[position]
+        del self._ends[position]
+        event = self._events.pop(position)
+        self._tree = None
+        self.version += 1
+        return event
+
+    def get(self, event_id: str):
+        """按ID查找事件"""
+        key = self._key_by_id.get(event_id)
+        if key is None:
+            return None
+        return self._events[bisect.bisect_left(self._keys, key)]
+
+    def first_timestamp(self) -> Optional[datetime]:
+        return self._events[0].timestamp if self._events else None
+
+    def last_timestamp(self) -> Optional[datetime]:
+        return self._events[-1].timestamp if self._events else None
+
+    def span(self, start_s: float, end_s: float) -> Tuple[int, int]:
+        """起点秒数落在 [start_s, end_s] 内的事件下标区间 [low, high)"""
+        low = bisect.bisect_left(self._starts, start_s)
+        high = bisect.bisect_right(self._starts, end_s, lo=low)
+        return low, high
+
+    def in_range(self, start: datetime, end: datetime) -> List:
+        """时间点落在 [start, end] 内的事件（二分查找）"""
+        low, high = self.span(to_seconds(start), to_seconds(end))
+        return self._events[low:high]
+
+    def count_in_range(self, start: datetime, end: datetime) -> int:
+        """时间点落在 [start, end] 内的事件数"""
+        return len(self.in_range(start, end))
+
+    def overlapping(self, start: datetime, end: datetime) -> List:
+        """区间与 [start, end] 相交的事件（考虑事件持续时间）"""
+        start_s, end_s = to_seconds(start), to_seconds(end)
+        # 起点不晚于end的前缀中，查找结束时间不早于start的事件
+        limit = bisect.bisect_right(self._starts, end_s)
+        if limit == 0:
+            return []
+
+        tree, size = self._max_end_tree()
+        hits = []
+        stack = [(1, 0, size)]
+        while stack:
+            node, low, high = stack.pop()
+            if low >= limit or tree[node] < start_s:
+                continue
+            if high - low == 1:
+                hits.append(low)
+                continue
+            middle = (low + high) // 2
+            stack.append((2 * node + 1, middle, high))
+            stack.append((2 * node, low, middle))
+        hits.sort()
+        return [self._events[i] for i in hits]
+
+    def _max_end_tree(self) -> Tuple[List[float], int]:
+        """按需重建以结束时间最大值增广的线段树"""
+        if self._tree is None:
+            size = 1
+            while size < len(self._ends):
+                size *= 2
+            tree = [float('-inf')] * (2 * size)
+            tree[size:size + len(self._ends)] = self._ends
+            for node in range(size - 1, 0, -1):
+                tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            self._tree, self._tree_size = tree, size
+        return self._tree, self._tree_size
+
+
+def count_cooccurrences(times_a: Sequence[float], times_b: Sequence[float], window: float) -> int:
+    """
+    统计 |a - b| <= window 的事件对数（两个序列均已升序）
+
+    对A中每个时间点，B中满足条件的区间 [a - window, a + window] 的左右端点都单调右移，
+    因此双指针扫描一遍即可，复杂度 O(len(A) + len(B))。
+    """
+    count = 0
+    low = high = 0
+    length_b = len(times_b)
+    for time_a in times_a:
+        while low < length_b and times_b[low] < time_a - window:
+            low += 1
+        if high < low:
+            high = low
+        while high < length_b and times_b[high] <= time_a + window:
+            high += 1
+        count += high - low
+    return count
@@ -0,0 +1,143 @@
+"""
+时间线轨道瓦片缓存
+轨道行按当前时间比例（每像素秒数）切分为固定宽度的瓦片，栅格化后缓存；
+平移时只需绘制新露出的瓦片，事件变化时只失效覆盖变化时间点的瓦片。
+"""
+
+import math
+import logging
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from PyQt6.QtGui import QPixmap
+
+logger = logging.getLogger(__name__)
+
+TileKey = Tuple[Hashable, float, int]      # (轨道ID, 时间比例, 瓦片序号)
+
+
+class TrackTileCache:
+    """
+    轨道瓦片的LRU缓存
+
+    瓦片在"绝对像素坐标"（时间秒数 / 每像素秒数）上对齐：第 i 块瓦片覆盖像素 [i*W, (i+1)*W)，
+    同一时间比例下平移视图时瓦片可直接复用。每个轨道记录绘制瓦片时的索引版本和样式，
+    二者变化且没有收到精确失效通知时，整条轨道的瓦片一并丢弃。
+    """
+
+    def __init__(self, tile_width: int = 256, max_tiles: int = 512):
+        if tile_width <= 0:
+            raise ValueError("Tile width must be positive")
+        self.tile_width = tile_width
+        self.max_tiles = max_tiles
+        self._tiles: "OrderedDict[TileKey, QPixmap]" = OrderedDict()
+        self._by_track: Dict[Hashable, Set[TileKey]] = {}
+        self._versions: Dict[Hashable, int] = {}
+        self._styles: Dict[Hashable, Tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def __contains__(self, key: TileKey) -> bool:
+        return key in self._tiles
+
+    @staticmethod
+    def scale_key(seconds_per_pixel: float) -> float:
+        """
+        规范化时间比例
+
+        视图范围经 timedelta 运算后会有微秒级误差，保留6位有效数字，
+        使平移时的时间比例保持不变、瓦片可以复用。
+        """
+        if seconds_per_pixel <= 0:
+            raise ValueError("Time scale must be positive")
+        return float(f"{seconds_per_pixel:.6g}")
+
+    def tile_range(self, first_pixel: float, last_pixel: float) -> range:
+        """覆盖绝对像素区间 [first_pixel, last_pixel] 的瓦片序号"""
+        return range(math.floor(first_pixel / self.tile_width),
+                     math.floor(last_pixel / self.tile_width) + 1)
+
+    def keys(self, track_id: Hashable) -> Set[TileKey]:
+        """某个轨道当前缓存的瓦片"""
+        return set(self._by_track.get(track_id, ()))
+
+    def get(self, key: TileKey) -> Optional[QPixmap]:
+        pixmap = self._tiles.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self._tiles.move_to_end(key)
+        self.hits += 1
+        return pixmap
+
+    def put(self, key: TileKey, pixmap: QPixmap):
+        self._tiles[key] = pixmap
+        self._tiles.move_to_end(key)
+        self._by_track.setdefault(key[0], set()).add(key)
+        while len(self._tiles) > self.max_tiles:
+            old_key, _ = self._tiles.popitem(last=False)
+            self._discard_key(old_key)
+
+    def sync_track(self, track_id: Hashable, version: int, style: Tuple):
+        """绘制前核对轨道状态，版本或样式与缓存不一致时丢弃该轨道的全部瓦片"""
+        if self._versions.get(track_id) != version or self._styles.get(track_id) != style:
+            if track_id in self._by_track:
+                logger.debug(f"Timeline tiles of track {track_id} dropped: state changed")
+            self._drop_track(track_id)
+            self._versions[track_id] = version
+            self._styles[track_id] = style
+
+    def invalidate_times(self, track_id: Hashable, seconds: Iterable[float],
+                         pad_pixels: float, version: Optional[int] = None) -> int:
+        """
+        失效覆盖给定时间点的瓦片
+
+        Args:
+            seconds: 发生变化的事件时间（秒），包括事件的旧位置和新位置
+            pad_pixels: 事件图形向两侧延伸的像素数
+            version: 变化后的轨道索引版本，给出时视为其余瓦片仍然有效
+
+        Returns:
+            丢弃的瓦片数
+        """
+        keys = self._by_track.get(track_id)
+        dropped = 0
+        if keys:
+            scales = {key[1] for key in keys}
+            for second in seconds:
+                for scale in scales:
+                    pixel = second / scale
+                    for index in self.tile_range(pixel - pad_pixels, pixel + pad_pixels):
+                        key = (track_id, scale, index)
+                        if self._tiles.pop(key, None) is not None:
+                            self._discard_key(key)
+                            dropped += 1
+        if version is not None and track_id in self._versions:
+            self._versions[track_id] = version
+        return dropped
+
+    def invalidate(self, track_id: Optional[Hashable] = None):
+        """丢弃指定轨道（未指定时为全部轨道）的瓦片"""
+        if track_id is None:
+            self._tiles.clear()
+            self._by_track.clear()
+            self._versions.clear()
+            self._styles.clear()
+            return
+        self._drop_track(track_id)
+        self._versions.pop(track_id, None)
+        self._styles.pop(track_id, None)
+
+    def _drop_track(self, track_id: Hashable):
+        for key in self._by_track.pop(track_id, ()):
+            self._tiles.pop(key, None)
+
+    def _discard_key(self, key: TileKey):
+        keys = self._by_track.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_track[key[0]]
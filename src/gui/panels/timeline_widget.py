@@ -247,12 +247,21 @@ class TimelineCanvas(QWidget):
         if not self.current_view_range:
             return None
         
-        # 简化实现：遍历所有可见事件
+        start_time, end_time = self.current_view_range
+        timeline_width = self.rect().width() - 100
+        duration = (end_time - start_time).total_seconds()
+        if duration <= 0 or timeline_width <= 0:
+            return None
+        
+        # 只检查时间上靠近鼠标位置的事件（通过轨道索引查找）
+        seconds_per_pixel = duration / timeline_width
+        pointer_time = start_time + timedelta(seconds=(pos.x() - self.rect().x() - 50) * seconds_per_pixel)
+        tolerance = timedelta(seconds=10 * seconds_per_pixel)
         for track in self.engine.tracks.values():
             if not track.visible:
                 continue
             
-            for event in track.events:
+            for event in track.get_events_in_range(pointer_time - tolerance, pointer_time + tolerance):
                 # 计算事件在屏幕上的位置
                 event_screen_pos = self._world_to_screen_pos(event)
                 if event_screen_pos and self._point_near_event(pos, event_screen_pos):
@@ -673,8 +682,14 @@ class TimelineWidget(QWidget):
                     }
         return None
     
-    def _on_codex_changed(self):
-        """Codex数据变化处理"""
+    def _on_codex_changed(self, entry_id: str = None):
+        """Codex数据变化处理：只增量更新发生变化的条目"""
+        if entry_id:
+            try:
+                self.engine.update_entry(entry_id)
+                return
+            except Exception as e:
+                logger.warning(f"Incremental timeline update failed, reloading: {e}")
         self._load_data()
     
     def _export_analysis(self):
@@ -246,4 +246,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # 后台分析服务使用spawn进程池，打包后的程序需要freeze_support
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
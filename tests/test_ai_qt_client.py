@@ -0,0 +1,193 @@
+"""
+Qt AI客户端的单元测试
+使用本地HTTP服务验证请求在常驻事件循环线程中执行，结果通过Qt信号返回
+"""
+
+import unittest
+import json
+import time
+import select
+import socket
+import threading
+import sys
+import os
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication
+
+from core.ai_client import AIConfig, AIProvider
+from core.ai_qt_client import QtAIClient
+from core.async_loop_thread import get_ai_event_loop, shutdown_ai_event_loop
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    """OpenAI兼容接口：stream请求返回SSE数据块"""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    served = 0
+    aborted = 0
+
+    def _client_disconnected(self) -> bool:
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        return bool(readable) and self.connection.recv(1, socket.MSG_PEEK) == b""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        # 模拟生成耗时；客户端断开连接时停止生成
+        deadline = time.time() + self.delay
+        while time.time() < deadline:
+            if self._client_disconnected():
+                type(self).aborted += 1
+                self.close_connection = True
+                return
+            time.sleep(0.02)
+        type(self).served += 1
+
+        if request.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for piece in ["天", "色", "渐暗"]:
+                chunk = {"choices": [{"delta": {"content": piece}}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+            return
+
+        body = json.dumps({"choices": [{"message": {"content": "好的"}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestQtAIClient(unittest.TestCase):
+    """Qt AI客户端测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _CompletionHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutdown_ai_event_loop()
+
+    def setUp(self):
+        _CompletionHandler.delay = 0.0
+        _CompletionHandler.served = _CompletionHandler.aborted = 0
+        config = AIConfig(provider=AIProvider.OLLAMA, model="test-model",
+                          endpoint_url=f"http://127.0.0.1:{self.server.server_port}", timeout=5)
+        self.client = QtAIClient(config)
+        self.events = []
+        self.client.responseReceived.connect(lambda text, ctx: self.events.append(('response', text)))
+        self.client.streamChunkReceived.connect(lambda text, ctx: self.events.append(('chunk', text)))
+        self.client.errorOccurred.connect(lambda error, ctx: self.events.append(('error', error)))
+        self.client.requestCompleted.connect(lambda ctx: self.events.append(('completed', None)))
+
+    def _wait_completed(self, timeout=10):
+        deadline = time.time() + timeout
+        while ('completed', None) not in self.events and time.time() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+
+    def test_requests_share_loop_thread(self):
+        """测试多次请求复用同一个事件循环线程"""
+        loop = get_ai_event_loop().loop
+        for _ in range(2):
+            self.events.clear()
+            self.client.complete_async("你好")
+            self._wait_completed()
+            self.assertEqual(self.events, [('response', "好的"), ('completed', None)])
+        self.assertIs(get_ai_event_loop().loop, loop)
+
+    def test_stream_chunks_delivered_in_order(self):
+        """测试流式数据块按顺序投递到GUI线程"""
+        self.client.stream_coalesce_ms = 0
+        self.client.complete_stream_async("你好")
+        self._wait_completed()
+        self.assertEqual(self.events, [
+            ('chunk', "天"), ('chunk', "色"), ('chunk', "渐暗"),
+            ('response', "天色渐暗"), ('completed', None)
+        ])
+
+    def test_stream_chunks_coalesced(self):
+        """测试合并间隔内的数据块合并后投递"""
+        self.client.stream_coalesce_ms = 1000
+        self.client.complete_stream_async("你好")
+        self._wait_completed()
+        self.assertEqual(self.events, [
+            ('chunk', "天"), ('chunk', "色渐暗"),
+            ('response', "天色渐暗"), ('completed', None)
+        ])
+
+    def test_cancelled_request_emits_no_response(self):
+        """测试取消后不再发送响应"""
+        _CompletionHandler.delay = 0.3
+        self.client.complete_async("你好")
+        self.assertTrue(self.client.is_busy())
+        self.client.cancel_request()
+        self._wait_completed()
+        time.sleep(0.4)
+        self.app.processEvents()
+
+        self.assertNotIn('response', [kind for kind, _ in self.events])
+        self.assertFalse(self.client.is_busy())
+
+    def test_new_request_replaces_in_flight(self):
+        """测试新请求立即取代进行中的旧请求"""
+        _CompletionHandler.delay = 0.3
+        self.client.complete_async("旧的", context={'context_key': "1:a"})
+        self.client.complete_async("新的", context={'context_key': "2:b"})
+        self._wait_completed()
+
+        self.assertEqual([kind for kind, _ in self.events], ['response', 'completed'])
+        metrics = self.client.get_scheduler_metrics()
+        self.assertEqual(metrics['superseded'], 1)
+        self.assertEqual(metrics['completed'], 1)
+
+    def test_replaced_requests_close_connections(self):
+        """测试被取代的补全请求关闭HTTP连接，不占用连接池，最新请求不被拖慢"""
+        _CompletionHandler.delay = 1.0
+        for i in range(6):
+            self.client.complete_async(f"旧的{i}", context={'context_key': f"{i}:a"})
+            time.sleep(0.05)
+        start = time.time()
+        self.client.complete_async("新的", context={'context_key': "9:b"})
+        self._wait_completed()
+        elapsed = time.time() - start
+
+        self.assertEqual([kind for kind, _ in self.events], ['response', 'completed'])
+        self.assertLess(elapsed, 1.8)
+        deadline = time.time() + 2
+        while _CompletionHandler.aborted < 6 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual((_CompletionHandler.aborted, _CompletionHandler.served), (6, 1))
+        self.assertEqual(self.client.get_scheduler_metrics()['not_aborted'], 0)
+
+    def test_cancel_if_stale(self):
+        """测试光标上下文变化时取消请求"""
+        _CompletionHandler.delay = 0.3
+        self.client.complete_async("你好", context={'context_key': "1:a"})
+        self.assertFalse(self.client.cancel_if_stale("1:a"))
+        self.assertTrue(self.client.cancel_if_stale("5:b"))
+        self.assertEqual(self.client.get_scheduler_metrics()['context_changed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
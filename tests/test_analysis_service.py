@@ -0,0 +1,107 @@
+"""
+后台文本分析服务的单元测试
+测试批量任务、过期任务取消和工作进程侧的Codex快照
+"""
+
+import unittest
+import time
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication
+
+from core.analysis_service import (
+    AnalysisService, AnalysisJobKind, _run_analysis_batch
+)
+from core.codex_manager import CodexEntry, CodexEntryType
+
+
+class _FakeCodexManager:
+    """提供分析服务所需接口的简化Codex管理器"""
+
+    pattern_version = 1
+
+    def __init__(self, entries):
+        self._entries = entries
+
+    def get_all_entries(self):
+        return list(self._entries)
+
+
+class TestAnalysisService(unittest.TestCase):
+    """分析服务测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.entries = [
+            CodexEntry(id="char1", title="张三", entry_type=CodexEntryType.CHARACTER,
+                       aliases=["小张"]),
+        ]
+        # 使用线程模式避免测试中启动子进程
+        self.service = AnalysisService(codex_manager=_FakeCodexManager(self.entries),
+                                       use_processes=False)
+        self.finished = {}
+        self.cancelled = []
+        self.service.jobFinished.connect(lambda job_id, result: self.finished.__setitem__(job_id, result))
+        self.service.jobCancelled.connect(self.cancelled.append)
+
+    def tearDown(self):
+        self.service.shutdown(wait=True)
+
+    def _wait_for(self, count, timeout=30):
+        deadline = time.time() + timeout
+        while len(self.finished) + len(self.cancelled) < count and time.time() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+
+    def test_batch_results_match_inputs(self):
+        """测试批量任务按输入顺序返回结果"""
+        job_id = self.service.submit(AnalysisJobKind.OPTIMIZED_REFERENCES,
+                                     ["张三说：走吧。", "今天没有人来。"])
+        self._wait_for(1)
+
+        results = self.finished[job_id]
+        self.assertEqual(len(results), 2)
+        self.assertEqual([ref.matched_text for ref in results[0]], ["张三"])
+        self.assertEqual(results[1], [])
+
+    def test_stale_job_is_dropped(self):
+        """测试同一键的新任务会使旧任务结果失效"""
+        old_job = self.service.submit(AnalysisJobKind.TEXT_STRUCTURE, ["张三走了。"], key="doc1")
+        new_job = self.service.submit(AnalysisJobKind.TEXT_STRUCTURE, ["小张来了。"], key="doc1")
+        self._wait_for(2)
+
+        self.assertIn(new_job, self.finished)
+        self.assertNotIn(old_job, self.finished)
+        self.assertIn(old_job, self.cancelled)
+        self.assertEqual(self.service.get_statistics()['cancelled'], 1)
+
+    def test_reference_job_requires_codex_manager(self):
+        """测试引用检测任务需要Codex管理器"""
+        service = AnalysisService(use_processes=False)
+        with self.assertRaises(ValueError):
+            service.submit(AnalysisJobKind.ENHANCED_REFERENCES, ["张三"])
+        service.shutdown()
+
+
+class TestWorkerBatch(unittest.TestCase):
+    """工作进程侧任务函数测试"""
+
+    def test_detector_uses_codex_snapshot(self):
+        """测试工作进程使用Codex条目快照进行检测"""
+        entries = [CodexEntry(id="loc1", title="天山", entry_type=CodexEntryType.LOCATION)]
+        results = _run_analysis_batch(AnalysisJobKind.OPTIMIZED_REFERENCES,
+                                      ["他去了天山。"], codex_version=7, codex_entries=entries)
+        self.assertEqual([ref.entry_id for ref in results[0]], ["loc1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
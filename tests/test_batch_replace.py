@@ -0,0 +1,170 @@
+"""
+项目级批量替换的单元测试
+"""
+
+import unittest
+import random
+import sqlite3
+import time
+import shutil
+import tempfile
+import sys
+import os
+from unittest.mock import MagicMock
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.project import ProjectManager, ProjectData, ProjectDocument, DocumentType, DocumentStatus
+from core.database_manager import DatabaseManager
+from core.search_index import document_order, get_search_index
+from core.batch_replace import replace_line, replace_query, plan_replacements, apply_plan
+
+
+class TestReplaceLine(unittest.TestCase):
+    """单行替换测试类"""
+
+    def test_literal_and_whole_word(self):
+        self.assertEqual(replace_line(replace_query("cat"), "Cat concatenate", "dog"), ("dog condogenate", 2))
+        query = replace_query("cat", {"whole_word": True, "case_sensitive": True})
+        self.assertEqual(replace_line(query, "cat concatenate Cat", "dog"), ("dog concatenate Cat", 1))
+        # 中文全字匹配按分词边界判断
+        self.assertEqual(replace_line(replace_query("殿", {"whole_word": True}), "走进大殿", "堂")[1], 0)
+
+    def test_regex_groups(self):
+        query = replace_query(r"(林|苏)风", {"regex": True})
+        self.assertEqual(replace_line(query, "林风与苏风", r"\1雪"), ("林雪与苏雪", 2))
+        with self.assertRaises(ValueError):
+            replace_line(query, "林风", r"\2")
+
+    def test_replace_always_uses_phrase(self):
+        self.assertEqual(replace_line(replace_query("林风 剑", {"phrase": False}), "林风 剑 林风", "X"),
+                         ("X 林风", 1))
+
+
+class TestProjectReplace(unittest.TestCase):
+    """项目级替换测试类"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.shared = MagicMock()
+        self.manager = ProjectManager(MagicMock(), self.shared)
+        self.manager._db_manager = DatabaseManager(self.temp_dir)
+        project = ProjectData(id="p", name="测试", description="", author="", language="zh_CN",
+                              project_path=self.temp_dir, version="2.0")
+        contents = ["林风走进大殿。\n苏雪看着林风。", "夜色沉沉。", "林风拔出了剑。\n\n林风说道。"]
+        for i, content in enumerate(contents):
+            project.documents[f"d{i}"] = ProjectDocument(id=f"d{i}", parent_id=None, name=f"第{i + 1}章",
+                                                         doc_type=DocumentType.CHAPTER,
+                                                         status=DocumentStatus.NEW, order=i, content=content)
+        self.manager._current_project = project
+        self.manager.save_project()
+        get_search_index().attach(self.temp_dir)
+
+    def tearDown(self):
+        get_search_index().detach()
+        self.manager._db_manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _plan(self, search_text, replace_text, options=None):
+        documents = self.manager.get_current_project().documents
+        return plan_replacements(search_text, replace_text, options, document_order(documents),
+                                 {doc_id: doc.content for doc_id, doc in documents.items()})
+
+    def _stored_contents(self):
+        return {row['id']: row['content'] for row in self.manager._db_manager.load_project_data()['documents']}
+
+    def test_plan_and_apply(self):
+        plan = self._plan("林风", "萧尘")
+        self.assertEqual([doc.doc_id for doc in plan.documents], ["d0", "d2"])
+        self.assertEqual(plan.count, 4)
+        self.assertEqual([(c.line_num, c.after) for c in plan.documents[1].changes],
+                         [(1, "萧尘拔出了剑。"), (3, "萧尘说道。")])
+        # 未建立索引时逐行扫描，结果一致
+        get_search_index().detach()
+        self.assertEqual(self._plan("林风", "萧尘"), plan)
+
+        applied, conflicts = apply_plan(self.manager, plan)
+        self.assertEqual((applied, conflicts), (["d0", "d2"], []))
+        self.assertEqual(self._stored_contents()["d0"], "萧尘走进大殿。\n苏雪看着萧尘。")
+        self.assertEqual(self.manager.get_document_content("d1"), "夜色沉沉。")
+        self.shared.documentsSaved.emit.assert_called_once_with(["d0", "d2"])
+
+    def test_regex_without_literal_uses_all_lines(self):
+        """没有必需字面量的正则表达式（如清除只含空白的行）也覆盖索引中的所有行"""
+        project = self.manager.get_current_project()
+        project.documents["d1"].content = "夜色沉沉。\n   \n\t"
+        project.documents["d2"].content += "\n  "
+        plan = self._plan(r"^\s+$", "", {"regex": True})
+        self.assertEqual([(doc.doc_id, [c.line_num for c in doc.changes]) for doc in plan.documents],
+                         [("d1", [2, 3]), ("d2", [4])])
+        get_search_index().detach()
+        self.assertEqual(self._plan(r"^\s+$", "", {"regex": True}), plan)
+
+    def test_conflicting_document_is_skipped(self):
+        plan = self._plan("林风", "萧尘")
+        self.manager.get_current_project().documents["d2"].content = "林风已经改名。"
+        applied, conflicts = apply_plan(self.manager, plan)
+        self.assertEqual((applied, conflicts), (["d0"], ["d2"]))
+        self.assertEqual(self.manager.get_document_content("d2"), "林风已经改名。")
+
+    def test_failed_transaction_changes_nothing(self):
+        plan = self._plan("林风", "萧尘")
+        # 一个文档尚未写入数据库时整个事务回滚，内存中的内容也恢复
+        with sqlite3.connect(os.path.join(self.temp_dir, "project.db")) as conn:
+            conn.execute("DELETE FROM documents WHERE id = 'd2'")
+        before = {doc_id: doc.content for doc_id, doc in self.manager.get_current_project().documents.items()}
+        with self.assertRaises(sqlite3.Error):
+            apply_plan(self.manager, plan)
+        self.assertEqual({doc_id: doc.content for doc_id, doc in self.manager.get_current_project().documents.items()},
+                         before)
+        self.assertEqual(self._stored_contents()["d0"], before["d0"])
+        self.shared.documentsSaved.emit.assert_not_called()
+
+
+class TestBatchReplacePerformance(unittest.TestCase):
+    """整部书稿中给角色改名的保存耗时"""
+
+    def test_single_transaction_vs_per_document_save(self):
+        rng = random.Random(5)
+        words = ["林风", "走进", "大殿", "看着", "远方", "说道", "夜色", "沉沉", "的", "剑"]
+        contents = {f"d{i}": "\n".join("".join(rng.choice(words) for _ in range(20)) for _ in range(100))
+                    for i in range(150)}
+
+        timings = {}
+        for batch in (False, True):
+            temp_dir = tempfile.mkdtemp()
+            try:
+                manager = ProjectManager(MagicMock(), MagicMock())
+                manager._db_manager = DatabaseManager(temp_dir)
+                project = ProjectData(id="p", name="测试", description="", author="", language="zh_CN",
+                                      project_path=temp_dir, version="2.0")
+                for i, (doc_id, content) in enumerate(contents.items()):
+                    project.documents[doc_id] = ProjectDocument(id=doc_id, parent_id=None, name=doc_id,
+                                                                doc_type=DocumentType.CHAPTER,
+                                                                status=DocumentStatus.NEW, order=i,
+                                                                content=content)
+                manager._current_project = project
+                manager.save_project()
+                plan = plan_replacements("林风", "萧尘", None, document_order(project.documents), contents)
+
+                start = time.perf_counter()
+                if batch:
+                    apply_plan(manager, plan)
+                else:
+                    # 原方式：逐个文档保存，每次都重写整个项目
+                    for doc in plan.documents:
+                        manager.update_document(doc.doc_id, content=doc.content)
+                timings[batch] = time.perf_counter() - start
+                stored = {row['id']: row['content'] for row in manager._db_manager.load_project_data()['documents']}
+                self.assertEqual(stored["d0"], plan.documents[0].content)
+                manager._db_manager.close()
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        print(f"\n150个文档中替换: 逐个保存 {timings[False] * 1000:.0f}ms, 单事务批量保存 {timings[True] * 1000:.0f}ms")
+        self.assertLess(timings[True] * 5, timings[False])
+
+
+if __name__ == '__main__':
+    unittest.main()
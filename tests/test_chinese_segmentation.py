@@ -0,0 +1,107 @@
+"""
+中文分词器的单元测试
+测试段落分词缓存、词典版本戳和位置计算
+"""
+
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.chinese_segmentation import ChineseSegmenter, SegmentationCache, JIEBA_AVAILABLE
+from core.codex_manager import CodexEntry, CodexEntryType
+
+
+class TestSegmentationCache(unittest.TestCase):
+    """段落分词缓存测试类"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_lru_eviction(self):
+        """测试LRU淘汰"""
+        cache = SegmentationCache(max_entries=2)
+        cache.put("a", [("甲", "n", 0, 1)])
+        cache.put("b", [("乙", "n", 0, 1)])
+        cache.get("a")
+        cache.put("c", [("丙", "n", 0, 1)])
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_persistence_roundtrip(self):
+        """测试磁盘持久化"""
+        cache_file = os.path.join(self.temp_dir, "cache", "segmentation_cache.json")
+        cache = SegmentationCache()
+        cache.attach(cache_file)
+        cache.put("key", [("张三", "nr", 0, 2)])
+        cache.save()
+
+        restored = SegmentationCache()
+        restored.attach(cache_file)
+        self.assertEqual(restored.get("key"), [("张三", "nr", 0, 2)])
+
+    def test_corrupted_cache_file_ignored(self):
+        """测试损坏的缓存文件被忽略"""
+        cache_file = os.path.join(self.temp_dir, "segmentation_cache.json")
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            f.write("{not json")
+
+        cache = SegmentationCache()
+        cache.attach(cache_file)
+        self.assertEqual(len(cache), 0)
+
+
+@unittest.skipUnless(JIEBA_AVAILABLE, "jieba未安装")
+class TestChineseSegmenter(unittest.TestCase):
+    """中文分词器测试类"""
+
+    def setUp(self):
+        self.segmenter = ChineseSegmenter()
+        self.text = "张三走进客栈。\n  李四说：“好。”\n\n天山雪峰下 hello world"
+
+    def test_positions_match_source_text(self):
+        """测试分词位置与原文一致"""
+        for with_pos in (True, False):
+            segments = self.segmenter.segment_text(self.text, with_pos=with_pos)
+            self.assertTrue(segments)
+            for seg in segments:
+                self.assertEqual(self.text[seg.start:seg.end], seg.word)
+
+    def test_repeated_segmentation_hits_cache(self):
+        """测试未变化的段落命中缓存"""
+        first = self.segmenter.segment_text(self.text)
+        misses = self.segmenter.cache.misses
+        second = self.segmenter.segment_text(self.text)
+
+        self.assertEqual(self.segmenter.cache.misses, misses)
+        self.assertEqual([(s.word, s.start) for s in first],
+                         [(s.word, s.start) for s in second])
+
+    def test_dictionary_version_changes_only_on_new_words(self):
+        """测试词典版本戳仅在词表变化时更新"""
+        entries = [CodexEntry(id="loc1", title="天山雪峰", entry_type=CodexEntryType.LOCATION)]
+        self.segmenter.update_custom_dictionary(entries)
+        version = self.segmenter.dictionary_version
+
+        self.segmenter.update_custom_dictionary(entries)
+        self.assertEqual(self.segmenter.dictionary_version, version)
+
+        entries.append(CodexEntry(id="char1", title="王小五", entry_type=CodexEntryType.CHARACTER))
+        self.segmenter.update_custom_dictionary(entries)
+        self.assertNotEqual(self.segmenter.dictionary_version, version)
+
+        words = [seg.word for seg in self.segmenter.segment_text(self.text)]
+        self.assertIn("天山雪峰", words)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+补全响应缓存的单元测试
+测试缓存键规范化、LRU淘汰、TTL过期和磁盘持久化
+"""
+
+import unittest
+from unittest.mock import patch
+import tempfile
+import sys
+import os
+from pathlib import Path
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.completion_cache import CompletionCache
+
+
+class TestCompletionCache(unittest.TestCase):
+    """补全响应缓存测试类"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = patch('core.completion_cache.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_key_normalizes_prompt_and_includes_params(self):
+        """测试缓存键忽略空白差异但区分模型和采样参数"""
+        key = CompletionCache.make_key("续写：\r\n他走了。  \n", "openai:gpt", temperature=0.7)
+        self.assertEqual(key, CompletionCache.make_key("续写：\n他走了。", "openai:gpt", temperature=0.7))
+        self.assertNotEqual(key, CompletionCache.make_key("续写：\n他走了。", "openai:gpt", temperature=0.8))
+        self.assertNotEqual(key, CompletionCache.make_key("续写：\n他走了。", "claude:sonnet", temperature=0.7))
+
+    def test_lru_eviction_and_hit_rate(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache = CompletionCache(max_entries=2)
+        cache.put("a", "甲")
+        cache.put("b", "乙")
+        self.assertEqual(cache.get("a"), "甲")
+        cache.put("c", "丙")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "丙")
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    def test_ttl_expiry(self):
+        """测试过期条目不再返回"""
+        cache = CompletionCache(ttl_seconds=60)
+        cache.put("a", "甲")
+        self.now += 61
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get_stats()['expired'], 1)
+
+    def test_persistence(self):
+        """测试缓存保存到磁盘并在重新加载时跳过过期条目"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_file = Path(temp_dir) / "cache" / "completion_cache.json"
+            cache = CompletionCache(ttl_seconds=60, cache_file=cache_file)
+            cache.put("old", "旧")
+            self.now += 30
+            cache.put("new", "新")
+            cache.save()
+
+            self.now += 40
+            reloaded = CompletionCache(ttl_seconds=60, cache_file=cache_file)
+            self.assertIsNone(reloaded.get("old"))
+            self.assertEqual(reloaded.get("new"), "新")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+补全预取的单元测试
+使用本地HTTP服务模拟LLM接口，验证预取结果写入缓存、命中率和节省的延迟统计
+"""
+
+import unittest
+import json
+import time
+import threading
+import sys
+import os
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication
+
+from core.ai_client import AIConfig, AIProvider
+from core.completion_cache import CompletionCache
+from core.completion_prefetcher import CompletionPrefetcher, PrefetchBudget, MAX_PREFETCHED_KEYS, _PendingPrefetch
+from core.async_loop_thread import shutdown_ai_event_loop
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    """OpenAI兼容接口，固定延迟后返回补全"""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.1
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        _CompletionHandler.requests += 1
+        time.sleep(self.delay)
+
+        body = json.dumps({"choices": [{"message": {"content": "夜色渐深。"}}]},
+                          ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestCompletionPrefetcher(unittest.TestCase):
+    """补全预取测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _CompletionHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutdown_ai_event_loop()
+
+    def setUp(self):
+        _CompletionHandler.delay = 0.1
+        _CompletionHandler.requests = 0
+        self.config = AIConfig(provider=AIProvider.OLLAMA, model="test-model",
+                               endpoint_url=f"http://127.0.0.1:{self.server.server_port}", timeout=5)
+        self.cache = CompletionCache()
+        self.prefetcher = CompletionPrefetcher(PrefetchBudget(max_concurrent=1, max_tokens_per_minute=300),
+                                               cache=self.cache)
+        self.finished = []
+        self.prefetcher.prefetchFinished.connect(lambda key, ok: self.finished.append((key, ok)))
+
+    def _wait(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+
+    def test_trigger_points(self):
+        """测试触发点预测"""
+        self.assertTrue(CompletionPrefetcher.is_trigger_point("他走了。", 4))
+        self.assertTrue(CompletionPrefetcher.is_trigger_point("他走了。\n后来", 4))
+        self.assertTrue(CompletionPrefetcher.is_trigger_point("第一段\n", 4))
+        self.assertFalse(CompletionPrefetcher.is_trigger_point("他走了", 3))
+        self.assertFalse(CompletionPrefetcher.is_trigger_point("他走了。后来", 4))
+        self.assertFalse(CompletionPrefetcher.is_trigger_point("\n\n", 2))
+
+    def test_prefetch_then_hit(self):
+        """测试预取结果写入缓存并在触发时计为命中"""
+        self.assertTrue(self.prefetcher.prefetch("k1", "续写", self.config, 100, 0.7))
+        self._wait(lambda: self.finished)
+
+        self.assertEqual(self.finished, [("k1", True)])
+        self.assertEqual(self.cache.get("k1"), "夜色渐深。")
+        self.assertTrue(self.prefetcher.record_cache_hit("k1"))
+        self.assertFalse(self.prefetcher.record_cache_hit("k1"))
+
+        stats = self.prefetcher.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['hit_rate'], 1.0)
+        self.assertGreaterEqual(stats['latency_saved'], 0.1)
+
+    def test_join_pending(self):
+        """测试触发时接管进行中的预取"""
+        _CompletionHandler.delay = 0.3
+        self.prefetcher.prefetch("k1", "续写", self.config, 100, 0.7)
+        results = []
+        self.assertTrue(self.prefetcher.join_pending("k1", results.append))
+        self.assertFalse(self.prefetcher.join_pending("k2", results.append))
+        self._wait(lambda: results)
+
+        self.assertEqual(results, ["夜色渐深。"])
+        self.assertEqual(_CompletionHandler.requests, 1)
+        self.assertEqual(self.prefetcher.get_stats()['joined'], 1)
+
+    def test_budget_limits(self):
+        """测试并发和token预算"""
+        _CompletionHandler.delay = 0.2
+        self.assertTrue(self.prefetcher.prefetch("k1", "a", self.config, 200, 0.7))
+        self.assertFalse(self.prefetcher.prefetch("k2", "b", self.config, 50, 0.7))  # 并发已满
+        self._wait(lambda: self.finished)
+        self.assertFalse(self.prefetcher.prefetch("k3", "c", self.config, 200, 0.7))  # token超出
+        self.assertTrue(self.prefetcher.prefetch("k4", "d", self.config, 100, 0.7))
+        self.assertEqual(self.prefetcher.get_stats()['budget_rejected'], 2)
+
+    def test_cancel_stale(self):
+        """测试文本变化后取消预取"""
+        _CompletionHandler.delay = 0.3
+        self.prefetcher.prefetch("k1", "续写", self.config, 100, 0.7)
+        self.prefetcher.cancel_stale()
+        time.sleep(0.4)
+        self.app.processEvents()
+
+        self.assertEqual(self.finished, [])
+        self.assertIsNone(self.cache.get("k1"))
+        self.assertEqual(self.prefetcher.get_stats()['cancelled'], 1)
+
+    def test_cache_check_leaves_stats(self):
+        """测试预取前检查缓存不计入缓存命中统计"""
+        self.cache.put("k1", "已缓存")
+        self.assertFalse(self.prefetcher.prefetch("k1", "续写", self.config, 100, 0.7))
+        self.assertTrue(self.prefetcher.prefetch("k2", "续写", self.config, 100, 0.7))
+        self.assertFalse(self.prefetcher.has_capacity())
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 0))
+
+    def test_prefetched_keys_bounded(self):
+        """测试预取耗时记录有容量上限"""
+        self.prefetcher.budget.max_concurrent = MAX_PREFETCHED_KEYS + 10
+        for i in range(MAX_PREFETCHED_KEYS + 10):
+            self.prefetcher._pending[f"k{i}"] = _PendingPrefetch(cache_key=f"k{i}", started_at=time.monotonic())
+            self.prefetcher._on_result_ready(f"k{i}", "夜色渐深。")
+        self.assertEqual(len(self.prefetcher._prefetched), MAX_PREFETCHED_KEYS)
+        self.assertFalse(self.prefetcher.record_cache_hit("k0"))
+        self.assertTrue(self.prefetcher.record_cache_hit(f"k{MAX_PREFETCHED_KEYS + 9}"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+补全请求调度器的单元测试
+测试取消替换、上下文键和节省时间统计
+"""
+
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.completion_scheduler import CompletionScheduler
+
+
+class TestCompletionScheduler(unittest.TestCase):
+    """补全请求调度器测试类"""
+
+    def setUp(self):
+        self.scheduler = CompletionScheduler()
+        self.now = 100.0
+        patcher = patch('core.completion_scheduler.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_context_key_tracks_text_before_cursor(self):
+        """测试上下文键只取决于光标位置和光标前文本"""
+        key = CompletionScheduler.make_context_key("他走进了房间。", 4)
+        self.assertEqual(key, CompletionScheduler.make_context_key("他走进了大厅。", 4))
+        self.assertNotEqual(key, CompletionScheduler.make_context_key("她走进了房间。", 4))
+        self.assertNotEqual(key, CompletionScheduler.make_context_key("他走进了房间。", 5))
+
+    def test_new_request_supersedes_in_flight(self):
+        """测试新请求取代进行中的请求"""
+        self.assertIsNone(self.scheduler.begin(1, "a"))
+        self.assertEqual(self.scheduler.begin(2, "b"), 1)
+        self.assertEqual(self.scheduler.in_flight_id, 2)
+
+        # 被取代的请求完成时不再计入
+        self.scheduler.finish(1)
+        metrics = self.scheduler.get_metrics()
+        self.assertEqual(metrics['superseded'], 1)
+        self.assertEqual(metrics['completed'], 0)
+
+    def test_time_saved_uses_median_latency(self):
+        """测试节省时间按历史延迟中位数估算"""
+        for request_id, latency in enumerate([2.0, 3.0, 4.0], start=1):
+            self.scheduler.begin(request_id, "a")
+            self.now += latency
+            self.scheduler.finish(request_id)
+
+        self.scheduler.begin(10, "a")
+        self.assertTrue(self.scheduler.is_stale("b"))
+        self.now += 1.0
+        self.assertTrue(self.scheduler.cancel(10, reason='context_changed'))
+
+        metrics = self.scheduler.get_metrics()
+        self.assertEqual(metrics['context_changed'], 1)
+        self.assertAlmostEqual(metrics['time_saved'], 2.0)
+        self.assertAlmostEqual(metrics['time_discarded'], 1.0)
+        self.assertFalse(metrics['in_flight'])
+
+        # 取消后仍在后台执行的请求不计入节省时间
+        self.scheduler.begin(11, "a", abortable=False)
+        self.now += 1.0
+        self.scheduler.cancel(11)
+        metrics = self.scheduler.get_metrics()
+        self.assertAlmostEqual(metrics['time_saved'], 2.0)
+        self.assertEqual(metrics['not_aborted'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
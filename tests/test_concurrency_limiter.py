@@ -0,0 +1,166 @@
+"""
+自适应并发限制器的单元测试
+"""
+
+import unittest
+import asyncio
+import threading
+import time
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.concurrency_limiter import (
+    AdaptiveLimiter, LimiterConfig, RequestPriority, ConcurrencyLimiterRegistry,
+    get_limiter_registry, endpoint_key, reset_limiter_registry
+)
+from core.mock_llm_server import MockLLMServer, MockServerProfile
+from core.rag_service import RAGService
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """AIMD窗口调整测试类"""
+
+    def _request(self, limiter, status, priority=RequestPriority.NORMAL):
+        with limiter.slot_blocking(priority) as permit:
+            permit.set_status(status)
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter("chat:test", LimiterConfig(initial_limit=2, max_limit=3))
+        self._request(limiter, 200)
+        self.assertEqual(limiter.limit, 2)
+        self._request(limiter, 200)
+        self.assertEqual(limiter.limit, 3)
+        for _ in range(10):
+            self._request(limiter, 200)
+        self.assertEqual(limiter.limit, 3)
+
+    def test_multiplicative_decrease_once_per_batch(self):
+        limiter = AdaptiveLimiter("chat:test", LimiterConfig(initial_limit=8))
+        permits = [limiter.acquire_blocking() for _ in range(4)]
+        for permit in permits:
+            permit.set_status(503)
+            permit.release()
+        # 同时发出的请求一起失败只缩小一次窗口
+        self.assertEqual(limiter.limit, 4)
+        self._request(limiter, 429)
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(limiter.get_stats()['throttled'], 1)
+
+    def _timed_request(self, limiter, latency, stream):
+        permit = limiter.acquire_blocking(stream=stream)
+        permit.acquired_at -= latency
+        permit.set_status(200)
+        permit.release()
+
+    def test_stream_and_full_latency_baselines(self):
+        """流式请求只计到首个数据块，不能作为整段生成的非流式请求的延迟基线"""
+        limiter = AdaptiveLimiter("chat:test", LimiterConfig(initial_limit=4))
+        for _ in range(8):
+            self._timed_request(limiter, 0.2, stream=True)
+        for _ in range(8):
+            self._timed_request(limiter, 1.2, stream=False)
+            self._timed_request(limiter, 0.2, stream=True)
+        stats = limiter.get_stats()
+        self.assertEqual(stats['decreases'], 0)
+        self.assertGreaterEqual(limiter.limit, 4)
+        self.assertAlmostEqual(stats['min_stream_latency_ms'], 200, delta=50)
+
+        # 同类请求延迟明显升高仍视为过载
+        self._timed_request(limiter, 6.0, stream=False)
+        self.assertEqual(limiter.get_stats()['decreases'], 1)
+
+    def test_client_errors_ignored(self):
+        limiter = AdaptiveLimiter("chat:test", LimiterConfig(initial_limit=4))
+        self._request(limiter, 400)
+        with self.assertRaises(ValueError):
+            with limiter.slot_blocking():
+                raise ValueError("解析失败")
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_retry_after_pauses_sending(self):
+        limiter = AdaptiveLimiter("chat:test")
+        with limiter.slot_blocking() as permit:
+            permit.set_status(429, retry_after=0.2)
+        start = time.monotonic()
+        limiter.acquire_blocking().release()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_interactive_served_first(self):
+        limiter = AdaptiveLimiter("chat:test", LimiterConfig(initial_limit=1))
+        held = limiter.acquire_blocking()
+        order = []
+
+        def worker(priority):
+            with limiter.slot_blocking(priority):
+                order.append(priority)
+
+        threads = [threading.Thread(target=worker, args=(RequestPriority.BACKGROUND,))]
+        threads[0].start()
+        time.sleep(0.05)
+        threads.append(threading.Thread(target=worker, args=(RequestPriority.INTERACTIVE,)))
+        threads[1].start()
+        time.sleep(0.05)
+
+        held.release()
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual(order, [RequestPriority.INTERACTIVE, RequestPriority.BACKGROUND])
+
+    def test_background_share_reserves_slots(self):
+        limiter = AdaptiveLimiter("chat:test", LimiterConfig(initial_limit=4, background_share=0.5))
+
+        async def run():
+            background = [await limiter.acquire(RequestPriority.BACKGROUND) for _ in range(2)]
+            waiting = asyncio.ensure_future(limiter.acquire(RequestPriority.BACKGROUND))
+            await asyncio.sleep(0.01)
+            self.assertFalse(waiting.done())
+            # 后台请求占满份额时交互请求仍能立即获得名额
+            interactive = await asyncio.wait_for(limiter.acquire(RequestPriority.INTERACTIVE), 0.5)
+            background[0].release()
+            permit = await asyncio.wait_for(waiting, 0.5)
+            for item in (background[1], interactive, permit):
+                item.release()
+
+        asyncio.run(run())
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_registry_overrides(self):
+        registry = ConcurrencyLimiterRegistry(LimiterConfig(max_limit=16),
+                                              overrides={'embeddings': {'max_limit': 2, 'unknown': 1}})
+        limiter = registry.get('embeddings', 'https://api.example.com/v1')
+        self.assertEqual(limiter.name, 'embeddings:api.example.com')
+        self.assertEqual(limiter.config.max_limit, 2)
+        self.assertIs(limiter, registry.get('embeddings', 'https://api.example.com/v1/other'))
+        self.assertEqual(registry.get('chat', 'https://api.example.com').config.max_limit, 16)
+        self.assertIsNone(ConcurrencyLimiterRegistry(enabled=False).get('chat', 'http://x'))
+
+
+class TestEmbeddingConcurrency(unittest.TestCase):
+    """RAG批量嵌入受端点限流器约束"""
+
+    def tearDown(self):
+        reset_limiter_registry()
+
+    def test_batch_respects_max_concurrent(self):
+        profile = MockServerProfile(embedding_latency_ms=30, embedding_dim=8)
+        with MockLLMServer(profile) as server:
+            key = endpoint_key('embeddings', server.api_base_url)
+            service = RAGService({'base_url': server.api_base_url, 'api_key': 'mock', 'provider': 'mock',
+                                  'network': {'max_retries': 1, 'max_concurrent': 2}})
+            try:
+                embeddings = service.create_embeddings_batch([f"第{i}段" for i in range(8)])
+            finally:
+                service.close()
+            self.assertTrue(all(embeddings))
+            self.assertLessEqual(server.get_stats()['max_in_flight'], 2)
+
+        stats = get_limiter_registry().get_stats()[key]
+        self.assertEqual(stats['granted_background'], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
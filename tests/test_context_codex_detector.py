@@ -0,0 +1,105 @@
+"""
+光标窗口Codex检测的单元测试
+测试窗口计算、距离排序和文档摘要补充
+"""
+
+import unittest
+import threading
+from unittest.mock import Mock
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.context_codex_detector import ContextAwareCodexDetector, WINDOW_SIZES
+from core.reference_cache import ReferenceDetectionCache
+from core.reference_detector import ReferenceDetector
+from core.codex_manager import CodexManager, CodexEntry, CodexEntryType
+
+
+class TestContextAwareCodexDetector(unittest.TestCase):
+    """光标窗口检测器测试类"""
+
+    def setUp(self):
+        self.entries = [
+            CodexEntry(id="char1", title="张三", entry_type=CodexEntryType.CHARACTER),
+            CodexEntry(id="char2", title="李四", entry_type=CodexEntryType.CHARACTER),
+            CodexEntry(id="loc1", title="天山", entry_type=CodexEntryType.LOCATION),
+        ]
+        self.codex_manager = Mock(spec=CodexManager)
+        self.codex_manager.get_all_entries.side_effect = lambda: list(self.entries)
+        self.codex_manager.get_entry.side_effect = lambda entry_id: next(
+            (entry for entry in self.entries if entry.id == entry_id), None
+        )
+        self.codex_manager.pattern_version = 1
+
+        self.detector = ContextAwareCodexDetector(
+            self.codex_manager, ReferenceDetector(self.codex_manager),
+            cache=ReferenceDetectionCache()
+        )
+
+        # 天山只出现在远离光标的章节开头
+        filler = "风吹过山谷。\n" * 2000
+        self.text = "他们来到天山。\n" + filler + "李四看着远方。\n张三走了过来，张三说："
+        self.cursor = len(self.text)
+
+    def test_window_is_bounded(self):
+        """测试扫描窗口不随文档长度增长"""
+        start, end = self.detector.get_window(self.text, self.cursor, "fast")
+        before_size, after_size = WINDOW_SIZES["fast"]
+        self.assertLessEqual(end - start, (before_size + after_size) * 5 // 4)
+        self.assertTrue(start == 0 or self.text[start - 1] == '\n')
+
+    def test_nearby_entries_ranked_first(self):
+        """测试距离近、出现多的条目排在前面"""
+        ranked = self.detector.detect(self.text, self.cursor, "fast")
+        self.assertEqual([item.entry_id for item in ranked], ["char1", "char2"])
+        self.assertEqual(ranked[0].window_count, 2)
+
+    def _wait_for_summaries(self):
+        thread = self.detector._summary_thread
+        if thread is not None:
+            thread.join(5)
+
+    def test_document_summary_adds_distant_entries(self):
+        """测试窗口外的提及由文档摘要补充并排在窗口内条目之后"""
+        self.detector.schedule_summary("doc1", self.text)
+        self._wait_for_summaries()
+        ranked = self.detector.detect(self.text, self.cursor, "fast", document_id="doc1")
+        self.assertEqual([item.entry_id for item in ranked], ["char1", "char2", "loc1"])
+        self.assertFalse(ranked[-1].in_window)
+        self.assertEqual(ranked[-1].document_count, 1)
+
+        # 摘要在有效期内复用，Codex版本变化后不再使用旧摘要
+        self.assertIs(self.detector.get_document_summary("doc1", self.text),
+                      self.detector.get_document_summary("doc1", self.text))
+        self.codex_manager.pattern_version = 2
+        self.assertNotIn("loc1", [
+            item.entry_id for item in
+            self.detector.detect(self.text.replace("天山", "山下"), self.cursor, "fast", document_id="doc1")
+        ])
+
+    def test_summary_computed_off_completion_path(self):
+        """测试补全路径不在调用线程中检测全文，摘要在后台计算后才被使用"""
+        detect = self.detector._detect
+        full_text_threads = []
+
+        def record(text, document_id):
+            if len(text) == len(self.text):
+                full_text_threads.append(threading.current_thread())
+            return detect(text, document_id)
+
+        self.detector._detect = record
+        ranked = self.detector.detect(self.text, self.cursor, "fast", document_id="doc1")
+        self.assertEqual([item.entry_id for item in ranked], ["char1", "char2"])
+
+        self._wait_for_summaries()
+        self.assertEqual(len(full_text_threads), 1)
+        self.assertIsNot(full_text_threads[0], threading.current_thread())
+        ranked = self.detector.detect(self.text, self.cursor, "fast", document_id="doc1")
+        self.assertEqual([item.entry_id for item in ranked], ["char1", "char2", "loc1"])
+        self.assertEqual(len(full_text_threads), 1)
+
+if __name__ == '__main__':
+    unittest.main()
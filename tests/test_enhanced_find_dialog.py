@@ -0,0 +1,74 @@
+"""
+增强查找对话框中后台工作线程的生命周期测试
+"""
+
+import unittest
+import time
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication
+
+from core.project import ProjectData, ProjectDocument, DocumentType, DocumentStatus
+from gui.dialogs import enhanced_find_dialog
+from gui.dialogs.enhanced_find_dialog import EnhancedFindDialog
+
+
+class _SlowIndex:
+    """同步索引很慢（首次搜索建索引）的全文索引替身"""
+
+    is_attached = True
+
+    def sync(self, contents):
+        time.sleep(0.5)
+
+    def search(self, query, order, batch_size):
+        return iter([])
+
+
+class TestSearchWorkerLifetime(unittest.TestCase):
+    """被新搜索取代的工作线程在结束前不会被销毁"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def _run_until(self, condition, timeout=10.0):
+        deadline = time.perf_counter() + timeout
+        while not condition() and time.perf_counter() < deadline:
+            QApplication.processEvents()
+            time.sleep(0.01)
+
+    def test_replaced_worker_kept_until_finished(self):
+        project = ProjectData(id="p", name="测试", description="", author="", language="zh_CN",
+                              project_path="", version="2.0")
+        project.documents["c"] = ProjectDocument(id="c", parent_id=None, name="第1章", doc_type=DocumentType.CHAPTER,
+                                                 status=DocumentStatus.NEW, order=0, content="林风走进大殿")
+        project_manager = MagicMock()
+        project_manager.get_current_project.return_value = project
+        dialog = EnhancedFindDialog(project_manager=project_manager)
+
+        with patch.object(enhanced_find_dialog, "get_search_index", return_value=_SlowIndex()):
+            dialog._search_edit.setText("林风")
+            dialog._start_global_search()
+            first = dialog._search_worker
+            dialog._search_edit.setText("林风走")
+            dialog._start_global_search()
+
+            self.assertTrue(first.isRunning())
+            self.assertEqual(dialog._retired_workers, {first})
+            self._run_until(lambda: not dialog._retired_workers and not dialog._search_worker.isRunning())
+
+        self.assertEqual(dialog._retired_workers, set())
+        self.assertEqual(dialog._results_label.text(), "搜索结果 (0 项)")
+        dialog.deleteLater()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+"""
+逐章流式导出的单元测试
+"""
+
+import unittest
+import threading
+import time
+import multiprocessing
+import tracemalloc
+import tempfile
+import shutil
+import sys
+import os
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.project import ProjectData, ProjectDocument, DocumentType, DocumentStatus
+from core.export_manager import ExportManager, ExportOptions, ExportFormat, PDF_PART_CHARS
+import core.export_manager as export_manager_module
+
+
+def _project(contents, author="作者甲"):
+    project = ProjectData(id="p", name="测试小说", description="", author=author, language="zh_CN",
+                          project_path="", version="2.0")
+    project.documents["a"] = ProjectDocument(id="a", parent_id=None, name="开端", doc_type=DocumentType.ACT,
+                                             status=DocumentStatus.NEW, order=0, content="")
+    for i, content in enumerate(contents):
+        project.documents[f"c{i}"] = ProjectDocument(id=f"c{i}", parent_id="a", name=f"章{i + 1}",
+                                                     doc_type=DocumentType.CHAPTER,
+                                                     status=DocumentStatus.NEW, order=i, content=content)
+    return project
+
+
+def _manager(project):
+    project_manager = MagicMock()
+    project_manager.get_current_project.return_value = project
+    return ExportManager(project_manager)
+
+
+def _slow_pdf_part(html, output_path):
+    """模拟渲染很慢的分段（在工作进程中运行）"""
+    time.sleep(20)
+    return output_path
+
+
+def _fake_pdf_part(html, output_path):
+    Path(output_path).write_text(html, encoding="utf-8")
+    return output_path
+
+
+class _FakeReader:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.text = self.path.read_text(encoding="utf-8")
+
+
+class _FakeWriter:
+    """记录合并过程的PdfWriter替身"""
+
+    def __init__(self):
+        self.held = []
+        self.events = []
+
+    def append(self, reader):
+        self.held.append(reader)
+        self.events.append(("append", reader.path.name, len(self.held)))
+
+    def reset_translation(self, reader):
+        self.held.remove(reader)
+
+    def write(self, f):
+        f.write(b"merged")
+
+    def close(self):
+        pass
+
+
+class TestStreamingExport(unittest.TestCase):
+    """流式导出测试类"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.manager = _manager(_project(["林风走进大殿。\n\n<剑> & 鞘", "夜色沉沉。"]))
+        self.progress = []
+        self.completed = []
+        self.manager.exportProgress.connect(lambda current, total: self.progress.append((current, total)))
+        self.manager.exportCompleted.connect(self.completed.append)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _export(self, export_format, suffix):
+        path = self.temp_dir / f"book{suffix}"
+        self.assertTrue(self.manager.export_project(ExportOptions(format=export_format, output_path=path)))
+        return path.read_text(encoding="utf-8")
+
+    def test_text(self):
+        text = self._export(ExportFormat.TEXT, ".txt")
+        chapter_break = ExportOptions(format=ExportFormat.TEXT, output_path=None).chapter_break
+        self.assertEqual(text, "测试小说\n作者：作者甲\n\n" + "=" * 50 + "\n\n"
+                               "\n第1幕 开端\n" + "=" * 30 + "\n\n" + chapter_break +
+                               "\n第1章 章1\n" + "-" * 30 + "\n\n林风走进大殿。\n\n<剑> & 鞘\n" + chapter_break +
+                               "\n第2章 章2\n" + "-" * 30 + "\n\n夜色沉沉。\n" + chapter_break)
+        self.assertEqual(self.progress, [(1, 3), (2, 3), (3, 3)])
+        self.assertEqual(self.completed, [str(self.temp_dir / "book.txt")])
+
+    def test_markdown(self):
+        text = self._export(ExportFormat.MARKDOWN, ".md")
+        self.assertTrue(text.startswith("# 测试小说\n\n**作者**: 作者甲\n\n---\n\n\n# 第1幕 开端\n\n"))
+        self.assertTrue(text.endswith("\n## 第2章 章2\n\n夜色沉沉。\n\n"))
+
+    def test_html(self):
+        text = self._export(ExportFormat.HTML, ".html")
+        self.assertIn("        <h1>测试小说</h1>\n        <p class='author'>作者：作者甲</p>\n", text)
+        self.assertIn("        <p>&lt;剑&gt; &amp; 鞘</p>\n", text)
+        # 最后一个文档后没有章节分隔
+        self.assertEqual(text.count("chapter-break'>"), 2)
+        self.assertTrue(text.endswith("        <p>夜色沉沉。</p>\n    </div>\n</body>\n</html>"))
+
+    def test_cancel_leaves_no_output(self):
+        path = self.temp_dir / "book.txt"
+        path.write_text("旧的导出", encoding="utf-8")
+        cancelled = []
+        self.manager.exportCancelled.connect(cancelled.append)
+        # 写完第一个文档后取消
+        self.manager.exportProgress.connect(lambda current, total: self.manager.cancel())
+
+        self.assertFalse(self.manager.export_project(ExportOptions(format=ExportFormat.TEXT, output_path=path)))
+        self.assertEqual(cancelled, [str(path)])
+        self.assertEqual(self.progress, [(1, 3)])
+        self.assertEqual(path.read_text(encoding="utf-8"), "旧的导出")
+        self.assertEqual(sorted(p.name for p in self.temp_dir.iterdir()), ["book.txt"])
+
+    def test_cancel_before_start(self):
+        """任务创建后、开始执行前的取消不会被清除"""
+        path = self.temp_dir / "book.txt"
+        cancelled = []
+        self.manager.exportCancelled.connect(cancelled.append)
+        self.manager.reset_cancel()
+        self.manager.cancel()
+
+        self.assertFalse(self.manager.export_project(ExportOptions(format=ExportFormat.TEXT, output_path=path)))
+        self.assertEqual(cancelled, [str(path)])
+        self.assertFalse(path.exists())
+
+        self.manager.reset_cancel()
+        self.assertTrue(self.manager.export_project(ExportOptions(format=ExportFormat.TEXT, output_path=path)))
+
+    def _export_pdf_parallel(self, manager, path):
+        with patch.object(export_manager_module, "_weasyprint_available", return_value=True), \
+                patch.object(export_manager_module, "PYPDF_AVAILABLE", True):
+            return manager.export_project(ExportOptions(format=ExportFormat.PDF, output_path=path))
+
+    def test_pdf_cancel_does_not_wait_for_running_parts(self):
+        manager = _manager(_project(["字" * PDF_PART_CHARS] * 3))
+        path = self.temp_dir / "book.pdf"
+        timer = threading.Timer(1.0, manager.cancel)
+        timer.start()
+        start = time.perf_counter()
+        with patch.object(export_manager_module, "_render_pdf_part", _slow_pdf_part):
+            self.assertFalse(self._export_pdf_parallel(manager, path))
+        elapsed = time.perf_counter() - start
+        timer.join()
+
+        self.assertLess(elapsed, 10)
+        deadline = time.perf_counter() + 5
+        while multiprocessing.active_children() and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(multiprocessing.active_children(), [])
+        self.assertEqual(list(self.temp_dir.iterdir()), [])
+
+    def test_pdf_merge_releases_each_part(self):
+        """合并时每个分段复制完页面后即释放，分段文件随即删除"""
+        manager = _manager(_project(["字" * PDF_PART_CHARS] * 3))
+        path = self.temp_dir / "book.pdf"
+        writers = []
+
+        def make_writer():
+            writers.append(_FakeWriter())
+            return writers[-1]
+
+        with patch.object(export_manager_module, "_render_pdf_part", _fake_pdf_part), \
+                patch.object(export_manager_module, "PdfReader", _FakeReader, create=True), \
+                patch.object(export_manager_module, "PdfWriter", make_writer, create=True):
+            self.assertTrue(self._export_pdf_parallel(manager, path))
+
+        self.assertEqual(writers[0].events, [("append", "part_0000.pdf", 1), ("append", "part_0001.pdf", 1),
+                                             ("append", "part_0002.pdf", 1)])
+        self.assertEqual(path.read_bytes(), b"merged")
+        self.assertEqual(sorted(p.name for p in self.temp_dir.iterdir()), ["book.pdf"])
+
+    def test_pdf_parts_split_at_chapters(self):
+        documents = self.manager._collect_documents(_project(["字" * (PDF_PART_CHARS // 2)] * 5))
+        parts = ExportManager._split_pdf_parts(documents)
+        self.assertEqual(parts, [(0, 3), (3, 5), (5, 6)])
+        self.assertEqual(ExportManager._split_pdf_parts(documents[:2]), [(0, 2)])
+        self.assertEqual(ExportManager._split_pdf_parts([]), [])
+
+    def test_pdf_without_weasyprint(self):
+        errors = []
+        self.manager.exportError.connect(errors.append)
+        path = self.temp_dir / "book.pdf"
+        with patch.object(export_manager_module, "_weasyprint_available", return_value=False):
+            self.assertFalse(self.manager.export_project(ExportOptions(format=ExportFormat.PDF, output_path=path)))
+        self.assertEqual(errors, ["需要安装weasyprint库: pip install weasyprint"])
+        self.assertFalse(path.exists())
+
+
+class TestExportMemory(unittest.TestCase):
+    """百万字书稿导出时的内存峰值"""
+
+    def test_streaming_vs_joined_string(self):
+        contents = [("林风走进大殿，看着远方。" * 20 + "\n") * 40 for _ in range(100)]
+        project = _project(contents)
+        manager = _manager(project)
+        options = ExportOptions(format=ExportFormat.HTML, output_path=None)
+        temp_dir = Path(tempfile.mkdtemp())
+        try:
+            # 原方式：整本书先拼成一个字符串
+            tracemalloc.start()
+            documents = manager._collect_documents(project)
+            full = "".join(list(manager._html_header(project, options))
+                           + [chunk for i, doc in enumerate(documents)
+                              for chunk in manager._render_html_document(doc, i, len(documents), options)]
+                           + list(manager._html_footer()))
+            joined_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del full
+
+            options.output_path = temp_dir / "book.html"
+            tracemalloc.start()
+            manager.export_project(options)
+            streaming_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        total_chars = sum(len(content) for content in contents)
+        print(f"\n{total_chars}字书稿导出HTML: 拼接整本内存峰值 {joined_peak / 1e6:.1f}MB, "
+              f"逐章写入 {streaming_peak / 1e6:.1f}MB")
+        self.assertLess(streaming_peak * 5, joined_peak)
+
+
+if __name__ == '__main__':
+    unittest.main()
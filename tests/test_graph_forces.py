@@ -0,0 +1,123 @@
+"""
+关系图力计算（Barnes–Hut斥力、向量化引力）的单元测试与性能测试
+"""
+
+import unittest
+import random
+import time
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from gui.panels.graph_forces import BarnesHutTree, barnes_hut_repulsion, direct_repulsion
+from gui.panels.graph_engine import ForceDirectedEngine, GraphConfig, GraphNode, GraphEdge
+
+
+def _random_graph(count, seed=7, edges_per_node=1.5):
+    rng = random.Random(seed)
+    nodes = {
+        f"n{i}": GraphNode(id=f"n{i}", label=f"节点{i}",
+                           x=rng.uniform(-500, 500), y=rng.uniform(-500, 500))
+        for i in range(count)
+    }
+    edges = [GraphEdge(source=f"n{rng.randrange(count)}", target=f"n{rng.randrange(count)}",
+                       weight=rng.uniform(0.5, 1.5))
+             for _ in range(int(count * edges_per_node))]
+    return nodes, edges
+
+
+class TestBarnesHut(unittest.TestCase):
+    """Barnes–Hut斥力测试类"""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.x = rng.uniform(-1000, 1000, 800)
+        self.y = rng.normal(0, 300, 800)
+
+    def test_tree_mass(self):
+        tree = BarnesHutTree(self.x, self.y)
+        self.assertEqual(tree.mass[0], 800)
+        self.assertAlmostEqual(tree.com_x[0], self.x.mean())
+        self.assertEqual(int(tree.mass[tree.leaf].sum()), 800)
+
+    def test_theta_zero_is_exact(self):
+        fx, fy = barnes_hut_repulsion(self.x, self.y, -300.0, theta=0.0)
+        ex, ey = direct_repulsion(self.x, self.y, -300.0)
+        np.testing.assert_allclose(fx, ex, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(fy, ey, rtol=1e-9, atol=1e-12)
+
+    def test_approximation_error(self):
+        fx, fy = barnes_hut_repulsion(self.x, self.y, -300.0, theta=0.5)
+        ex, ey = direct_repulsion(self.x, self.y, -300.0)
+        error = np.hypot(fx - ex, fy - ey)
+        magnitude = np.hypot(ex, ey)
+        self.assertLess(np.median(error / magnitude), 0.02)
+
+    def test_duplicate_points(self):
+        x = np.array([0.0, 0.0, 0.0, 10.0])
+        y = np.array([0.0, 0.0, 0.0, 0.0])
+        fx, fy = barnes_hut_repulsion(x, y, -1.0, theta=0.0)
+        ex, ey = direct_repulsion(x, y, -1.0)
+        np.testing.assert_allclose(fx, ex)
+        self.assertTrue(np.all(np.isfinite(fy)))
+
+
+class TestVectorizedEngine(unittest.TestCase):
+    """向量化布局与逐对计算结果一致"""
+
+    def test_tick_matches_python_path(self):
+        config = GraphConfig(barnes_hut_min_nodes=10 ** 6)
+        nodes_a, edges = _random_graph(60)
+        nodes_b, _ = _random_graph(60)
+
+        python_engine = ForceDirectedEngine(config)
+        python_engine.use_vectorized = False
+        vector_engine = ForceDirectedEngine(config)
+        for _ in range(3):
+            stable_a = python_engine.calculate_forces(nodes_a, edges)
+            stable_b = vector_engine.calculate_forces(nodes_b, edges)
+            self.assertEqual(stable_a, stable_b)
+
+        for node_id, node in nodes_a.items():
+            self.assertAlmostEqual(node.x, nodes_b[node_id].x, places=6)
+            self.assertAlmostEqual(node.vy, nodes_b[node_id].vy, places=6)
+
+    def test_fixed_nodes_do_not_move(self):
+        nodes, edges = _random_graph(300)
+        nodes["n0"].fixed = True
+        x0 = nodes["n0"].x
+        ForceDirectedEngine(GraphConfig()).calculate_forces(nodes, edges)
+        self.assertEqual(nodes["n0"].x, x0)
+        self.assertNotEqual(nodes["n1"].vx, 0.0)
+
+
+class TestForceLayoutPerformance(unittest.TestCase):
+    """每次迭代耗时随节点数近似 O(n log n) 增长"""
+
+    def _tick_time(self, count, repeats=3):
+        nodes, edges = _random_graph(count)
+        engine = ForceDirectedEngine(GraphConfig(barnes_hut_min_nodes=0))
+        engine.calculate_forces(nodes, edges)
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            engine.calculate_forces(nodes, edges)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test_tick_scaling(self):
+        timings = {count: self._tick_time(count) for count in (100, 1000, 5000)}
+        for count, seconds in timings.items():
+            print(f"\n{count}个节点: 每次迭代 {seconds * 1000:.1f}ms")
+
+        # 5倍节点，O(n²)约为25倍，O(n log n)约为6倍
+        self.assertLess(timings[5000] / timings[1000], 12)
+        self.assertLess(timings[5000], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
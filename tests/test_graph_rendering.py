@@ -0,0 +1,122 @@
+"""
+关系图分级渲染（LOD）的单元测试与帧耗时测试
+"""
+
+import unittest
+import random
+import time
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import QRectF
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QImage, QPainter, QColor
+
+from gui.panels.graph_engine import GraphConfig, GraphNode, GraphEdge, RenderingEngine, LODTier
+from gui.panels.graph_spatial_index import GraphSpatialIndex
+
+NODE_TYPES = ['CHARACTER', 'LOCATION', 'OBJECT', 'LORE', 'SUBPLOT', 'OTHER']
+
+
+def _random_graph(count, seed=3, extent=4000.0):
+    rng = random.Random(seed)
+    nodes = {
+        f"n{i}": GraphNode(id=f"n{i}", label=f"角色{i}", node_type=rng.choice(NODE_TYPES),
+                           size=rng.uniform(20, 50),
+                           x=rng.uniform(-extent, extent), y=rng.uniform(-extent, extent))
+        for i in range(count)
+    }
+    edges = [GraphEdge(source=f"n{rng.randrange(count)}", target=f"n{rng.randrange(count)}")
+             for _ in range(count * 2)]
+    return nodes, edges
+
+
+def _render_frame(engine, nodes, edges, viewport, size=(1280, 800)):
+    """离屏渲染一帧，返回 (耗时秒, 图像)"""
+    image = QImage(size[0], size[1], QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(QColor("#f8f9fa"))
+    painter = QPainter(image)
+    painter.setViewport(0, 0, size[0], size[1])
+    painter.setWindow(viewport.toRect())
+    start = time.perf_counter()
+    engine.render(painter, viewport, nodes, edges)
+    elapsed = time.perf_counter() - start
+    painter.end()
+    return elapsed, image
+
+
+class TestLevelOfDetail(unittest.TestCase):
+    """细节层级选择测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.nodes, self.edges = _random_graph(300, extent=600.0)
+        self.engine = RenderingEngine(GraphConfig())
+
+    def test_tier_follows_zoom(self):
+        cases = [
+            (QRectF(-4000, -2500, 8000, 5000), LODTier.OVERVIEW),
+            (QRectF(-1000, -625, 2000, 1250), LODTier.SIMPLIFIED),
+            (QRectF(-400, -250, 800, 500), LODTier.DETAIL),
+        ]
+        for viewport, tier in cases:
+            _render_frame(self.engine, self.nodes, self.edges, viewport)
+            self.assertEqual(self.engine.last_lod, tier)
+
+    def test_labels_cached_only_in_detail(self):
+        _render_frame(self.engine, self.nodes, self.edges, QRectF(-1000, -625, 2000, 1250))
+        self.assertEqual(self.engine._label_cache, {})
+        _render_frame(self.engine, self.nodes, self.edges, QRectF(-400, -250, 800, 500))
+        cached = len(self.engine._label_cache)
+        self.assertGreater(cached, 0)
+        _render_frame(self.engine, self.nodes, self.edges, QRectF(-400, -250, 800, 500))
+        self.assertEqual(len(self.engine._label_cache), cached)
+
+    def test_overview_draws_clusters(self):
+        _, image = _render_frame(self.engine, self.nodes, self.edges, QRectF(-4000, -2500, 8000, 5000))
+        background = QColor("#f8f9fa").rgb()
+        self.assertNotEqual(image.pixelColor(640, 400).rgb(), background)
+        self.assertEqual(image.pixelColor(5, 5).rgb(), background)
+
+    def test_lod_disabled_always_detail(self):
+        self.engine.config.lod_enabled = False
+        _render_frame(self.engine, self.nodes, self.edges, QRectF(-4000, -2500, 8000, 5000))
+        self.assertEqual(self.engine.last_lod, LODTier.DETAIL)
+
+
+class TestRenderingPerformance(unittest.TestCase):
+    """缩小视图的帧耗时远低于完整细节"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def test_overview_frame_time(self):
+        nodes, edges = _random_graph(5000)
+        index = GraphSpatialIndex()
+        index.rebuild(nodes, edges)
+        viewport = QRectF(-4200, -2625, 8400, 5250)
+
+        timings = {}
+        for lod_enabled in (False, True):
+            engine = RenderingEngine(GraphConfig(lod_enabled=lod_enabled))
+            engine.spatial_index = index
+            _render_frame(engine, nodes, edges, viewport)
+            timings[lod_enabled] = min(_render_frame(engine, nodes, edges, viewport)[0]
+                                       for _ in range(3))
+
+        print(f"\n5000个节点/10000条边全图: 完整细节 {timings[False] * 1000:.1f}ms, "
+              f"分级渲染 {timings[True] * 1000:.1f}ms")
+        self.assertLess(timings[True], timings[False] / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+关系图后台物理模拟的单元测试
+"""
+
+import unittest
+import threading
+import time
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt6.QtWidgets import QApplication
+
+from gui.panels.graph_simulation import LayoutSnapshot
+from gui.panels.graph_engine import GraphConfig, GraphNode, GraphEdge, GraphPhysicsEngine
+
+
+def _chain_graph(count):
+    nodes = {f"n{i}": GraphNode(id=f"n{i}", label=f"节点{i}") for i in range(count)}
+    edges = [GraphEdge(source=f"n{i}", target=f"n{i + 1}") for i in range(count - 1)]
+    return nodes, edges
+
+
+def _wait(app, predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        app.processEvents()
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class TestLayoutSnapshot(unittest.TestCase):
+    """双缓冲快照测试类"""
+
+    def test_read_returns_latest_copy(self):
+        snapshot = LayoutSnapshot(3)
+        snapshot.publish(np.array([1.0, 2.0, 3.0]), np.zeros(3))
+        version, positions = snapshot.read()
+        self.assertEqual(positions[:, 0].tolist(), [1.0, 2.0, 3.0])
+
+        snapshot.publish(np.full(3, 9.0), np.zeros(3))
+        self.assertEqual(positions[0, 0], 1.0)
+        self.assertIsNone(snapshot.read(since=version + 1)[1])
+        self.assertEqual(snapshot.read(since=version)[1][0, 0], 9.0)
+
+
+class TestBackgroundSimulation(unittest.TestCase):
+    """工作线程模拟测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        # 斥力为正、引力较弱的参数能在几十次迭代内收敛
+        self.engine = GraphPhysicsEngine(GraphConfig(max_fps=1000, force_strength=0.1,
+                                                     center_force=0.02, charge_strength=1000.0))
+
+    def tearDown(self):
+        self.engine.stop_simulation()
+
+    def test_runs_off_gui_thread_and_stops_when_stable(self):
+        nodes, edges = _chain_graph(30)
+        stability = []
+        self.engine.stabilityChanged.connect(stability.append)
+        self.engine.start_simulation(nodes, edges)
+
+        worker = self.engine.worker
+        self.assertIsNotNone(worker)
+        self.assertNotEqual(worker.thread_id, threading.get_ident())
+        self.assertTrue(_wait(self.app, lambda: self.engine.is_stable))
+        self.assertEqual(stability, [False, True])
+        self.assertTrue(_wait(self.app, lambda: not self.engine.is_running(), 2.0))
+
+        # GUI线程读取快照后节点位置与工作线程一致
+        before = (nodes["n5"].x, nodes["n5"].y)
+        self.engine.sync_nodes(nodes)
+        self.assertEqual((nodes["n5"].x, nodes["n5"].y),
+                         (float(worker.x[5]), float(worker.y[5])))
+        self.assertNotEqual(before, (nodes["n5"].x, nodes["n5"].y))
+
+    def test_pin_restarts_stable_layout(self):
+        nodes, edges = _chain_graph(20)
+        self.engine.start_simulation(nodes, edges)
+        self.assertTrue(_wait(self.app, lambda: self.engine.is_stable))
+
+        # 固定节点被拖到远处，其余节点随之重新收敛
+        self.engine.pin_node("n0", 500.0, 500.0)
+        self.assertTrue(_wait(self.app, lambda: not self.engine.is_stable, 2.0))
+        self.assertTrue(_wait(self.app, lambda: self.engine.is_stable))
+        self.engine.sync_nodes(nodes)
+        self.assertEqual((nodes["n0"].x, nodes["n0"].y), (500.0, 500.0))
+        self.assertGreater(nodes["n1"].x, 250.0)
+
+        self.engine.release_node("n0")
+        self.assertTrue(_wait(self.app, lambda: not self.engine.worker.fixed.any(), 2.0))
+        self.assertTrue(_wait(self.app, lambda: not self.engine.is_running()))
+
+    def test_iteration_limit_stops_oscillating_layout(self):
+        self.engine.config.charge_strength = -300.0
+        self.engine.config.force_strength = 30.0
+        self.engine.config.max_simulation_iterations = 50
+        nodes, edges = _chain_graph(10)
+        self.engine.start_simulation(nodes, edges)
+        self.assertTrue(_wait(self.app, lambda: self.engine.is_stable))
+        self.assertEqual(self.engine.get_engine_info()['iteration_count'], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+关系图空间索引的单元测试与性能测试
+"""
+
+import unittest
+import random
+import tempfile
+import time
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import QPointF, QRectF
+from PyQt6.QtWidgets import QApplication
+
+from gui.panels.graph_spatial_index import SpatialGrid, GraphSpatialIndex
+from gui.panels.graph_engine import (GraphConfig, GraphNode, GraphEdge, InteractionManager,
+                                     RenderingEngine)
+from gui.panels.modern_relationship_graph import ModernGraphCanvas
+
+
+def _random_graph(count, seed=11, extent=3000.0):
+    rng = random.Random(seed)
+    nodes = {
+        f"n{i}": GraphNode(id=f"n{i}", label=f"节点{i}", size=rng.uniform(20, 50),
+                           x=rng.uniform(-extent, extent), y=rng.uniform(-extent, extent))
+        for i in range(count)
+    }
+    edges = [GraphEdge(source=f"n{rng.randrange(count)}", target=f"n{rng.randrange(count)}")
+             for _ in range(count * 2)]
+    return nodes, edges
+
+
+class TestSpatialGrid(unittest.TestCase):
+    """均匀网格测试类"""
+
+    def test_insert_update_remove(self):
+        grid = SpatialGrid(10.0)
+        self.assertTrue(grid.insert("a", (1, 1, 2, 2)))
+        self.assertFalse(grid.insert("a", (3, 3, 4, 4)))  # 同一格子内移动不重新分桶
+        self.assertTrue(grid.insert("a", (15, 1, 16, 2)))
+        self.assertEqual(grid.query((0, 0, 9, 9)), set())
+        self.assertEqual(grid.query_point(15, 1), {"a"})
+        grid.remove("a")
+        self.assertEqual(len(grid), 0)
+        self.assertEqual(grid.query((-100, -100, 100, 100)), set())
+
+    def test_oversized_items_always_candidates(self):
+        grid = SpatialGrid(1.0)
+        grid.insert("long", (0, 0, 1000, 1000))
+        grid.insert("small", (500, 500, 500, 500))
+        self.assertEqual(grid.query_point(-50, -50), {"long"})
+        self.assertEqual(grid.query_point(500, 500), {"long", "small"})
+
+
+class TestGraphSpatialIndex(unittest.TestCase):
+    """节点/边索引测试类"""
+
+    def setUp(self):
+        self.nodes, self.edges = _random_graph(400)
+        self.index = GraphSpatialIndex(100.0)
+        self.index.rebuild(self.nodes, self.edges)
+        self.viewport = QRectF(-500, -400, 900, 700)
+
+    def _brute_force_visible(self, engine):
+        visible_nodes = [node for node in self.nodes.values()
+                         if engine._is_node_visible(self.viewport, node)]
+        visible_edges = [i for i, edge in enumerate(self.edges)
+                         if engine._is_edge_visible(self.viewport, self.nodes[edge.source],
+                                                    self.nodes[edge.target])]
+        return visible_nodes, visible_edges
+
+    def _check_culling(self):
+        engine = RenderingEngine(GraphConfig())
+        expected_nodes, expected_edges = self._brute_force_visible(engine)
+
+        engine.spatial_index = self.index
+        self.assertEqual(engine._visible_nodes(self.viewport, self.nodes), expected_nodes)
+        candidates = engine._candidate_edges(self.viewport, self.edges)
+        candidate_ids = {id(edge) for edge in candidates}
+        self.assertTrue(all(id(self.edges[i]) in candidate_ids for i in expected_edges))
+        self.assertLess(len(candidates), len(self.edges))
+
+    def test_culling_matches_linear_scan(self):
+        self._check_culling()
+
+    def test_incremental_refresh_after_layout_moves(self):
+        rng = random.Random(5)
+        for node in self.nodes.values():
+            node.x += rng.uniform(-30, 30)
+            node.y += rng.uniform(-30, 30)
+        moved = self.index.refresh(self.nodes)
+        self.assertGreater(moved, 0)
+        self.assertLess(moved, len(self.nodes))
+        self.assertEqual(self.index.refresh(self.nodes), 0)
+        self._check_culling()
+
+    def test_hit_test_and_rubber_band(self):
+        manager = InteractionManager(GraphConfig())
+        manager.spatial_index = self.index
+        target = self.nodes["n42"]
+
+        self.assertTrue(manager.handle_mouse_press(QPointF(target.x + 1, target.y), self.nodes))
+        self.assertIs(manager.drag_node, target)
+        manager.handle_mouse_move(QPointF(5000, 5000), self.nodes)
+        manager.handle_mouse_release(QPointF(5000, 5000), self.nodes)
+        self.assertEqual(self.index.nodes_at(5000, 5000, self.nodes), [target])
+
+        # 从图外的空白处开始框选
+        rect = QRectF(QPointF(-3500, -3500), QPointF(0, 200))
+        expected = {node.id for node in self.nodes.values()
+                    if rect.left() <= node.x <= rect.right() and rect.top() <= node.y <= rect.bottom()}
+        self.assertFalse(manager.handle_mouse_press(rect.topLeft(), self.nodes, rubber_band=True))
+        manager.handle_mouse_move(rect.bottomRight(), self.nodes)
+        self.assertEqual(manager.rubber_band_rect, rect)
+        manager.handle_mouse_release(rect.bottomRight(), self.nodes)
+        self.assertIsNone(manager.rubber_band_rect)
+        self.assertEqual(manager.selected_nodes, expected)
+        self.assertTrue(expected)
+
+
+class TestCanvasLayoutSync(unittest.TestCase):
+    """画布取物理快照时同步更新空间索引"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def test_export_image_refreshes_index(self):
+        canvas = ModernGraphCanvas(GraphConfig())
+        canvas.physics_engine.stop_simulation()
+        canvas.nodes, canvas.edges = _random_graph(50)
+        canvas.spatial_index.rebuild(canvas.nodes, canvas.edges)
+
+        def sync_nodes(nodes):
+            # 模拟物理模拟的新快照：所有节点平移
+            for node in nodes.values():
+                node.x += 5000
+            return True
+
+        canvas.physics_engine.sync_nodes = sync_nodes
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertTrue(canvas.export_image(os.path.join(temp_dir, "graph.png"), 200, 100))
+        self.assertEqual(canvas.spatial_index.refresh(canvas.nodes), 0)
+        target = canvas.nodes["n7"]
+        self.assertIn(target, canvas.spatial_index.nodes_at(target.x, target.y, canvas.nodes))
+
+
+class TestSpatialIndexPerformance(unittest.TestCase):
+    """命中测试与视口剔除的耗时不随图规模线性增长"""
+
+    def test_hit_test_sublinear(self):
+        nodes, edges = _random_graph(20000, extent=20000.0)
+        index = GraphSpatialIndex(100.0)
+        index.rebuild(nodes, edges)
+        manager = InteractionManager(GraphConfig())
+        points = [QPointF(node.x, node.y) for node in random.Random(1).sample(list(nodes.values()), 200)]
+
+        start = time.perf_counter()
+        for point in points:
+            manager._find_node_at_position(point, nodes)
+        linear = time.perf_counter() - start
+
+        manager.spatial_index = index
+        start = time.perf_counter()
+        for point in points:
+            self.assertIsNotNone(manager._find_node_at_position(point, nodes))
+        indexed = time.perf_counter() - start
+        print(f"\n20000个节点命中测试200次: 线性 {linear * 1000:.1f}ms, 索引 {indexed * 1000:.1f}ms")
+        self.assertLess(indexed * 20, linear)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+HTTP会话池的单元测试
+使用本地HTTP服务统计建立的连接数，验证同步和异步客户端复用长连接
+"""
+
+import unittest
+import asyncio
+import json
+import threading
+import sys
+import os
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.ai_client import AIClient, AsyncAIClient, AIConfig, AIProvider
+from core.http_session_pool import HTTPSessionPool, endpoint_origin
+import core.http_session_pool as http_session_pool
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    """返回固定补全结果的OpenAI兼容接口"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": "好的"}}]
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    """统计已接受连接数的HTTP服务"""
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+
+    def verify_request(self, request, client_address):
+        self.connections += 1
+        return True
+
+
+class TestHTTPSessionPool(unittest.TestCase):
+    """HTTP会话池测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _CountingServer(('127.0.0.1', 0), _CompletionHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.connections = 0
+        # 每个测试使用独立的会话池
+        self.pool = http_session_pool._global_session_pool = HTTPSessionPool()
+        self.config = AIConfig(
+            provider=AIProvider.OLLAMA,
+            model="test-model",
+            endpoint_url=f"http://127.0.0.1:{self.server.server_port}",
+            timeout=5
+        )
+
+    def tearDown(self):
+        http_session_pool.shutdown_http_session_pool()
+
+    def test_sync_requests_reuse_connection(self):
+        """测试连续的同步请求复用同一连接"""
+        for _ in range(3):
+            with AIClient(self.config) as client:
+                self.assertEqual(client.complete("你好"), "好的")
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.pool.get_stats()['sessions_created'], 1)
+
+    def test_async_requests_reuse_connection(self):
+        """测试同一事件循环中的异步请求复用同一连接"""
+        async def run():
+            results = []
+            for _ in range(3):
+                async with AsyncAIClient(self.config) as client:
+                    results.append(await client.complete_async("你好"))
+            await self.pool.close_async_sessions()
+            return results
+
+        self.assertEqual(asyncio.run(run()), ["好的"] * 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.pool.get_stats()['async_sessions'], 0)
+
+    def test_sessions_keyed_by_endpoint(self):
+        """测试同一服务商的不同服务地址使用各自的会话和连接池"""
+        other = _CountingServer(('127.0.0.1', 0), _CompletionHandler)
+        threading.Thread(target=other.serve_forever, daemon=True).start()
+        try:
+            other_config = AIConfig(provider=AIProvider.OLLAMA, model="test-model",
+                                    endpoint_url=f"http://127.0.0.1:{other.server_port}", timeout=5)
+            for config in (self.config, other_config, self.config):
+                self.assertEqual(AIClient(config).complete("你好"), "好的")
+
+            self.assertEqual(self.pool.get_stats()['sessions'], 2)
+            self.assertEqual((self.server.connections, other.connections), (1, 1))
+            self.assertIsNot(AIClient(self.config)._get_http_session(), AIClient(other_config)._get_http_session())
+        finally:
+            other.shutdown()
+            other.server_close()
+
+    def test_endpoint_origin(self):
+        self.assertEqual(endpoint_origin("https://API.example.com/v1/chat/completions"),
+                         "https://api.example.com:443")
+        self.assertEqual(endpoint_origin("http://localhost:11434/api/chat"), "http://localhost:11434")
+        self.assertEqual(endpoint_origin("http://localhost/api/chat"), "http://localhost:80")
+        self.assertEqual(endpoint_origin(None), "")
+
+    def test_close_releases_sessions(self):
+        """测试关闭会话池后重新创建会话"""
+        AIClient(self.config).complete("你好")
+        self.pool.close()
+        AIClient(self.config).complete("你好")
+
+        self.assertEqual(self.server.connections, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
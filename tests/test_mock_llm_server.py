@@ -0,0 +1,111 @@
+"""
+本地模拟LLM服务与延迟基准测试的单元测试
+"""
+
+import unittest
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.ai_client import AIConfig, AIProvider, AsyncAIClient, AIClientError
+from core.async_loop_thread import get_ai_event_loop, shutdown_ai_event_loop
+from core.mock_llm_server import MockLLMServer, MockServerProfile
+from core.rag_service import RAGService
+from core.latency_benchmark import percentile, benchmark_completion, benchmark_indexing
+
+
+def _run(coro):
+    return get_ai_event_loop().submit(coro).result(10)
+
+
+class TestMockLLMServer(unittest.TestCase):
+    """模拟服务接口测试类"""
+
+    def setUp(self):
+        self.server = MockLLMServer(MockServerProfile(
+            ttft_ms=20, tokens_per_second=500, response_tokens=5,
+            embedding_latency_ms=0, rerank_latency_ms=0, embedding_dim=8, seed=1)).start()
+        self.config = AIConfig(provider=AIProvider.OLLAMA, model="mock-model",
+                               endpoint_url=self.server.base_url, timeout=10)
+
+    def tearDown(self):
+        self.server.stop()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_ai_event_loop()
+
+    def test_chat_stream_and_complete(self):
+        client = AsyncAIClient(self.config)
+
+        async def collect():
+            return [chunk async for chunk in client.complete_stream("续写", "系统说明")]
+
+        chunks = _run(collect())
+        self.assertEqual(len(chunks), 5)
+        content = _run(client.complete_async("续写", "系统说明", max_tokens=3))
+        self.assertEqual(content, "".join(chunks[:3]))
+        self.assertEqual(self.server.get_stats()['requests']['chat'], 2)
+
+    def test_prefix_cache_usage(self):
+        messages = [{'role': 'system', 'content': "系统说明"}, {'role': 'user', 'content': "续写"}]
+        self.assertEqual(self.server.build_usage(messages, 1)['prompt_tokens_details']['cached_tokens'], 0)
+        self.assertGreater(self.server.build_usage(messages, 1)['prompt_tokens_details']['cached_tokens'], 0)
+
+    def test_embeddings_and_rerank(self):
+        service = RAGService({'base_url': self.server.api_base_url, 'api_key': 'mock',
+                              'provider': 'mock', 'network': {'max_retries': 1}})
+        try:
+            first = service.create_embedding("林远")
+            self.assertEqual(len(first), 8)
+            self.assertEqual(first, service.create_embedding("林远"))
+            self.assertNotEqual(first, service.create_embedding("青云宗"))
+
+            ranked = service.rerank("林远下山", ["青云宗", "林远下山历练", "天色渐暗"], top_k=2)
+            self.assertEqual(ranked[0][0], 1)
+            self.assertEqual(len(ranked), 2)
+        finally:
+            service.close()
+
+    def test_failure_injection(self):
+        self.server.profile.failure_rate = 1.0
+        self.server.profile.failure_status = 503
+        with self.assertRaises(AIClientError):
+            _run(AsyncAIClient(self.config).complete_async("续写"))
+        self.assertEqual(self.server.get_stats()['failures'], {'chat:503': 1})
+
+
+class TestLatencyBenchmark(unittest.TestCase):
+    """基准测试工具测试类"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_ai_event_loop()
+
+    def test_percentile(self):
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertAlmostEqual(percentile(range(101), 99), 99)
+
+    def test_reports(self):
+        profile = MockServerProfile(ttft_ms=30, tokens_per_second=1000, response_tokens=4,
+                                    embedding_latency_ms=0, embedding_dim=8)
+        with MockLLMServer(profile) as server:
+            config = AIConfig(provider=AIProvider.OLLAMA, model="mock-model",
+                              endpoint_url=server.base_url, timeout=10)
+            report = benchmark_completion(config, ["续写"] * 6, concurrency=3)
+            self.assertEqual((report.requests, report.errors), (6, 0))
+            self.assertGreaterEqual(report.ttft.p50, 30)
+            self.assertGreaterEqual(report.latency.p99, report.ttft.p99)
+
+            rag_config = {'base_url': server.api_base_url, 'api_key': 'mock',
+                          'provider': 'mock', 'network': {'max_retries': 1}}
+            report = benchmark_indexing(rag_config, {"doc": "山风吹过竹林。" * 60})
+            self.assertEqual((report.requests, report.errors), (1, 0))
+            self.assertGreater(report.units_per_second, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,9 @@
 
 import unittest
 from unittest.mock import Mock, MagicMock
+import random
+import re
+import time
 import sys
 import os
 
@@ -262,5 +265,99 @@ class TestOptimizedEntityDetector(unittest.TestCase):
         self.assertIn('low', confidence_thresholds)
 
 
+
+class TestOptimizedEntityDetectorPerformance(unittest.TestCase):
+    """优化实体检测器过滤阶段的性能测试"""
+    
+    # 过滤阶段的最低吞吐量（匹配数/秒），留有充足余量以适应较慢的机器
+    MIN_MATCHES_PER_SECOND = 5000
+    
+    def setUp(self):
+        """构造包含大量角色名的Codex和长章节文本"""
+        rng = random.Random(42)
+        surnames = '赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨朱秦尤许何吕施张孔曹严华金魏陶姜'
+        names = sorted({rng.choice(surnames) + rng.choice(surnames) + rng.choice(surnames)
+                        for _ in range(200)})[:150]
+        self.entries = [
+            CodexEntry(id=f"char{i}", title=name, entry_type=CodexEntryType.CHARACTER)
+            for i, name in enumerate(names)
+        ]
+        
+        codex_manager = Mock(spec=CodexManager)
+        codex_manager.get_all_entries.return_value = self.entries
+        codex_manager.get_entry.return_value = None
+        self.detector = OptimizedEntityDetector(codex_manager)
+        
+        prefixes = ['不是', '没有', '，而是', '说道：', '走进客栈。', '\n']
+        self.text = ''.join(rng.choice(prefixes) + rng.choice(names) for _ in range(3000))
+    
+    def test_filter_throughput(self):
+        """测试过滤阶段的匹配吞吐量"""
+        raw_references = self.detector._detect_raw_references(self.text)
+        self.assertGreaterEqual(len(raw_references), 3000)
+        
+        start = time.perf_counter()
+        filter_index = self.detector._build_filter_index(self.text)
+        results = [
+            self.detector._apply_filters_and_scoring(ref, self.text, filter_index)
+            for ref in raw_references
+        ]
+        elapsed = time.perf_counter() - start
+        
+        matches_per_second = len(raw_references) / max(elapsed, 1e-9)
+        self.assertGreaterEqual(
+            matches_per_second, self.MIN_MATCHES_PER_SECOND,
+            f"过滤吞吐量过低: {matches_per_second:.0f} 匹配/秒"
+        )
+        # 否定语境中的匹配应被过滤，其余保留
+        self.assertTrue(any(result is None for result in results))
+        self.assertTrue(any(result is not None for result in results))
+    
+    def _reference_negative_context(self, text, start_pos, matched_text):
+        """原实现：逐个否定模式在上下文中执行 re.search"""
+        context_start = max(0, start_pos - 20)
+        context_before = text[context_start:start_pos]
+        context_end = min(len(text), start_pos + len(matched_text) + 10)
+        context_after = text[start_pos + len(matched_text):context_end]
+        transition_words = ['而是', '但是', '不过', '然而', '可是']
+        if any(word in context_before for word in transition_words):
+            return False
+        for pattern in self.detector.negative_context_patterns:
+            if re.search(pattern + re.escape(matched_text), context_before + matched_text):
+                full_context = context_before + matched_text + context_after
+                if any(word in full_context for word in transition_words):
+                    return any(word in context_after for word in transition_words)
+                return True
+        return False
+
+    def test_filter_index_matches_direct_check(self):
+        """测试过滤索引与原逐模式检查的结果一致"""
+        filter_index = self.detector._build_filter_index(self.text)
+        references = self.detector._detect_raw_references(self.text)
+        negated = 0
+        for ref in references[:1000]:
+            expected = self._reference_negative_context(self.text, ref.start_position, ref.matched_text)
+            negated += expected
+            self.assertEqual(
+                self.detector._is_in_negative_context(self.text, ref.start_position, ref.matched_text, filter_index),
+                expected
+            )
+        self.assertTrue(0 < negated < min(len(references), 1000))
+
+    def test_negative_context_samples(self):
+        """测试已知的否定与肯定语境样例"""
+        samples = [
+            ("他不是张三。", True),
+            ("我没有见过张三。", True),
+            ("来的不是张三，而是李四。", True),
+            ("不是别人，而是张三。", False),
+            ("但是张三来了。", False),
+            ("张三走进客栈。", False),
+        ]
+        for text, expected in samples:
+            start = text.index("张三")
+            self.assertEqual(self.detector._is_in_negative_context(text, start, "张三"), expected, text)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
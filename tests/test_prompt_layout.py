@@ -0,0 +1,145 @@
+"""
+提示词分段布局与前缀缓存统计的单元测试
+"""
+
+import unittest
+import random
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.prompt_layout import PromptLayout, PromptCacheStats, extract_cache_usage
+from core.simple_prompt_service import SinglePromptManager, SimplePromptContext, PromptMode
+from core.ai_client import AIClient, AIConfig, AIProvider
+from gui.ai.enhanced_ai_manager import IntelligentContextBuilder, DynamicPromptGenerator
+
+
+class TestPromptLayout(unittest.TestCase):
+    """分段布局测试类"""
+
+    def test_stable_segments_first(self):
+        layout = PromptLayout()
+        layout.add_volatile('context', "光标前文")
+        layout.add_stable('system', "系统说明")
+        layout.add_stable('empty', "  ")
+        self.assertEqual(layout.to_prompt(), "系统说明\n\n光标前文")
+        self.assertEqual([name for name, _ in layout.stable], ['system'])
+
+    def test_prompt_manager_prefix_is_stable(self):
+        """测试光标位置和文本变化时稳定前缀不变"""
+        manager = SinglePromptManager()
+        text = "林远推开客栈的门。屋里很暗，只有一盏油灯。他在角落坐下，要了一壶酒。"
+        layouts = [
+            manager.generate_prompt_layout(SimplePromptContext(
+                text=text[:cursor], cursor_position=cursor, selected_tags=["武侠"]))
+            for cursor in (9, 20, len(text))
+        ]
+
+        self.assertEqual(len({layout.prefix_key for layout in layouts}), 1)
+        self.assertEqual(len({layout.volatile_text for layout in layouts}), 3)
+        self.assertIn("武功招式", layouts[0].stable_text)
+        self.assertNotIn("客栈", layouts[0].stable_text)
+        self.assertTrue(layouts[0].to_prompt().startswith(layouts[0].stable_text))
+
+    def test_global_codex_in_prefix(self):
+        """测试全局Codex条目进入稳定前缀，两次不同光标位置的补全前缀键相同"""
+        def entry(entry_id, title, description, entry_type="CHARACTER"):
+            return SimpleNamespace(id=entry_id, title=title, description=description,
+                                   entry_type=SimpleNamespace(value=entry_type))
+
+        global_entries = [entry("g2", "林远", "青城派弟子，性格沉稳。"),
+                          entry("g1", "江湖规矩", "门派之间不得私斗。", "LORE"),
+                          entry("g3", "苏晴", "客栈老板娘。")]
+        local_entries = {"c1": entry("c1", "油灯", "客栈中的旧油灯。", "OBJECT"),
+                         "c2": entry("c2", "酒壶", "林远随身的酒壶。", "OBJECT")}
+        rng = random.Random(3)
+        codex_manager = MagicMock()
+        # 每次返回的全局条目顺序不同
+        codex_manager.get_global_entries.side_effect = lambda: rng.sample(global_entries, len(global_entries))
+        codex_manager.get_entry.side_effect = local_entries.get
+
+        builder = IntelligentContextBuilder()
+        builder.codex_manager = codex_manager
+        detector = MagicMock()
+        detector.detect.side_effect = lambda text, cursor_pos, *args, **kwargs: [
+            SimpleNamespace(entry_id="c1" if cursor_pos < 20 else "c2", matched_text=None)]
+        builder._get_window_detector = lambda: detector
+        generator = DynamicPromptGenerator()
+
+        text = "林远推开客栈的门。屋里很暗，只有一盏油灯。他在角落坐下，要了一壶酒。"
+        layouts = [generator.generate_prompt_layout(builder.collect_context(text, cursor), ["武侠"])
+                   for cursor in (18, len(text))]
+
+        self.assertEqual(layouts[0].prefix_key, layouts[1].prefix_key)
+        stable = layouts[0].stable_text
+        self.assertLess(stable.index("江湖规矩"), stable.index("林远"))
+        self.assertLess(stable.index("林远"), stable.index("苏晴"))
+        self.assertNotIn("油灯", stable)
+        self.assertIn("客栈中的旧油灯", layouts[0].volatile_text)
+        self.assertIn("林远随身的酒壶", layouts[1].volatile_text)
+        self.assertNotIn("门派之间不得私斗", layouts[1].volatile_text)
+
+    def test_full_mode_guidance_in_prefix(self):
+        manager = SinglePromptManager()
+        layout = manager.generate_prompt_layout(SimplePromptContext(
+            text="他走了。", cursor_position=4, prompt_mode=PromptMode.FULL))
+        self.assertIn("详细创作指导", layout.stable_text)
+
+
+class TestPromptCacheUsage(unittest.TestCase):
+    """缓存用量提取测试类"""
+
+    def test_openai_usage(self):
+        usage = extract_cache_usage('openai', {
+            'usage': {'prompt_tokens': 1500, 'prompt_tokens_details': {'cached_tokens': 1024}}})
+        self.assertEqual(usage, {'prompt_tokens': 1500, 'cached_tokens': 1024, 'cache_write_tokens': 0})
+
+    def test_claude_usage(self):
+        usage = extract_cache_usage('claude', {'usage': {
+            'input_tokens': 50, 'cache_read_input_tokens': 1200, 'cache_creation_input_tokens': 0}})
+        self.assertEqual(usage['prompt_tokens'], 1250)
+        self.assertEqual(usage['cached_tokens'], 1200)
+
+    def test_gemini_usage(self):
+        usage = extract_cache_usage('gemini', {'usageMetadata': {
+            'promptTokenCount': 2000, 'cachedContentTokenCount': 1800}})
+        self.assertEqual(usage['cached_tokens'], 1800)
+
+    def test_stats_per_provider(self):
+        stats = PromptCacheStats()
+        stats.record('openai', {'usage': {'prompt_tokens': 1000}})
+        stats.record('openai', {'usage': {'prompt_tokens': 1000, 'prompt_tokens_details': {'cached_tokens': 800}}})
+        self.assertIsNone(stats.record('openai', {}))
+
+        result = stats.get_stats()['openai']
+        self.assertEqual(result['requests'], 2)
+        self.assertEqual(result['cache_hit_requests'], 1)
+        self.assertAlmostEqual(result['cached_ratio'], 0.4)
+
+
+class TestCacheControlHints(unittest.TestCase):
+    """缓存提示测试类"""
+
+    def _build(self, provider, **kwargs):
+        client = AIClient(AIConfig(provider=provider, model="test-model", endpoint_url="http://127.0.0.1:1"))
+        messages = client._build_messages("光标前文", "系统说明")
+        return client._build_request_data(messages, **kwargs)
+
+    def test_claude_system_marked_cacheable(self):
+        data = self._build(AIProvider.CLAUDE, cache_system_prompt=True)
+        self.assertEqual(data['system'], [{
+            'type': 'text', 'text': "系统说明", 'cache_control': {'type': 'ephemeral'}}])
+        self.assertEqual(self._build(AIProvider.CLAUDE)['system'], "系统说明")
+
+    def test_openai_compatible_keeps_system_first(self):
+        data = self._build(AIProvider.OLLAMA, cache_system_prompt=True)
+        self.assertEqual(data['messages'][0], {'role': 'system', 'content': "系统说明"})
+        self.assertNotIn('cache_system_prompt', data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+引用检测结果缓存的单元测试
+测试段落级缓存、结果拼接和Codex版本失效
+"""
+
+import unittest
+from unittest.mock import Mock
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.reference_cache import ReferenceDetectionCache
+from core.reference_detector import ReferenceDetector
+from core.codex_manager import CodexManager, CodexEntry, CodexEntryType
+
+
+class TestReferenceDetectionCache(unittest.TestCase):
+    """引用检测缓存测试类"""
+
+    def setUp(self):
+        self.entries = [
+            CodexEntry(id="char1", title="张三", entry_type=CodexEntryType.CHARACTER, aliases=["小张"]),
+            CodexEntry(id="loc1", title="天山", entry_type=CodexEntryType.LOCATION),
+        ]
+        self.codex_manager = Mock(spec=CodexManager)
+        self.codex_manager.get_all_entries.side_effect = lambda: list(self.entries)
+        self.codex_manager.get_entry.side_effect = lambda entry_id: next(
+            (entry for entry in self.entries if entry.id == entry_id), None
+        )
+        self.codex_manager.pattern_version = 1
+
+        self.detector = ReferenceDetector(self.codex_manager)
+        self.cache = ReferenceDetectionCache()
+        self.text = "张三来到了天山。\n小张说：“走吧。”\n\n天山上风很大，张三笑了。"
+
+    def test_results_match_direct_detection(self):
+        """测试拼接后的结果与直接检测一致"""
+        direct = self.detector.detect_references(self.text)
+        cached = self.cache.detect(self.detector, self.text)
+
+        self.assertEqual(
+            [(ref.entry_id, ref.matched_text, ref.start_position, ref.end_position) for ref in cached],
+            [(ref.entry_id, ref.matched_text, ref.start_position, ref.end_position) for ref in direct]
+        )
+        for ref in cached:
+            self.assertEqual(self.text[ref.start_position:ref.end_position], ref.matched_text)
+
+    def test_unchanged_paragraphs_are_reused(self):
+        """测试未修改的段落不会重新检测"""
+        self.cache.detect(self.detector, self.text)
+        misses = self.cache.get_stats()['misses']
+
+        edited = self.text + "\n小张走了。"
+        references = self.cache.detect(self.detector, edited)
+
+        # 只有新增的段落需要检测
+        self.assertEqual(self.cache.get_stats()['misses'], misses + 1)
+        self.assertEqual(references[-1].matched_text, "小张")
+        self.assertEqual(edited[references[-1].start_position:references[-1].end_position], "小张")
+
+    def test_repeated_document_returns_copies(self):
+        """测试重复请求返回独立副本"""
+        first = self.cache.detect(self.detector, self.text)
+        first[0].start_position = -1
+        second = self.cache.detect(self.detector, self.text)
+
+        self.assertEqual(self.cache.get_stats()['document_hits'], 1)
+        self.assertNotEqual(second[0].start_position, -1)
+
+    def test_codex_version_invalidates_cache(self):
+        """测试Codex模式版本变化后缓存失效"""
+        self.cache.detect(self.detector, self.text)
+        self.entries.append(CodexEntry(id="obj1", title="风很大", entry_type=CodexEntryType.OBJECT))
+        self.codex_manager.pattern_version = 2
+
+        references = self.cache.detect(self.detector, self.text)
+        self.assertIn("obj1", [ref.entry_id for ref in references])
+
+    def test_uncached_when_version_unavailable(self):
+        """测试无法获取模式版本时直接检测"""
+        self.codex_manager.pattern_version = Mock()
+        self.cache.detect(self.detector, self.text)
+        self.assertEqual(self.cache.get_stats()['paragraphs'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+"""
+增量搜索高亮的单元测试与输入延迟测试
+"""
+
+import unittest
+import random
+import time
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication, QPlainTextEdit, QTextEdit
+from PyQt6.QtCore import QRegularExpression
+from PyQt6.QtGui import QTextCursor, QTextDocument
+
+from gui.editor.search_highlighter import IncrementalSearchHighlighter, compile_search_pattern
+
+WORDS = ["林风", "走进", "大殿", "看着", "远方", "的", "剑", "说道", "心中", "一阵", "寒意", "夜色", "林雪"]
+
+
+def _chapter(lines, seed=4):
+    rng = random.Random(seed)
+    return "\n".join("".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40))) for _ in range(lines))
+
+
+def _run_until_finished(highlighter, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while not highlighter.is_finished and time.perf_counter() < deadline:
+        QApplication.processEvents()
+
+
+def _captured(pattern, text):
+    """正则表达式在文本中的全部匹配"""
+    iterator = pattern.globalMatch(text)
+    result = []
+    while iterator.hasNext():
+        result.append(iterator.next().captured(0))
+    return result
+
+
+def _expected(text, pattern):
+    """逐行匹配的期望结果（文档内位置）"""
+    result, offset = [], 0
+    for line in text.split("\n"):
+        iterator = pattern.globalMatch(line)
+        while iterator.hasNext():
+            match = iterator.next()
+            result.append((offset + match.capturedStart(), offset + match.capturedEnd()))
+        offset += len(line) + 1
+    return result
+
+
+class TestIncrementalSearchHighlighter(unittest.TestCase):
+    """增量高亮测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.editor = QPlainTextEdit()
+        self.editor.resize(600, 400)
+        self.text = _chapter(2000)
+        self.editor.setPlainText(self.text)
+        self.highlighter = IncrementalSearchHighlighter(self.editor)
+
+    def test_compile_options(self):
+        self.assertIsNone(compile_search_pattern("([", {"regex": True}))
+        self.assertEqual(_captured(compile_search_pattern("cat", {"whole_word": True}), "cat cats Cat"),
+                         ["cat", "Cat"])
+        self.assertEqual(_captured(compile_search_pattern("cat", {"case_sensitive": True}), "cat Cat"), ["cat"])
+        self.assertEqual(_captured(compile_search_pattern("a.b", {}), "a.b axb"), ["a.b"])
+
+    def test_visible_blocks_first_then_idle_slices(self):
+        self.highlighter.set_query("林风")
+        # 可见区域同步完成，其余留待空闲时扫描
+        self.assertGreater(self.highlighter.match_count, 0)
+        self.assertFalse(self.highlighter.is_finished)
+        _run_until_finished(self.highlighter)
+        expected = _expected(self.text, compile_search_pattern("林风", {}))
+        self.assertEqual(self.highlighter.matches(), expected)
+
+        # 额外选区只覆盖视口附近，滚动到末尾后随之更新
+        selections = self.editor.extraSelections()
+        self.assertTrue(0 < len(selections) < len(expected))
+        self.assertEqual((selections[0].cursor.selectionStart(), selections[0].cursor.selectionEnd()), expected[0])
+        self.editor.verticalScrollBar().setValue(self.editor.verticalScrollBar().maximum())
+        last = self.editor.extraSelections()[-1].cursor
+        self.assertEqual((last.selectionStart(), last.selectionEnd()), expected[-1])
+
+    def test_extended_query_rescans_only_matching_blocks(self):
+        self.highlighter.set_query("林")
+        _run_until_finished(self.highlighter)
+        matched_blocks = len(self.highlighter._matches)
+        self.highlighter.set_query("林风")
+        self.assertLessEqual(len(self.highlighter._pending), matched_blocks)
+        _run_until_finished(self.highlighter)
+        self.assertEqual(self.highlighter.matches(), _expected(self.text, compile_search_pattern("林风", {})))
+
+        # 缩短查询时重新扫描全部文本块
+        self.highlighter.set_query("林")
+        _run_until_finished(self.highlighter)
+        self.assertEqual(len(self.highlighter._matches), matched_blocks)
+
+    def test_edit_and_non_bmp_positions(self):
+        self.editor.setPlainText("😀林风\n林风")
+        self.highlighter.set_query("林风")
+        _run_until_finished(self.highlighter)
+        cursors = [selection.cursor.selectedText() for selection in self.editor.extraSelections()]
+        self.assertEqual(cursors, ["林风", "林风"])
+
+        self.editor.textCursor().insertText("林风")
+        _run_until_finished(self.highlighter)
+        self.assertEqual(self.highlighter.match_count, 3)
+
+        self.highlighter.clear()
+        self.assertEqual(self.editor.extraSelections(), [])
+
+    def test_same_regex_dialect_as_find(self):
+        """PCRE2 语法（Unicode属性、命名分组）的高亮与查找下一个的结果一致"""
+        self.editor.setPlainText("😀林风走进大殿\nabc 林风\n林雪")
+        document = self.editor.document()
+        for query in [r"\p{Han}+", r"(?<name>林)风", r"(?<name>林)\k<name>?雪"]:
+            self.highlighter.set_query(query, {"regex": True})
+            _run_until_finished(self.highlighter)
+            found_spans, cursor = [], QTextCursor(document)
+            while True:
+                cursor = document.find(QRegularExpression(query), cursor)
+                if cursor.isNull():
+                    break
+                found_spans.append((cursor.selectionStart(), cursor.selectionEnd()))
+            self.assertTrue(found_spans, query)
+            self.assertEqual(self.highlighter.matches(), found_spans, query)
+
+
+class TestHighlightLatency(unittest.TestCase):
+    """大章节中逐字输入查找文本时的界面阻塞时间"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    @staticmethod
+    def _full_highlight(editor, search_text):
+        """原实现：每次输入都在整个文档中查找，并为每个匹配重新设置额外选区"""
+        selections = []
+        cursor = QTextCursor(editor.document())
+        while True:
+            found = editor.document().find(search_text, cursor, QTextDocument.FindFlag(0))
+            if found.isNull():
+                break
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = found
+            selections.append(selection)
+            editor.setExtraSelections(selections)
+            cursor = found
+
+    def test_keystroke_latency(self):
+        editor = QPlainTextEdit()
+        editor.resize(800, 600)
+        editor.setPlainText(_chapter(20000, seed=9))
+        keystrokes = ["林", "林风", "林风走", "林风走进"]
+
+        start = time.perf_counter()
+        self._full_highlight(editor, keystrokes[-1])
+        full = time.perf_counter() - start
+        editor.setExtraSelections([])
+
+        highlighter = IncrementalSearchHighlighter(editor)
+        blocking = []
+        slices = []
+        original_slice = highlighter._scan_slice
+
+        def timed_slice():
+            slice_start = time.perf_counter()
+            original_slice()
+            slices.append(time.perf_counter() - slice_start)
+
+        highlighter._timer.timeout.disconnect()
+        highlighter._timer.timeout.connect(timed_slice)
+        for text in keystrokes:
+            start = time.perf_counter()
+            highlighter.set_query(text)
+            blocking.append(time.perf_counter() - start)
+            # 两次按键之间处理少量空闲分片
+            for _ in range(3):
+                QApplication.processEvents()
+        _run_until_finished(highlighter)
+
+        print(f"\n20000行章节: 原实现单次高亮 {full * 1000:.0f}ms, 增量高亮每次按键 "
+              f"{max(blocking) * 1000:.1f}ms, 最长空闲分片 {max(slices) * 1000:.1f}ms")
+        self.assertEqual(highlighter.match_count,
+                         len(_expected(editor.toPlainText(), compile_search_pattern("林风走进", {}))))
+        self.assertLess(max(blocking) * 10, full)
+        self.assertLess(max(slices), 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
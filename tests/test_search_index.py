@@ -0,0 +1,183 @@
+"""
+项目全文搜索索引的单元测试与性能测试
+"""
+
+import unittest
+import random
+import shutil
+import tempfile
+import time
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.project import ProjectDocument, DocumentType, DocumentStatus
+from core.search_index import (SearchQuery, ProjectSearchIndex, FTS5_TRIGRAM_AVAILABLE,
+                               document_order, scan_documents, _required_literals)
+
+CHARACTERS = ["林风", "苏雪", "萧无尘", "Alice", "Bob"]
+WORDS = ["走进", "大殿", "看着", "远方", "的", "剑", "说道", "心中", "一阵", "寒意", "夜色", "沉沉"]
+
+
+def _make_document(doc_id, order, content, parent_id=None):
+    return ProjectDocument(id=doc_id, parent_id=parent_id, name=f"第{order + 1}章",
+                           doc_type=DocumentType.CHAPTER, status=DocumentStatus.NEW,
+                           order=order, content=content)
+
+
+def _chapter(rng, lines=200):
+    return "\n".join("".join(rng.choice(WORDS + CHARACTERS) for _ in range(rng.randint(5, 30)))
+                     for _ in range(lines))
+
+
+def _all_hits(batches):
+    return [(hit.doc_id, hit.line_num, hit.spans) for batch in batches for hit in batch]
+
+
+class TestSearchQuery(unittest.TestCase):
+    """搜索条件测试类"""
+
+    def test_case_and_whole_word(self):
+        self.assertEqual(SearchQuery("alice").find_spans("Alice met ALICE"), [(0, 5), (10, 15)])
+        self.assertEqual(SearchQuery("alice", {"case_sensitive": True}).find_spans("Alice"), [])
+        query = SearchQuery("cat", {"whole_word": True})
+        self.assertEqual(query.find_spans("cat concatenate cat."), [(0, 3), (16, 19)])
+
+    def test_cjk_whole_word_uses_segmentation(self):
+        query = SearchQuery("大殿", {"whole_word": True})
+        self.assertTrue(query.matches("林风走进大殿"))
+        self.assertFalse(SearchQuery("殿", {"whole_word": True}).matches("林风走进大殿"))
+
+    def test_terms_without_phrase(self):
+        query = SearchQuery("林风 剑", {"phrase": False})
+        self.assertTrue(query.matches("剑光一闪，林风退后"))
+        self.assertFalse(query.matches("林风退后"))
+        self.assertFalse(SearchQuery("林风 剑").matches("剑光一闪，林风退后"))
+
+    def test_regex_literals(self):
+        self.assertEqual(_required_literals(r"萧无尘.{0,5}说道"), ["萧无尘", "说道"])
+        self.assertEqual(_required_literals(r"^(?:Chapter)\s+\d+"), ["Chapter"])
+        self.assertEqual(_required_literals(r"林风|苏雪"), [])
+        with self.assertRaises(ValueError):
+            SearchQuery("([", {"regex": True})
+
+
+class TestDocumentOrder(unittest.TestCase):
+    """文档顺序测试类"""
+
+    def test_tree_preorder(self):
+        documents = {
+            "b": _make_document("b", 1, ""),
+            "a": _make_document("a", 0, ""),
+            "a2": _make_document("a2", 1, "", parent_id="a"),
+            "a1": _make_document("a1", 0, "", parent_id="a"),
+        }
+        self.assertEqual(document_order(documents), ["a", "a1", "a2", "b"])
+
+
+@unittest.skipUnless(FTS5_TRIGRAM_AVAILABLE, "SQLite不支持FTS5 trigram")
+class TestProjectSearchIndex(unittest.TestCase):
+    """全文索引测试类"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = random.Random(3)
+        self.documents = {f"d{i}": _make_document(f"d{i}", i, _chapter(rng, 50)) for i in range(8)}
+        self.contents = {doc_id: doc.content for doc_id, doc in self.documents.items()}
+        self.order = document_order(self.documents)
+        self.index = ProjectSearchIndex()
+        self.index.attach(self.temp_dir)
+        self.assertEqual(self.index.sync(self.contents), 8)
+
+    def tearDown(self):
+        self.index.detach()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _check(self, text, options=None):
+        query = SearchQuery(text, options)
+        expected = _all_hits(scan_documents(query, self.order, self.contents))
+        self.assertEqual(_all_hits(self.index.search(query, self.order, batch_size=7)), expected)
+        return expected
+
+    def test_results_match_line_scan(self):
+        self.assertTrue(self._check("萧无尘"))
+        self.assertTrue(self._check("剑"))                          # 不足3个字符
+        self.assertTrue(self._check("alice"))
+        self.assertTrue(self._check(r"萧无尘.{0,6}说道", {"regex": True}))
+        self.assertTrue(self._check(r"(林风|苏雪)心中", {"regex": True}))
+        self.assertTrue(self._check("林风 寒意", {"phrase": False}))
+        self.assertTrue(self._check("大殿", {"whole_word": True}))
+
+        # 只含空白的行也要能被没有必需字面量的正则表达式搜到
+        self.contents["d2"] += "\n   \n\t\n\n　正文"
+        self.index.update_document("d2", self.contents["d2"])
+        self.assertEqual(len(self._check(r"^\s*$", {"regex": True})), 2)
+        self.assertTrue(self._check(r"^\s+", {"regex": True}))
+
+    def test_incremental_update_and_persistence(self):
+        self.assertFalse(self.index.update_document("d3", self.contents["d3"]))
+        self.contents["d3"] = "第一行\n这里出现了独一无二的宝物"
+        self.assertTrue(self.index.update_document("d3", self.contents["d3"]))
+        hits = self._check("独一无二")
+        self.assertEqual([(doc_id, line) for doc_id, line, _ in hits], [("d3", 2)])
+
+        self.index.remove_documents(["d5"])
+        del self.contents["d5"]
+        self._check("林风")
+
+        # 重新打开后只需同步发生变化的文档
+        self.index.detach()
+        reopened = ProjectSearchIndex()
+        reopened.attach(self.temp_dir)
+        self.contents["d0"] += "\n新增的一行"
+        self.assertEqual(reopened.sync(self.contents), 1)
+        reopened.detach()
+
+
+@unittest.skipUnless(FTS5_TRIGRAM_AVAILABLE, "SQLite不支持FTS5 trigram")
+class TestSearchPerformance(unittest.TestCase):
+    """数百万字项目的全局搜索耗时"""
+
+    def test_indexed_search_vs_line_scan(self):
+        rng = random.Random(8)
+        documents = {f"d{i}": _make_document(f"d{i}", i, _chapter(rng, 300)) for i in range(200)}
+        documents["d150"].content += "\n月光下，萧无尘取出了那枚古老的青铜令牌"
+        contents = {doc_id: doc.content for doc_id, doc in documents.items()}
+        order = document_order(documents)
+        total_chars = sum(len(content) for content in contents.values())
+
+        # 原实现：逐行转小写并比较
+        start = time.perf_counter()
+        expected = [(doc_id, line_num) for doc_id in order
+                    for line_num, line in enumerate(contents[doc_id].split('\n'), 1)
+                    if "青铜令牌" in line.lower()]
+        line_scan = time.perf_counter() - start
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            index = ProjectSearchIndex()
+            index.attach(temp_dir)
+            start = time.perf_counter()
+            index.sync(contents)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            index.sync(contents)
+            hits = [(hit.doc_id, hit.line_num) for batch in index.search(SearchQuery("青铜令牌"), order)
+                    for hit in batch]
+            indexed = time.perf_counter() - start
+            index.detach()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        print(f"\n{total_chars}字/{len(documents)}个文档: 建立索引 {build * 1000:.0f}ms, "
+              f"逐行扫描 {line_scan * 1000:.1f}ms, 索引搜索(含同步检查) {indexed * 1000:.1f}ms")
+        self.assertEqual(hits, expected)
+        self.assertGreater(total_chars, 2_000_000)
+        self.assertLess(indexed * 5, line_scan)
+
+
+if __name__ == '__main__':
+    unittest.main()
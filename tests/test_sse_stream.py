@@ -0,0 +1,142 @@
+"""
+流式响应处理的单元测试
+测试增量SSE解码、按服务商提取增量文本、数据块合并，以及每1000个token的CPU耗时
+"""
+
+import unittest
+import json
+import time
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.sse_stream import SSEDecoder, StreamDeltaExtractor, ChunkCoalescer
+
+
+def _openai_event(text: str) -> bytes:
+    chunk = {"id": "chatcmpl-1", "object": "chat.completion.chunk",
+             "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+class TestSSEDecoder(unittest.TestCase):
+    """SSE解码器测试类"""
+
+    def test_frames_split_at_every_byte(self):
+        """测试跨读取切分的帧（包括多字节字符中间切分）"""
+        body = _openai_event("夜色") + b": ping\n\n" + _openai_event("渐深") + b"data: [DONE]\n\n"
+        decoder = SSEDecoder()
+        events = []
+        for i in range(len(body)):
+            events.extend(decoder.feed(body[i:i + 1]))
+
+        self.assertEqual(len(events), 3)
+        self.assertEqual(json.loads(events[0])['choices'][0]['delta']['content'], "夜色")
+        self.assertEqual(events[2], "[DONE]")
+
+    def test_crlf_multiline_and_flush(self):
+        """测试CRLF换行、多行data和缺少结尾空行的事件"""
+        decoder = SSEDecoder()
+        events = decoder.feed(b"event: message\r\ndata: {\"a\":\r\ndata: 1}\r\n\r\ndata:[DONE]")
+        self.assertEqual(events, ['{"a":\n1}'])
+        self.assertEqual(decoder.flush(), ["[DONE]"])
+
+
+class TestStreamDeltaExtractor(unittest.TestCase):
+    """增量文本提取测试类"""
+
+    def test_openai_format(self):
+        extractor = StreamDeltaExtractor('openai')
+        self.assertEqual(extractor.extract(_openai_event("天")[6:-2].decode('utf-8')), "天")
+        self.assertIsNone(extractor.extract('{"choices":[{"delta":{"role":"assistant"}}]}'))
+        self.assertEqual(extractor.skipped, 1)
+
+    def test_claude_format(self):
+        extractor = StreamDeltaExtractor('claude')
+        self.assertIsNone(extractor.extract('{"type":"ping"}'))
+        self.assertEqual(extractor.extract(
+            '{"type":"content_block_delta","index":0,"delta":{"type":"text_delta","text":"色"}}'), "色")
+        self.assertEqual(extractor.parsed, 1)
+
+    def test_gemini_format(self):
+        extractor = StreamDeltaExtractor('gemini')
+        self.assertEqual(extractor.extract(
+            '{"candidates":[{"content":{"parts":[{"text":"渐"},{"text":"暗"}]}}]}'), "渐暗")
+
+    def test_events_without_blank_line_separator(self):
+        """测试服务端未以空行分隔事件时逐行解析"""
+        extractor = StreamDeltaExtractor('openai')
+        payload = '{"choices":[{"delta":{"content":"天"}}]}\n{"choices":[{"delta":{"content":"色"}}]}'
+        self.assertEqual(extractor.extract(payload), "天色")
+
+
+class TestChunkCoalescer(unittest.TestCase):
+    """数据块合并测试类"""
+
+    def test_coalesce_within_interval(self):
+        emitted = []
+        coalescer = ChunkCoalescer(emitted.append, interval_ms=1000)
+        for piece in ["天", "色", "渐", "暗"]:
+            coalescer.push(piece)
+        coalescer.flush()
+        self.assertEqual(emitted, ["天", "色渐暗"])
+
+    def test_zero_interval_emits_every_chunk(self):
+        emitted = []
+        coalescer = ChunkCoalescer(emitted.append, interval_ms=0)
+        for piece in ["天", "色"]:
+            coalescer.push(piece)
+        self.assertEqual(emitted, ["天", "色"])
+
+    def test_discard(self):
+        emitted = []
+        coalescer = ChunkCoalescer(emitted.append, interval_ms=1000)
+        coalescer.push("天")
+        coalescer.push("色")
+        coalescer.discard()
+        coalescer.flush()
+        self.assertEqual(emitted, ["天"])
+
+
+class TestStreamParsingPerformance(unittest.TestCase):
+    """流式解析CPU耗时测试"""
+
+    TOKENS = 20000
+    READ_SIZE = 1500  # 模拟网络读取的切分大小
+    MAX_CPU_MS_PER_1000_TOKENS = 50.0
+
+    def setUp(self):
+        self.body = b"".join(_openai_event("字") for _ in range(self.TOKENS)) + b"data: [DONE]\n\n"
+        self.reads = [self.body[i:i + self.READ_SIZE] for i in range(0, len(self.body), self.READ_SIZE)]
+
+    def test_cpu_per_1000_tokens(self):
+        """测试每1000个流式token的解析CPU耗时"""
+        start = time.process_time()
+        decoder = SSEDecoder()
+        extractor = StreamDeltaExtractor('openai')
+        emitted = []
+        coalescer = ChunkCoalescer(emitted.append, interval_ms=50)
+        tokens = 0
+        for data in self.reads:
+            for payload in decoder.feed(data):
+                if payload == '[DONE]':
+                    break
+                content = extractor.extract(payload)
+                if content:
+                    tokens += 1
+                    coalescer.push(content)
+        coalescer.flush()
+        cpu_ms = (time.process_time() - start) * 1000 / (self.TOKENS / 1000)
+
+        self.assertEqual(tokens, self.TOKENS)
+        self.assertEqual(''.join(emitted), "字" * self.TOKENS)
+        self.assertLess(len(emitted), self.TOKENS)
+        print(f"\n流式解析: {cpu_ms:.2f} ms CPU / 1000 token，界面更新 {len(emitted)} 次")
+        self.assertLess(cpu_ms, self.MAX_CPU_MS_PER_1000_TOKENS,
+                        f"流式解析CPU耗时过高: {cpu_ms:.2f} ms / 1000 token")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+时间线事件索引与分析的单元测试与性能测试
+"""
+
+import unittest
+import random
+import time
+import sys
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from gui.panels.timeline_index import EventIntervalIndex, count_cooccurrences
+from gui.panels.timeline_engine import TimelineEvent, TimelineTrack, TimelineAnalyzer, TimelineEngine
+
+BASE = datetime(2024, 1, 1)
+
+
+def _random_events(count, codex_id="c", seed=1, span_days=365):
+    rng = random.Random(seed)
+    return [TimelineEvent(id=f"{codex_id}_{i}", codex_id=codex_id, title=f"事件{i}",
+                          timestamp=BASE + timedelta(days=rng.uniform(0, span_days)),
+                          duration=timedelta(days=rng.choice([0, 0, 3, 30])))
+            for i in range(count)]
+
+
+class FakeCodexManager:
+    """只提供时间线需要的接口"""
+
+    def __init__(self, entries):
+        self.entries = {entry.id: entry for entry in entries}
+
+    def get_all_entries(self):
+        return list(self.entries.values())
+
+    def get_entry(self, entry_id):
+        return self.entries.get(entry_id)
+
+
+def _entry(entry_id, dates):
+    return SimpleNamespace(id=entry_id, title=f"条目{entry_id}",
+                           entry_type=SimpleNamespace(value='CHARACTER'),
+                           progression=[{'title': f"进展{i}", 'date': date.isoformat()}
+                                        for i, date in enumerate(dates)])
+
+
+class TestEventIntervalIndex(unittest.TestCase):
+    """事件索引测试类"""
+
+    def setUp(self):
+        self.events = _random_events(500)
+        self.index = EventIntervalIndex(self.events)
+
+    def test_range_query_matches_linear_filter(self):
+        start, end = BASE + timedelta(days=100), BASE + timedelta(days=130)
+        expected = sorted((e for e in self.events if start <= e.timestamp <= end),
+                          key=lambda e: e.timestamp)
+        self.assertEqual(self.index.in_range(start, end), expected)
+
+    def test_overlapping_query(self):
+        start, end = BASE + timedelta(days=200), BASE + timedelta(days=201)
+        expected = {e.id for e in self.events
+                    if e.timestamp <= end and e.timestamp + e.duration >= start}
+        hits = self.index.overlapping(start, end)
+        self.assertEqual({e.id for e in hits}, expected)
+        self.assertEqual(hits, sorted(hits, key=lambda e: e.timestamp))
+
+    def test_incremental_add_remove(self):
+        moved = self.events[0]
+        self.index.remove(moved.id)
+        moved.timestamp = BASE + timedelta(days=1000)
+        self.index.add(moved)
+        self.assertIs(self.index.events[-1], moved)
+        self.assertEqual(self.index.overlapping(BASE + timedelta(days=999), BASE + timedelta(days=1001)),
+                         [moved])
+        self.assertIsNone(self.index.remove("missing"))
+        self.assertEqual(len(self.index), 500)
+
+    def test_track_uses_index(self):
+        track = TimelineTrack(codex_id="c", codex_title="条目", codex_type="CHARACTER",
+                              events=list(self.events))
+        self.assertEqual(track.date_range, (min(e.timestamp for e in self.events),
+                                            max(e.timestamp for e in self.events)))
+        # 直接追加事件后索引自动重建
+        late = TimelineEvent(id="late", codex_id="c", title="最后", timestamp=BASE + timedelta(days=900))
+        track.events.append(late)
+        self.assertEqual(track.get_events_in_range(BASE + timedelta(days=800), BASE + timedelta(days=999)),
+                         [late])
+
+
+class TestTimelineAnalysis(unittest.TestCase):
+    """窗口共现与增量分析测试类"""
+
+    def test_cooccurrence_matches_pairwise(self):
+        rng = random.Random(4)
+        times_a = sorted(rng.uniform(0, 1000) for _ in range(300))
+        times_b = sorted(rng.uniform(0, 1000) for _ in range(200))
+        expected = sum(1 for a in times_a for b in times_b if abs(a - b) <= 7)
+        self.assertEqual(count_cooccurrences(times_a, times_b, 7), expected)
+
+    def test_correlation_matrix_symmetric_and_cached(self):
+        tracks = [TimelineTrack(codex_id=f"t{i}", codex_title=f"轨道{i}", codex_type="CHARACTER",
+                                events=_random_events(100, f"t{i}", seed=i)) for i in range(3)]
+        analyzer = TimelineAnalyzer()
+        matrix = analyzer._calculate_correlation_matrix(tracks)
+        self.assertEqual(matrix["t0"]["t0"], 1.0)
+        self.assertEqual(matrix["t0"]["t1"], matrix["t1"]["t0"])
+        self.assertAlmostEqual(matrix["t0"]["t2"],
+                               analyzer._calculate_temporal_correlation(tracks[0].events, tracks[2].events))
+
+        cached = dict(analyzer.cache)
+        tracks[1].add_event(TimelineEvent(id="new", codex_id="t1", title="新事件", timestamp=BASE))
+        analyzer._calculate_correlation_matrix(tracks)
+        # 只有与t1相关的轨道对被重新计算
+        self.assertEqual(analyzer.cache[('correlation', 't0', 't2')], cached[('correlation', 't0', 't2')])
+        self.assertNotEqual(analyzer.cache[('correlation', 't0', 't1')][0],
+                            cached[('correlation', 't0', 't1')][0])
+
+    def test_engine_incremental_update(self):
+        manager = FakeCodexManager([_entry("a", [BASE, BASE + timedelta(days=3)]),
+                                    _entry("b", [BASE + timedelta(days=1)])])
+        engine = TimelineEngine(manager)
+        engine.load_progression_data()
+        untouched = engine.tracks["b"].events[0]
+        engine.toggle_track_visibility("a", False)
+
+        manager.entries["b"].progression.append({'title': "新进展", 'date': (BASE + timedelta(days=40)).isoformat()})
+        self.assertTrue(engine.update_entry("b"))
+        self.assertIs(engine.tracks["b"].events[0], untouched)
+        self.assertEqual(engine.tracks["b"].event_count, 2)
+        self.assertFalse(engine.tracks["a"].visible)
+        self.assertGreaterEqual(engine.view_range[1], BASE + timedelta(days=40))
+        self.assertFalse(engine.update_entry("b"))
+
+        del manager.entries["a"]
+        self.assertTrue(engine.update_entry("a"))
+        self.assertNotIn("a", engine.tracks)
+
+
+class TestTimelineAnalysisPerformance(unittest.TestCase):
+    """多轨道长进展的相关性分析耗时"""
+
+    def test_correlation_matrix_scaling(self):
+        tracks = [TimelineTrack(codex_id=f"t{i}", codex_title=f"轨道{i}", codex_type="CHARACTER",
+                                events=_random_events(2000, f"t{i}", seed=i, span_days=3650))
+                  for i in range(30)]
+        analyzer = TimelineAnalyzer()
+        start = time.perf_counter()
+        analyzer._calculate_correlation_matrix(tracks)
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tracks[5].add_event(TimelineEvent(id="extra", codex_id="t5", title="新增", timestamp=BASE))
+        analyzer._calculate_correlation_matrix(tracks)
+        incremental = time.perf_counter() - start
+
+        print(f"\n30条轨道×2000个事件相关性矩阵: 全量 {elapsed * 1000:.0f}ms, 单条目更新后 {incremental * 1000:.0f}ms")
+        # 逐对比较需要 435 × 400万次比较
+        self.assertLess(elapsed, 5.0)
+        self.assertLess(incremental, elapsed / 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+时间线瓦片渲染的单元测试与帧耗时测试
+"""
+
+import unittest
+import random
+import time
+import sys
+import os
+from datetime import datetime, timedelta
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import QRect
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QImage, QPainter, QColor
+
+from gui.panels.timeline_engine import (TimelineEvent, TimelineTrack, TimelineRenderer,
+                                        TimelineEngine, EventType)
+from gui.panels.timeline_tiles import TrackTileCache
+
+from test_timeline_index import FakeCodexManager, _entry
+
+BASE = datetime(2015, 1, 1)
+
+
+def _story_tracks(track_count, event_count, span_days=3650, seed=7):
+    rng = random.Random(seed)
+    types = list(EventType)
+    tracks = []
+    for t in range(track_count):
+        events = [TimelineEvent(id=f"t{t}_{i}", codex_id=f"t{t}", title=f"事件{i}",
+                                event_type=rng.choice(types), importance=rng.randint(1, 5),
+                                timestamp=BASE + timedelta(days=rng.uniform(0, span_days)))
+                  for i in range(event_count)]
+        tracks.append(TimelineTrack(codex_id=f"t{t}", codex_title=f"角色{t}",
+                                    codex_type="CHARACTER", events=events))
+    return tracks
+
+
+def _render_frame(renderer, tracks, view_range, size=(1280, 800)):
+    """离屏渲染一帧，返回 (耗时秒, 图像)"""
+    image = QImage(size[0], size[1], QImage.Format.Format_ARGB32_Premultiplied)
+    painter = QPainter(image)
+    start = time.perf_counter()
+    renderer.render_timeline(painter, QRect(0, 0, size[0], size[1]), tracks, view_range)
+    elapsed = time.perf_counter() - start
+    painter.end()
+    return elapsed, image
+
+
+class TestTrackTileCache(unittest.TestCase):
+    """瓦片缓存测试类"""
+
+    def test_scale_key_absorbs_rounding(self):
+        self.assertEqual(TrackTileCache.scale_key(86400.0000001), TrackTileCache.scale_key(86400.0))
+        self.assertEqual(list(TrackTileCache(tile_width=100).tile_range(-50, 250)), [-1, 0, 1, 2])
+
+    def test_lru_and_invalidation(self):
+        cache = TrackTileCache(tile_width=100, max_tiles=3)
+        for index in range(4):
+            cache.put(("a", 1.0, index), object())
+        self.assertNotIn(("a", 1.0, 0), cache)
+        self.assertEqual(len(cache), 3)
+
+        cache.sync_track("a", 1, ())
+        cache.put(("a", 1.0, 5), object())
+        cache.put(("a", 2.0, 2), object())
+        # 时间点 520 秒位于比例1.0的第5块瓦片、比例2.0的第2块瓦片
+        self.assertEqual(cache.invalidate_times("a", [520.0], pad_pixels=5, version=2), 2)
+        cache.sync_track("a", 2, ())
+        self.assertEqual(len(cache.keys("a")), 0)
+        cache.put(("a", 1.0, 7), object())
+        cache.sync_track("a", 3, ())
+        self.assertEqual(len(cache), 0)
+
+
+class TestTiledRendering(unittest.TestCase):
+    """瓦片渲染测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.tracks = _story_tracks(3, 200)
+        self.renderer = TimelineRenderer()
+        self.view = (BASE + timedelta(days=1000), BASE + timedelta(days=1365))
+
+    def test_event_drawn_where_expected(self):
+        track = self.tracks[0]
+        event = track.events[0]
+        track.events[:] = [event]
+        view = (event.timestamp - timedelta(days=100), event.timestamp + timedelta(days=100))
+        _, image = _render_frame(self.renderer, [track], view)
+        # 事件位于时间线区域的水平中点、第一条轨道的垂直中点
+        center = image.pixelColor(640, 50 + 40 + track.height // 2)
+        self.assertEqual(center.rgb(), event.color.rgb())
+        self.assertEqual(image.pixelColor(400, 50 + 40 + track.height // 2).rgb(),
+                         track.color.lighter(180).rgb())
+
+    def test_panning_reuses_tiles(self):
+        _render_frame(self.renderer, self.tracks, self.view)
+        rendered = self.renderer.tiles_rendered
+        self.assertGreater(rendered, 0)
+        _render_frame(self.renderer, self.tracks, self.view)
+        self.assertEqual(self.renderer.tiles_rendered, rendered)
+
+        # 平移约100像素，每条轨道最多新增一块瓦片
+        shift = (self.view[1] - self.view[0]) * 100 / 1180
+        _render_frame(self.renderer, self.tracks, (self.view[0] + shift, self.view[1] + shift))
+        self.assertLessEqual(self.renderer.tiles_rendered - rendered, len(self.tracks))
+
+    def test_offscreen_events_not_rasterized(self):
+        track = self.tracks[0]
+        far = TimelineEvent(id="far", codex_id="t0", title="远处", timestamp=BASE + timedelta(days=9000))
+        track.add_event(far)
+        _render_frame(self.renderer, [track], self.view)
+        scale = next(iter(self.renderer.tile_cache.keys("t0")))[1]
+        self.assertTrue(all(key[2] * 256 * scale < (far.timestamp - datetime(1970, 1, 1)).total_seconds()
+                            for key in self.renderer.tile_cache.keys("t0")))
+
+    def test_engine_update_invalidates_only_dirty_tiles(self):
+        dates = [BASE + timedelta(days=30 * i) for i in range(40)]
+        manager = FakeCodexManager([_entry("a", dates)])
+        engine = TimelineEngine(manager)
+        engine.load_progression_data()
+        tracks = list(engine.tracks.values())
+        _render_frame(engine.renderer, tracks, engine.view_range)
+        before = engine.renderer.tile_cache.keys("a")
+        self.assertGreater(len(before), 3)
+
+        manager.entries["a"].progression[5]['date'] = (dates[5] + timedelta(hours=6)).isoformat()
+        self.assertTrue(engine.update_entry("a"))
+        after = engine.renderer.tile_cache.keys("a")
+        self.assertTrue(0 < len(before - after) <= 2)
+
+        rendered = engine.renderer.tiles_rendered
+        _render_frame(engine.renderer, tracks, engine.view_range)
+        self.assertEqual(engine.renderer.tiles_rendered - rendered, len(before - after))
+
+        # 绕过引擎直接修改轨道时整条轨道重新绘制
+        tracks[0].add_event(TimelineEvent(id="direct", codex_id="a", title="直接添加", timestamp=dates[20]))
+        _render_frame(engine.renderer, tracks, engine.view_range)
+        self.assertEqual(engine.renderer.tiles_rendered - rendered, len(before - after) + len(before))
+
+
+class TestTimelineRenderingPerformance(unittest.TestCase):
+    """十年跨度时间线的平移帧耗时"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def test_panning_frame_time(self):
+        tracks = _story_tracks(12, 3000)
+        view_start, view_end = BASE + timedelta(days=1200), BASE + timedelta(days=2100)
+        step = (view_end - view_start) / 60   # 每帧平移约20像素
+
+        timings = {}
+        for use_tiles in (False, True):
+            renderer = TimelineRenderer()
+            renderer.use_tile_cache = use_tiles
+            _render_frame(renderer, tracks, (view_start, view_end))
+            frames = [_render_frame(renderer, tracks, (view_start + step * i, view_end + step * i))[0]
+                      for i in range(1, 31)]
+            timings[use_tiles] = sum(frames) / len(frames)
+
+        print(f"\n12条轨道×3000个事件（十年跨度）平移: 逐帧绘制 {timings[False] * 1000:.1f}ms/帧, "
+              f"瓦片缓存 {timings[True] * 1000:.1f}ms/帧")
+        self.assertLess(timings[True], timings[False] / 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
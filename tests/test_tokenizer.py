@@ -0,0 +1,211 @@
+"""
+分词与token预算的单元测试
+"""
+
+import unittest
+import threading
+import time
+import sys
+import os
+from unittest.mock import Mock, patch
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import core.tokenizer as tokenizer_module
+from core.tokenizer import (
+    Tokenizer, HeuristicTokenizer, CachedTokenCounter, TokenBudget, create_tokenizer
+)
+from core.context_injector import SmartContextInjector, ContextSection
+from core.simple_prompt_service import AutoContextInjector, SimplePromptContext, PromptMode
+from gui.ai.enhanced_ai_manager import IntelligentContextBuilder
+
+
+class _CharTokenizer(Tokenizer):
+    """每个字符一个token，便于精确断言"""
+
+    name = "char"
+
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text: str) -> int:
+        self.calls += 1
+        return len(text)
+
+
+class TestHeuristicTokenizer(unittest.TestCase):
+    """估算分词器测试类"""
+
+    def setUp(self):
+        self.tokenizer = HeuristicTokenizer()
+
+    def test_count(self):
+        self.assertEqual(self.tokenizer.count(""), 0)
+        self.assertEqual(self.tokenizer.count("hello world"), 2)
+        self.assertEqual(self.tokenizer.count("2024"), 2)
+        self.assertEqual(self.tokenizer.count("一二三四五"), 6)
+
+    def test_truncate_within_budget(self):
+        text = "他走进客栈，说道：今天的风很大。" * 20
+        for keep_tail in (False, True):
+            truncated = self.tokenizer.truncate(text, 50, keep_tail)
+            self.assertLessEqual(self.tokenizer.count(truncated), 50)
+            self.assertGreater(self.tokenizer.count(truncated), 45)
+            if keep_tail:
+                self.assertTrue(text.endswith(truncated))
+            else:
+                self.assertTrue(text.startswith(truncated))
+
+    def test_create_tokenizer(self):
+        self.assertIsInstance(create_tokenizer("heuristic"), HeuristicTokenizer)
+        self.assertIsInstance(create_tokenizer("auto"), Tokenizer)
+
+    def test_fallback_warns_once(self):
+        with patch.object(tokenizer_module, "TiktokenTokenizer", side_effect=ImportError), \
+                patch.object(tokenizer_module, "_fallback_warned", False), \
+                self.assertLogs(tokenizer_module.logger, "WARNING") as logs:
+            self.assertIsInstance(create_tokenizer("auto"), HeuristicTokenizer)
+            self.assertIsInstance(create_tokenizer("tiktoken:o200k_base"), HeuristicTokenizer)
+        self.assertEqual(len(logs.records), 1)
+
+    def test_background_load_does_not_block(self):
+        """tiktoken编码在后台线程加载，加载完成前使用估算分词器"""
+        loaded = threading.Event()
+        loader_threads = []
+
+        class _SlowTiktoken(_CharTokenizer):
+            name = "tiktoken:test"
+
+            def __init__(self, encoding_name):
+                super().__init__()
+                loader_threads.append(threading.current_thread())
+                loaded.wait(5)
+
+        with patch.object(tokenizer_module, "TiktokenTokenizer", _SlowTiktoken), \
+                patch.object(tokenizer_module, "_global_token_counter", None), \
+                patch("core.config.get_config", return_value=None):
+            counter = tokenizer_module.get_token_counter()
+            self.assertIsInstance(counter.tokenizer, HeuristicTokenizer)
+            self.assertEqual(counter.count("一二三四五"), 6)
+            loaded.set()
+            deadline = time.time() + 5
+            while counter.name != "tiktoken:test" and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(counter.count("一二三四五"), 5)
+        self.assertIsNot(loader_threads[0], threading.main_thread())
+
+
+class TestTokenBudget(unittest.TestCase):
+    """token预算测试类"""
+
+    def setUp(self):
+        self.tokenizer = _CharTokenizer()
+        self.counter = CachedTokenCounter(self.tokenizer)
+        self.budget = TokenBudget(20, self.counter)
+
+    def test_allocation_by_priority(self):
+        self.budget.set_section("story", "a" * 8, priority=7)
+        self.budget.set_section("codex", "b" * 10, priority=8)
+        self.budget.set_section("project", "c" * 5, priority=5, min_tokens=3)
+
+        allocation = self.budget.allocate()
+        self.assertEqual(allocation["codex"], "b" * 10)
+        self.assertEqual(allocation["story"], "a" * 8)
+        self.assertNotIn("project", allocation)  # 剩余2个token，不足min_tokens
+        self.assertEqual(self.budget.used_tokens, 18)
+
+    def test_truncate_to_remaining(self):
+        self.budget.set_section("codex", "b" * 15, priority=8)
+        self.budget.set_section("story", "a" * 10, priority=7, keep_tail=True)
+        allocation = self.budget.allocate()
+        self.assertEqual(allocation["story"], "a" * 5)
+        self.assertEqual(self.budget.used_tokens, 20)
+
+    def test_unchanged_sections_not_recounted(self):
+        self.budget.set_section("codex", "b" * 10, priority=8)
+        self.budget.set_section("story", "a" * 8, priority=7)
+        self.budget.allocate()
+        calls = self.tokenizer.calls
+
+        self.budget.set_section("codex", "b" * 10, priority=8)
+        self.budget.set_section("story", "a" * 9, priority=7)
+        self.budget.allocate()
+        self.assertEqual(self.tokenizer.calls, calls + 1)
+
+
+class TestContextInjectorBudget(unittest.TestCase):
+    """上下文注入器预算分配测试类"""
+
+    def test_sections_fit_token_limit(self):
+        injector = SmartContextInjector(Mock(), Mock())
+        injector.max_context_tokens = 400
+        sections = [
+            ContextSection("当前场景相关信息", "林远是青云宗弟子。" * 20, priority=8),
+            ContextSection("故事发展", "故事发展到目前为止：\n" + "林远下山历练。" * 30, priority=7),
+            ContextSection("项目信息", "作品名称：青云志", priority=5),
+        ]
+        for section in sections:
+            section.token_estimate = injector._estimate_tokens(section.content)
+
+        selected = injector._select_context_sections(sections)
+        total = sum(injector._estimate_tokens(section.content) for section in selected)
+        self.assertLessEqual(total, 400)
+        self.assertEqual(selected[0].content, sections[0].content)
+        self.assertTrue(selected[1].content.endswith("..."))
+
+    def test_no_section_left_with_only_ellipsis(self):
+        injector = SmartContextInjector(Mock(), Mock())
+        injector.min_section_tokens = 0
+        first = ContextSection("当前场景相关信息", "林远是青云宗弟子。" * 20, priority=8)
+        second = ContextSection("故事发展", "林远下山历练。" * 30, priority=7)
+        injector.max_context_tokens = injector._estimate_tokens(first.content) + 2
+
+        selected = injector._select_context_sections([first, second])
+        self.assertEqual([section.title for section in selected], ["当前场景相关信息"])
+
+        injector.max_context_tokens = injector._estimate_tokens(first.content) + 20
+        selected = injector._select_context_sections([first, second])
+        self.assertEqual(len(selected), 2)
+        self.assertTrue(selected[1].content.startswith("林远"))
+        self.assertTrue(selected[1].content.endswith("..."))
+
+
+class TestPromptContextBudget(unittest.TestCase):
+    """补全提示词写作上下文的token预算测试类"""
+
+    def setUp(self):
+        self.counter = CachedTokenCounter(_CharTokenizer())
+
+    def test_auto_injector_shares_budget_with_rag(self):
+        with patch('core.simple_prompt_service.get_token_counter', return_value=self.counter):
+            injector = AutoContextInjector()
+        context = SimplePromptContext(text="甲" * 5000 + "乙" * 1000, cursor_position=5000,
+                                      prompt_mode=PromptMode.BALANCED)
+
+        allocated = injector.allocate_context(context, "丙" * 1000)
+        self.assertEqual(allocated["rag_context"], "丙" * 300)
+        self.assertEqual(allocated["current_text"], "甲" * 450 + "乙" * 150)
+
+        # 没有RAG结果时光标前文用满剩余预算
+        allocated = injector.allocate_context(context)
+        self.assertEqual(allocated["rag_context"], "")
+        self.assertEqual(allocated["current_text"], "甲" * 750 + "乙" * 150)
+
+    def test_text_context_within_token_budget(self):
+        text = "林风走进大殿，看着远方。" * 200
+        cursor_pos = len(text) // 2
+        with patch('gui.ai.enhanced_ai_manager.get_token_counter', return_value=self.counter):
+            builder = IntelligentContextBuilder()
+
+        for mode, tokens in IntelligentContextBuilder.TEXT_CONTEXT_TOKENS.items():
+            context = builder._extract_text_context(text, cursor_pos, mode)
+            self.assertLessEqual(len(context["before"]), tokens)
+            self.assertGreater(len(context["before"]), tokens // 2)
+            self.assertTrue(text[:cursor_pos].endswith(context["before"]))
+            self.assertLessEqual(len(context["after"]), tokens // 2)
+            self.assertTrue(text[cursor_pos:].startswith(context["after"]))
+
+
+if __name__ == '__main__':
+    unittest.main()